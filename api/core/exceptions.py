@@ -7,6 +7,7 @@ from fastapi.responses import JSONResponse
 class AppError(Exception):
     status_code = 500
     detail = "Internal server error"
+    headers: dict[str, str] | None = None
 
     def __init__(self, detail: str | None = None) -> None:
         self.detail = detail or self.detail
@@ -28,6 +29,21 @@ class TransactionNotFoundError(NotFoundError):
         super().__init__(f"Transaction not found: {transaction_id}")
 
 
+class ThresholdVersionNotFoundError(NotFoundError):
+    def __init__(self, version_id: int) -> None:
+        super().__init__(f"Threshold version not found: {version_id}")
+
+
+class PredictionNotFoundError(NotFoundError):
+    def __init__(self, transaction_id: str) -> None:
+        super().__init__(f"No prediction for transaction: {transaction_id}")
+
+
+class ExplanationUnavailableError(AppError):
+    status_code = 501
+    detail = "The loaded model does not support explanations"
+
+
 class InvalidUploadError(BadRequestError):
     pass
 
@@ -36,6 +52,10 @@ class InvalidCSVError(BadRequestError):
     pass
 
 
+class InvalidTimeRangeError(BadRequestError):
+    detail = "start must be earlier than end"
+
+
 class CreateOrScoreFailedError(AppError):
     def __init__(self, transaction_id: str) -> None:
         super().__init__(f"Create-and-score failed for transaction: {transaction_id}")
@@ -46,6 +66,41 @@ class UpdateOrRescoreFailedError(AppError):
         super().__init__(f"Update-and-rescore failed for transaction: {transaction_id}")
 
 
+class TransactionUpdateConflictError(AppError):
+    status_code = 409
+
+    def __init__(self, transaction_id: str) -> None:
+        super().__init__(
+            f"Transaction kept changing during the update, retry: {transaction_id}"
+        )
+
+
+class ServiceOverloadedError(AppError):
+    status_code = 503
+    detail = "Too many scoring requests in flight, retry later"
+
+    def __init__(self, retry_after_seconds: int) -> None:
+        super().__init__()
+        self.headers = {"Retry-After": str(retry_after_seconds)}
+
+
+class IdempotencyKeyReusedError(AppError):
+    status_code = 422
+
+    def __init__(self, key: str) -> None:
+        super().__init__(
+            f"Idempotency-Key was already used for a different request: {key}"
+        )
+
+
+class IdempotencyKeyInProgressError(AppError):
+    status_code = 409
+
+    def __init__(self, key: str, retry_after_seconds: int = 1) -> None:
+        super().__init__(f"A request with this Idempotency-Key is in progress: {key}")
+        self.headers = {"Retry-After": str(retry_after_seconds)}
+
+
 class CSVImportFailedError(AppError):
     def __init__(self, filename: str | None) -> None:
         file_label = filename or "<unknown>"
@@ -61,6 +116,7 @@ async def app_error_handler(_request: Request, exc: Exception) -> JSONResponse:
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
+        headers=exc.headers,
     )
 
 
@@ -1,3 +1,4 @@
+import hashlib
 import os
 from pathlib import Path
 from threading import Lock
@@ -10,6 +11,8 @@ from api.core.logfire import get_logger
 
 _lock = Lock()
 _bundle: dict[str, Any] | None = None
+_bundle_digest: str | None = None
+_shadow_bundles: dict[str, dict[str, Any]] = {}
 logger = get_logger(__name__)
 
 
@@ -24,12 +27,30 @@ class _JoblibCompat:
 joblib: Any = _joblib if hasattr(_joblib, "load") else _JoblibCompat()
 
 
+def _load_bundle(model_path: Path) -> dict[str, Any]:
+    if not model_path.exists():
+        msg = f"Model file not found at {model_path}. Set MODEL_PATH correctly."
+        raise RuntimeError(msg)
+
+    loaded = joblib.load(model_path)
+    logger.info("Loaded model bundle from %s", model_path)
+
+    if not isinstance(loaded, dict) or "model" not in loaded:
+        msg = (
+            f"Invalid model artifact at {model_path}. "
+            "Expected dict with key 'model'. "
+            f"Got {type(loaded)}"
+        )
+        raise RuntimeError(msg)
+    return loaded
+
+
 def get_model_bundle() -> dict[str, Any]:
     """
     Lazy-load model bundle from joblib once per process.
     Expected keys: 'model', 'threshold'
     """
-    global _bundle
+    global _bundle, _bundle_digest
     if _bundle is not None:
         return _bundle
 
@@ -43,29 +64,52 @@ def get_model_bundle() -> dict[str, Any]:
             msg = "MODEL_PATH environment variable is not set"
             raise RuntimeError(msg) from e
 
-        if not model_path.exists():
-            msg = f"Model file not found at {model_path}. Set MODEL_PATH correctly."
-            raise RuntimeError(msg)
+        _bundle = _load_bundle(model_path)
+        _bundle_digest = hashlib.sha256(model_path.read_bytes()).hexdigest()[:16]
+        return _bundle
+
+
+def model_bundle_loaded() -> bool:
+    """Whether ``get_model_bundle`` has loaded the bundle, without loading it."""
+    return _bundle is not None
 
-        loaded = joblib.load(model_path)
-        logger.info("Loaded model bundle from %s", model_path)
 
-        if not isinstance(loaded, dict) or "model" not in loaded:
-            msg = (
-                f"Invalid model artifact at {model_path}. "
-                "Expected dict with key 'model'. "
-                f"Got {type(loaded)}"
-            )
+def load_shadow_bundles(paths: list[str]) -> dict[str, dict[str, Any]]:
+    """
+    Load challenger bundles scored in shadow next to the champion, keyed by
+    name: the bundle's 'name' key, or the file name without its suffix.
+    """
+    global _shadow_bundles
+    bundles: dict[str, dict[str, Any]] = {}
+    for path in paths:
+        model_path = Path(path)
+        bundle = _load_bundle(model_path)
+        name = str(bundle.get("name") or model_path.stem)
+        if name in bundles:
+            msg = f"Duplicate shadow model name: {name}"
             raise RuntimeError(msg)
+        bundles[name] = bundle
+    with _lock:
+        _shadow_bundles = bundles
+    return bundles
 
-        _bundle = loaded
-        return _bundle
+
+def get_shadow_bundles() -> dict[str, dict[str, Any]]:
+    return _shadow_bundles
 
 
 def get_model():
     return get_model_bundle()["model"]
 
 
+def get_model_version() -> str:
+    """The bundle's 'version' key, or a digest of the model file."""
+    bundle = get_model_bundle()
+    if "version" in bundle:
+        return str(bundle["version"])
+    return _bundle_digest or "unversioned"
+
+
 def get_threshold(default: float = 0.5) -> float:
     bundle = get_model_bundle()
     return float(bundle.get("threshold", default))
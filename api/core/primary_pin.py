@@ -0,0 +1,43 @@
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.database import primary_pin
+
+PIN_COOKIE = "db_primary_pin"
+_SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class PrimaryPinMiddleware:
+    """
+    Read-your-writes on top of replica routing.
+
+    A request with an unsafe method reads from the primary, and a successful
+    one sets a cookie that keeps the client's reads on the primary for
+    ``pin_seconds``, long enough for the replicas to catch up.
+    """
+
+    def __init__(self, app: ASGIApp, *, pin_seconds: int) -> None:
+        self.app = app
+        self.pin_seconds = pin_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        writes = scope["method"] not in _SAFE_METHODS
+        if not writes and PIN_COOKIE not in HTTPConnection(scope).cookies:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{PIN_COOKIE}=1; Max-Age={self.pin_seconds}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        with primary_pin():
+            await self.app(scope, receive, send_with_pin if writes else send)
@@ -0,0 +1,97 @@
+import gzip
+from typing import Any, cast
+
+import msgpack
+import zstandard
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = {MSGPACK_MEDIA_TYPE, "application/x-msgpack"}
+# Below this size compression costs more CPU than it saves on the wire.
+MIN_COMPRESSED_BYTES = 1024
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+_zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+
+
+def _parse_quality_header(header: str) -> dict[str, float]:
+    """Parse an ``Accept``/``Accept-Encoding`` header into ``{token: q}``."""
+    qualities: dict[str, float] = {}
+    for part in header.split(","):
+        token, *params = (item.strip() for item in part.split(";"))
+        if not token:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[token.lower()] = quality
+    return qualities
+
+
+def select_media_type(accept: str) -> str:
+    qualities = _parse_quality_header(accept)
+    msgpack_quality = max(
+        (qualities.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES),
+        default=0.0,
+    )
+    json_quality = max(
+        qualities.get(JSON_MEDIA_TYPE, 0.0),
+        qualities.get("application/*", 0.0),
+        qualities.get("*/*", 0.0),
+    )
+    if msgpack_quality > 0 and msgpack_quality >= json_quality:
+        return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def select_content_encoding(accept_encoding: str) -> str | None:
+    """The acceptable encoding with the highest q; ties go to zstd."""
+    qualities = _parse_quality_header(accept_encoding)
+    best: str | None = None
+    best_quality = 0.0
+    for encoding in ("zstd", "gzip"):
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def encode_response(
+    request: Request,
+    adapter: TypeAdapter[Any],
+    content: Any,
+) -> Response:
+    """
+    Validate ``content`` with ``adapter`` and serialize it in one pydantic-core
+    pass, skipping FastAPI's ``jsonable_encoder`` round trip.
+
+    The body is JSON or MessagePack based on ``Accept``, and is compressed with
+    zstd or gzip based on ``Accept-Encoding`` once it is large enough.
+    """
+    value = adapter.validate_python(content, from_attributes=True)
+    media_type = select_media_type(request.headers.get("accept", ""))
+    if media_type == MSGPACK_MEDIA_TYPE:
+        body = cast(bytes, msgpack.packb(adapter.dump_python(value, mode="json")))
+    else:
+        body = adapter.dump_json(value)
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    encoding = None
+    if len(body) >= MIN_COMPRESSED_BYTES:
+        encoding = select_content_encoding(request.headers.get("accept-encoding", ""))
+    if encoding == "zstd":
+        body = _zstd_compressor.compress(body)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=body, media_type=media_type, headers=headers)
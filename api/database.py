@@ -1,28 +1,108 @@
-from tortoise import Tortoise
+import itertools
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from tortoise import BaseDBAsyncClient, Tortoise, connections
+from tortoise.utils import generate_schema_for_client
 
 from api.core.logfire import get_logger
 
 logger = get_logger(__name__)
 
+PRIMARY_CONNECTION = "default"
+
+_replicas: Iterator[str] | None = None
+_primary_pinned: ContextVar[bool] = ContextVar("primary_pinned", default=False)
+
 
-async def init_db(database_uri: str, *, generate_schemas: bool = True) -> None:
+async def init_db(
+    database_uri: str,
+    *,
+    replica_uris: Sequence[str] = (),
+    generate_schemas: bool = True,
+    migrate: bool = False,
+) -> None:
+    """
+    Connect to the primary at ``database_uri`` and to each read replica in
+    ``replica_uris``. Models, schema generation and migrations only use the
+    primary; ``read_connection`` hands out the replicas.
+    """
+    global _replicas
     logger.debug("Initializing Tortoise ORM")
+    replica_names = [f"replica_{index}" for index in range(len(replica_uris))]
     await Tortoise.init(
-        db_url=database_uri,
-        modules={"models": ["api.models"]},
+        config={
+            "connections": {
+                PRIMARY_CONNECTION: database_uri,
+                **dict(zip(replica_names, replica_uris, strict=True)),
+            },
+            "apps": {
+                "models": {
+                    "models": ["api.models"],
+                    "default_connection": PRIMARY_CONNECTION,
+                }
+            },
+        }
     )
+    _replicas = itertools.cycle(replica_names) if replica_names else None
+    if replica_names:
+        logger.info("Routing reads to %s read replica(s)", len(replica_names))
     if generate_schemas:
-        await Tortoise.generate_schemas()
+        await generate_schema_for_client(connections.get(PRIMARY_CONNECTION), True)
+    if migrate:
+        from api.migrations import migrate as apply_pending
+
+        applied = await apply_pending()
+        if applied:
+            logger.info("Applied migrations: %s", ", ".join(applied))
 
 
 async def close_db() -> None:
+    global _replicas
     logger.debug("Closing database connections")
+    _replicas = None
     await Tortoise.close_connections()
 
 
+@contextmanager
+def primary_pin() -> Iterator[None]:
+    """Send every ``read_connection`` inside the block to the primary."""
+    token = _primary_pinned.set(True)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(token)
+
+
+def read_connection() -> BaseDBAsyncClient:
+    """
+    Connection for reads that may lag the primary slightly: the next replica
+    in turn, or the primary when none is configured or it is pinned.
+    """
+    if _replicas is None or _primary_pinned.get():
+        return connections.get(PRIMARY_CONNECTION)
+    return connections.get(next(_replicas))
+
+
 async def reset_tables() -> None:
     logger.debug("Resetting database tables")
-    from api.models import Prediction, Transaction
+    from api.models import (
+        AnalyticsWatermark,
+        IdempotencyKey,
+        Prediction,
+        PredictionExplanation,
+        PredictionRollup,
+        ShadowPrediction,
+        ThresholdVersion,
+        Transaction,
+    )
 
+    await PredictionExplanation.all().delete()
     await Prediction.all().delete()
     await Transaction.all().delete()
+    await PredictionRollup.all().delete()
+    await AnalyticsWatermark.all().delete()
+    await IdempotencyKey.all().delete()
+    await ThresholdVersion.all().delete()
+    await ShadowPrediction.all().delete()
@@ -1,3 +1,3 @@
-from api.domain.fraud_scoring import score_request
+from api.domain.fraud_scoring import predict_probabilities, score_frame, score_request
 
-__all__ = ["score_request"]
+__all__ = ["predict_probabilities", "score_frame", "score_request"]
@@ -0,0 +1,165 @@
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+import pandas as pd  # type: ignore[import-untyped]
+
+from api.domain.fraud_scoring import FEATURE_COLUMNS, sigmoid
+
+NUMERIC_FEATURES: tuple[str, ...] = tuple(
+    column for column in FEATURE_COLUMNS if column != "merchant_category"
+)
+_LOGIT_CLIP = 1e-15
+
+
+@dataclass(frozen=True)
+class LinearPrescreen:
+    """
+    Logistic model over the raw features, cheap enough to score a single
+    request in plain Python without building a DataFrame.
+    """
+
+    intercept: float
+    weights: dict[str, float]
+    category_weights: dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "LinearPrescreen":
+        return cls(
+            intercept=float(data["intercept"]),
+            weights={name: float(data["weights"][name]) for name in NUMERIC_FEATURES},
+            category_weights={
+                str(name): float(weight)
+                for name, weight in data.get("category_weights", {}).items()
+            },
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "intercept": self.intercept,
+            "weights": dict(self.weights),
+            "category_weights": dict(self.category_weights),
+        }
+
+    def probability(self, features: Mapping[str, Any]) -> float:
+        z = self.intercept + self.category_weights.get(
+            str(features["merchant_category"]), 0.0
+        )
+        for name, weight in self.weights.items():
+            z += weight * float(features[name])
+        return sigmoid(z)
+
+    def probabilities(self, features_df: pd.DataFrame) -> np.ndarray:
+        numeric = features_df.loc[:, list(NUMERIC_FEATURES)].to_numpy(dtype=np.float64)
+        weights = np.array([self.weights[name] for name in NUMERIC_FEATURES])
+        categories = features_df["merchant_category"].astype(str)
+        category_terms = categories.map(self.category_weights.get).fillna(0.0)
+        z = self.intercept + numeric @ weights + category_terms.to_numpy(np.float64)
+        return 1 / (1 + np.exp(-z))
+
+
+def fit_prescreen(
+    features_df: pd.DataFrame, target_probabilities: np.ndarray
+) -> LinearPrescreen:
+    """
+    Distil a model into a ``LinearPrescreen`` by least squares on the logit of
+    its probabilities, so the pre-screen ranks rows like the full model.
+    """
+    categories = sorted({str(value) for value in features_df["merchant_category"]})
+    numeric = features_df.loc[:, list(NUMERIC_FEATURES)].to_numpy(dtype=np.float64)
+    one_hot = (
+        features_df["merchant_category"].astype(str).to_numpy()[:, None]
+        == np.array(categories)[None, :]
+    ).astype(np.float64)
+    design = np.column_stack([np.ones(len(features_df)), numeric, one_hot])
+    clipped = np.clip(target_probabilities, _LOGIT_CLIP, 1 - _LOGIT_CLIP)
+    coefficients, *_ = np.linalg.lstsq(
+        design, np.log(clipped / (1 - clipped)), rcond=None
+    )
+    numeric_end = 1 + len(NUMERIC_FEATURES)
+    return LinearPrescreen(
+        intercept=float(coefficients[0]),
+        weights=dict(
+            zip(NUMERIC_FEATURES, map(float, coefficients[1:numeric_end]), strict=True)
+        ),
+        category_weights=dict(
+            zip(categories, map(float, coefficients[numeric_end:]), strict=True)
+        ),
+    )
+
+
+@dataclass(frozen=True)
+class CascadeBand:
+    """
+    Pre-screen probabilities below ``low`` are cleared and those at or above
+    ``high`` are flagged without the full model; the rest are escalated.
+    """
+
+    low: float
+    high: float
+
+    def stage(self, probability: float) -> int | None:
+        """Decision taken by the pre-screen, or None to escalate."""
+        if probability < self.low:
+            return 0
+        if probability >= self.high:
+            return 1
+        return None
+
+    def escalated(self, probabilities: np.ndarray) -> np.ndarray:
+        return (probabilities >= self.low) & (probabilities < self.high)
+
+
+def pick_band(
+    prescreen_probabilities: np.ndarray,
+    decisions: np.ndarray,
+    *,
+    threshold: float,
+    margin: float = 0.0,
+) -> CascadeBand:
+    """
+    Widest band edges under which the pre-screen reproduces every full-model
+    decision in the sample: ``low`` is the lowest pre-screen score of a
+    flagged row and ``high`` sits just above the highest score of a cleared
+    one. The band always covers ``threshold`` and ``margin`` widens it on
+    both sides.
+    """
+    flagged = decisions.astype(bool)
+    if flagged.all() or not flagged.any():
+        msg = "Need both cleared and flagged rows to pick band edges"
+        raise ValueError(msg)
+    low = min(float(prescreen_probabilities[flagged].min()), threshold) - margin
+    high = (
+        max(
+            float(np.nextafter(prescreen_probabilities[~flagged].max(), np.inf)),
+            threshold,
+        )
+        + margin
+    )
+    return CascadeBand(low=max(low, 0.0), high=min(high, 1.0))
+
+
+@dataclass(frozen=True)
+class Cascade:
+    """Pre-screen stage and its band, valid for the threshold it was built at."""
+
+    prescreen: LinearPrescreen
+    band: CascadeBand
+    threshold: float
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "Cascade":
+        return cls(
+            prescreen=LinearPrescreen.from_dict(data["prescreen"]),
+            band=CascadeBand(low=float(data["low"]), high=float(data["high"])),
+            threshold=float(data["threshold"]),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "prescreen": self.prescreen.to_dict(),
+            "low": self.band.low,
+            "high": self.band.high,
+            "threshold": self.threshold,
+        }
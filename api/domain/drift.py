@@ -0,0 +1,240 @@
+import math
+from bisect import bisect_right
+from collections.abc import Mapping, Sequence
+from typing import Any, Literal
+
+import numpy as np
+import pandas as pd  # type: ignore[import-untyped]
+
+from api.enums import MerchantCategory
+
+SKETCH_LAYOUT = 1
+PSI_BINS = 10
+PSI_EPSILON = 1e-4
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Fixed edges keep every worker's sketch the same shape, so they merge by
+# adding counts. Amounts get ~5% wide bins on a log scale, trust scores one
+# bin per integer, and probabilities 0.1 wide bins in log-odds.
+AMOUNT_EDGES: tuple[float, ...] = tuple(np.geomspace(0.01, 1e6, 381).tolist())
+DEVICE_TRUST_EDGES: tuple[float, ...] = tuple(np.arange(0.5, 100, 1.0).tolist())
+PROBABILITY_EDGES: tuple[float, ...] = tuple(
+    (1 / (1 + np.exp(-np.linspace(-20, 20, 401)))).tolist()
+)
+DriftStatus = Literal["stable", "moderate", "significant", "no_data"]
+CATEGORIES: tuple[str, ...] = tuple(category.value for category in MerchantCategory)
+
+
+class BinnedCounts:
+    """
+    Counts of values per bin of fixed ``edges``: bin ``i`` holds values in
+    ``[edges[i - 1], edges[i])``, with open-ended bins at both ends.
+    """
+
+    def __init__(self, edges: Sequence[float], counts: Sequence[int] | None = None):
+        self.edges = tuple(edges)
+        self.counts = (
+            [0] * (len(self.edges) + 1) if counts is None else [int(c) for c in counts]
+        )
+        if len(self.counts) != len(self.edges) + 1:
+            msg = "Expected one more count than edges"
+            raise ValueError(msg)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_right(self.edges, value)] += 1
+
+    def observe_many(self, values: np.ndarray) -> None:
+        bins = np.searchsorted(self.edges, values, side="right")
+        added = np.bincount(bins, minlength=len(self.counts))
+        self.counts = [a + int(b) for a, b in zip(self.counts, added, strict=True)]
+
+    def merge(self, other: "BinnedCounts") -> None:
+        if other.edges != self.edges:
+            msg = "Cannot merge counts with different edges"
+            raise ValueError(msg)
+        self.counts = [a + b for a, b in zip(self.counts, other.counts, strict=True)]
+
+    def quantile(self, q: float) -> float | None:
+        """Upper edge of the bin holding the ``q`` quantile; None when empty."""
+        total = self.total
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return self.edges[min(index, len(self.edges) - 1)]
+        return self.edges[-1]
+
+
+class DriftSketch:
+    """
+    Constant-memory summary of scored traffic: binned ``amount``,
+    ``device_trust_score`` and ``fraud_probability``, and counts per merchant
+    category. Sketches from several workers merge exactly.
+    """
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.amount = BinnedCounts(AMOUNT_EDGES)
+        self.device_trust_score = BinnedCounts(DEVICE_TRUST_EDGES)
+        self.fraud_probability = BinnedCounts(PROBABILITY_EDGES)
+        self.merchant_category = dict.fromkeys(CATEGORIES, 0)
+
+    def observe(
+        self,
+        *,
+        amount: float,
+        device_trust_score: float,
+        merchant_category: str,
+        fraud_probability: float | None,
+    ) -> None:
+        self.rows += 1
+        self.amount.observe(amount)
+        self.device_trust_score.observe(device_trust_score)
+        if fraud_probability is not None:
+            self.fraud_probability.observe(fraud_probability)
+        category = str(merchant_category)
+        if category in self.merchant_category:
+            self.merchant_category[category] += 1
+
+    def observe_frame(
+        self,
+        features_df: pd.DataFrame,
+        fraud_probabilities: np.ndarray,
+        *,
+        scored: np.ndarray | None = None,
+    ) -> None:
+        """Fold in a frame; ``scored`` masks the probabilities that count."""
+        self.rows += len(features_df)
+        self.amount.observe_many(features_df["amount"].to_numpy(np.float64))
+        self.device_trust_score.observe_many(
+            features_df["device_trust_score"].to_numpy(np.float64)
+        )
+        self.fraud_probability.observe_many(
+            fraud_probabilities if scored is None else fraud_probabilities[scored]
+        )
+        counts = (
+            features_df["merchant_category"]
+            .astype(str)
+            .value_counts()
+            .reindex(list(CATEGORIES), fill_value=0)
+        )
+        for category, count in zip(CATEGORIES, counts.tolist(), strict=True):
+            self.merchant_category[category] += int(count)
+
+    def merge(self, other: "DriftSketch") -> None:
+        self.rows += other.rows
+        self.amount.merge(other.amount)
+        self.device_trust_score.merge(other.device_trust_score)
+        self.fraud_probability.merge(other.fraud_probability)
+        for category, count in other.merchant_category.items():
+            self.merchant_category[category] = (
+                self.merchant_category.get(category, 0) + count
+            )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "layout": SKETCH_LAYOUT,
+            "rows": self.rows,
+            "amount": self.amount.counts,
+            "device_trust_score": self.device_trust_score.counts,
+            "fraud_probability": self.fraud_probability.counts,
+            "merchant_category": dict(self.merchant_category),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "DriftSketch":
+        if data.get("layout") != SKETCH_LAYOUT:
+            msg = f"Unsupported sketch layout: {data.get('layout')!r}"
+            raise ValueError(msg)
+        sketch = cls()
+        sketch.rows = int(data["rows"])
+        sketch.amount = BinnedCounts(AMOUNT_EDGES, data["amount"])
+        sketch.device_trust_score = BinnedCounts(
+            DEVICE_TRUST_EDGES, data["device_trust_score"]
+        )
+        sketch.fraud_probability = BinnedCounts(
+            PROBABILITY_EDGES, data["fraud_probability"]
+        )
+        sketch.merchant_category = {
+            category: int(data["merchant_category"].get(category, 0))
+            for category in CATEGORIES
+        }
+        return sketch
+
+
+def quantile_groups(
+    baseline_counts: Sequence[int], groups: int = PSI_BINS
+) -> list[slice]:
+    """
+    Split fine bins into up to ``groups`` runs of roughly equal baseline mass,
+    the usual decile binning for PSI, without needing the raw values.
+    """
+    total = sum(baseline_counts)
+    bounds: list[int] = []
+    seen = 0
+    next_cut = 1
+    for index, count in enumerate(baseline_counts):
+        seen += count
+        if next_cut < groups and seen * groups >= next_cut * total:
+            bounds.append(index + 1)
+            while next_cut < groups and seen * groups >= next_cut * total:
+                next_cut += 1
+    starts = [0, *bounds]
+    ends = [*bounds, len(baseline_counts)]
+    return [
+        slice(start, end)
+        for start, end in zip(starts, ends, strict=True)
+        if end > start
+    ]
+
+
+def psi(
+    baseline_counts: Sequence[int],
+    live_counts: Sequence[int],
+    *,
+    epsilon: float = PSI_EPSILON,
+) -> float | None:
+    """
+    Population stability index of ``live_counts`` against ``baseline_counts``
+    over the same bins; None when either side is empty. Empty bins are
+    floored at ``epsilon`` so the log stays finite.
+    """
+    baseline_total = sum(baseline_counts)
+    live_total = sum(live_counts)
+    if not baseline_total or not live_total:
+        return None
+    value = 0.0
+    for expected_count, actual_count in zip(baseline_counts, live_counts, strict=True):
+        expected = max(expected_count / baseline_total, epsilon)
+        actual = max(actual_count / live_total, epsilon)
+        value += (actual - expected) * math.log(actual / expected)
+    return value
+
+
+def grouped_psi(
+    baseline: BinnedCounts, live: BinnedCounts, groups: int = PSI_BINS
+) -> float | None:
+    """PSI over baseline-quantile groups of the fine bins."""
+    slices = quantile_groups(baseline.counts, groups)
+    return psi(
+        [sum(baseline.counts[part]) for part in slices],
+        [sum(live.counts[part]) for part in slices],
+    )
+
+
+def drift_status(value: float | None) -> DriftStatus:
+    if value is None:
+        return "no_data"
+    if value >= PSI_SIGNIFICANT:
+        return "significant"
+    if value >= PSI_MODERATE:
+        return "moderate"
+    return "stable"
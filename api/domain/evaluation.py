@@ -0,0 +1,151 @@
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+import numpy as np
+
+# Both sides of the grid round the same way, so a score equal to a threshold
+# lands in the first bucket flagged at that threshold.
+_GRID_TOLERANCE = 1e-9
+
+
+def threshold_edge(threshold: float, bins: int) -> int:
+    """Index of the first of ``bins`` equal-width buckets flagged at ``threshold``."""
+    return int(np.clip(np.ceil(threshold * bins - _GRID_TOLERANCE), 0, bins))
+
+
+def score_buckets(probabilities: np.ndarray, bins: int) -> np.ndarray:
+    """Bucket of each probability among ``bins`` equal-width buckets."""
+    scaled = np.asarray(probabilities, dtype=np.float64) * bins + _GRID_TOLERANCE
+    return np.clip(np.floor(scaled).astype(np.int64), 0, bins - 1)
+
+
+def flagged_at(counts: np.ndarray, thresholds: Iterable[float]) -> list[int]:
+    """Number of scores at or above each threshold, from bucket ``counts``."""
+    zero = np.zeros(1, dtype=np.int64)
+    flagged = np.concatenate([np.cumsum(counts[::-1])[::-1], zero])
+    return [int(flagged[threshold_edge(t, len(counts))]) for t in thresholds]
+
+
+@dataclass(frozen=True)
+class ConfusionCounts:
+    threshold: float
+    true_positives: int
+    false_positives: int
+    true_negatives: int
+    false_negatives: int
+    cost: float
+
+
+class ScoreHistogram:
+    """
+    Constant-memory accumulator of labelled fraud probabilities.
+
+    Scores are counting-sorted into ``bins`` equal-width buckets per class, so
+    the reverse cumulative sums over the buckets give the confusion matrix for
+    every threshold on the ``1 / bins`` grid in a single pass.
+    """
+
+    def __init__(self, bins: int = 100_000) -> None:
+        if bins < 1:
+            msg = "bins must be positive"
+            raise ValueError(msg)
+        self.bins = bins
+        self.positives = np.zeros(bins, dtype=np.int64)
+        self.negatives = np.zeros(bins, dtype=np.int64)
+
+    @property
+    def total_positives(self) -> int:
+        return int(self.positives.sum())
+
+    @property
+    def total_negatives(self) -> int:
+        return int(self.negatives.sum())
+
+    def update(self, probabilities: np.ndarray, labels: np.ndarray) -> None:
+        bucket = score_buckets(probabilities, self.bins)
+        is_fraud = np.asarray(labels, dtype=bool)
+        self.positives += np.bincount(bucket[is_fraud], minlength=self.bins)
+        self.negatives += np.bincount(bucket[~is_fraud], minlength=self.bins)
+
+    def merge(self, other: "ScoreHistogram") -> None:
+        if other.bins != self.bins:
+            msg = "Cannot merge histograms with different bin counts"
+            raise ValueError(msg)
+        self.positives += other.positives
+        self.negatives += other.negatives
+
+    def _flagged_counts(self) -> tuple[np.ndarray, np.ndarray]:
+        """True/false positives at each grid edge ``k / bins`` for k in 0..bins."""
+        zero = np.zeros(1, dtype=np.int64)
+        true_positives = np.concatenate([np.cumsum(self.positives[::-1])[::-1], zero])
+        false_positives = np.concatenate([np.cumsum(self.negatives[::-1])[::-1], zero])
+        return true_positives, false_positives
+
+    def confusion_at(
+        self,
+        thresholds: Iterable[float],
+        *,
+        fp_cost: float = 1.0,
+        fn_cost: float = 1.0,
+    ) -> list[ConfusionCounts]:
+        true_positives, false_positives = self._flagged_counts()
+        positives = self.total_positives
+        negatives = self.total_negatives
+        counts = []
+        for threshold in thresholds:
+            edge = threshold_edge(threshold, self.bins)
+            tp = int(true_positives[edge])
+            fp = int(false_positives[edge])
+            fn = positives - tp
+            counts.append(
+                ConfusionCounts(
+                    threshold=float(threshold),
+                    true_positives=tp,
+                    false_positives=fp,
+                    true_negatives=negatives - fp,
+                    false_negatives=fn,
+                    cost=fp_cost * fp + fn_cost * fn,
+                )
+            )
+        return counts
+
+    def cost_optimal_threshold(
+        self,
+        *,
+        fp_cost: float = 1.0,
+        fn_cost: float = 1.0,
+    ) -> ConfusionCounts:
+        true_positives, false_positives = self._flagged_counts()
+        costs = fp_cost * false_positives + fn_cost * (
+            self.total_positives - true_positives
+        )
+        best_edge = int(np.argmin(costs))
+        return self.confusion_at(
+            [best_edge / self.bins], fp_cost=fp_cost, fn_cost=fn_cost
+        )[0]
+
+    def roc_auc(self) -> float | None:
+        positives = self.total_positives
+        negatives = self.total_negatives
+        if positives == 0 or negatives == 0:
+            return None
+        true_positives, false_positives = self._flagged_counts()
+        tpr = true_positives[::-1] / positives
+        fpr = false_positives[::-1] / negatives
+        return float(np.trapezoid(tpr, fpr))
+
+    def average_precision(self) -> float | None:
+        positives = self.total_positives
+        if positives == 0:
+            return None
+        true_positives, false_positives = self._flagged_counts()
+        true_positives = true_positives[::-1]
+        flagged = true_positives + false_positives[::-1]
+        recall = true_positives / positives
+        precision = np.divide(
+            true_positives,
+            flagged,
+            out=np.ones_like(recall),
+            where=flagged > 0,
+        )
+        return float(np.sum(np.diff(recall, prepend=0.0) * precision))
@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd  # type: ignore[import-untyped]
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+
+from api.domain.fraud_scoring import FEATURE_COLUMNS
+
+
+@dataclass(frozen=True)
+class Explanations:
+    """
+    Log-odds attributions for a batch of rows: ``base_values[i]`` plus the sum
+    of ``contributions[i]`` is the model's log-odds for row ``i``. Columns of
+    ``contributions`` follow ``FEATURE_COLUMNS``.
+    """
+
+    base_values: np.ndarray
+    contributions: np.ndarray
+
+    @property
+    def log_odds(self) -> np.ndarray:
+        return self.base_values + self.contributions.sum(axis=1)
+
+
+class LinearExplainer:
+    """
+    Exact attribution for a preprocessing step followed by a linear classifier.
+
+    Each transformed column contributes ``coefficient * value`` to the
+    log-odds, and ``feature_map`` adds those up per input feature, so a whole
+    batch is one transform and one matrix product. Standardized features are
+    attributed relative to their training mean.
+    """
+
+    method = "linear"
+
+    def __init__(
+        self,
+        preprocessor: Any,
+        coefficients: np.ndarray,
+        intercept: float,
+        feature_map: np.ndarray,
+    ) -> None:
+        self.preprocessor = preprocessor
+        self.coefficients = coefficients
+        self.intercept = intercept
+        self.feature_map = feature_map
+
+    def explain(self, features_df: pd.DataFrame) -> Explanations:
+        transformed = self.preprocessor.transform(
+            features_df.loc[:, list(FEATURE_COLUMNS)]
+        )
+        if hasattr(transformed, "toarray"):
+            transformed = transformed.toarray()
+        weighted = np.asarray(transformed, dtype=np.float64) * self.coefficients
+        return Explanations(
+            base_values=np.full(len(features_df), self.intercept),
+            contributions=weighted @ self.feature_map,
+        )
+
+
+def _input_index(transformer: ColumnTransformer, column: Any) -> int:
+    names = getattr(transformer, "feature_names_in_", FEATURE_COLUMNS)
+    name = names[column] if isinstance(column, int) else column
+    try:
+        return FEATURE_COLUMNS.index(str(name))
+    except ValueError:
+        msg = f"Column {name!r} is not a model feature"
+        raise ValueError(msg) from None
+
+
+def _feature_map(transformer: ColumnTransformer) -> np.ndarray:
+    """0/1 matrix from each transformed column to the input feature it encodes."""
+    width = sum(
+        output.stop - output.start for output in transformer.output_indices_.values()
+    )
+    feature_map = np.zeros((width, len(FEATURE_COLUMNS)))
+    for name, step, columns in transformer.transformers_:
+        output = transformer.output_indices_[name]
+        if step == "drop" or output.stop == output.start:
+            continue
+        inputs = [_input_index(transformer, column) for column in columns]
+        if output.stop - output.start == len(inputs):
+            sizes = [1] * len(inputs)
+        elif hasattr(step, "categories_"):
+            sizes = [len(categories) for categories in step.categories_]
+        else:
+            sizes = [output.stop - output.start] if len(inputs) == 1 else []
+        if sum(sizes) != output.stop - output.start:
+            msg = f"Cannot map outputs of transformer {name!r} to its input columns"
+            raise ValueError(msg)
+        start = output.start
+        for index, size in zip(inputs, sizes, strict=True):
+            feature_map[start : start + size, index] = 1
+            start += size
+    return feature_map
+
+
+def linear_explainer(model: Any) -> LinearExplainer:
+    """
+    Build a ``LinearExplainer`` for a ``Pipeline`` of a ``ColumnTransformer``
+    and a binary linear classifier, or raise ValueError for any other model.
+    """
+    steps = [step for _, step in model.steps] if isinstance(model, Pipeline) else []
+    if len(steps) != 2 or not isinstance(steps[0], ColumnTransformer):
+        msg = "Expected a two-step Pipeline starting with a ColumnTransformer"
+        raise ValueError(msg)
+    preprocessor, classifier = steps
+    coefficients = np.asarray(getattr(classifier, "coef_", None), dtype=np.float64)
+    if coefficients.ndim != 2 or coefficients.shape[0] != 1:
+        msg = "Expected a binary linear classifier as the last pipeline step"
+        raise ValueError(msg)
+    feature_map = _feature_map(preprocessor)
+    if feature_map.shape[0] != coefficients.shape[1]:
+        msg = "Classifier coefficients do not match the transformed columns"
+        raise ValueError(msg)
+    return LinearExplainer(
+        preprocessor=preprocessor,
+        coefficients=coefficients[0],
+        intercept=float(np.ravel(classifier.intercept_)[0]),
+        feature_map=feature_map,
+    )
@@ -1,9 +1,48 @@
+import math
 from typing import Any
 
+import numpy as np
 import pandas as pd  # type: ignore[import-untyped]
 
 from api.schemas import ScoreRequest
 
+FEATURE_COLUMNS: tuple[str, ...] = (
+    "amount",
+    "transaction_hour",
+    "merchant_category",
+    "foreign_transaction",
+    "location_mismatch",
+    "device_trust_score",
+    "velocity_last_24h",
+    "cardholder_age",
+)
+
+
+def sigmoid(log_odds: float) -> float:
+    """Probability for ``log_odds``, without overflow at either extreme."""
+    if log_odds >= 0:
+        return 1 / (1 + math.exp(-log_odds))
+    exp_log_odds = math.exp(log_odds)
+    return exp_log_odds / (1 + exp_log_odds)
+
+
+def predict_probabilities(model: Any, features_df: pd.DataFrame) -> np.ndarray:
+    """Score a whole feature frame in one model call."""
+    if hasattr(model, "predict_proba"):
+        return np.asarray(model.predict_proba(features_df)[:, 1], dtype=np.float64)
+    return np.asarray(model.predict(features_df), dtype=np.float64)
+
+
+def score_frame(
+    features_df: pd.DataFrame,
+    *,
+    model: Any,
+    threshold: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    fraud_probabilities = predict_probabilities(model, features_df)
+    decisions = (fraud_probabilities >= threshold).astype(np.int64)
+    return fraud_probabilities, decisions
+
 
 def score_request(
     payload: ScoreRequest,
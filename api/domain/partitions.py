@@ -0,0 +1,56 @@
+import re
+from collections.abc import Iterator
+from datetime import UTC, datetime
+
+PARTITIONED_TABLE = "prediction"
+DEFAULT_PARTITION = f"{PARTITIONED_TABLE}_default"
+_MONTH_NAME = re.compile(rf"^{PARTITIONED_TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def as_utc(moment: datetime) -> datetime:
+    """Naive datetimes are taken as UTC."""
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=UTC)
+    return moment.astimezone(UTC)
+
+
+def month_floor(moment: datetime) -> datetime:
+    """Start of the UTC month holding ``moment``."""
+    moment = as_utc(moment)
+    return datetime(moment.year, moment.month, 1, tzinfo=UTC)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=UTC)
+
+
+def month_range(start: datetime, end: datetime) -> Iterator[datetime]:
+    """Month starts from the month of ``start`` up to, not including, ``end``."""
+    month = month_floor(start)
+    while month < end:
+        yield month
+        month = add_months(month, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARTITIONED_TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name: str) -> datetime | None:
+    """The month a partition or archive name stands for; None for other names."""
+    match = _MONTH_NAME.match(name)
+    if match is None:
+        return None
+    year, month = int(match[1]), int(match[2])
+    if not 1 <= month <= 12:
+        return None
+    return datetime(year, month, 1, tzinfo=UTC)
+
+
+def retention_cutoff(now: datetime, retention_months: int) -> datetime:
+    """
+    Months starting before the cutoff are past retention. The current month
+    always stays, so the cutoff is never later than its start.
+    """
+    return add_months(month_floor(now), -retention_months)
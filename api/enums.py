@@ -9,3 +9,14 @@ class MerchantCategory(StrEnum):
     GROCERY = "Grocery"
     FOOD = "Food"
     CLOTHING = "Clothing"
+
+
+# Smallint codes stored in the database. Codes run from 1 without gaps; a new
+# category takes the next code and existing codes never change.
+MERCHANT_CATEGORY_CODES: dict[MerchantCategory, int] = {
+    MerchantCategory.ELECTRONICS: 1,
+    MerchantCategory.TRAVEL: 2,
+    MerchantCategory.GROCERY: 3,
+    MerchantCategory.FOOD: 4,
+    MerchantCategory.CLOTHING: 5,
+}
@@ -1,18 +1,57 @@
 from contextlib import asynccontextmanager
+from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from scalar_fastapi import get_scalar_api_reference
 
 from api.config import Settings, settings
 from api.core.exceptions import register_exception_handlers
 from api.core.logfire import configure_logfire, get_logger
-from api.core.model_loader import get_model_bundle
+from api.core.model_loader import get_model_bundle, load_shadow_bundles
+from api.core.primary_pin import PrimaryPinMiddleware
 from api.database import close_db, init_db
-from api.routers import transactions
+from api.routers import admin, analytics, health, monitoring, transactions
+from api.services.admission import start_admission_control, stop_admission_control
+from api.services.analytics import start_rollup_job, stop_rollup_job
+from api.services.drift import start_drift_monitor, stop_drift_monitor
+from api.services.health import (
+    drain_on_shutdown_signal,
+    start_readiness_probe,
+    stop_readiness_probe,
+)
+from api.services.idempotency import (
+    start_idempotency_store,
+    stop_idempotency_store,
+)
+from api.services.partitions import (
+    start_partition_maintenance,
+    stop_partition_maintenance,
+)
+from api.services.prediction_writer import (
+    start_prediction_writer,
+    stop_prediction_writer,
+)
+from api.services.score_feed import (
+    close_score_feeds,
+    start_score_feed,
+    stop_score_feed,
+)
+from api.services.shadow_scoring import start_shadow_scorer, stop_shadow_scorer
 
 logger = get_logger(__name__)
 
+OPENAPI_URL = "/openapi.json"
+
+
+def openapi_body(app: FastAPI) -> bytes:
+    """The OpenAPI document, rendered on first use and then served as bytes."""
+    body = getattr(app.state, "openapi_body", None)
+    if body is None:
+        body = app.state.openapi_body = bytes(JSONResponse(app.openapi()).body)
+    return body
+
 
 def create_application(settings: Settings) -> FastAPI:
     configure_logfire(settings)
@@ -22,14 +61,94 @@ def create_application(settings: Settings) -> FastAPI:
         configure_logfire(settings, app=app)
         get_model_bundle()
         logger.info("startup: model bundle loaded")
+        shadow_bundles = load_shadow_bundles(settings.SHADOW_MODEL_PATHS)
         await init_db(
             settings.DATABASE_URI,
+            replica_uris=settings.DATABASE_REPLICA_URIS,
             generate_schemas=settings.DB_GENERATE_SCHEMAS,
+            migrate=settings.DB_MIGRATE,
         )
 
         logger.info("startup: DB initialized")
+        probe = start_readiness_probe(
+            cache_seconds=settings.READINESS_CACHE_SECONDS,
+            db_timeout_seconds=settings.READINESS_DB_TIMEOUT_SECONDS,
+        )
+        # Open score feeds would otherwise keep a graceful shutdown waiting.
+        probe.on_drain(close_score_feeds)
+        drain_on_shutdown_signal(probe, drain_seconds=settings.SHUTDOWN_DRAIN_SECONDS)
+        if settings.ADMISSION_CONTROL:
+            start_admission_control(
+                initial_limit=settings.ADMISSION_INITIAL_LIMIT,
+                min_limit=settings.ADMISSION_MIN_LIMIT,
+                max_limit=settings.ADMISSION_MAX_LIMIT,
+                latency_target_ms=settings.ADMISSION_LATENCY_TARGET_MS,
+                batch_share=settings.ADMISSION_BATCH_SHARE,
+                retry_after_seconds=settings.ADMISSION_RETRY_AFTER_SECONDS,
+            )
+            logger.info("startup: admission control enabled")
+        if settings.IDEMPOTENCY_KEYS:
+            start_idempotency_store(
+                cache_size=settings.IDEMPOTENCY_CACHE_SIZE,
+                ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+                wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+            )
+            logger.info("startup: idempotency keys enabled")
+        if settings.PREDICTION_WRITE_BEHIND:
+            start_prediction_writer(
+                max_size=settings.PREDICTION_QUEUE_MAX_SIZE,
+                flush_interval_ms=settings.PREDICTION_FLUSH_INTERVAL_MS,
+                batch_size=settings.PREDICTION_FLUSH_BATCH_SIZE,
+            )
+            logger.info("startup: write-behind prediction queue started")
+        if shadow_bundles:
+            start_shadow_scorer(
+                shadow_bundles,
+                max_size=settings.SHADOW_QUEUE_MAX_SIZE,
+                flush_interval_ms=settings.SHADOW_FLUSH_INTERVAL_MS,
+                batch_size=settings.SHADOW_BATCH_SIZE,
+            )
+            logger.info("startup: shadow scoring started for %s", list(shadow_bundles))
+        start_score_feed(
+            buffer_size=settings.SCORE_FEED_BUFFER_SIZE,
+            notify_dsn=settings.DATABASE_URI if settings.SCORE_FEED_NOTIFY else None,
+            channel=settings.SCORE_FEED_CHANNEL,
+        )
+        if settings.ANALYTICS_ROLLUP_INTERVAL_SECONDS > 0:
+            start_rollup_job(
+                interval_seconds=settings.ANALYTICS_ROLLUP_INTERVAL_SECONDS,
+                settle_seconds=settings.ANALYTICS_SETTLE_SECONDS,
+            )
+            logger.info("startup: analytics rollup job started")
+        if settings.DRIFT_MONITORING:
+            start_drift_monitor(
+                Path(settings.DRIFT_SNAPSHOT_DIR),
+                baseline_path=Path(settings.DRIFT_BASELINE_PATH),
+                interval_seconds=settings.DRIFT_SNAPSHOT_INTERVAL_SECONDS,
+                max_age_seconds=settings.DRIFT_SNAPSHOT_MAX_AGE_SECONDS,
+            )
+            logger.info("startup: drift monitoring started")
+        if settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS > 0:
+            start_partition_maintenance(
+                Path(settings.PREDICTION_ARCHIVE_DIR),
+                retention_months=settings.PREDICTION_RETENTION_MONTHS,
+                months_ahead=settings.PARTITION_MONTHS_AHEAD,
+                interval_seconds=settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+            )
+            logger.info("startup: partition maintenance started")
+        openapi_body(app)
         yield
+        probe.drain()
+        stop_admission_control()
+        await stop_idempotency_store()
+        await stop_score_feed()
+        await stop_rollup_job()
+        await stop_prediction_writer()
+        await stop_shadow_scorer()
+        await stop_drift_monitor()
+        await stop_partition_maintenance()
         await close_db()
+        stop_readiness_probe()
         logger.info("shutdown: triggered")
 
     app = FastAPI(
@@ -37,6 +156,8 @@ def create_application(settings: Settings) -> FastAPI:
         version=settings.VERSION,
         docs_url=None,
         redoc_url=None,
+        # Served from bytes rendered once, see openapi_body.
+        openapi_url=None,
         lifespan=lifespan,
     )
     app.add_middleware(
@@ -46,18 +167,30 @@ def create_application(settings: Settings) -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    if settings.DATABASE_REPLICA_URIS:
+        app.add_middleware(
+            PrimaryPinMiddleware, pin_seconds=settings.DB_PRIMARY_PIN_SECONDS
+        )
     register_exception_handlers(app)
 
     @app.get("/", include_in_schema=False)
     async def scalar_docs():
         return get_scalar_api_reference(
-            openapi_url=app.openapi_url,
+            openapi_url=OPENAPI_URL,
             title=f"{settings.PROJECT_NAME} - Scalar API",
         )
 
+    @app.get(OPENAPI_URL, include_in_schema=False)
+    async def openapi():
+        return Response(openapi_body(app), media_type="application/json")
+
+    app.include_router(health.router, tags=["Health"])
     app.include_router(
         transactions.router, prefix="/transactions", tags=["Transactions"]
     )
+    app.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
+    app.include_router(monitoring.router, prefix="/monitoring", tags=["Monitoring"])
+    app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 
     return app
 
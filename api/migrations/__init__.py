@@ -0,0 +1,93 @@
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from tortoise import connections
+
+from api.core.logfire import get_logger
+from api.migrations import (
+    m0001_partition_predictions,
+    m0001a_analytics_tables,
+    m0002_compact_storage,
+    m0003_transaction_version,
+    m0004_idempotency_keys,
+    m0005_threshold_versions,
+    m0006_shadow_predictions,
+    m0007_prediction_explanations,
+    m0008_prediction_stage,
+    m0009_transaction_indexes,
+)
+
+logger = get_logger(__name__)
+
+# Session-level advisory lock, so workers starting together migrate once.
+MIGRATION_LOCK_KEY = 72_044_000
+
+_CREATE_LEDGER_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migration (
+    name VARCHAR(100) NOT NULL PRIMARY KEY,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    name: str
+    upgrade: Callable[[Any], Awaitable[None]]
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(m0001_partition_predictions.NAME, m0001_partition_predictions.upgrade),
+    Migration(m0001a_analytics_tables.NAME, m0001a_analytics_tables.upgrade),
+    Migration(m0002_compact_storage.NAME, m0002_compact_storage.upgrade),
+    Migration(m0003_transaction_version.NAME, m0003_transaction_version.upgrade),
+    Migration(m0004_idempotency_keys.NAME, m0004_idempotency_keys.upgrade),
+    Migration(m0005_threshold_versions.NAME, m0005_threshold_versions.upgrade),
+    Migration(m0006_shadow_predictions.NAME, m0006_shadow_predictions.upgrade),
+    Migration(
+        m0007_prediction_explanations.NAME, m0007_prediction_explanations.upgrade
+    ),
+    Migration(m0008_prediction_stage.NAME, m0008_prediction_stage.upgrade),
+    Migration(m0009_transaction_indexes.NAME, m0009_transaction_indexes.upgrade),
+)
+
+
+async def apply_migrations(
+    connection: Any, migrations: tuple[Migration, ...] = MIGRATIONS
+) -> list[str]:
+    """
+    Apply the migrations not yet recorded in ``schema_migration``, in order,
+    each in its own transaction, and return their names.
+
+    Migrations reshape tables the ORM creates, so nothing runs until the base
+    schema exists.
+    """
+    if await connection.fetchval("SELECT to_regclass('transaction')") is None:
+        logger.warning("Skipping migrations: the base schema does not exist yet")
+        return []
+    await connection.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_KEY)
+    try:
+        await connection.execute(_CREATE_LEDGER_SQL)
+        rows = await connection.fetch("SELECT name FROM schema_migration")
+        applied = {row["name"] for row in rows}
+        newly_applied: list[str] = []
+        for migration in migrations:
+            if migration.name in applied:
+                continue
+            logger.info("Applying migration %s", migration.name)
+            async with connection.transaction():
+                await migration.upgrade(connection)
+                await connection.execute(
+                    "INSERT INTO schema_migration (name) VALUES ($1)", migration.name
+                )
+            newly_applied.append(migration.name)
+        return newly_applied
+    finally:
+        await connection.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_KEY)
+
+
+async def migrate() -> list[str]:
+    """Apply pending migrations on a connection of the default pool."""
+    async with connections.get("default").acquire_connection() as connection:
+        return await apply_migrations(connection)
@@ -0,0 +1,73 @@
+"""
+Turn ``prediction`` into a table range-partitioned by month on ``scored_at``.
+
+The primary key becomes ``(id, scored_at)``, since a partitioned table's keys
+must include the partition column; ids still come from the same sequence.
+Indexes keep the names ``generate_schemas`` gives them, so its
+``IF NOT EXISTS`` statements stay no-ops afterwards.
+"""
+
+from datetime import UTC, datetime
+from typing import Any
+
+from api.domain.partitions import add_months, month_floor, month_range, partition_name
+from api.repositories import partitions as partition_repo
+
+NAME = "0001_partition_predictions"
+MONTHS_AHEAD = 3
+
+_CREATE_SQL = """
+ALTER TABLE prediction RENAME TO prediction_unpartitioned;
+ALTER TABLE prediction_unpartitioned
+    RENAME CONSTRAINT prediction_pkey TO prediction_unpartitioned_pkey;
+ALTER SEQUENCE prediction_id_seq OWNED BY NONE;
+CREATE TABLE prediction (
+    LIKE prediction_unpartitioned INCLUDING DEFAULTS,
+    PRIMARY KEY (id, scored_at),
+    FOREIGN KEY (transaction_id) REFERENCES "transaction" (id) ON DELETE CASCADE
+) PARTITION BY RANGE (scored_at);
+COMMENT ON TABLE prediction IS 'Represents a prediction for a financial transaction';
+"""
+
+_COPY_SQL = """
+INSERT INTO prediction (id, fraud_probability, decision, scored_at, transaction_id)
+SELECT id, fraud_probability, decision, scored_at, transaction_id
+FROM prediction_unpartitioned;
+DROP TABLE prediction_unpartitioned;
+ALTER SEQUENCE prediction_id_seq OWNED BY prediction.id;
+CREATE INDEX "idx_prediction_scored__975f23" ON prediction (scored_at);
+CREATE INDEX "idx_prediction_transac_d2aa50"
+    ON prediction (transaction_id, scored_at, id);
+"""
+# Column types come from the table being replaced, which is the compact
+# layout on databases created after 0002.
+_FLAGGED_INDEX_SQL = (
+    'CREATE INDEX "idx_prediction_flagged_scored_at" '
+    "ON prediction (scored_at) WHERE decision = {flagged}"
+)
+
+
+async def upgrade(connection: Any) -> None:
+    kind = await connection.fetchval(
+        "SELECT relkind::text FROM pg_class WHERE oid = to_regclass('prediction')"
+    )
+    if kind == "p":
+        return
+    await connection.execute(_CREATE_SQL)
+    first, last = await connection.fetchrow(
+        "SELECT min(scored_at), max(scored_at) FROM prediction_unpartitioned"
+    )
+    now = datetime.now(UTC)
+    last = month_floor(max(last or now, now))
+    await partition_repo.create_default_partition(connection)
+    for month in month_range(first or now, add_months(last, MONTHS_AHEAD + 1)):
+        await partition_repo.create_month_partition(connection, partition_name(month))
+    decision_type = await connection.fetchval(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_schema = current_schema() "
+        "AND table_name = 'prediction_unpartitioned' AND column_name = 'decision'"
+    )
+    await connection.execute(_COPY_SQL)
+    await connection.execute(
+        _FLAGGED_INDEX_SQL.format(flagged="true" if decision_type == "boolean" else "1")
+    )
@@ -0,0 +1,40 @@
+"""
+Create ``prediction_rollup`` and ``analytics_watermark`` for databases whose
+schema is not generated.
+
+Runs ahead of ``0002_compact_storage``, which narrows ``prediction_rollup``.
+The tables are created in their current layout, so that migration finds
+nothing left to narrow. The DDL matches what ``generate_schemas`` emits, and
+databases that already have the tables are left as they are.
+"""
+
+from typing import Any
+
+NAME = "0001a_analytics_tables"
+
+
+async def upgrade(connection: Any) -> None:
+    await connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS "prediction_rollup" (
+            "id" SERIAL NOT NULL PRIMARY KEY,
+            "bucket_start" TIMESTAMPTZ NOT NULL,
+            "merchant_category" SMALLINT NOT NULL,
+            "decision" INT NOT NULL,
+            "prediction_count" BIGINT NOT NULL DEFAULT 0,
+            "probability_sum" DOUBLE PRECISION NOT NULL DEFAULT 0,
+            "amount_sum" DOUBLE PRECISION NOT NULL DEFAULT 0,
+            CONSTRAINT "uid_prediction__bucket__bde2e6"
+                UNIQUE ("bucket_start", "merchant_category", "decision")
+        )
+        """
+    )
+    await connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS "analytics_watermark" (
+            "name" VARCHAR(100) NOT NULL PRIMARY KEY,
+            "scored_at" TIMESTAMPTZ,
+            "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
@@ -0,0 +1,16 @@
+"""
+Add ``transaction.version`` for optimistic concurrency on updates.
+
+Adding a column with a constant default only touches the catalog, so this
+does not rewrite the table.
+"""
+
+from typing import Any
+
+NAME = "0003_transaction_version"
+
+
+async def upgrade(connection: Any) -> None:
+    await connection.execute(
+        'ALTER TABLE "transaction" ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 1'
+    )
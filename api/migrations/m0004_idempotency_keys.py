@@ -0,0 +1,27 @@
+"""
+Create ``idempotency_key`` for databases whose schema is not generated.
+
+The DDL matches what ``generate_schemas`` emits for ``IdempotencyKey``, so
+either path leaves the same table and index behind.
+"""
+
+from typing import Any
+
+NAME = "0004_idempotency_keys"
+
+
+async def upgrade(connection: Any) -> None:
+    await connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS "idempotency_key" (
+            "key" VARCHAR(255) NOT NULL PRIMARY KEY,
+            "request_hash" VARCHAR(64) NOT NULL,
+            "response" JSONB,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await connection.execute(
+        'CREATE INDEX IF NOT EXISTS "idx_idempotency_created_98dcfd" '
+        'ON "idempotency_key" ("created_at")'
+    )
@@ -0,0 +1,22 @@
+"""
+Create ``threshold_version`` for databases whose schema is not generated.
+
+The DDL matches what ``generate_schemas`` emits for ``ThresholdVersion``.
+"""
+
+from typing import Any
+
+NAME = "0005_threshold_versions"
+
+
+async def upgrade(connection: Any) -> None:
+    await connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS "threshold_version" (
+            "id" SERIAL NOT NULL PRIMARY KEY,
+            "threshold" DOUBLE PRECISION NOT NULL,
+            "note" VARCHAR(255),
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
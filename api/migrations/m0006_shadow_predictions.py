@@ -0,0 +1,30 @@
+"""
+Create ``shadow_prediction`` for databases whose schema is not generated.
+
+The DDL matches what ``generate_schemas`` emits for ``ShadowPrediction``.
+"""
+
+from typing import Any
+
+NAME = "0006_shadow_predictions"
+
+
+async def upgrade(connection: Any) -> None:
+    await connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS "shadow_prediction" (
+            "id" SERIAL NOT NULL PRIMARY KEY,
+            "transaction_id" VARCHAR(255) NOT NULL,
+            "model_name" VARCHAR(100) NOT NULL,
+            "fraud_probability" DOUBLE PRECISION NOT NULL,
+            "decision" INT NOT NULL,
+            "champion_probability" DOUBLE PRECISION NOT NULL,
+            "champion_decision" INT NOT NULL,
+            "scored_at" TIMESTAMPTZ NOT NULL
+        )
+        """
+    )
+    await connection.execute(
+        'CREATE INDEX IF NOT EXISTS "idx_shadow_pred_model_n_089aac" '
+        'ON "shadow_prediction" ("model_name", "scored_at")'
+    )
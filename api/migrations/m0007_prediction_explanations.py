@@ -0,0 +1,27 @@
+"""
+Create ``prediction_explanation`` for databases whose schema is not generated.
+
+The DDL matches what ``generate_schemas`` emits for ``PredictionExplanation``.
+"""
+
+from typing import Any
+
+NAME = "0007_prediction_explanations"
+
+
+async def upgrade(connection: Any) -> None:
+    await connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS "prediction_explanation" (
+            "id" SERIAL NOT NULL PRIMARY KEY,
+            "prediction_id" INT NOT NULL,
+            "model_version" VARCHAR(64) NOT NULL,
+            "method" VARCHAR(32) NOT NULL,
+            "base_value" DOUBLE PRECISION NOT NULL,
+            "contributions" JSONB NOT NULL,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            CONSTRAINT "uid_prediction__model_v_9c1eee"
+                UNIQUE ("model_version", "prediction_id")
+        )
+        """
+    )
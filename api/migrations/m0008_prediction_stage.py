@@ -0,0 +1,18 @@
+"""
+Add ``prediction.prescreened`` to mark predictions the cascade pre-screen
+decided, whose stored probability is the pre-screen's estimate.
+
+Adding a column with a constant default only touches the catalog, so this
+does not rewrite the table or its partitions.
+"""
+
+from typing import Any
+
+NAME = "0008_prediction_stage"
+
+
+async def upgrade(connection: Any) -> None:
+    await connection.execute(
+        "ALTER TABLE prediction "
+        "ADD COLUMN IF NOT EXISTS prescreened BOOL NOT NULL DEFAULT FALSE"
+    )
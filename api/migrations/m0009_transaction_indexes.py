@@ -0,0 +1,28 @@
+"""
+Create the ``transaction`` indexes behind the list and export filters for
+databases whose schema is not generated.
+
+The names and definitions match what ``generate_schemas`` emits for
+``Transaction.Meta.indexes``. Migrations run in a transaction, so the indexes
+are built without ``CONCURRENTLY`` and block writes to ``transaction`` while
+they build. On a large table, create them concurrently under these names
+first; the migration then finds them and does nothing.
+"""
+
+from typing import Any
+
+NAME = "0009_transaction_indexes"
+
+_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS "idx_transaction_created_4dda88" '
+    'ON "transaction" ("created_at")',
+    'CREATE INDEX IF NOT EXISTS "idx_transaction_merchan_ce3fd1" '
+    'ON "transaction" ("merchant_category", "created_at")',
+    'CREATE INDEX IF NOT EXISTS "idx_transaction_foreign_created_at" '
+    'ON "transaction" ("created_at") WHERE foreign_transaction = true',
+)
+
+
+async def upgrade(connection: Any) -> None:
+    for statement in _INDEXES:
+        await connection.execute(statement)
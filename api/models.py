@@ -1,7 +1,56 @@
+from typing import Any
+
 from tortoise import fields
+from tortoise.contrib.postgres.indexes import PostgreSQLIndex
+from tortoise.indexes import Index
 from tortoise.models import Model
 
-from api.enums import MerchantCategory
+from api.enums import MERCHANT_CATEGORY_CODES, MerchantCategory
+
+
+class MerchantCategoryField(fields.SmallIntField):
+    """``MerchantCategory`` stored as its smallint code"""
+
+    def __init__(self, **kwargs: Any) -> None:
+        kwargs.setdefault(
+            "description",
+            "\n".join(
+                f"{code}: {category.value}"
+                for category, code in MERCHANT_CATEGORY_CODES.items()
+            ),
+        )
+        super().__init__(**kwargs)
+        self._by_code = {
+            code: category for category, code in MERCHANT_CATEGORY_CODES.items()
+        }
+
+    def to_python_value(self, value: Any) -> MerchantCategory | None:  # type: ignore[override]
+        if value is None or isinstance(value, MerchantCategory):
+            return value
+        if isinstance(value, int):
+            return self._by_code[value]
+        return MerchantCategory(value)
+
+    def to_db_value(self, value: Any, instance: Any) -> int | None:
+        if value is None:
+            return None
+        return MERCHANT_CATEGORY_CODES[MerchantCategory(value)]
+
+
+class RealField(fields.FloatField):
+    """Single-precision float, about seven significant digits"""
+
+    SQL_TYPE = "REAL"
+
+
+class DecisionField(fields.BooleanField):
+    """A 0/1 decision stored as a boolean and read back as an int"""
+
+    def to_python_value(self, value: Any) -> int | None:  # type: ignore[override]
+        return None if value is None else int(value)
+
+    def to_db_value(self, value: Any, instance: Any) -> bool | None:
+        return None if value is None else bool(value)
 
 
 class Transaction(Model):
@@ -9,14 +58,27 @@ class Transaction(Model):
 
     transaction_id = fields.CharField(max_length=255, unique=True)
     amount = fields.FloatField()
-    transaction_hour = fields.IntField()
-    merchant_category = fields.CharEnumField(MerchantCategory, max_length=100)
+    transaction_hour = fields.SmallIntField()
+    merchant_category: MerchantCategory = MerchantCategoryField()  # type: ignore[assignment]
     foreign_transaction = fields.BooleanField()
     location_mismatch = fields.BooleanField()
-    device_trust_score = fields.IntField()
+    device_trust_score = fields.SmallIntField()
     velocity_last_24h = fields.IntField()
-    cardholder_age = fields.IntField()
+    cardholder_age = fields.SmallIntField()
     created_at = fields.DatetimeField(auto_now_add=True)
+    # Bumped on every write, so updates can check nothing changed since the read.
+    version = fields.IntField(default=1)
+
+    class Meta(Model.Meta):
+        indexes = (
+            Index(fields=("created_at",)),
+            Index(fields=("merchant_category", "created_at")),
+            PostgreSQLIndex(
+                fields=("created_at",),
+                condition={"foreign_transaction": True},
+                name="idx_transaction_foreign_created_at",
+            ),
+        )
 
 
 class Prediction(Model):
@@ -26,6 +88,104 @@ class Prediction(Model):
         "models.Transaction",
         related_name="predictions",
     )
+    # Column order pairs the 4-byte columns so rows carry no alignment padding.
+    fraud_probability = RealField()
+    scored_at = fields.DatetimeField(auto_now_add=True)
+    decision: int = DecisionField()  # type: ignore[assignment]
+    # Decided by the cascade pre-screen; fraud_probability is then its estimate.
+    prescreened = fields.BooleanField(default=False)
+
+    class Meta(Model.Meta):
+        indexes = (
+            Index(fields=("scored_at",)),
+            # Latest prediction per transaction, including the id tie-break.
+            Index(fields=("transaction_id", "scored_at", "id")),
+            PostgreSQLIndex(
+                fields=("scored_at",),
+                condition={"decision": True},
+                name="idx_prediction_flagged_scored_at",
+            ),
+        )
+
+
+class PredictionRollup(Model):
+    """Hourly prediction aggregates per merchant category and decision"""
+
+    bucket_start = fields.DatetimeField()
+    merchant_category: MerchantCategory = MerchantCategoryField()  # type: ignore[assignment]
+    decision = fields.IntField()
+    prediction_count = fields.BigIntField(default=0)
+    probability_sum = fields.FloatField(default=0)
+    amount_sum = fields.FloatField(default=0)
+
+    class Meta(Model.Meta):
+        table = "prediction_rollup"
+        unique_together = (("bucket_start", "merchant_category", "decision"),)
+
+
+class AnalyticsWatermark(Model):
+    """How far an incremental analytics job has consumed its source table"""
+
+    name = fields.CharField(max_length=100, primary_key=True)
+    scored_at = fields.DatetimeField(null=True)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta(Model.Meta):
+        table = "analytics_watermark"
+
+
+class ThresholdVersion(Model):
+    """Decision threshold in force from created_at until the next version"""
+
+    id = fields.IntField(primary_key=True)
+    threshold = fields.FloatField()
+    note = fields.CharField(max_length=255, null=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta(Model.Meta):
+        table = "threshold_version"
+
+
+class ShadowPrediction(Model):
+    """A challenger model's score of a live transaction, next to the champion's"""
+
+    transaction_id = fields.CharField(max_length=255)
+    model_name = fields.CharField(max_length=100)
     fraud_probability = fields.FloatField()
     decision = fields.IntField()
-    scored_at = fields.DatetimeField(auto_now_add=True)
+    champion_probability = fields.FloatField()
+    champion_decision = fields.IntField()
+    scored_at = fields.DatetimeField()
+
+    class Meta(Model.Meta):
+        table = "shadow_prediction"
+        indexes = (Index(fields=("model_name", "scored_at")),)
+
+
+class PredictionExplanation(Model):
+    """Per-feature attribution of a prediction, computed once per model version"""
+
+    prediction_id = fields.IntField()
+    model_version = fields.CharField(max_length=64)
+    method = fields.CharField(max_length=32)
+    base_value = fields.FloatField()
+    contributions = fields.JSONField[list[dict[str, Any]]]()
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta(Model.Meta):
+        table = "prediction_explanation"
+        unique_together = (("model_version", "prediction_id"),)
+
+
+class IdempotencyKey(Model):
+    """Response of a scoring request, replayed to retries with the same key"""
+
+    key = fields.CharField(max_length=255, primary_key=True)
+    request_hash = fields.CharField(max_length=64)
+    # Null while the first request with the key is still being scored.
+    response = fields.JSONField[dict[str, Any]](null=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta(Model.Meta):
+        table = "idempotency_key"
+        indexes = (Index(fields=("created_at",)),)
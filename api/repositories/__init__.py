@@ -1,21 +1,31 @@
 from api.repositories.transactions import (
+    bulk_get_by_external_ids,
+    bulk_insert_predictions,
+    bulk_insert_transactions,
+    create_or_score_transaction_row,
     create_prediction,
     create_transaction,
-    get_or_create_transaction,
+    get_transaction,
     get_transaction_by_external_id,
-    get_transaction_for_update,
+    insert_missing_transactions,
     list_prediction_rows_for_transaction,
     list_transactions,
-    update_transaction_fields,
+    rescore_transaction_if_version,
+    upsert_transactions,
 )
 
 __all__ = [
+    "bulk_get_by_external_ids",
+    "bulk_insert_predictions",
+    "bulk_insert_transactions",
+    "create_or_score_transaction_row",
     "create_prediction",
     "create_transaction",
-    "get_or_create_transaction",
+    "get_transaction",
     "get_transaction_by_external_id",
-    "get_transaction_for_update",
+    "insert_missing_transactions",
     "list_prediction_rows_for_transaction",
     "list_transactions",
-    "update_transaction_fields",
+    "rescore_transaction_if_version",
+    "upsert_transactions",
 ]
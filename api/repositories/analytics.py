@@ -0,0 +1,233 @@
+from datetime import datetime
+from typing import Any, Literal, TypedDict
+
+from tortoise import connections
+from tortoise.transactions import in_transaction
+
+from api.enums import MerchantCategory
+from api.repositories.encoding import merchant_category_code, merchant_category_sql
+
+Granularity = Literal["hour", "day"]
+
+PREDICTION_ROLLUP_WATERMARK = "prediction_rollup"
+
+# Per-hour aggregates of predictions in [$1, $2), merged into the rollup. The
+# outer SELECT reports how many predictions and buckets the run touched.
+_ROLLUP_SQL = """
+WITH delta AS (
+    SELECT date_trunc('hour', p.scored_at, 'UTC') AS bucket_start,
+           t.merchant_category,
+           p.decision::int AS decision,
+           count(*) AS prediction_count,
+           sum(p.fraud_probability) AS probability_sum,
+           sum(t.amount) AS amount_sum
+    FROM prediction p
+    JOIN "transaction" t ON t.id = p.transaction_id
+    WHERE {window}
+    GROUP BY 1, 2, 3
+), upserted AS (
+    INSERT INTO prediction_rollup AS r (
+        bucket_start, merchant_category, decision,
+        prediction_count, probability_sum, amount_sum
+    )
+    SELECT * FROM delta
+    ON CONFLICT (bucket_start, merchant_category, decision) DO UPDATE SET
+        prediction_count = r.prediction_count + EXCLUDED.prediction_count,
+        probability_sum = r.probability_sum + EXCLUDED.probability_sum,
+        amount_sum = r.amount_sum + EXCLUDED.amount_sum
+    RETURNING 1
+)
+SELECT (SELECT coalesce(sum(prediction_count), 0) FROM delta)::bigint AS predictions,
+       (SELECT count(*) FROM upserted) AS buckets
+"""
+
+# Rolled-up hours plus a live aggregate of the predictions past the watermark,
+# so reads are exact without waiting for the next refresh. The rollup only
+# holds predictions scored before the watermark, so the two never overlap.
+_COMBINED_SQL = """
+WITH watermark AS (
+    SELECT scored_at FROM analytics_watermark WHERE name = $1
+), combined AS (
+    SELECT r.bucket_start, r.merchant_category, r.decision,
+           r.prediction_count, r.probability_sum, r.amount_sum
+    FROM prediction_rollup r
+    {rollup_where}
+    UNION ALL
+    SELECT date_trunc('hour', p.scored_at, 'UTC'), t.merchant_category,
+           p.decision::int, count(*), sum(p.fraud_probability), sum(t.amount)
+    FROM prediction p
+    JOIN "transaction" t ON t.id = p.transaction_id
+    WHERE p.scored_at >= coalesce((SELECT scored_at FROM watermark), '-infinity')
+    {live_where}
+    GROUP BY 1, 2, 3
+)
+"""
+
+_METRICS_SQL = """
+    sum(prediction_count)::bigint AS prediction_count,
+    coalesce(sum(prediction_count) FILTER (WHERE decision = 1), 0)::bigint
+        AS flagged_count,
+    sum(probability_sum) / sum(prediction_count) AS mean_probability,
+    sum(amount_sum) AS amount_sum,
+    coalesce(sum(amount_sum) FILTER (WHERE decision = 1), 0) AS flagged_amount_sum
+"""
+
+
+class RollupRefresh(TypedDict):
+    predictions: int
+    buckets: int
+    watermark: datetime | None
+
+
+class RollupMetricsRow(TypedDict):
+    prediction_count: int
+    flagged_count: int
+    mean_probability: float
+    amount_sum: float
+    flagged_amount_sum: float
+
+
+class RollupBucketRow(RollupMetricsRow):
+    bucket_start: datetime
+
+
+class RollupCategoryRow(RollupMetricsRow):
+    merchant_category: str
+
+
+def _metrics_row(row: dict[str, Any]) -> RollupMetricsRow:
+    return RollupMetricsRow(
+        prediction_count=row["prediction_count"],
+        flagged_count=row["flagged_count"],
+        mean_probability=row["mean_probability"],
+        amount_sum=row["amount_sum"],
+        flagged_amount_sum=row["flagged_amount_sum"],
+    )
+
+
+async def refresh_prediction_rollup(*, settle_seconds: float) -> RollupRefresh:
+    """
+    Fold predictions scored since the watermark into ``prediction_rollup``.
+
+    Only predictions older than ``settle_seconds`` are consumed, so rows whose
+    ``scored_at`` was stamped before a slow commit are not skipped. The
+    watermark row is locked for the run, which makes concurrent refreshes from
+    several workers safe.
+    """
+    async with in_transaction() as connection:
+        await connection.execute_query(
+            "INSERT INTO analytics_watermark (name, scored_at, updated_at) "
+            "VALUES ($1, NULL, now()) ON CONFLICT (name) DO NOTHING",
+            [PREDICTION_ROLLUP_WATERMARK],
+        )
+        _, rows = await connection.execute_query(
+            "SELECT scored_at AS watermark, "
+            "now() - make_interval(secs => $2) AS until "
+            "FROM analytics_watermark WHERE name = $1 FOR UPDATE",
+            [PREDICTION_ROLLUP_WATERMARK, float(settle_seconds)],
+        )
+        watermark: datetime | None = rows[0]["watermark"]
+        until: datetime = rows[0]["until"]
+        if watermark is not None and watermark >= until:
+            return RollupRefresh(predictions=0, buckets=0, watermark=watermark)
+
+        window, values = "p.scored_at < $1", [until]
+        if watermark is not None:
+            window = f"p.scored_at >= $2 AND {window}"
+            values.append(watermark)
+        _, rows = await connection.execute_query(
+            _ROLLUP_SQL.format(window=window), values
+        )
+        await connection.execute_query(
+            "UPDATE analytics_watermark SET scored_at = $2, updated_at = now() "
+            "WHERE name = $1",
+            [PREDICTION_ROLLUP_WATERMARK, until],
+        )
+    return RollupRefresh(
+        predictions=rows[0]["predictions"],
+        buckets=rows[0]["buckets"],
+        watermark=until,
+    )
+
+
+def combined_rollup_sql(
+    *,
+    start: datetime | None,
+    end: datetime | None,
+    merchant_category: MerchantCategory | None,
+) -> tuple[str, list[Any]]:
+    """
+    Render the ``combined`` CTE for ``[start, end)``.
+
+    Bounds must be aligned to whole hours, because rolled-up rows are only
+    filtered by ``bucket_start``.
+    """
+    values: list[Any] = [PREDICTION_ROLLUP_WATERMARK]
+    rollup_conditions: list[str] = []
+    live_conditions: list[str] = []
+    predicates: list[tuple[str, str, Any]] = [
+        ("r.bucket_start >= {}", "p.scored_at >= {}", start),
+        ("r.bucket_start < {}", "p.scored_at < {}", end),
+        (
+            "r.merchant_category = {}",
+            "t.merchant_category = {}",
+            None
+            if merchant_category is None
+            else merchant_category_code(merchant_category),
+        ),
+    ]
+    for rollup_template, live_template, value in predicates:
+        if value is None:
+            continue
+        values.append(value)
+        placeholder = f"${len(values)}"
+        rollup_conditions.append(rollup_template.format(placeholder))
+        live_conditions.append(live_template.format(placeholder))
+
+    rollup_where = (
+        f"WHERE {' AND '.join(rollup_conditions)}" if rollup_conditions else ""
+    )
+    live_where = "".join(f" AND {condition}" for condition in live_conditions)
+    query = _COMBINED_SQL.format(rollup_where=rollup_where, live_where=live_where)
+    return query, values
+
+
+async def rollup_timeseries(
+    *,
+    granularity: Granularity,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    merchant_category: MerchantCategory | None = None,
+) -> list[RollupBucketRow]:
+    combined, values = combined_rollup_sql(
+        start=start, end=end, merchant_category=merchant_category
+    )
+    values.append(granularity)
+    query = (
+        f"{combined} SELECT date_trunc(${len(values)}, bucket_start, 'UTC') "  # noqa: S608
+        f"AS bucket_start, {_METRICS_SQL} FROM combined GROUP BY 1 ORDER BY 1"
+    )
+    _, rows = await connections.get("default").execute_query(query, values)
+    return [
+        RollupBucketRow(bucket_start=row["bucket_start"], **_metrics_row(row))
+        for row in rows
+    ]
+
+
+async def rollup_by_category(
+    *,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[RollupCategoryRow]:
+    combined, values = combined_rollup_sql(start=start, end=end, merchant_category=None)
+    query = (
+        f"{combined} SELECT {merchant_category_sql('merchant_category')} "  # noqa: S608
+        f"AS merchant_category, {_METRICS_SQL} FROM combined GROUP BY 1 ORDER BY 1"
+    )
+    _, rows = await connections.get("default").execute_query(query, values)
+    return [
+        RollupCategoryRow(
+            merchant_category=row["merchant_category"], **_metrics_row(row)
+        )
+        for row in rows
+    ]
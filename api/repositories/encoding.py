@@ -0,0 +1,44 @@
+from collections.abc import Sequence
+
+from api.enums import MERCHANT_CATEGORY_CODES, MerchantCategory
+
+_CATEGORIES_BY_CODE = sorted(
+    MERCHANT_CATEGORY_CODES, key=MERCHANT_CATEGORY_CODES.__getitem__
+)
+if [MERCHANT_CATEGORY_CODES[category] for category in _CATEGORIES_BY_CODE] != list(
+    range(1, len(_CATEGORIES_BY_CODE) + 1)
+):
+    msg = "Merchant category codes must run from 1 without gaps"
+    raise ValueError(msg)
+
+# Postgres arrays are 1-based, so a stored code is its own subscript.
+_CATEGORY_NAMES_SQL = (
+    "(ARRAY["
+    + ", ".join(f"'{category.value}'" for category in _CATEGORIES_BY_CODE)
+    + "]::text[])"
+)
+
+
+def merchant_category_code(category: MerchantCategory | str) -> int:
+    return MERCHANT_CATEGORY_CODES[MerchantCategory(category)]
+
+
+def merchant_category_sql(column: str) -> str:
+    """SQL turning the stored code in ``column`` back into the category name."""
+    return f"{_CATEGORY_NAMES_SQL}[{column}]"
+
+
+def select_columns(columns: Sequence[str], alias: str) -> str:
+    """
+    Select list of ``alias.column`` for each column, with the category decoded
+    and decisions read as 0/1, so rows keep the API's shapes.
+    """
+    rendered = []
+    for column in columns:
+        if column == "merchant_category":
+            rendered.append(f"{merchant_category_sql(f'{alias}.{column}')} AS {column}")
+        elif column == "decision":
+            rendered.append(f"{alias}.decision::int AS decision")
+        else:
+            rendered.append(f"{alias}.{column}")
+    return ", ".join(rendered)
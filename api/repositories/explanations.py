@@ -0,0 +1,90 @@
+import json
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, TypedDict
+
+from tortoise import connections
+
+from api.domain.fraud_scoring import FEATURE_COLUMNS
+from api.repositories.encoding import select_columns
+
+_FEATURE_SELECT = select_columns(FEATURE_COLUMNS, "t")
+
+
+class ExplanationRow(TypedDict):
+    prediction_id: int
+    model_version: str
+    method: str
+    base_value: float
+    contributions: list[dict[str, Any]]
+    created_at: datetime
+
+
+async def get_explanations(
+    model_version: str, prediction_ids: Sequence[int]
+) -> dict[int, ExplanationRow]:
+    """Stored explanations of ``prediction_ids`` under ``model_version``."""
+    if not prediction_ids:
+        return {}
+    _, rows = await connections.get("default").execute_query(
+        "SELECT prediction_id, model_version, method, base_value, contributions, "
+        "created_at FROM prediction_explanation "
+        "WHERE model_version = $1 AND prediction_id = ANY($2::int4[])",
+        [model_version, list(prediction_ids)],
+    )
+    return {
+        row["prediction_id"]: ExplanationRow(
+            prediction_id=row["prediction_id"],
+            model_version=row["model_version"],
+            method=row["method"],
+            base_value=row["base_value"],
+            contributions=json.loads(row["contributions"]),
+            created_at=row["created_at"],
+        )
+        for row in rows
+    }
+
+
+async def get_prediction_features(
+    prediction_ids: Sequence[int],
+) -> list[dict[str, Any]]:
+    """Current transaction features behind each prediction, with its ``id``."""
+    if not prediction_ids:
+        return []
+    _, rows = await connections.get("default").execute_query(
+        f"SELECT p.id, {_FEATURE_SELECT} "  # noqa: S608
+        'FROM "prediction" p JOIN "transaction" t ON t.id = p.transaction_id '
+        "WHERE p.id = ANY($1::int4[])",
+        [list(prediction_ids)],
+    )
+    return [dict(row) for row in rows]
+
+
+async def bulk_insert_explanations(rows: Sequence[ExplanationRow]) -> int:
+    """
+    Store explanations in a single statement. A row already stored for the
+    same model version and prediction wins, so concurrent first requests
+    are harmless.
+    """
+    if not rows:
+        return 0
+    await connections.get("default").execute_query(
+        "INSERT INTO prediction_explanation (prediction_id, model_version, method, "
+        "base_value, contributions, created_at) "
+        "SELECT prediction_id, model_version, method, base_value, "
+        "contributions::jsonb, created_at "
+        "FROM unnest($1::int4[], $2::text[], $3::text[], $4::float8[], "
+        "$5::text[], $6::timestamptz[]) "
+        "AS r(prediction_id, model_version, method, base_value, contributions, "
+        "created_at) "
+        "ON CONFLICT (model_version, prediction_id) DO NOTHING",
+        [
+            [int(row["prediction_id"]) for row in rows],
+            [row["model_version"] for row in rows],
+            [row["method"] for row in rows],
+            [float(row["base_value"]) for row in rows],
+            [json.dumps(row["contributions"]) for row in rows],
+            [row["created_at"] for row in rows],
+        ],
+    )
+    return len(rows)
@@ -0,0 +1,76 @@
+from typing import Any
+
+from tortoise import connections
+
+from api.models import IdempotencyKey
+
+# Takes the key for a new request. An existing row is only taken over once it
+# has expired, or when its first request never stored a response (the worker
+# died mid-request) and has been silent for $4 seconds. No row back means the
+# key belongs to someone else.
+_CLAIM_SQL = """
+INSERT INTO idempotency_key AS k (key, request_hash, response, created_at)
+VALUES ($1, $2, NULL, CURRENT_TIMESTAMP)
+ON CONFLICT (key) DO UPDATE SET
+    request_hash = EXCLUDED.request_hash,
+    response = NULL,
+    created_at = EXCLUDED.created_at
+WHERE k.created_at < CURRENT_TIMESTAMP - make_interval(secs => $3)
+   OR (k.response IS NULL
+       AND k.created_at < CURRENT_TIMESTAMP - make_interval(secs => $4))
+RETURNING key
+"""
+
+_DELETE_EXPIRED_SQL = """
+DELETE FROM idempotency_key
+WHERE created_at < CURRENT_TIMESTAMP - make_interval(secs => $1)
+"""
+
+
+def _client(connection: Any | None) -> Any:
+    return connection if connection is not None else connections.get("default")
+
+
+async def claim_idempotency_key(
+    key: str,
+    request_hash: str,
+    *,
+    ttl_seconds: float,
+    abandoned_seconds: float,
+    connection: Any | None = None,
+) -> bool:
+    """Record ``key`` as in progress; False if another request holds it."""
+    _, rows = await _client(connection).execute_query(
+        _CLAIM_SQL, [key, request_hash, float(ttl_seconds), float(abandoned_seconds)]
+    )
+    return bool(rows)
+
+
+async def get_idempotency_key(
+    key: str, *, connection: Any | None = None
+) -> IdempotencyKey | None:
+    return await IdempotencyKey.filter(key=key).using_db(connection).first()
+
+
+async def save_idempotent_response(
+    key: str, response: dict[str, Any], *, connection: Any | None = None
+) -> None:
+    await IdempotencyKey.filter(key=key).using_db(connection).update(response=response)
+
+
+async def release_idempotency_key(key: str, *, connection: Any | None = None) -> None:
+    """Drop a claim whose request failed, so a retry can score again."""
+    await (
+        IdempotencyKey.filter(key=key, response__isnull=True)
+        .using_db(connection)
+        .delete()
+    )
+
+
+async def delete_expired_idempotency_keys(
+    ttl_seconds: float, *, connection: Any | None = None
+) -> int:
+    count, _ = await _client(connection).execute_query(
+        _DELETE_EXPIRED_SQL, [float(ttl_seconds)]
+    )
+    return count
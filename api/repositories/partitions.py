@@ -0,0 +1,185 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, TypedDict
+
+from tortoise import connections
+
+from api.domain.partitions import (
+    DEFAULT_PARTITION,
+    PARTITIONED_TABLE,
+    add_months,
+    partition_month,
+)
+from api.repositories.analytics import PREDICTION_ROLLUP_WATERMARK
+from api.repositories.encoding import merchant_category_sql
+
+# Session-level advisory lock taken by whichever worker maintains partitions.
+MAINTENANCE_LOCK_KEY = 72_044_001
+
+ARCHIVE_COLUMNS: tuple[str, ...] = (
+    "id",
+    "transaction_id",
+    "fraud_probability",
+    "decision",
+    "prescreened",
+    "scored_at",
+    "merchant_category",
+    "amount",
+    "foreign_transaction",
+)
+
+# Attached monthly partitions and the default partition, plus monthly tables
+# left detached by an interrupted archive run (relispartition is false).
+_PARTITIONS_SQL = """
+SELECT c.relname AS name,
+       c.relispartition AS attached,
+       greatest(c.reltuples, 0)::bigint AS rows_estimate,
+       pg_total_relation_size(c.oid) AS total_bytes
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = current_schema()
+  AND c.relkind = 'r'
+  AND (c.relname = $1 OR c.relname ~ $2)
+ORDER BY c.relname
+"""
+_MONTH_PATTERN = f"^{PARTITIONED_TABLE}_p[0-9]{{4}}_[0-9]{{2}}$"
+
+
+class PartitionRow(TypedDict):
+    name: str
+    attached: bool
+    rows_estimate: int
+    total_bytes: int
+
+
+def _month_table(name: str) -> tuple[str, datetime]:
+    """Quoted table name and month of a monthly partition; rejects other names."""
+    month = partition_month(name)
+    if month is None:
+        msg = f"Not a monthly prediction partition: {name!r}"
+        raise ValueError(msg)
+    return f'"{name}"', month
+
+
+@asynccontextmanager
+async def acquire() -> AsyncIterator[Any]:
+    """A raw connection from the default pool, for DDL and session locks."""
+    async with connections.get("default").acquire_connection() as connection:
+        yield connection
+
+
+@asynccontextmanager
+async def maintenance_connection() -> AsyncIterator[Any | None]:
+    """
+    A connection holding the maintenance lock, or None when another worker
+    holds it. The lock is released when the block exits.
+    """
+    async with acquire() as connection:
+        locked = await connection.fetchval(
+            "SELECT pg_try_advisory_lock($1)", MAINTENANCE_LOCK_KEY
+        )
+        if not locked:
+            yield None
+            return
+        try:
+            yield connection
+        finally:
+            await connection.execute(
+                "SELECT pg_advisory_unlock($1)", MAINTENANCE_LOCK_KEY
+            )
+
+
+async def list_partitions(connection: Any) -> list[PartitionRow]:
+    rows = await connection.fetch(_PARTITIONS_SQL, DEFAULT_PARTITION, _MONTH_PATTERN)
+    return [
+        PartitionRow(
+            name=row["name"],
+            attached=row["attached"],
+            rows_estimate=row["rows_estimate"],
+            total_bytes=row["total_bytes"],
+        )
+        for row in rows
+    ]
+
+
+async def create_default_partition(connection: Any) -> None:
+    await connection.execute(
+        f'CREATE TABLE IF NOT EXISTS "{DEFAULT_PARTITION}" '
+        f'PARTITION OF "{PARTITIONED_TABLE}" DEFAULT'
+    )
+
+
+async def create_month_partition(connection: Any, name: str) -> None:
+    """
+    Add the monthly partition ``name``.
+
+    The table is built standalone, takes over any rows of its month that
+    landed in the default partition, and is then attached. ``ATTACH`` only
+    needs a ``SHARE UPDATE EXCLUSIVE`` lock on the parent, so scoring
+    inserts keep flowing while it runs.
+    """
+    table, month = _month_table(name)
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    async with connection.transaction():
+        await connection.execute(
+            f"CREATE TABLE {table} "
+            f'(LIKE "{PARTITIONED_TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        )
+        await connection.execute(
+            f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '  # noqa: S608
+            "WHERE scored_at >= $1 AND scored_at < $2 RETURNING *) "
+            f"INSERT INTO {table} SELECT * FROM moved",
+            month,
+            add_months(month, 1),
+        )
+        await connection.execute(
+            f'ALTER TABLE "{PARTITIONED_TABLE}" ATTACH PARTITION {table} '
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+
+
+async def detach_partition(connection: Any, name: str) -> None:
+    table, _ = _month_table(name)
+    await connection.execute(
+        f'ALTER TABLE "{PARTITIONED_TABLE}" DETACH PARTITION {table}'
+    )
+
+
+async def drop_partition_table(connection: Any, name: str) -> None:
+    table, _ = _month_table(name)
+    await connection.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+async def stream_archive_rows(
+    connection: Any, name: str, *, batch_size: int
+) -> AsyncIterator[list[tuple[Any, ...]]]:
+    """
+    Stream ``ARCHIVE_COLUMNS`` rows of a detached partition in id order. The
+    transaction columns the export filters on are copied alongside, so the
+    archive stays queryable on its own.
+    """
+    table, _ = _month_table(name)
+    query = (
+        "SELECT p.id, t.transaction_id, p.fraud_probability, "  # noqa: S608
+        "p.decision::int AS decision, p.prescreened, p.scored_at, "
+        f"{merchant_category_sql('t.merchant_category')} AS merchant_category, "
+        "t.amount, t.foreign_transaction "
+        f'FROM {table} p LEFT JOIN "transaction" t ON t.id = p.transaction_id '
+        "ORDER BY p.id"
+    )
+    async with connection.transaction(readonly=True):
+        cursor = await connection.cursor(query)
+        while True:
+            records = await cursor.fetch(batch_size)
+            if not records:
+                break
+            yield [tuple(record) for record in records]
+
+
+async def get_rollup_watermark(connection: Any) -> datetime | None:
+    """How far the analytics rollup has consumed predictions, if it has run."""
+    return await connection.fetchval(
+        "SELECT scored_at FROM analytics_watermark WHERE name = $1",
+        PREDICTION_ROLLUP_WATERMARK,
+    )
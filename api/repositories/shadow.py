@@ -0,0 +1,109 @@
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, TypedDict
+
+from tortoise import connections
+
+_ABS_DELTA = "abs(fraud_probability - champion_probability)"
+
+_REPORT_SQL = f"""
+SELECT model_name,
+       count(*) AS prediction_count,
+       count(*) FILTER (WHERE decision = champion_decision) AS agreements,
+       count(*) FILTER (WHERE decision = 1 AND champion_decision = 1)
+           AS both_flagged,
+       count(*) FILTER (WHERE decision = 1 AND champion_decision = 0)
+           AS shadow_only_flagged,
+       count(*) FILTER (WHERE decision = 0 AND champion_decision = 1)
+           AS champion_only_flagged,
+       avg(fraud_probability - champion_probability) AS mean_delta,
+       avg({_ABS_DELTA}) AS mean_abs_delta,
+       percentile_cont(0.95) WITHIN GROUP (ORDER BY {_ABS_DELTA})
+           AS p95_abs_delta,
+       max({_ABS_DELTA}) AS max_abs_delta,
+       corr(fraud_probability, champion_probability) AS correlation
+FROM shadow_prediction
+{{where}}
+GROUP BY model_name
+ORDER BY model_name
+"""  # noqa: S608
+
+
+class ShadowPredictionRow(TypedDict):
+    transaction_id: str
+    model_name: str
+    fraud_probability: float
+    decision: int
+    champion_probability: float
+    champion_decision: int
+    scored_at: datetime
+
+
+class ShadowReportRow(TypedDict):
+    model_name: str
+    prediction_count: int
+    agreements: int
+    both_flagged: int
+    shadow_only_flagged: int
+    champion_only_flagged: int
+    mean_delta: float
+    mean_abs_delta: float
+    p95_abs_delta: float
+    max_abs_delta: float
+    correlation: float | None
+
+
+async def bulk_insert_shadow_predictions(rows: Sequence[ShadowPredictionRow]) -> int:
+    """Insert shadow scores in a single statement."""
+    if not rows:
+        return 0
+    await connections.get("default").execute_query(
+        "INSERT INTO shadow_prediction (transaction_id, model_name, "
+        "fraud_probability, decision, champion_probability, champion_decision, "
+        "scored_at) "
+        "SELECT * FROM unnest($1::text[], $2::text[], $3::float8[], $4::int4[], "
+        "$5::float8[], $6::int4[], $7::timestamptz[])",
+        [
+            [row["transaction_id"] for row in rows],
+            [row["model_name"] for row in rows],
+            [float(row["fraud_probability"]) for row in rows],
+            [int(row["decision"]) for row in rows],
+            [float(row["champion_probability"]) for row in rows],
+            [int(row["champion_decision"]) for row in rows],
+            [row["scored_at"] for row in rows],
+        ],
+    )
+    return len(rows)
+
+
+async def shadow_report(
+    *,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[ShadowReportRow]:
+    values: list[Any] = []
+    conditions: list[str] = []
+    for template, value in (("scored_at >= {}", start), ("scored_at < {}", end)):
+        if value is not None:
+            values.append(value)
+            conditions.append(template.format(f"${len(values)}"))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    _, rows = await connections.get("default").execute_query(
+        _REPORT_SQL.format(where=where), values
+    )
+    return [
+        ShadowReportRow(
+            model_name=row["model_name"],
+            prediction_count=row["prediction_count"],
+            agreements=row["agreements"],
+            both_flagged=row["both_flagged"],
+            shadow_only_flagged=row["shadow_only_flagged"],
+            champion_only_flagged=row["champion_only_flagged"],
+            mean_delta=row["mean_delta"],
+            mean_abs_delta=row["mean_abs_delta"],
+            p95_abs_delta=row["p95_abs_delta"],
+            max_abs_delta=row["max_abs_delta"],
+            correlation=row["correlation"],
+        )
+        for row in rows
+    ]
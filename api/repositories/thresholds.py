@@ -0,0 +1,154 @@
+from datetime import datetime
+from typing import Any, TypedDict
+
+from tortoise import connections
+from tortoise.transactions import in_transaction
+
+from api.models import ThresholdVersion
+from api.repositories.analytics import PREDICTION_ROLLUP_WATERMARK
+
+# Re-decides one id range of predictions at $1, matched on the full
+# (id, scored_at) key of the partitioned table. Only rows whose decision flips
+# are written. Pre-screened rows are skipped: their probability is only good
+# for the threshold the cascade was built at. Flipped rows already folded into the analytics rollup ($4 is
+# the rollup watermark) move their counts and sums between decision rows, so
+# the rollup stays exact without a rebuild.
+_REDECIDE_SQL = """
+WITH batch AS (
+    SELECT id, scored_at, prescreened FROM prediction
+    WHERE id > $2 ORDER BY id LIMIT $3
+), changed AS (
+    UPDATE prediction p
+    SET decision = (p.fraud_probability >= $1)
+    FROM batch b, "transaction" t
+    WHERE p.id = b.id
+      AND p.scored_at = b.scored_at
+      AND NOT b.prescreened
+      AND t.id = p.transaction_id
+      AND p.decision <> (p.fraud_probability >= $1)
+    RETURNING p.scored_at, t.merchant_category, p.decision::int AS decision,
+              p.fraud_probability, t.amount
+), moved AS (
+    SELECT date_trunc('hour', scored_at, 'UTC') AS bucket_start,
+           merchant_category, decision, 1 AS sign, fraud_probability, amount
+    FROM changed WHERE scored_at < $4
+    UNION ALL
+    SELECT date_trunc('hour', scored_at, 'UTC'),
+           merchant_category, 1 - decision, -1, fraud_probability, amount
+    FROM changed WHERE scored_at < $4
+), adjusted AS (
+    INSERT INTO prediction_rollup AS r (
+        bucket_start, merchant_category, decision,
+        prediction_count, probability_sum, amount_sum
+    )
+    SELECT bucket_start, merchant_category, decision,
+           sum(sign), sum(sign * fraud_probability), sum(sign * amount)
+    FROM moved
+    GROUP BY 1, 2, 3
+    ON CONFLICT (bucket_start, merchant_category, decision) DO UPDATE SET
+        prediction_count = r.prediction_count + EXCLUDED.prediction_count,
+        probability_sum = r.probability_sum + EXCLUDED.probability_sum,
+        amount_sum = r.amount_sum + EXCLUDED.amount_sum
+    RETURNING 1
+)
+SELECT (SELECT max(id) FROM batch) AS last_id,
+       (SELECT count(*) FROM batch) AS scanned,
+       (SELECT count(*) FROM batch WHERE prescreened) AS prescreened,
+       (SELECT count(*) FROM changed) AS changed
+"""
+
+
+class RedecideBatch(TypedDict):
+    last_id: int | None
+    scanned: int
+    prescreened: int
+    changed: int
+
+
+class ProbabilityBucketRow(TypedDict):
+    bucket: int
+    predictions: int
+    flagged: int
+    prescreened: int
+
+
+async def latest_threshold_version() -> ThresholdVersion | None:
+    return await ThresholdVersion.all().order_by("-id").first()
+
+
+async def get_threshold_version(version_id: int) -> ThresholdVersion | None:
+    return await ThresholdVersion.get_or_none(id=version_id)
+
+
+async def list_threshold_versions(*, limit: int) -> list[ThresholdVersion]:
+    return await ThresholdVersion.all().order_by("-id").limit(limit)
+
+
+async def create_threshold_version(
+    *, threshold: float, note: str | None
+) -> ThresholdVersion:
+    return await ThresholdVersion.create(threshold=threshold, note=note)
+
+
+async def redecide_prediction_batch(
+    *, threshold: float, after_id: int, batch_size: int
+) -> RedecideBatch:
+    """
+    Recompute ``decision`` for the next ``batch_size`` predictions after
+    ``after_id`` in one statement. The rollup watermark is share-locked for
+    the batch, so a concurrent rollup refresh cannot move it in between.
+    """
+    async with in_transaction() as connection:
+        _, rows = await connection.execute_query(
+            "SELECT scored_at FROM analytics_watermark WHERE name = $1 FOR SHARE",
+            [PREDICTION_ROLLUP_WATERMARK],
+        )
+        watermark = rows[0]["scored_at"] if rows else None
+        _, rows = await connection.execute_query(
+            _REDECIDE_SQL, [threshold, after_id, batch_size, watermark]
+        )
+    return RedecideBatch(
+        last_id=rows[0]["last_id"],
+        scanned=rows[0]["scanned"],
+        prescreened=rows[0]["prescreened"],
+        changed=rows[0]["changed"],
+    )
+
+
+async def probability_histogram(
+    *,
+    bins: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[ProbabilityBucketRow]:
+    """
+    Stored predictions counted per ``1 / bins`` probability bucket, with how
+    many of each are currently flagged. Pre-screened predictions are counted
+    apart, since their probability is not the model's. Non-empty buckets only.
+    """
+    values: list[Any] = [bins]
+    conditions: list[str] = []
+    for template, value in (("scored_at >= {}", start), ("scored_at < {}", end)):
+        if value is not None:
+            values.append(value)
+            conditions.append(template.format(f"${len(values)}"))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = (
+        # Same rounding as api.domain.evaluation.score_buckets.
+        "SELECT greatest(least(floor(fraud_probability * $1::float8 + 1e-9), "  # noqa: S608
+        "$1::float8 - 1), 0)::int AS bucket, "
+        "count(*) FILTER (WHERE NOT prescreened) AS predictions, "
+        "count(*) FILTER (WHERE decision AND NOT prescreened) AS flagged, "
+        "count(*) FILTER (WHERE prescreened) AS prescreened "
+        f"FROM prediction {where} GROUP BY 1"
+    )
+    _, rows = await connections.get("default").execute_query(query, values)
+    return [
+        ProbabilityBucketRow(
+            bucket=row["bucket"],
+            predictions=row["predictions"],
+            flagged=row["flagged"],
+            prescreened=row["prescreened"],
+        )
+        for row in rows
+    ]
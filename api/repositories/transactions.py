@@ -1,7 +1,59 @@
+from collections.abc import AsyncIterator, Sequence
+from dataclasses import dataclass
 from datetime import UTC, datetime
 from typing import Any, TypedDict
 
+from tortoise import connections
+
+from api.database import read_connection
+from api.enums import MerchantCategory
 from api.models import Prediction, Transaction
+from api.repositories.encoding import merchant_category_code, select_columns
+
+TRANSACTION_FEATURE_COLUMNS: tuple[str, ...] = (
+    "id",
+    "amount",
+    "transaction_hour",
+    "merchant_category",
+    "foreign_transaction",
+    "location_mismatch",
+    "device_trust_score",
+    "velocity_last_24h",
+    "cardholder_age",
+)
+
+TRANSACTION_EXPORT_COLUMNS: tuple[str, ...] = (
+    "id",
+    "transaction_id",
+    *TRANSACTION_FEATURE_COLUMNS[1:],
+    "created_at",
+)
+PREDICTION_EXPORT_COLUMNS: tuple[str, ...] = (
+    "id",
+    "transaction_id",
+    "fraud_probability",
+    "decision",
+    "prescreened",
+    "scored_at",
+)
+_TRANSACTION_SELECT = select_columns(TRANSACTION_EXPORT_COLUMNS, "t")
+_SCORE_SELECT = (
+    "p.id, t.transaction_id, p.fraud_probability, p.decision::int AS decision, "
+    "p.prescreened, p.scored_at"
+)
+
+# Column name -> Postgres array element type used by the unnest() bulk statements.
+_TRANSACTION_INSERT_TYPES: dict[str, str] = {
+    "transaction_id": "text",
+    "amount": "float8",
+    "transaction_hour": "int2",
+    "merchant_category": "int2",
+    "foreign_transaction": "bool",
+    "location_mismatch": "bool",
+    "device_trust_score": "int2",
+    "velocity_last_24h": "int4",
+    "cardholder_age": "int2",
+}
 
 
 class PredictionRow(TypedDict):
@@ -9,49 +61,172 @@ class PredictionRow(TypedDict):
     transaction_id: str
     fraud_probability: float
     decision: int
+    prescreened: bool
     scored_at: datetime
 
 
-async def list_transactions(*, limit: int, offset: int) -> list[Transaction]:
-    return await Transaction.all().order_by("-created_at").offset(offset).limit(limit)
+class ScoredTransaction(TypedDict):
+    transaction_pk: int
+    prediction_id: int
+    scored_at: datetime
+    created: bool
 
 
-async def count_transactions() -> int:
-    return await Transaction.all().count()
+class UpsertedTransaction(TypedDict):
+    id: int
+    transaction_id: str
+    created: bool
 
 
-async def list_scores(*, limit: int, offset: int) -> list[PredictionRow]:
-    rows = (
-        await Prediction.all()
-        .order_by("-scored_at")
-        .offset(offset)
-        .limit(limit)
-        .values(
-            "id",
-            "transaction__transaction_id",
-            "fraud_probability",
-            "decision",
-            "scored_at",
+@dataclass(frozen=True)
+class TransactionFilters:
+    """
+    Optional predicates shared by the list, count and export queries.
+
+    ``decision`` and the probability bounds apply to the prediction itself on
+    score queries and to the latest prediction on transaction queries.
+    ``start``/``end`` bound ``created_at`` or ``scored_at`` as ``[start, end)``.
+    """
+
+    merchant_category: MerchantCategory | None = None
+    min_amount: float | None = None
+    max_amount: float | None = None
+    foreign_transaction: bool | None = None
+    decision: int | None = None
+    min_probability: float | None = None
+    max_probability: float | None = None
+    start: datetime | None = None
+    end: datetime | None = None
+
+    @property
+    def filters_predictions(self) -> bool:
+        return (
+            self.decision is not None
+            or self.min_probability is not None
+            or self.max_probability is not None
         )
+
+
+NO_FILTERS = TransactionFilters()
+
+# Most recent prediction per transaction, served by the
+# (transaction_id, scored_at) index on prediction.
+_LATEST_PREDICTION_JOIN = (
+    " JOIN LATERAL (SELECT latest.decision, latest.fraud_probability"
+    " FROM prediction latest WHERE latest.transaction_id = t.id"
+    " ORDER BY latest.scored_at DESC, latest.id DESC LIMIT 1) p ON TRUE"
+)
+
+
+def _where_clause(
+    filters: TransactionFilters, *, time_column: str
+) -> tuple[str, list[Any]]:
+    """
+    Render only the filters that are set as ``$n`` placeholders, so every
+    predicate stays sargable for the composite and partial indexes.
+    """
+    merchant_category = (
+        None
+        if filters.merchant_category is None
+        else merchant_category_code(filters.merchant_category)
     )
+    decision = None if filters.decision is None else bool(filters.decision)
+    predicates: list[tuple[str, Any]] = [
+        ("t.merchant_category = {}", merchant_category),
+        ("t.amount >= {}", filters.min_amount),
+        ("t.amount <= {}", filters.max_amount),
+        ("t.foreign_transaction = {}", filters.foreign_transaction),
+        ("p.decision = {}", decision),
+        ("p.fraud_probability >= {}", filters.min_probability),
+        ("p.fraud_probability <= {}", filters.max_probability),
+        (f"{time_column} >= {{}}", filters.start),
+        (f"{time_column} < {{}}", filters.end),
+    ]
+    conditions: list[str] = []
+    values: list[Any] = []
+    for template, value in predicates:
+        if value is None:
+            continue
+        values.append(value)
+        conditions.append(template.format(f"${len(values)}"))
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where, values
+
+
+def transaction_query(
+    select: str, filters: TransactionFilters = NO_FILTERS
+) -> tuple[str, list[Any]]:
+    where, values = _where_clause(filters, time_column="t.created_at")
+    join = _LATEST_PREDICTION_JOIN if filters.filters_predictions else ""
+    return f'SELECT {select} FROM "transaction" t{join}{where}', values  # noqa: S608
+
+
+def score_query(
+    select: str, filters: TransactionFilters = NO_FILTERS
+) -> tuple[str, list[Any]]:
+    where, values = _where_clause(filters, time_column="p.scored_at")
+    # LEFT JOIN on the primary key lets the planner drop the join when no
+    # transaction column is used (counts); the FK is NOT NULL so rows match.
+    query = (
+        f"SELECT {select} FROM prediction p "  # noqa: S608
+        f'LEFT JOIN "transaction" t ON t.id = p.transaction_id{where}'
+    )
+    return query, values
+
+
+def _paginate(query: str, values: list[Any], *, limit: int, offset: int) -> str:
+    values.extend((limit, offset))
+    return f"{query} LIMIT ${len(values) - 1} OFFSET ${len(values)}"
+
+
+async def list_transactions(
+    *, limit: int, offset: int, filters: TransactionFilters = NO_FILTERS
+) -> list[dict[str, Any]]:
+    query, values = transaction_query(_TRANSACTION_SELECT, filters)
+    query = _paginate(
+        f"{query} ORDER BY t.created_at DESC", values, limit=limit, offset=offset
+    )
+    _, rows = await read_connection().execute_query(query, values)
+    return [dict(row) for row in rows]
+
+
+async def count_transactions(filters: TransactionFilters = NO_FILTERS) -> int:
+    query, values = transaction_query("count(*) AS total", filters)
+    _, rows = await read_connection().execute_query(query, values)
+    return rows[0]["total"]
+
+
+async def list_scores(
+    *, limit: int, offset: int, filters: TransactionFilters = NO_FILTERS
+) -> list[PredictionRow]:
+    query, values = score_query(_SCORE_SELECT, filters)
+    query = _paginate(
+        f"{query} ORDER BY p.scored_at DESC", values, limit=limit, offset=offset
+    )
+    _, rows = await read_connection().execute_query(query, values)
     return [
         PredictionRow(
             id=row["id"],
-            transaction_id=row["transaction__transaction_id"],
+            transaction_id=row["transaction_id"],
             fraud_probability=row["fraud_probability"],
             decision=row["decision"],
+            prescreened=row["prescreened"],
             scored_at=row["scored_at"],
         )
         for row in rows
     ]
 
 
-async def count_scores() -> int:
-    return await Prediction.all().count()
+async def count_scores(filters: TransactionFilters = NO_FILTERS) -> int:
+    query, values = score_query("count(*) AS total", filters)
+    _, rows = await read_connection().execute_query(query, values)
+    return rows[0]["total"]
 
 
 async def get_transaction_by_external_id(transaction_id: str) -> Transaction | None:
-    return await Transaction.get_or_none(transaction_id=transaction_id)
+    return await Transaction.get_or_none(
+        transaction_id=transaction_id, using_db=read_connection()
+    )
 
 
 async def list_prediction_rows_for_transaction(
@@ -59,8 +234,9 @@ async def list_prediction_rows_for_transaction(
 ) -> list[PredictionRow]:
     rows = await (
         Prediction.filter(transaction=transaction)
+        .using_db(read_connection())
         .order_by("-scored_at")
-        .values("id", "fraud_probability", "decision", "scored_at")
+        .values("id", "fraud_probability", "decision", "prescreened", "scored_at")
     )
     return [
         PredictionRow(
@@ -68,47 +244,61 @@ async def list_prediction_rows_for_transaction(
             transaction_id=transaction.transaction_id,
             fraud_probability=row["fraud_probability"],
             decision=row["decision"],
+            prescreened=row["prescreened"],
             scored_at=row["scored_at"],
         )
         for row in rows
     ]
 
 
-async def get_or_create_transaction(
-    *,
-    transaction_id: str,
-    defaults: dict[str, Any],
-    connection: Any,
-) -> tuple[Transaction, bool]:
-    return await Transaction.get_or_create(
-        transaction_id=transaction_id,
-        defaults=defaults,
-        using_db=connection,
-    )
-
-
-async def get_transaction_for_update(
-    transaction_id: str,
-    *,
-    connection: Any,
-) -> Transaction | None:
-    return await (
-        Transaction.filter(transaction_id=transaction_id)
-        .using_db(connection)
-        .select_for_update()
-        .get_or_none()
-    )
+async def get_transaction(transaction_id: str) -> Transaction | None:
+    """The transaction as stored on the primary, read without a lock."""
+    return await Transaction.get_or_none(transaction_id=transaction_id)
 
 
-async def update_transaction_fields(
-    transaction: Transaction,
+async def rescore_transaction_if_version(
     *,
+    transaction_pk: int,
+    version: int,
     fields: dict[str, Any],
-    connection: Any,
-) -> None:
-    for field_name, value in fields.items():
-        setattr(transaction, field_name, value)
-    await transaction.save(using_db=connection)
+    fraud_probability: float,
+    decision: int,
+    prescreened: bool = False,
+    scored_at: datetime | None = None,
+    connection: Any | None = None,
+) -> datetime | None:
+    """
+    Write ``fields`` and record a prediction, as one statement, if the
+    transaction is still at ``version``; the version is bumped. Returns the
+    prediction's ``scored_at``, or None when another write got there first.
+    """
+    values: list[Any] = [transaction_pk, version]
+    assignments = []
+    for column, value in fields.items():
+        values.append(_column_value(column, value))
+        pg_type = _TRANSACTION_INSERT_TYPES[column]
+        assignments.append(f"{column} = ${len(values)}::{pg_type}")
+    assignments.append("version = version + 1")
+    values += [
+        float(fraud_probability),
+        bool(decision),
+        bool(prescreened),
+        scored_at or datetime.now(UTC),
+    ]
+    query = (
+        'WITH updated AS (UPDATE "transaction" '  # noqa: S608
+        f"SET {', '.join(assignments)} "
+        "WHERE id = $1 AND version = $2 RETURNING id"
+        "), scored AS ("
+        'INSERT INTO "prediction" '
+        "(transaction_id, fraud_probability, decision, prescreened, scored_at) "
+        f"SELECT id, ${len(values) - 3}::float8, ${len(values) - 2}::bool, "
+        f"${len(values) - 1}::bool, ${len(values)}::timestamptz FROM updated "
+        "RETURNING scored_at"
+        ") SELECT scored_at FROM scored"
+    )
+    _, rows = await _client(connection).execute_query(query, values)
+    return rows[0]["scored_at"] if rows else None
 
 
 async def create_transaction(payload: dict[str, Any]) -> Transaction:
@@ -130,3 +320,313 @@ async def create_prediction(
         scored_at=scored_at or datetime.now(UTC),
         using_db=connection,
     )
+
+
+_FEATURE_BATCH_SQL = (
+    f"SELECT {select_columns(TRANSACTION_FEATURE_COLUMNS, 't')} "  # noqa: S608
+    'FROM "transaction" t WHERE t.id > $1 ORDER BY t.id LIMIT $2'
+)
+
+
+async def _stream_query(
+    query: str,
+    values: Sequence[Any],
+    *,
+    batch_size: int,
+    isolation: str | None = None,
+) -> AsyncIterator[list[tuple[Any, ...]]]:
+    """
+    Run ``query`` through a server-side cursor inside a read-only transaction
+    and yield ``batch_size`` rows per fetch, so memory stays constant.
+    """
+    client = connections.get("default")
+    async with (
+        client.acquire_connection() as connection,
+        connection.transaction(readonly=True, isolation=isolation),
+    ):
+        cursor = await connection.cursor(query, *values)
+        while True:
+            records = await cursor.fetch(batch_size)
+            if not records:
+                break
+            yield [tuple(record) for record in records]
+
+
+async def fetch_transaction_feature_batch(
+    *,
+    after_id: int,
+    limit: int,
+    connection: Any | None = None,
+) -> list[tuple[Any, ...]]:
+    """
+    The next ``limit`` ``TRANSACTION_FEATURE_COLUMNS`` rows with
+    ``id > after_id`` in id order.
+
+    One short statement on the primary key per batch, so a long run holds no
+    transaction or snapshot between batches.
+    """
+    _, rows = await _client(connection).execute_query(
+        _FEATURE_BATCH_SQL, [after_id, limit]
+    )
+    return [tuple(row.values()) for row in rows]
+
+
+async def stream_transactions_for_export(
+    filters: TransactionFilters = NO_FILTERS,
+    *,
+    batch_size: int = 10_000,
+) -> AsyncIterator[list[tuple[Any, ...]]]:
+    """Stream ``TRANSACTION_EXPORT_COLUMNS`` rows in id order from one snapshot."""
+    query, values = transaction_query(_TRANSACTION_SELECT, filters)
+    async for batch in _stream_query(
+        f"{query} ORDER BY t.id",
+        values,
+        batch_size=batch_size,
+        isolation="repeatable_read",
+    ):
+        yield batch
+
+
+async def stream_predictions_for_export(
+    filters: TransactionFilters = NO_FILTERS,
+    *,
+    batch_size: int = 10_000,
+) -> AsyncIterator[list[tuple[Any, ...]]]:
+    """Stream ``PREDICTION_EXPORT_COLUMNS`` rows in id order from one snapshot."""
+    query, values = score_query(_SCORE_SELECT, filters)
+    async for batch in _stream_query(
+        f"{query} ORDER BY p.id",
+        values,
+        batch_size=batch_size,
+        isolation="repeatable_read",
+    ):
+        yield batch
+
+
+def _client(connection: Any | None) -> Any:
+    return connection if connection is not None else connections.get("default")
+
+
+def _column_value(column: str, value: Any) -> Any:
+    return merchant_category_code(value) if column == "merchant_category" else value
+
+
+def _transaction_columns(rows: Sequence[dict[str, Any]]) -> list[list[Any]]:
+    """Pivot row dicts into one array parameter per insert column."""
+    return [
+        [_column_value(column, row[column]) for row in rows]
+        for column in _TRANSACTION_INSERT_TYPES
+    ]
+
+
+def _unnest_transactions_sql() -> str:
+    column_list = ", ".join(_TRANSACTION_INSERT_TYPES)
+    arrays = ", ".join(
+        f"${position}::{pg_type}[]"
+        for position, pg_type in enumerate(_TRANSACTION_INSERT_TYPES.values(), start=1)
+    )
+    return (
+        f'INSERT INTO "transaction" ({column_list}) '  # noqa: S608
+        f"SELECT * FROM unnest({arrays})"
+    )
+
+
+async def create_or_score_transaction_row(
+    *,
+    fields: dict[str, Any],
+    fraud_probability: float,
+    decision: int,
+    prescreened: bool = False,
+    scored_at: datetime | None = None,
+    connection: Any | None = None,
+) -> ScoredTransaction:
+    """
+    Create the transaction if it is new and record its prediction, as one
+    statement and one round trip.
+
+    A concurrent insert of the same ``transaction_id`` resolves through
+    ``ON CONFLICT`` instead of failing. An existing transaction keeps its
+    stored fields, same as ``get_or_create``.
+    """
+    column_list = ", ".join(_TRANSACTION_INSERT_TYPES)
+    placeholders = ", ".join(
+        f"${position}" for position in range(1, len(_TRANSACTION_INSERT_TYPES) + 1)
+    )
+    prediction_params = len(_TRANSACTION_INSERT_TYPES)
+    query = (
+        "WITH upserted AS ("  # noqa: S608
+        f'INSERT INTO "transaction" ({column_list}) VALUES ({placeholders}) '
+        "ON CONFLICT (transaction_id) "
+        "DO UPDATE SET transaction_id = EXCLUDED.transaction_id "
+        "RETURNING id, (xmax = 0) AS created"
+        "), scored AS ("
+        'INSERT INTO "prediction" '
+        "(transaction_id, fraud_probability, decision, prescreened, scored_at) "
+        f"SELECT id, ${prediction_params + 1}::float8, "
+        f"${prediction_params + 2}::bool, ${prediction_params + 3}::bool, "
+        f"${prediction_params + 4}::timestamptz "
+        "FROM upserted "
+        "RETURNING id, transaction_id, scored_at"
+        ") "
+        "SELECT scored.id AS prediction_id, scored.transaction_id AS transaction_pk, "
+        "scored.scored_at, upserted.created "
+        "FROM scored JOIN upserted ON upserted.id = scored.transaction_id"
+    )
+    values = [column[0] for column in _transaction_columns([fields])]
+    values += [
+        float(fraud_probability),
+        bool(decision),
+        bool(prescreened),
+        scored_at or datetime.now(UTC),
+    ]
+    _, rows = await _client(connection).execute_query(query, values)
+    row = rows[0]
+    return ScoredTransaction(
+        transaction_pk=row["transaction_pk"],
+        prediction_id=row["prediction_id"],
+        scored_at=row["scored_at"],
+        created=row["created"],
+    )
+
+
+async def bulk_get_by_external_ids(
+    transaction_ids: Sequence[str],
+    *,
+    connection: Any | None = None,
+) -> dict[str, int]:
+    """Map external transaction ids to primary keys in a single query."""
+    if not transaction_ids:
+        return {}
+    _, rows = await _client(connection).execute_query(
+        'SELECT id, transaction_id FROM "transaction" '
+        "WHERE transaction_id = ANY($1::text[])",
+        [list(transaction_ids)],
+    )
+    return {row["transaction_id"]: row["id"] for row in rows}
+
+
+async def bulk_insert_transactions(
+    rows: Sequence[dict[str, Any]],
+    *,
+    connection: Any | None = None,
+) -> list[int]:
+    """
+    Insert new transactions with one statement and return their ids in input
+    order. Raises on ``transaction_id`` conflicts, see ``upsert_transactions``.
+    """
+    if not rows:
+        return []
+    _, inserted = await _client(connection).execute_query(
+        _unnest_transactions_sql() + " RETURNING id, transaction_id",
+        _transaction_columns(rows),
+    )
+    ids_by_external_id = {row["transaction_id"]: row["id"] for row in inserted}
+    return [ids_by_external_id[row["transaction_id"]] for row in rows]
+
+
+async def insert_missing_transactions(
+    rows: Sequence[dict[str, Any]],
+    *,
+    connection: Any | None = None,
+) -> dict[str, int]:
+    """
+    Insert the rows whose ``transaction_id`` is not stored yet, in one statement.
+
+    Returns external id -> pk for the rows actually inserted, so rows missing
+    from the result were duplicates. Ids must be unique within ``rows``.
+    """
+    if not rows:
+        return {}
+    _, inserted = await _client(connection).execute_query(
+        _unnest_transactions_sql()
+        + " ON CONFLICT (transaction_id) DO NOTHING RETURNING id, transaction_id",
+        _transaction_columns(rows),
+    )
+    return {row["transaction_id"]: row["id"] for row in inserted}
+
+
+async def upsert_transactions(
+    rows: Sequence[dict[str, Any]],
+    *,
+    update_existing: bool = False,
+    connection: Any | None = None,
+) -> list[UpsertedTransaction]:
+    """
+    Insert or look up transactions with one ``INSERT ... ON CONFLICT ... RETURNING``.
+
+    Existing rows are returned untouched unless ``update_existing`` is set, in
+    which case their feature columns are overwritten. Repeated ids in ``rows``
+    collapse onto their first occurrence, which also sets the result order.
+    """
+    first_occurrences: dict[str, dict[str, Any]] = {}
+    for row in rows:
+        first_occurrences.setdefault(row["transaction_id"], row)
+    unique_rows = list(first_occurrences.values())
+    if not unique_rows:
+        return []
+
+    if update_existing:
+        assignments = ", ".join(
+            [
+                f"{column} = EXCLUDED.{column}"
+                for column in _TRANSACTION_INSERT_TYPES
+                if column != "transaction_id"
+            ]
+            + ['version = "transaction".version + 1']
+        )
+    else:
+        # A no-op update so RETURNING also yields the rows that already existed.
+        assignments = "transaction_id = EXCLUDED.transaction_id"
+
+    _, upserted = await _client(connection).execute_query(
+        _unnest_transactions_sql()
+        + f" ON CONFLICT (transaction_id) DO UPDATE SET {assignments}"
+        + " RETURNING id, transaction_id, (xmax = 0) AS created",
+        _transaction_columns(unique_rows),
+    )
+    by_external_id = {
+        row["transaction_id"]: UpsertedTransaction(
+            id=row["id"],
+            transaction_id=row["transaction_id"],
+            created=row["created"],
+        )
+        for row in upserted
+    }
+    return [by_external_id[row["transaction_id"]] for row in unique_rows]
+
+
+async def bulk_insert_predictions(
+    *,
+    transaction_ids: Sequence[int],
+    fraud_probabilities: Sequence[float],
+    decisions: Sequence[int],
+    prescreened: Sequence[bool] | None = None,
+    scored_at: datetime | Sequence[datetime] | None = None,
+    connection: Any | None = None,
+) -> list[int]:
+    """
+    Insert one prediction per transaction pk in a single statement. Without
+    ``prescreened`` every prediction comes from the full model.
+    """
+    if not transaction_ids:
+        return []
+    if scored_at is None or isinstance(scored_at, datetime):
+        scored_at = [scored_at or datetime.now(UTC)] * len(transaction_ids)
+    if prescreened is None:
+        prescreened = [False] * len(transaction_ids)
+
+    _, inserted = await _client(connection).execute_query(
+        'INSERT INTO "prediction" '
+        "(transaction_id, fraud_probability, decision, prescreened, scored_at) "
+        "SELECT * FROM unnest($1::int4[], $2::float8[], $3::bool[], $4::bool[], "
+        "$5::timestamptz[]) "
+        "RETURNING id",
+        [
+            [int(transaction_id) for transaction_id in transaction_ids],
+            [float(probability) for probability in fraud_probabilities],
+            [bool(decision) for decision in decisions],
+            [bool(flag) for flag in prescreened],
+            list(scored_at),
+        ],
+    )
+    return [row["id"] for row in inserted]
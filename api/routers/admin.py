@@ -0,0 +1,222 @@
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import Field
+
+from api.core.exceptions import InvalidTimeRangeError
+from api.core.logfire import get_logger
+from api.schemas import (
+    AdmissionStats,
+    CascadeStats,
+    IdempotencyStats,
+    PartitionMaintenanceReport,
+    PartitionStatus,
+    RedecideRequest,
+    RedecideResponse,
+    RescoreRequest,
+    RescoreResponse,
+    RollupRefreshResponse,
+    ScoreFeedStats,
+    ShadowModelReport,
+    ShadowScoringStats,
+    ThresholdVersionCreate,
+    ThresholdVersionList,
+    ThresholdVersionRead,
+    ThresholdWhatIf,
+    WriteBehindStats,
+)
+from api.services.admission import Priority, admission, get_admission_controller
+from api.services.analytics import DEFAULT_SETTLE_SECONDS, refresh_rollups
+from api.services.cascade import cascade_stats
+from api.services.idempotency import get_idempotency_store
+from api.services.partitions import partition_status, run_partition_maintenance
+from api.services.prediction_writer import get_prediction_writer
+from api.services.rescoring import (
+    REQUEST_MAX_ROWS,
+    REQUEST_MAX_SECONDS,
+    rescore_transactions,
+)
+from api.services.score_feed import get_score_broadcaster
+from api.services.shadow_scoring import get_shadow_scorer, shadow_report
+from api.services.thresholds import (
+    create_threshold_version,
+    list_threshold_versions,
+    redecide_predictions,
+    threshold_what_if,
+)
+
+router = APIRouter()
+logger = get_logger(__name__)
+
+
+@router.post(
+    "/rescore",
+    response_model=RescoreResponse,
+    dependencies=[Depends(admission(Priority.BATCH))],
+)
+async def rescore(
+    payload: RescoreRequest,
+):
+    max_rows = min(payload.max_rows or REQUEST_MAX_ROWS, REQUEST_MAX_ROWS)
+    logger.info(
+        "Bulk rescore requested after_id=%s max_rows=%s",
+        payload.after_id,
+        max_rows,
+    )
+    return await rescore_transactions(
+        payload.model_copy(update={"max_rows": max_rows}),
+        max_seconds=REQUEST_MAX_SECONDS,
+    )
+
+
+@router.get("/admission", response_model=AdmissionStats)
+async def admission_stats():
+    controller = get_admission_controller()
+    if controller is None:
+        return AdmissionStats(
+            enabled=False,
+            limit=0,
+            in_flight=0,
+            batch_in_flight=0,
+            admitted=0,
+            rejected=0,
+            batch_admitted=0,
+            batch_rejected=0,
+            limit_decreases=0,
+            last_latency_ms=None,
+        )
+    return controller.stats()
+
+
+@router.get("/idempotency", response_model=IdempotencyStats)
+async def idempotency_stats():
+    store = get_idempotency_store()
+    if store is None:
+        return IdempotencyStats(
+            enabled=False,
+            cached=0,
+            in_flight=0,
+            scored=0,
+            replayed=0,
+            coalesced=0,
+            reused=0,
+            in_progress=0,
+        )
+    return store.stats()
+
+
+@router.get("/write-behind", response_model=WriteBehindStats)
+async def write_behind_stats():
+    writer = get_prediction_writer()
+    if writer is None:
+        return WriteBehindStats(
+            enabled=False,
+            queue_depth=0,
+            enqueued=0,
+            flushed=0,
+            failed=0,
+            batches=0,
+            backpressure_waits=0,
+            last_flush_ms=None,
+        )
+    return writer.stats()
+
+
+@router.get("/cascade", response_model=CascadeStats)
+async def cascade():
+    return cascade_stats()
+
+
+@router.get("/shadow", response_model=ShadowScoringStats)
+async def shadow_stats():
+    scorer = get_shadow_scorer()
+    if scorer is None:
+        return ShadowScoringStats(
+            enabled=False,
+            models=[],
+            queue_depth=0,
+            enqueued=0,
+            dropped=0,
+            scored=0,
+            failed=0,
+            batches=0,
+            last_batch_ms=None,
+        )
+    return scorer.stats()
+
+
+@router.get("/shadow/report", response_model=list[ShadowModelReport])
+async def shadow_comparison(
+    start: datetime | None = None,
+    end: datetime | None = None,
+):
+    if start is not None and end is not None and start >= end:
+        raise InvalidTimeRangeError
+    return await shadow_report(start=start, end=end)
+
+
+@router.get("/score-feed", response_model=ScoreFeedStats)
+async def score_feed_stats():
+    return get_score_broadcaster().stats()
+
+
+@router.post("/analytics/refresh", response_model=RollupRefreshResponse)
+async def refresh_analytics(
+    settle_seconds: float = Query(DEFAULT_SETTLE_SECONDS, ge=0),
+):
+    logger.info("Analytics rollup refresh requested settle_seconds=%s", settle_seconds)
+    return await refresh_rollups(settle_seconds=settle_seconds)
+
+
+@router.get("/partitions", response_model=PartitionStatus)
+async def partitions():
+    return await partition_status()
+
+
+@router.post("/partitions/maintain", response_model=PartitionMaintenanceReport)
+async def maintain_partitions():
+    logger.info("Partition maintenance requested")
+    return await run_partition_maintenance()
+
+
+@router.get("/thresholds", response_model=ThresholdVersionList)
+async def thresholds(
+    limit: int = Query(20, ge=1, le=200),
+):
+    return await list_threshold_versions(limit=limit)
+
+
+@router.post("/thresholds", response_model=ThresholdVersionRead, status_code=201)
+async def add_threshold(
+    payload: ThresholdVersionCreate,
+):
+    logger.info("New threshold version requested threshold=%s", payload.threshold)
+    return await create_threshold_version(payload)
+
+
+@router.post("/thresholds/redecide", response_model=RedecideResponse)
+async def redecide(
+    payload: RedecideRequest,
+):
+    logger.info(
+        "Re-decide requested threshold_version=%s after_id=%s max_rows=%s",
+        payload.threshold_version,
+        payload.after_id,
+        payload.max_rows,
+    )
+    return await redecide_predictions(payload)
+
+
+@router.get("/thresholds/what-if", response_model=ThresholdWhatIf)
+async def what_if(
+    threshold: Annotated[
+        list[Annotated[float, Field(ge=0, le=1)]],
+        Query(min_length=1, max_length=100),
+    ],
+    start: datetime | None = None,
+    end: datetime | None = None,
+):
+    if start is not None and end is not None and start >= end:
+        raise InvalidTimeRangeError
+    return await threshold_what_if(threshold, start=start, end=end)
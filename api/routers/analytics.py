@@ -0,0 +1,52 @@
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, Query
+
+from api.core.exceptions import InvalidTimeRangeError
+from api.core.logfire import get_logger
+from api.enums import MerchantCategory
+from api.repositories.analytics import Granularity
+from api.schemas import AnalyticsBucket, AnalyticsCategory
+from api.services.analytics import fraud_by_category, fraud_timeseries
+
+router = APIRouter()
+logger = get_logger(__name__)
+
+
+def _check_time_range(start: datetime | None, end: datetime | None) -> None:
+    if start is not None and end is not None and start >= end:
+        raise InvalidTimeRangeError
+
+
+@router.get("/timeseries", response_model=list[AnalyticsBucket])
+async def timeseries(
+    granularity: Annotated[Granularity, Query()] = "hour",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    merchant_category: MerchantCategory | None = None,
+):
+    _check_time_range(start, end)
+    logger.debug(
+        "Analytics timeseries granularity=%s start=%s end=%s category=%s",
+        granularity,
+        start,
+        end,
+        merchant_category,
+    )
+    return await fraud_timeseries(
+        granularity=granularity,
+        start=start,
+        end=end,
+        merchant_category=merchant_category,
+    )
+
+
+@router.get("/categories", response_model=list[AnalyticsCategory])
+async def categories(
+    start: datetime | None = None,
+    end: datetime | None = None,
+):
+    _check_time_range(start, end)
+    logger.debug("Analytics categories start=%s end=%s", start, end)
+    return await fraud_by_category(start=start, end=end)
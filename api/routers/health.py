@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, Response
+
+from api.schemas import ReadinessReport
+from api.services.health import get_readiness_probe
+
+router = APIRouter()
+
+_ALIVE = b'{"status":"ok"}'
+
+
+@router.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the worker answers. Checks nothing else, so it never flaps."""
+    return Response(_ALIVE, media_type="application/json")
+
+
+@router.get("/readyz", include_in_schema=False, response_model=ReadinessReport)
+async def readyz():
+    probe = get_readiness_probe()
+    if probe is None:
+        report = ReadinessReport(
+            ready=False,
+            model_loaded=False,
+            database=False,
+            draining=False,
+            checked_at=None,
+        )
+    else:
+        report = await probe.check()
+    return JSONResponse(
+        report.model_dump(mode="json"), status_code=200 if report.ready else 503
+    )
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from api.core.logfire import get_logger
+from api.schemas import DriftReport
+from api.services.drift import current_drift_report
+
+router = APIRouter()
+logger = get_logger(__name__)
+
+
+@router.get("/drift", response_model=DriftReport)
+async def drift():
+    logger.debug("Computing drift report")
+    return await current_drift_report()
@@ -1,19 +1,40 @@
-import io
-from typing import Annotated
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Annotated, Any
 
-from fastapi import APIRouter, File, Query, UploadFile
+import pyarrow as pa
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Header,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 
 from api.core.exceptions import (
     AppError,
     CreateOrScoreFailedError,
     CSVImportFailedError,
+    IdempotencyKeyInProgressError,
+    IdempotencyKeyReusedError,
+    InvalidTimeRangeError,
     InvalidUploadError,
     TransactionNotFoundError,
+    TransactionUpdateConflictError,
     UpdateOrRescoreFailedError,
 )
 from api.core.logfire import get_logger
+from api.core.responses import encode_response
+from api.enums import MerchantCategory
 from api.repositories import transactions as transaction_repo
+from api.repositories.transactions import TransactionFilters
 from api.schemas import (
+    ExplanationRead,
     PredictionRead,
     ScoreRequest,
     ScoreResponse,
@@ -23,7 +44,26 @@ from api.schemas import (
     TransactionsCountResponse,
     TransactionUpdate,
 )
-from api.services.csv_import import import_transactions_from_csv
+from api.services.admission import Priority, admission
+from api.services.explanations import explain_transaction
+from api.services.export import (
+    EXPORT_MEDIA_TYPES,
+    PREDICTION_EXPORT_SCHEMA,
+    TRANSACTION_EXPORT_SCHEMA,
+    ExportFormat,
+    encode_export,
+)
+from api.services.file_import import (
+    detect_import_format,
+    import_transactions_from_file,
+)
+from api.services.idempotency import score_idempotently
+from api.services.partitions import with_archived_predictions
+from api.services.score_feed import (
+    ScoreEventFilter,
+    get_score_broadcaster,
+    stream_score_events,
+)
 from api.services.scoring import (
     create_or_score_transaction,
     update_and_rescore_transaction,
@@ -32,38 +72,158 @@ from api.services.scoring import (
 router = APIRouter()
 logger = get_logger(__name__)
 
+TRANSACTION_LIST_ADAPTER = TypeAdapter(list[TransactionRead])
+PREDICTION_LIST_ADAPTER = TypeAdapter(list[PredictionRead])
+
+
+def transaction_filters(
+    merchant_category: MerchantCategory | None = None,
+    min_amount: Annotated[float | None, Query(ge=0)] = None,
+    max_amount: Annotated[float | None, Query(ge=0)] = None,
+    foreign_transaction: bool | None = None,
+    decision: Annotated[int | None, Query(ge=0, le=1)] = None,
+    min_probability: Annotated[float | None, Query(ge=0, le=1)] = None,
+    max_probability: Annotated[float | None, Query(ge=0, le=1)] = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> TransactionFilters:
+    if start is not None and end is not None and start >= end:
+        raise InvalidTimeRangeError
+    return TransactionFilters(
+        merchant_category=merchant_category,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        foreign_transaction=foreign_transaction,
+        decision=decision,
+        min_probability=min_probability,
+        max_probability=max_probability,
+        start=start,
+        end=end,
+    )
+
+
+Filters = Annotated[TransactionFilters, Depends(transaction_filters)]
+
 
 @router.get("", response_model=list[TransactionRead])
 async def list_transactions(
+    request: Request,
+    filters: Filters,
     limit: int = Query(50, le=100),
     offset: int = 0,
 ):
-    logger.debug("Listing transactions with limit=%s offset=%s", limit, offset)
-    return await transaction_repo.list_transactions(limit=limit, offset=offset)
+    logger.debug(
+        "Listing transactions with limit=%s offset=%s filters=%s",
+        limit,
+        offset,
+        filters,
+    )
+    transactions = await transaction_repo.list_transactions(
+        limit=limit, offset=offset, filters=filters
+    )
+    return encode_response(request, TRANSACTION_LIST_ADAPTER, transactions)
 
 
 @router.get("/count", response_model=TransactionsCountResponse)
-async def count_transactions():
-    total = await transaction_repo.count_transactions()
+async def count_transactions(filters: Filters):
+    total = await transaction_repo.count_transactions(filters)
     return TransactionsCountResponse(total=total)
 
 
 @router.get("/scores", response_model=list[PredictionRead])
 async def list_scores(
+    request: Request,
+    filters: Filters,
     limit: int = Query(50, le=100),
     offset: int = 0,
 ):
-    logger.debug("Listing scores with limit=%s offset=%s", limit, offset)
-    predictions = await transaction_repo.list_scores(limit=limit, offset=offset)
-    return [PredictionRead(**prediction) for prediction in predictions]
+    logger.debug(
+        "Listing scores with limit=%s offset=%s filters=%s", limit, offset, filters
+    )
+    predictions = await transaction_repo.list_scores(
+        limit=limit, offset=offset, filters=filters
+    )
+    return encode_response(request, PREDICTION_LIST_ADAPTER, predictions)
 
 
 @router.get("/scores/count", response_model=TransactionsCountResponse)
-async def count_scores():
-    total = await transaction_repo.count_scores()
+async def count_scores(filters: Filters):
+    total = await transaction_repo.count_scores(filters)
     return TransactionsCountResponse(total=total)
 
 
+def _export_response(
+    batches: AsyncIterator[list[tuple[Any, ...]]],
+    *,
+    schema: pa.Schema,
+    export_format: ExportFormat,
+    name: str,
+) -> StreamingResponse:
+    return StreamingResponse(
+        encode_export(batches, schema=schema, export_format=export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.{export_format}"'
+        },
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_transactions(
+    filters: Filters,
+    export_format: Annotated[ExportFormat, Query(alias="format")] = "csv",
+):
+    logger.info("Exporting transactions as %s filters=%s", export_format, filters)
+    return _export_response(
+        transaction_repo.stream_transactions_for_export(filters),
+        schema=TRANSACTION_EXPORT_SCHEMA,
+        export_format=export_format,
+        name="transactions",
+    )
+
+
+@router.get("/scores/export", response_class=StreamingResponse)
+async def export_scores(
+    filters: Filters,
+    export_format: Annotated[ExportFormat, Query(alias="format")] = "csv",
+    include_archived: bool = False,
+):
+    logger.info(
+        "Exporting scores as %s filters=%s include_archived=%s",
+        export_format,
+        filters,
+        include_archived,
+    )
+    batches = transaction_repo.stream_predictions_for_export(filters)
+    if include_archived:
+        batches = with_archived_predictions(filters, batches)
+    return _export_response(
+        batches,
+        schema=PREDICTION_EXPORT_SCHEMA,
+        export_format=export_format,
+        name="scores",
+    )
+
+
+@router.get("/scores/stream", response_class=StreamingResponse)
+async def stream_scores(
+    decision: Annotated[int | None, Query(ge=0, le=1)] = None,
+    min_probability: Annotated[float | None, Query(ge=0, le=1)] = None,
+    merchant_category: MerchantCategory | None = None,
+):
+    filters = ScoreEventFilter(
+        decision=decision,
+        min_probability=min_probability,
+        merchant_category=merchant_category,
+    )
+    logger.debug("Opening score stream filters=%s", filters)
+    return StreamingResponse(
+        stream_score_events(get_score_broadcaster(), filters),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{transaction_id}", response_model=TransactionDetailResponse)
 async def get_transaction(
     transaction_id: str,
@@ -83,6 +243,7 @@ async def get_transaction(
             transaction_id=tx.transaction_id,
             fraud_probability=prediction["fraud_probability"],
             decision=prediction["decision"],
+            prescreened=prediction["prescreened"],
             scored_at=prediction["scored_at"],
         )
         for prediction in predictions
@@ -94,23 +255,47 @@ async def get_transaction(
     )
 
 
-@router.post("", response_model=ScoreResponse)
+@router.get("/{transaction_id}/explanation", response_model=ExplanationRead)
+async def get_transaction_explanation(
+    transaction_id: str,
+):
+    logger.debug("Explaining latest prediction of transaction %s", transaction_id)
+    return await explain_transaction(transaction_id)
+
+
+@router.post(
+    "",
+    response_model=ScoreResponse,
+    dependencies=[Depends(admission(Priority.SCORING))],
+)
 async def create_transaction(
     payload: ScoreRequest,
+    response: Response,
+    idempotency_key: Annotated[str | None, Header(min_length=1, max_length=255)] = None,
 ):
     logger.debug("Creating and scoring transaction %s", payload.transaction_id)
     try:
-        response = await create_or_score_transaction(payload)
+        if idempotency_key is None:
+            return await create_or_score_transaction(payload)
+        scored, replayed = await score_idempotently(idempotency_key, payload)
+    except (IdempotencyKeyReusedError, IdempotencyKeyInProgressError):
+        raise
     except Exception as exc:
         logger.exception(
             "Create-and-score failed for transaction %s", payload.transaction_id
         )
         raise CreateOrScoreFailedError(payload.transaction_id) from exc
 
-    return response
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return scored
 
 
-@router.put("/{transaction_id}", response_model=ScoreResponse)
+@router.put(
+    "/{transaction_id}",
+    response_model=ScoreResponse,
+    dependencies=[Depends(admission(Priority.SCORING))],
+)
 async def update_transaction(
     transaction_id: str,
     payload: TransactionUpdate,
@@ -118,7 +303,7 @@ async def update_transaction(
     logger.debug("Updating and rescoring transaction %s", transaction_id)
     try:
         response = await update_and_rescore_transaction(transaction_id, payload)
-    except TransactionNotFoundError:
+    except (TransactionNotFoundError, TransactionUpdateConflictError):
         raise
     except Exception as exc:
         logger.exception("Update-and-rescore failed for transaction %s", transaction_id)
@@ -127,24 +312,28 @@ async def update_transaction(
     return response
 
 
-@router.post("/import", response_model=TransactionImportResponse)
+@router.post(
+    "/import",
+    response_model=TransactionImportResponse,
+    dependencies=[Depends(admission(Priority.BATCH))],
+)
 async def import_transactions(
     file: Annotated[UploadFile, File(...)],
 ):
     if not file.filename:
         msg = "Filename is required"
         raise InvalidUploadError(msg)
-    if not file.filename.lower().endswith(".csv"):
-        msg = "Only .csv files are supported"
+    import_format = detect_import_format(file.filename)
+    if import_format is None:
+        msg = "Only .csv, .csv.gz, .csv.zst and .parquet files are supported"
         raise InvalidUploadError(msg)
 
-    text_stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
     try:
-        return await import_transactions_from_csv(csv_stream=text_stream)
+        return await import_transactions_from_file(
+            file.file, import_format=import_format
+        )
     except AppError:
         raise
     except Exception as exc:
-        logger.exception("CSV import failed for file %s", file.filename)
+        logger.exception("Import failed for file %s", file.filename)
         raise CSVImportFailedError(file.filename) from exc
-    finally:
-        text_stream.detach()
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -69,6 +70,8 @@ class PredictionRead(BaseModel):
     transaction_id: str
     fraud_probability: float = Field(ge=0, le=1)
     decision: int
+    # True when the cascade pre-screen decided, without running the full model.
+    prescreened: bool = False
     scored_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -105,3 +108,377 @@ class TransactionImportResponse(BaseModel):
     skipped_invalid: int
     skipped_scoring_errors: int
     errors: list[TransactionImportError]
+
+
+class ThresholdMetrics(BaseModel):
+    """Confusion matrix and derived rates at a single decision threshold"""
+
+    threshold: float
+    true_positives: int
+    false_positives: int
+    true_negatives: int
+    false_negatives: int
+    precision: float
+    recall: float
+    false_positive_rate: float
+    cost: float
+
+
+class ModelEvaluationReport(BaseModel):
+    """Offline evaluation of the loaded model against a labeled CSV"""
+
+    total_rows: int
+    evaluated_rows: int
+    skipped_invalid: int
+    positives: int
+    negatives: int
+    roc_auc: float | None
+    average_precision: float | None
+    fp_cost: float
+    fn_cost: float
+    current_threshold: ThresholdMetrics
+    cost_optimal_threshold: ThresholdMetrics
+    sweep: list[ThresholdMetrics]
+
+
+class RescoreRequest(BaseModel):
+    """Parameters for one resumable bulk rescoring run"""
+
+    after_id: int = Field(default=0, ge=0)
+    max_rows: int | None = Field(default=100_000, gt=0)
+    batch_size: int = Field(default=5_000, gt=0, le=50_000)
+    rows_per_second: float | None = Field(default=None, gt=0)
+
+
+class RescoreResponse(BaseModel):
+    """Result of a bulk rescoring run, last_id is the checkpoint to resume from"""
+
+    processed: int
+    batches: int
+    last_id: int
+    done: bool
+
+
+class AdmissionStats(BaseModel):
+    """State of the scoring endpoints' admission limit in this worker"""
+
+    enabled: bool
+    limit: int
+    in_flight: int
+    batch_in_flight: int
+    admitted: int
+    rejected: int
+    batch_admitted: int
+    batch_rejected: int
+    limit_decreases: int
+    last_latency_ms: float | None
+
+
+class IdempotencyStats(BaseModel):
+    """Counters for Idempotency-Key handling of POST /transactions in this worker"""
+
+    enabled: bool
+    cached: int
+    in_flight: int
+    scored: int
+    replayed: int
+    coalesced: int
+    reused: int
+    in_progress: int
+
+
+class ReadinessReport(BaseModel):
+    """Whether this worker is ready for traffic, and why not"""
+
+    ready: bool
+    model_loaded: bool
+    database: bool
+    draining: bool
+    checked_at: datetime | None
+
+
+class WriteBehindStats(BaseModel):
+    """Counters for the write-behind prediction queue"""
+
+    enabled: bool
+    queue_depth: int
+    enqueued: int
+    flushed: int
+    failed: int
+    batches: int
+    backpressure_waits: int
+    last_flush_ms: float | None
+
+
+class AnalyticsMetrics(BaseModel):
+    """Prediction aggregates shared by the analytics chart endpoints"""
+
+    prediction_count: int
+    flagged_count: int
+    flag_rate: float
+    mean_probability: float
+    amount_sum: float
+    flagged_amount_sum: float
+
+
+class AnalyticsBucket(AnalyticsMetrics):
+    """Aggregates for one hour or day, bucket_start is UTC"""
+
+    bucket_start: datetime
+
+
+class AnalyticsCategory(AnalyticsMetrics):
+    """Aggregates for one merchant category"""
+
+    merchant_category: MerchantCategory
+
+
+class RollupRefreshResponse(BaseModel):
+    """Result of one incremental rollup run, watermark is the new high mark"""
+
+    predictions: int
+    buckets: int
+    watermark: datetime | None
+
+
+class ScoreEvent(BaseModel):
+    """A new score pushed to /transactions/scores/stream subscribers"""
+
+    transaction_id: str
+    fraud_probability: float
+    decision: int
+    merchant_category: MerchantCategory
+    amount: float
+    scored_at: datetime
+    source: Literal["create", "update", "import"]
+
+
+class ScoreFeedStats(BaseModel):
+    """Counters for the live score feed of this worker"""
+
+    subscribers: int
+    published: int
+    delivered: int
+    dropped_subscribers: int
+    notify_channel: str | None
+    notify_queue_depth: int
+    notify_overflows: int
+
+
+class ThresholdVersionCreate(BaseModel):
+    """A new decision threshold, applied to scores from now on"""
+
+    threshold: float = Field(ge=0, le=1)
+    note: str | None = Field(default=None, max_length=255)
+
+
+class ThresholdVersionRead(BaseModel):
+    """One stored threshold version"""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    threshold: float
+    note: str | None
+    created_at: datetime
+
+
+class ThresholdVersionList(BaseModel):
+    """Threshold in force and the most recent versions, newest first"""
+
+    active_threshold: float
+    active_version: int | None
+    versions: list[ThresholdVersionRead]
+
+
+class RedecideRequest(BaseModel):
+    """Parameters for one resumable run re-deciding stored predictions"""
+
+    threshold_version: int | None = Field(default=None, gt=0)
+    after_id: int = Field(default=0, ge=0)
+    max_rows: int | None = Field(default=1_000_000, gt=0)
+    batch_size: int = Field(default=20_000, gt=0, le=200_000)
+
+
+class RedecideResponse(BaseModel):
+    """Result of a re-decide run, last_id is the checkpoint to resume from"""
+
+    threshold: float
+    threshold_version: int | None
+    scanned: int
+    # Left as they were; run a bulk rescore to decide them with the model.
+    prescreened: int
+    changed: int
+    batches: int
+    last_id: int
+    done: bool
+
+
+class ThresholdCandidate(BaseModel):
+    """Flagged predictions if a candidate threshold had been used"""
+
+    threshold: float
+    flagged_count: int
+    flag_rate: float
+    change: int
+
+
+class ThresholdWhatIf(BaseModel):
+    """Stored predictions re-decided at candidate thresholds"""
+
+    prediction_count: int
+    flagged_count: int
+    # Left out of the counts above, their probability is not the model's.
+    prescreened_count: int
+    active_threshold: float
+    resolution: float
+    candidates: list[ThresholdCandidate]
+
+
+class ShadowScoringStats(BaseModel):
+    """Counters for shadow scoring of challenger models in this worker"""
+
+    enabled: bool
+    models: list[str]
+    queue_depth: int
+    enqueued: int
+    dropped: int
+    scored: int
+    failed: int
+    batches: int
+    last_batch_ms: float | None
+
+
+class ShadowModelReport(BaseModel):
+    """Agreement and score deltas of one challenger against the champion"""
+
+    model_name: str
+    prediction_count: int
+    agreement_rate: float
+    both_flagged: int
+    shadow_only_flagged: int
+    champion_only_flagged: int
+    mean_delta: float
+    mean_abs_delta: float
+    p95_abs_delta: float
+    max_abs_delta: float
+    correlation: float | None
+
+
+class CascadeStats(BaseModel):
+    """Per-stage counters of cascaded scoring in this worker"""
+
+    enabled: bool
+    low: float | None
+    high: float | None
+    threshold: float | None
+    prescreened: int
+    cleared: int
+    flagged: int
+    escalated: int
+    bypassed: int
+    hit_rate: float
+
+
+class CascadeBuildReport(BaseModel):
+    """Band edges picked for a cascade and how they do on held-out rows"""
+
+    threshold: float
+    low: float
+    high: float
+    training_rows: int
+    validation_rows: int
+    validation_escalation_rate: float
+    validation_decision_changes: int
+    training_escalation_rate: float
+    training_decision_changes: int
+
+
+class FeatureContribution(BaseModel):
+    """One feature's share of a prediction's log-odds"""
+
+    feature: str
+    value: bool | int | float | str
+    contribution: float
+
+
+class ExplanationRead(BaseModel):
+    """Why a prediction scored as it did: base value plus per-feature log-odds"""
+
+    transaction_id: str
+    prediction_id: int
+    model_version: str
+    method: str
+    base_value: float
+    log_odds: float
+    model_probability: float = Field(ge=0, le=1)
+    # The stored score came from the cascade pre-screen; model_probability is
+    # what the full model gives the same features.
+    prescreened: bool
+    contributions: list[FeatureContribution]
+    created_at: datetime
+
+
+class FeatureDrift(BaseModel):
+    """Population stability index of one feature against the baseline"""
+
+    feature: str
+    psi: float | None
+    status: Literal["stable", "moderate", "significant", "no_data"]
+
+
+class ProbabilityQuantiles(BaseModel):
+    """Approximate fraud probability quantiles from a sketch"""
+
+    p50: float | None
+    p90: float | None
+    p99: float | None
+
+
+class DriftReport(BaseModel):
+    """Live traffic of all workers compared with the training baseline"""
+
+    enabled: bool
+    live_rows: int
+    baseline_rows: int
+    workers: int
+    features: list[FeatureDrift]
+    baseline_probability: ProbabilityQuantiles
+    live_probability: ProbabilityQuantiles
+
+
+class PredictionPartition(BaseModel):
+    """A monthly partition of predictions, or the default partition"""
+
+    name: str
+    month: datetime | None
+    attached: bool
+    rows_estimate: int
+    total_bytes: int
+
+
+class PredictionArchiveFile(BaseModel):
+    """A partition past retention, archived to a Parquet file"""
+
+    name: str
+    month: datetime
+    rows: int
+    bytes: int
+
+
+class PartitionStatus(BaseModel):
+    """Live prediction partitions and archived months"""
+
+    retention_months: int
+    archive_dir: str | None
+    partitions: list[PredictionPartition]
+    archives: list[PredictionArchiveFile]
+
+
+class PartitionMaintenanceReport(BaseModel):
+    """One maintenance run; locked is false when another worker ran it"""
+
+    locked: bool
+    created: list[str]
+    archived: list[PredictionArchiveFile]
+    waiting_for_rollup: list[str]
@@ -0,0 +1,217 @@
+import math
+import time
+from collections.abc import AsyncIterator, Callable, Iterable
+from enum import StrEnum
+
+import logfire
+from opentelemetry.metrics import CallbackOptions, Observation
+
+from api.core.exceptions import AppError, ServiceOverloadedError
+from api.core.logfire import get_logger
+from api.schemas import AdmissionStats
+
+logger = get_logger(__name__)
+
+_controller: "AdmissionController | None" = None
+_metrics_registered = False
+
+
+class Priority(StrEnum):
+    SCORING = "scoring"
+    BATCH = "batch"
+
+
+class AdmissionController:
+    """
+    AIMD concurrency limit for the scoring endpoints, per worker process.
+
+    A request is admitted while fewer than ``limit`` requests are in flight,
+    and rejected at once otherwise; nothing queues. Batch work may only fill
+    ``batch_share`` of the limit, so it is shed before single scoring.
+
+    Single scoring requests drive the limit: one slower than
+    ``latency_target_ms`` or failing with a server error cuts it by
+    ``backoff``, and one finishing while at least half the limit is in use
+    raises it by ``1 / limit``, about one more slot per full window.
+
+    The limit is cut at most once per window: requests already in flight
+    when it was cut were admitted under the old limit, so their completions
+    do not cut it again.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target_ms: float,
+        batch_share: float,
+        retry_after_seconds: int,
+        backoff: float = 0.9,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target_ms / 1000
+        self.batch_share = batch_share
+        self.retry_after_seconds = retry_after_seconds
+        self.backoff = backoff
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = {priority: 0 for priority in Priority}
+        self._admitted = {priority: 0 for priority in Priority}
+        self._rejected = {priority: 0 for priority in Priority}
+        self._decreases = 0
+        self._window_left = 0
+        self._last_latency_ms: float | None = None
+
+    @property
+    def limit(self) -> int:
+        return math.floor(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._in_flight.values())
+
+    def try_acquire(self, priority: Priority) -> bool:
+        if priority is Priority.BATCH:
+            capacity = max(1, math.floor(self.limit * self.batch_share))
+            if self._in_flight[Priority.BATCH] >= capacity:
+                self._rejected[priority] += 1
+                return False
+        if self.in_flight >= self.limit:
+            self._rejected[priority] += 1
+            return False
+        self._in_flight[priority] += 1
+        self._admitted[priority] += 1
+        return True
+
+    def release(self, priority: Priority, *, latency: float, failed: bool) -> None:
+        in_flight = self.in_flight
+        self._in_flight[priority] -= 1
+        if priority is not Priority.SCORING:
+            return
+        self._last_latency_ms = latency * 1000
+        in_window = self._window_left > 0
+        if in_window:
+            self._window_left -= 1
+        if failed or latency > self.latency_target:
+            if not in_window:
+                self._limit = max(self.min_limit, self._limit * self.backoff)
+                self._decreases += 1
+                self._window_left = in_flight - 1
+        elif in_flight * 2 >= self._limit:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+    def stats(self) -> AdmissionStats:
+        return AdmissionStats(
+            enabled=True,
+            limit=self.limit,
+            in_flight=self.in_flight,
+            batch_in_flight=self._in_flight[Priority.BATCH],
+            admitted=self._admitted[Priority.SCORING],
+            rejected=self._rejected[Priority.SCORING],
+            batch_admitted=self._admitted[Priority.BATCH],
+            batch_rejected=self._rejected[Priority.BATCH],
+            limit_decreases=self._decreases,
+            last_latency_ms=self._last_latency_ms,
+        )
+
+
+def _is_server_error(exc: BaseException) -> bool:
+    return not isinstance(exc, AppError) or exc.status_code >= 500
+
+
+def admission(priority: Priority) -> Callable[[], AsyncIterator[None]]:
+    """
+    Route dependency holding an admission slot for the whole request. Without
+    a controller every request is admitted.
+    """
+
+    async def dependency() -> AsyncIterator[None]:
+        controller = _controller
+        if controller is None:
+            yield
+            return
+        if not controller.try_acquire(priority):
+            raise ServiceOverloadedError(controller.retry_after_seconds)
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception as exc:
+            failed = _is_server_error(exc)
+            raise
+        finally:
+            controller.release(
+                priority, latency=time.perf_counter() - started, failed=failed
+            )
+
+    return dependency
+
+
+def _observe(read: Callable[["AdmissionController"], int]) -> Callable:
+    def callback(_options: CallbackOptions) -> Iterable[Observation]:
+        controller = _controller
+        return [] if controller is None else [Observation(read(controller))]
+
+    return callback
+
+
+def _register_metrics() -> None:
+    global _metrics_registered
+    if _metrics_registered:
+        return
+    logfire.metric_gauge_callback(
+        "admission.limit",
+        callbacks=[_observe(lambda controller: controller.limit)],
+        description="Concurrency limit of the scoring endpoints",
+    )
+    logfire.metric_gauge_callback(
+        "admission.in_flight",
+        callbacks=[_observe(lambda controller: controller.in_flight)],
+        description="Scoring requests holding an admission slot",
+    )
+    logfire.metric_counter_callback(
+        "admission.rejected",
+        callbacks=[_observe(lambda controller: controller.stats().rejected)],
+        description="Single scoring requests rejected with 503",
+    )
+    logfire.metric_counter_callback(
+        "admission.batch_rejected",
+        callbacks=[_observe(lambda controller: controller.stats().batch_rejected)],
+        description="Batch and import requests rejected with 503",
+    )
+    _metrics_registered = True
+
+
+def get_admission_controller() -> AdmissionController | None:
+    return _controller
+
+
+def start_admission_control(
+    *,
+    initial_limit: int,
+    min_limit: int,
+    max_limit: int,
+    latency_target_ms: float,
+    batch_share: float,
+    retry_after_seconds: int,
+) -> AdmissionController:
+    global _controller
+    _controller = AdmissionController(
+        initial_limit=initial_limit,
+        min_limit=min_limit,
+        max_limit=max_limit,
+        latency_target_ms=latency_target_ms,
+        batch_share=batch_share,
+        retry_after_seconds=retry_after_seconds,
+    )
+    _register_metrics()
+    return _controller
+
+
+def stop_admission_control() -> None:
+    global _controller
+    if _controller is not None:
+        logger.info("Admission control stopped: %s", _controller.stats().model_dump())
+    _controller = None
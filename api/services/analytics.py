@@ -0,0 +1,154 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from api.core.logfire import get_logger
+from api.enums import MerchantCategory
+from api.repositories import analytics as analytics_repo
+from api.repositories.analytics import Granularity, RollupMetricsRow
+from api.schemas import (
+    AnalyticsBucket,
+    AnalyticsCategory,
+    RollupRefreshResponse,
+)
+
+logger = get_logger(__name__)
+
+_job: "RollupJob | None" = None
+
+# Must exceed the longest gap between a prediction's scored_at and its commit.
+DEFAULT_SETTLE_SECONDS = 60.0
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_GRANULARITY_STEPS: dict[str, timedelta] = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+
+def _as_utc(moment: datetime) -> datetime:
+    """Naive datetimes are taken as UTC."""
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=UTC)
+    return moment.astimezone(UTC)
+
+
+def align_range(
+    start: datetime | None,
+    end: datetime | None,
+    granularity: Granularity,
+) -> tuple[datetime | None, datetime | None]:
+    """
+    Widen ``[start, end)`` to whole UTC buckets of ``granularity``, so every
+    returned bucket is complete.
+    """
+    step = _GRANULARITY_STEPS[granularity]
+
+    def floor(moment: datetime) -> datetime:
+        return _EPOCH + (moment - _EPOCH) // step * step
+
+    aligned_start = None if start is None else floor(_as_utc(start))
+    aligned_end = None
+    if end is not None:
+        end = _as_utc(end)
+        aligned_end = floor(end)
+        if aligned_end < end:
+            aligned_end += step
+    return aligned_start, aligned_end
+
+
+def _with_flag_rate(row: RollupMetricsRow) -> dict[str, Any]:
+    count = row["prediction_count"]
+    return {**row, "flag_rate": row["flagged_count"] / count if count else 0.0}
+
+
+async def fraud_timeseries(
+    *,
+    granularity: Granularity,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    merchant_category: MerchantCategory | None = None,
+) -> list[AnalyticsBucket]:
+    start, end = align_range(start, end, granularity)
+    rows = await analytics_repo.rollup_timeseries(
+        granularity=granularity,
+        start=start,
+        end=end,
+        merchant_category=merchant_category,
+    )
+    return [AnalyticsBucket.model_validate(_with_flag_rate(row)) for row in rows]
+
+
+async def fraud_by_category(
+    *,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[AnalyticsCategory]:
+    start, end = align_range(start, end, "hour")
+    rows = await analytics_repo.rollup_by_category(start=start, end=end)
+    return [AnalyticsCategory.model_validate(_with_flag_rate(row)) for row in rows]
+
+
+async def refresh_rollups(
+    *, settle_seconds: float = DEFAULT_SETTLE_SECONDS
+) -> RollupRefreshResponse:
+    refresh = await analytics_repo.refresh_prediction_rollup(
+        settle_seconds=settle_seconds
+    )
+    if refresh["predictions"]:
+        logger.info(
+            "Rolled up %s predictions into %s buckets, watermark=%s",
+            refresh["predictions"],
+            refresh["buckets"],
+            refresh["watermark"],
+        )
+    return RollupRefreshResponse(**refresh)
+
+
+class RollupJob:
+    """
+    Background task that refreshes the analytics rollups every
+    ``interval_seconds``. A failed run is logged and retried on the next tick.
+    """
+
+    def __init__(self, *, interval_seconds: float, settle_seconds: float) -> None:
+        self.interval = interval_seconds
+        self.settle_seconds = settle_seconds
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await refresh_rollups(settle_seconds=self.settle_seconds)
+            except Exception:
+                logger.exception("Analytics rollup refresh failed")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except TimeoutError:
+                continue
+
+
+def start_rollup_job(*, interval_seconds: float, settle_seconds: float) -> RollupJob:
+    global _job
+    _job = RollupJob(interval_seconds=interval_seconds, settle_seconds=settle_seconds)
+    _job.start()
+    return _job
+
+
+async def stop_rollup_job() -> None:
+    global _job
+    if _job is None:
+        return
+    job, _job = _job, None
+    await job.stop()
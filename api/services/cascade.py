@@ -0,0 +1,164 @@
+from pathlib import Path
+from typing import Any, TextIO
+
+import numpy as np
+
+from api.core.logfire import get_logger
+from api.core.model_loader import get_model_bundle
+from api.domain.cascade import Cascade, CascadeBand, fit_prescreen, pick_band
+from api.domain.fraud_scoring import predict_probabilities
+from api.schemas import CascadeBuildReport, CascadeStats, ScoreRequest
+from api.services.csv_import import read_feature_frame
+
+logger = get_logger(__name__)
+
+DEFAULT_CHUNK_SIZE = 250_000
+
+_cascade: Cascade | None = None
+_cascade_loaded = False
+
+
+class CascadeMetrics:
+    """How many requests each cascade stage decided."""
+
+    def __init__(self) -> None:
+        self.prescreened = 0
+        self.cleared = 0
+        self.flagged = 0
+        self.escalated = 0
+        self.bypassed = 0
+
+    def stats(self, cascade: Cascade | None) -> CascadeStats:
+        decided = self.cleared + self.flagged
+        return CascadeStats(
+            enabled=cascade is not None,
+            low=None if cascade is None else cascade.band.low,
+            high=None if cascade is None else cascade.band.high,
+            threshold=None if cascade is None else cascade.threshold,
+            prescreened=self.prescreened,
+            cleared=self.cleared,
+            flagged=self.flagged,
+            escalated=self.escalated,
+            bypassed=self.bypassed,
+            hit_rate=decided / self.prescreened if self.prescreened else 0.0,
+        )
+
+
+_metrics = CascadeMetrics()
+
+
+def get_cascade() -> Cascade | None:
+    """The bundle's optional ``cascade`` entry, parsed once per process."""
+    global _cascade, _cascade_loaded
+    if not _cascade_loaded:
+        data = get_model_bundle().get("cascade")
+        _cascade = None if data is None else Cascade.from_dict(data)
+        _cascade_loaded = True
+    return _cascade
+
+
+def cascade_stats() -> CascadeStats:
+    return _metrics.stats(get_cascade())
+
+
+def prescreen_payload(
+    payload: ScoreRequest, *, threshold: float
+) -> tuple[float, int] | None:
+    """
+    Decide ``payload`` with the pre-screen stage when it is confident, or
+    return None to escalate to the full model. The band only holds for the
+    threshold the cascade was built at, so any other threshold bypasses it.
+    """
+    cascade = get_cascade()
+    if cascade is None:
+        return None
+    if threshold != cascade.threshold:
+        _metrics.bypassed += 1
+        return None
+    _metrics.prescreened += 1
+    probability = cascade.prescreen.probability(payload.model_dump())
+    decision = cascade.band.stage(probability)
+    if decision is None:
+        _metrics.escalated += 1
+        return None
+    if decision:
+        _metrics.flagged += 1
+    else:
+        _metrics.cleared += 1
+    return probability, decision
+
+
+def _changes(
+    band: CascadeBand, probabilities: np.ndarray, decisions: np.ndarray
+) -> tuple[float, int]:
+    """Escalation rate and decisions the cascade would get wrong."""
+    escalated = band.escalated(probabilities)
+    early = (probabilities >= band.high).astype(np.int64)
+    changed = ~escalated & (early != decisions)
+    rate = float(escalated.mean()) if len(probabilities) else 0.0
+    return rate, int(changed.sum())
+
+
+def build_cascade(
+    source: str | Path | TextIO,
+    *,
+    model: Any,
+    threshold: float,
+    validation_fraction: float = 0.3,
+    margin: float = 0.01,
+    seed: int = 42,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> tuple[Cascade, CascadeBuildReport]:
+    """
+    Fit a pre-screen to ``model`` on part of a transactions CSV and pick band
+    edges on the held-out rows, so that no held-out decision changes. The
+    training rows are reported as a second, independent check.
+    """
+    if isinstance(source, str | Path):
+        with Path(source).open("r", encoding="utf-8-sig", newline="") as csv_file:
+            return build_cascade(
+                csv_file,
+                model=model,
+                threshold=threshold,
+                validation_fraction=validation_fraction,
+                margin=margin,
+                seed=seed,
+                chunk_size=chunk_size,
+            )
+
+    features_df = read_feature_frame(source, block_size=chunk_size)
+    full_probabilities = predict_probabilities(model, features_df)
+    decisions = (full_probabilities >= threshold).astype(np.int64)
+
+    validation = np.random.default_rng(seed).random(len(features_df)) < (
+        validation_fraction
+    )
+    prescreen = fit_prescreen(
+        features_df.loc[~validation], full_probabilities[~validation]
+    )
+    prescreen_probabilities = prescreen.probabilities(features_df)
+    band = pick_band(
+        prescreen_probabilities[validation],
+        decisions[validation],
+        threshold=threshold,
+        margin=margin,
+    )
+    validation_rate, validation_changes = _changes(
+        band, prescreen_probabilities[validation], decisions[validation]
+    )
+    training_rate, training_changes = _changes(
+        band, prescreen_probabilities[~validation], decisions[~validation]
+    )
+    report = CascadeBuildReport(
+        threshold=threshold,
+        low=band.low,
+        high=band.high,
+        training_rows=int((~validation).sum()),
+        validation_rows=int(validation.sum()),
+        validation_escalation_rate=validation_rate,
+        validation_decision_changes=validation_changes,
+        training_escalation_rate=training_rate,
+        training_decision_changes=training_changes,
+    )
+    logger.info("Cascade built: %s", report.model_dump())
+    return Cascade(prescreen=prescreen, band=band, threshold=threshold), report
@@ -1,19 +1,30 @@
 import csv
-from typing import TextIO
+import io
+from collections.abc import Iterable, Iterator, Sequence, Set
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any, TextIO, cast
 
+import numpy as np
+import pandas as pd  # type: ignore[import-untyped]
 from pydantic import ValidationError
+from tortoise.transactions import in_transaction
 
 from api.core.exceptions import InvalidCSVError
 from api.core.logfire import get_logger
-from api.core.model_loader import get_model, get_threshold
+from api.core.model_loader import get_model
+from api.domain.fraud_scoring import FEATURE_COLUMNS, score_frame
 from api.enums import MerchantCategory
 from api.repositories import transactions as transaction_repo
 from api.schemas import (
+    ScoreEvent,
     ScoreRequest,
+    TransactionBase,
     TransactionImportError,
     TransactionImportResponse,
 )
-from api.services.scoring import score_payload
+from api.services.score_feed import get_score_broadcaster, publish_scores
+from api.services.thresholds import current_threshold
 
 logger = get_logger(__name__)
 
@@ -28,6 +39,7 @@ CSV_REQUIRED_COLUMNS = {
     "velocity_last_24h",
     "cardholder_age",
 }
+DEFAULT_BLOCK_SIZE = 50_000
 
 TRUE_VALUES = {"1", "true", "t", "yes", "y"}
 FALSE_VALUES = {"0", "false", "f", "no", "n"}
@@ -35,6 +47,27 @@ MERCHANT_CATEGORIES: dict[str, MerchantCategory] = {
     category.value: category for category in MerchantCategory
 }
 
+# Column -> NumPy dtype; conversion follows the float()/int() calls of
+# _build_score_request exactly, bounds come from TransactionBase.
+_NUMERIC_COLUMNS: dict[str, type[np.generic]] = {
+    "amount": np.float64,
+    "transaction_hour": np.int64,
+    "device_trust_score": np.int64,
+    "velocity_last_24h": np.int64,
+    "cardholder_age": np.int64,
+}
+_BOOL_COLUMNS = ("foreign_transaction", "location_mismatch")
+# Extra column of blocks holding rows with more fields than the header: the
+# values past the last header column, joined, or "" when the row has none.
+_OVERFLOW_COLUMN = "__overflow__"
+# Characters iter_csv_blocks hands to pandas per read.
+_PIECE_SIZE = 4 * 1024 * 1024
+# Quote, separator and line end for text and binary sources.
+_CSV_MARKS: dict[type, tuple[Any, Any, Any]] = {
+    str: ('"', ",", "\n"),
+    bytes: (b'"', b",", b"\n"),
+}
+
 
 def parse_bool(value: str) -> bool:
     normalized = value.strip().lower()
@@ -61,87 +94,496 @@ def _build_score_request(row: dict[str, str]) -> ScoreRequest:
     )
 
 
-async def import_transactions_from_csv(
-    *,
+@dataclass
+class TransactionBlock:
+    """
+    One parsed block of CSV rows.
+
+    ``transactions`` holds the valid rows only, typed and in file order, with
+    ``transaction_id`` followed by ``FEATURE_COLUMNS``. ``valid`` is the
+    per-input-row mask, so callers can line up extra columns such as labels.
+    """
+
+    transactions: pd.DataFrame
+    line_numbers: np.ndarray
+    valid: np.ndarray
+    errors: list[TransactionImportError]
+
+    @property
+    def total_rows(self) -> int:
+        return len(self.valid)
+
+    @property
+    def skipped_invalid(self) -> int:
+        return self.total_rows - len(self.transactions)
+
+
+def read_csv_header(
     csv_stream: TextIO,
-    max_error_details: int = 50,
-) -> TransactionImportResponse:
-    reader = csv.DictReader(csv_stream)
-    if reader.fieldnames is None:
+    required_columns: Set[str] = CSV_REQUIRED_COLUMNS,
+) -> list[str]:
+    fieldnames = next(csv.reader(csv_stream), None)
+    if fieldnames is None:
         msg = "CSV header is missing"
         raise InvalidCSVError(msg)
 
-    missing_columns = CSV_REQUIRED_COLUMNS - set(reader.fieldnames)
+    missing_columns = required_columns - set(fieldnames)
     if missing_columns:
         missing = ", ".join(sorted(missing_columns))
         msg = f"CSV missing required columns: {missing}"
         raise InvalidCSVError(msg)
+    return fieldnames
 
-    errors: list[TransactionImportError] = []
-    total_rows = 0
-    imported = 0
-    skipped_duplicates = 0
-    skipped_invalid = 0
-    skipped_scoring_errors = 0
-    seen_transaction_ids: set[str] = set()
 
-    model = get_model()
-    threshold = get_threshold()
+def iter_csv_blocks(
+    source: Any,
+    fieldnames: list[str],
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    first_line: int = 2,
+) -> Iterator[tuple[int, pd.DataFrame]]:
+    """
+    Read header-less CSV rows with the pandas C engine, at most ``block_size``
+    at a time, as raw string columns. Yields ``(line of the first row, block)``.
+
+    The C engine fails a whole read over one row with more fields than the
+    header. The input is read in pieces of about ``_PIECE_SIZE`` characters,
+    and a piece where that happens is read again with the python engine, which
+    keeps the surplus in ``_OVERFLOW_COLUMN``; ``parse_transaction_block``
+    then rejects just those rows.
+    """
+    names = [*fieldnames, _OVERFLOW_COLUMN]
+    try:
+        while piece := _read_piece(source, width=len(names)):
+            for chunk in _parse_piece(piece, names, block_size=block_size):
+                yield first_line, chunk
+                first_line += len(chunk)
+    except (csv.Error, pd.errors.ParserError) as exc:
+        msg = f"Malformed CSV: {exc}"
+        raise InvalidCSVError(msg) from exc
+
+
+def _read_piece(source: Any, *, width: int) -> Any:
+    """
+    The next ``_PIECE_SIZE`` characters of ``source`` up to a line end, as str
+    or bytes, extended while a quoted field is still open so no record is cut
+    in half. Empty at the end of the input.
+
+    The piece starts with an empty row ``width`` fields wide, which fixes the
+    row width pandas expects; ``_parse_piece`` drops it again.
+    """
+    piece = source.read(_PIECE_SIZE)
+    if not piece:
+        return piece
+    piece += source.readline()
+    quote, separator, newline = _CSV_MARKS[type(piece)]
+    open_quote = piece.count(quote) % 2
+    extended = 0
+    while open_quote and extended < _PIECE_SIZE:
+        line = source.readline()
+        if not line:
+            break
+        piece += line
+        extended += len(line)
+        open_quote ^= line.count(quote) % 2
+    return separator * (width - 1) + newline + piece
+
+
+def _parse_piece(
+    piece: Any, names: list[str], *, block_size: int
+) -> Iterator[pd.DataFrame]:
+    # One read per piece: a chunked C reader takes each chunk's row width from
+    # its first row and would drop the surplus of a wide row that opens one.
+    buffer = io.StringIO(piece) if isinstance(piece, str) else io.BytesIO(piece)
+    options: dict[str, Any] = {
+        "header": None,
+        "names": names,
+        "dtype": str,
+        "keep_default_na": False,
+    }
+    try:
+        rows = pd.read_csv(buffer, index_col=False, **options)
+    except pd.errors.ParserError:
+        # A row wider than ``names``: only the python engine can fold the
+        # surplus into the last column instead of failing the read.
+        buffer.seek(0)
+        width = len(names) - 1
+        rows = pd.read_csv(
+            buffer,
+            engine="python",
+            on_bad_lines=lambda fields: [*fields[:width], "".join(fields[width:])],
+            **options,
+        ).fillna("")
+    for start in range(1, len(rows), block_size):
+        block = rows.iloc[start : start + block_size]
+        block.index = pd.RangeIndex(len(block))
+        yield block
 
-    for line_number, row in enumerate(reader, start=2):
-        total_rows += 1
-        tx_id = row.get("transaction_id")
 
+def read_feature_frame(
+    csv_stream: TextIO, *, block_size: int = DEFAULT_BLOCK_SIZE
+) -> pd.DataFrame:
+    """Valid rows of a transactions CSV as one ``FEATURE_COLUMNS`` frame."""
+    fieldnames = read_csv_header(csv_stream)
+    frames = [
+        parse_transaction_block(
+            chunk, first_line=first_line, max_error_details=0
+        ).transactions.loc[:, list(FEATURE_COLUMNS)]
+        for first_line, chunk in iter_csv_blocks(
+            csv_stream, fieldnames, block_size=block_size
+        )
+    ]
+    if not frames:
+        return pd.DataFrame(columns=pd.Index(FEATURE_COLUMNS))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _string_column(chunk: pd.DataFrame, column: str) -> pd.Series:
+    return cast(pd.Series, chunk[column])
+
+
+def _field_bounds(column: str) -> tuple[float | None, bool, float | None]:
+    """``(lower, lower is exclusive, upper)`` declared on ``TransactionBase``."""
+    lower: float | None = None
+    exclusive = False
+    upper: float | None = None
+    for constraint in TransactionBase.model_fields[column].metadata:
+        if getattr(constraint, "gt", None) is not None:
+            lower, exclusive = constraint.gt, True
+        if getattr(constraint, "ge", None) is not None:
+            lower = constraint.ge
+        if getattr(constraint, "le", None) is not None:
+            upper = constraint.le
+    return lower, exclusive, upper
+
+
+def _parse_numeric_column(
+    values: pd.Series,
+    dtype: type[np.generic],
+) -> tuple[np.ndarray, np.ndarray]:
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        # Typed input (Parquet): no per-value conversion, and no copy when the
+        # dtype already matches. Integer fields only take whole numbers.
+        if pd.api.types.is_integer_dtype(values) or dtype is np.float64:
+            parsed = values.to_numpy(dtype=dtype)
+            return parsed, np.ones(len(parsed), dtype=bool)
+        floats = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid="ignore"):
+            ok = np.isfinite(floats) & (np.floor(floats) == floats)
+        return np.where(ok, floats, 0).astype(dtype), ok
+
+    raw = values.to_numpy(dtype=object)
+    try:
+        return raw.astype(dtype), np.ones(len(raw), dtype=bool)
+    except (OverflowError, TypeError, ValueError):
+        pass
+
+    # Some value in the block does not convert: fall back to one call per
+    # value so only the offending rows are rejected.
+    convert = float if dtype is np.float64 else int
+    parsed = np.zeros(len(raw), dtype=dtype)
+    ok = np.zeros(len(raw), dtype=bool)
+    for index, value in enumerate(raw):
         try:
-            payload = _build_score_request(row)
-        except (KeyError, TypeError, ValidationError, ValueError) as exc:
-            skipped_invalid += 1
-            if len(errors) < max_error_details:
-                errors.append(
-                    TransactionImportError(
-                        line=line_number,
-                        transaction_id=tx_id,
-                        error=f"Invalid row: {exc}",
-                    )
-                )
+            parsed[index] = convert(value)
+        except (OverflowError, TypeError, ValueError):
             continue
+        ok[index] = True
+    return parsed, ok
+
+
+def parse_bool_column(values: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized ``parse_bool``: returns ``(parsed, ok)``."""
+    if pd.api.types.is_bool_dtype(values) and not values.hasnans:
+        parsed = values.to_numpy(dtype=bool)
+        return parsed, np.ones(len(parsed), dtype=bool)
+    normalized = values.astype(str).str.strip().str.lower()
+    is_true = normalized.isin(TRUE_VALUES).to_numpy()
+    is_false = normalized.isin(FALSE_VALUES).to_numpy()
+    return is_true, is_true | is_false
 
-        if payload.transaction_id in seen_transaction_ids:
-            skipped_duplicates += 1
-            continue
 
-        existing = await transaction_repo.get_transaction_by_external_id(
-            payload.transaction_id
+def _invalid_row_error(row: dict[str, Any], failed_columns: list[str]) -> str:
+    # Raw CSV rows go through the row-by-row builder so messages stay as
+    # before; typed rows just name the offending columns.
+    if all(isinstance(value, str) for value in row.values()):
+        try:
+            _build_score_request(row)
+        except (KeyError, TypeError, ValidationError, ValueError) as exc:
+            return f"Invalid row: {exc}"
+    return f"Invalid row: invalid value for {', '.join(failed_columns)}"
+
+
+def parse_transaction_block(
+    chunk: pd.DataFrame,
+    *,
+    first_line: int,
+    max_error_details: int = 50,
+) -> TransactionBlock:
+    """
+    Validate a block of rows with vectorized masks.
+
+    ``chunk`` holds either raw CSV strings or typed columns (Parquet). For
+    strings, the masks accept exactly the rows ``_build_score_request``
+    accepts, and the first ``max_error_details`` invalid rows are re-run
+    through it so their error messages match the row-by-row import.
+    """
+    transaction_ids = _string_column(chunk, "transaction_id")
+    column_ok: dict[str, np.ndarray] = {
+        "transaction_id": transaction_ids.notna().to_numpy()
+    }
+    columns: dict[str, Any] = {"transaction_id": transaction_ids.to_numpy()}
+
+    for column, dtype in _NUMERIC_COLUMNS.items():
+        parsed, ok = _parse_numeric_column(_string_column(chunk, column), dtype)
+        lower, exclusive, upper = _field_bounds(column)
+        with np.errstate(invalid="ignore"):
+            if lower is not None:
+                ok &= parsed > lower if exclusive else parsed >= lower
+            if upper is not None:
+                ok &= parsed <= upper
+        column_ok[column] = ok
+        columns[column] = parsed
+
+    merchant_category = (
+        _string_column(chunk, "merchant_category")
+        .astype(object)
+        .map(MERCHANT_CATEGORIES.get)
+    )
+    column_ok["merchant_category"] = merchant_category.notna().to_numpy()
+    columns["merchant_category"] = merchant_category.to_numpy()
+
+    for column in _BOOL_COLUMNS:
+        columns[column], column_ok[column] = parse_bool_column(
+            _string_column(chunk, column)
         )
-        if existing is not None:
-            skipped_duplicates += 1
-            seen_transaction_ids.add(payload.transaction_id)
-            continue
 
+    if _OVERFLOW_COLUMN in chunk:
+        overflow = _string_column(chunk, _OVERFLOW_COLUMN)
+        column_ok[_OVERFLOW_COLUMN] = (overflow == "").to_numpy()
+
+    valid = np.logical_and.reduce(list(column_ok.values()))
+    line_numbers = np.arange(first_line, first_line + len(chunk), dtype=np.int64)
+    errors: list[TransactionImportError] = []
+    for index in np.flatnonzero(~valid)[:max_error_details]:
+        row = chunk.iloc[index].to_dict()
+        row.pop(_OVERFLOW_COLUMN, None)
+        failed_columns = [column for column, ok in column_ok.items() if not ok[index]]
+        transaction_id = row.get("transaction_id")
+        errors.append(
+            TransactionImportError(
+                line=int(line_numbers[index]),
+                transaction_id=transaction_id
+                if isinstance(transaction_id, str)
+                else None,
+                error=f"Invalid row: more fields than the {len(row)} in the header"
+                if _OVERFLOW_COLUMN in failed_columns
+                else _invalid_row_error(row, failed_columns),
+            )
+        )
+
+    transactions = pd.DataFrame(
+        {column: columns[column] for column in ("transaction_id", *FEATURE_COLUMNS)}
+    )
+    return TransactionBlock(
+        transactions=transactions.loc[valid].reset_index(drop=True),
+        line_numbers=line_numbers[valid],
+        valid=valid,
+        errors=errors,
+    )
+
+
+def score_transactions(
+    features_df: pd.DataFrame,
+    *,
+    model: Any,
+    threshold: float,
+) -> tuple[np.ndarray, np.ndarray, dict[int, Exception]]:
+    """
+    Score a frame in one model call. If that call fails, score it row by row
+    so a bad row only fails itself; failures are returned by row position.
+    """
+    try:
+        fraud_probabilities, decisions = score_frame(
+            features_df, model=model, threshold=threshold
+        )
+    except Exception:  # noqa: BLE001
+        logger.warning(
+            "Block scoring failed, retrying %s rows one by one", len(features_df)
+        )
+    else:
+        return fraud_probabilities, decisions, {}
+
+    fraud_probabilities = np.zeros(len(features_df), dtype=np.float64)
+    decisions = np.zeros(len(features_df), dtype=np.int64)
+    failures: dict[int, Exception] = {}
+    for index in range(len(features_df)):
         try:
-            fraud_probability, decision, _ = score_payload(
-                payload, model=model, threshold=threshold
+            row_probabilities, row_decisions = score_frame(
+                features_df.iloc[[index]], model=model, threshold=threshold
             )
         except Exception as exc:  # noqa: BLE001
-            skipped_scoring_errors += 1
-            if len(errors) < max_error_details:
-                errors.append(
-                    TransactionImportError(
-                        line=line_number,
-                        transaction_id=payload.transaction_id,
-                        error=f"Scoring failed: {exc}",
-                    )
-                )
+            failures[index] = exc
             continue
+        fraud_probabilities[index] = row_probabilities[0]
+        decisions[index] = row_decisions[0]
+    return fraud_probabilities, decisions, failures
+
 
-        transaction = await transaction_repo.create_transaction(payload.model_dump())
-        await transaction_repo.create_prediction(
-            transaction=transaction,
-            fraud_probability=fraud_probability,
-            decision=decision,
+async def persist_scored_rows(
+    rows: Sequence[dict[str, Any]],
+    *,
+    fraud_probabilities: Sequence[float],
+    decisions: Sequence[int],
+) -> tuple[int, int]:
+    """
+    Store a batch of scored rows: new transactions plus their predictions.
+
+    The first occurrence of a ``transaction_id`` wins, within the batch and
+    against rows already stored, so batches must be persisted in file order.
+    Returns ``(imported, skipped_duplicates)``.
+    """
+    first_index: dict[str, int] = {}
+    for index, row in enumerate(rows):
+        first_index.setdefault(row["transaction_id"], index)
+    unique_indexes = list(first_index.values())
+
+    scored_at = datetime.now(UTC)
+    async with in_transaction() as connection:
+        inserted = await transaction_repo.insert_missing_transactions(
+            [rows[index] for index in unique_indexes],
+            connection=connection,
+        )
+        imported_indexes = [
+            index
+            for index in unique_indexes
+            if rows[index]["transaction_id"] in inserted
+        ]
+        await transaction_repo.bulk_insert_predictions(
+            transaction_ids=[
+                inserted[rows[index]["transaction_id"]] for index in imported_indexes
+            ],
+            fraud_probabilities=[
+                fraud_probabilities[index] for index in imported_indexes
+            ],
+            decisions=[decisions[index] for index in imported_indexes],
+            scored_at=scored_at,
+            connection=connection,
         )
-        seen_transaction_ids.add(payload.transaction_id)
-        imported += 1
+    if get_score_broadcaster().active:
+        await publish_scores(
+            [
+                ScoreEvent(
+                    transaction_id=rows[index]["transaction_id"],
+                    fraud_probability=fraud_probabilities[index],
+                    decision=decisions[index],
+                    merchant_category=rows[index]["merchant_category"],
+                    amount=rows[index]["amount"],
+                    scored_at=scored_at,
+                    source="import",
+                )
+                for index in imported_indexes
+            ]
+        )
+    return len(imported_indexes), len(rows) - len(imported_indexes)
+
+
+async def import_transactions_from_csv(
+    *,
+    csv_stream: TextIO,
+    max_error_details: int = 50,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> TransactionImportResponse:
+    fieldnames = read_csv_header(csv_stream)
+    return await import_transaction_blocks(
+        iter_csv_blocks(csv_stream, fieldnames, block_size=block_size),
+        max_error_details=max_error_details,
+    )
+
+
+async def import_transaction_blocks(
+    blocks: Iterable[tuple[int, pd.DataFrame]],
+    *,
+    max_error_details: int = 50,
+) -> TransactionImportResponse:
+    """
+    Import and score ``(first line, raw rows)`` blocks in order.
+
+    Each block is validated column-wise, checked for duplicates in one query,
+    scored in one model call and persisted with bulk inserts. Counts and
+    error lines are the same as a row-by-row import. Memory is bounded by the
+    block size plus the set of ids seen so far.
+    """
+    errors: list[TransactionImportError] = []
+    total_rows = 0
+    imported = 0
+    skipped_duplicates = 0
+    skipped_invalid = 0
+    skipped_scoring_errors = 0
+    seen_transaction_ids: set[str] = set()
+
+    model = get_model()
+    threshold = await current_threshold()
+
+    for first_line, chunk in blocks:
+        error_room = max_error_details - len(errors)
+        block = parse_transaction_block(
+            chunk, first_line=first_line, max_error_details=error_room
+        )
+        total_rows += block.total_rows
+        skipped_invalid += block.skipped_invalid
+        block_errors = block.errors
+
+        transactions = block.transactions
+        line_numbers = block.line_numbers
+        transaction_ids = _string_column(transactions, "transaction_id")
+        fresh = ~(
+            transaction_ids.duplicated().to_numpy()
+            | transaction_ids.isin(seen_transaction_ids).to_numpy()
+        )
+        existing = await transaction_repo.bulk_get_by_external_ids(
+            transaction_ids[fresh].tolist()
+        )
+        seen_transaction_ids.update(existing)
+        fresh &= ~transaction_ids.isin(list(existing)).to_numpy()
+        skipped_duplicates += len(transactions) - int(fresh.sum())
+        transactions = transactions.loc[fresh].reset_index(drop=True)
+        line_numbers = line_numbers[fresh]
+
+        fraud_probabilities, decisions, failures = score_transactions(
+            transactions.loc[:, list(FEATURE_COLUMNS)],
+            model=model,
+            threshold=threshold,
+        )
+        skipped_scoring_errors += len(failures)
+        block_errors = sorted(
+            block_errors
+            + [
+                TransactionImportError(
+                    line=int(line_numbers[index]),
+                    transaction_id=transactions.at[index, "transaction_id"],
+                    error=f"Scoring failed: {exc}",
+                )
+                for index, exc in list(failures.items())[:error_room]
+            ],
+            key=lambda error: error.line,
+        )
+        errors.extend(block_errors[:error_room])
+
+        scored = np.ones(len(transactions), dtype=bool)
+        scored[list(failures)] = False
+        if scored.any():
+            batch_imported, batch_duplicates = await persist_scored_rows(
+                transactions.loc[scored].to_dict("records"),
+                fraud_probabilities=fraud_probabilities[scored].tolist(),
+                decisions=decisions[scored].tolist(),
+            )
+            imported += batch_imported
+            skipped_duplicates += batch_duplicates
+            seen_transaction_ids.update(
+                _string_column(transactions, "transaction_id")[scored]
+            )
+        logger.debug("Imported %s of %s rows", imported, total_rows)
 
     summary = TransactionImportResponse(
         total_rows=total_rows,
@@ -152,7 +594,7 @@ async def import_transactions_from_csv(
         errors=errors,
     )
     logger.info(
-        "CSV import complete: total=%s imported=%s duplicates=%s invalid=%s scoring_errors=%s",
+        "Transaction import complete: total=%s imported=%s duplicates=%s invalid=%s scoring_errors=%s",
         summary.total_rows,
         summary.imported,
         summary.skipped_duplicates,
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import os
+import socket
+import time
+from pathlib import Path
+
+from api.core.logfire import get_logger
+from api.core.model_loader import get_model
+from api.domain.drift import (
+    BinnedCounts,
+    DriftSketch,
+    drift_status,
+    grouped_psi,
+    psi,
+)
+from api.domain.fraud_scoring import predict_probabilities
+from api.schemas import (
+    DriftReport,
+    FeatureDrift,
+    ProbabilityQuantiles,
+    ScoreRequest,
+)
+from api.services.cascade import get_cascade
+from api.services.csv_import import read_feature_frame
+
+logger = get_logger(__name__)
+
+_monitor: "DriftMonitor | None" = None
+_baseline: DriftSketch | None = None
+
+
+class DriftMonitor:
+    """
+    Folds every live score into this worker's ``DriftSketch``.
+
+    Workers share nothing in memory, so each one writes its sketch to
+    ``snapshot_dir`` every ``interval_seconds``; a report merges this
+    worker's sketch with the other workers' files. Files older than
+    ``max_age_seconds`` belong to workers that are gone and are ignored.
+    """
+
+    def __init__(
+        self,
+        snapshot_dir: Path,
+        *,
+        baseline_path: Path,
+        interval_seconds: float,
+        max_age_seconds: float,
+    ) -> None:
+        self.sketch = DriftSketch()
+        self.baseline_path = baseline_path
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_path = snapshot_dir / f"{socket.gethostname()}-{os.getpid()}.json"
+        self.interval_seconds = interval_seconds
+        self.max_age_seconds = max_age_seconds
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        self.write_snapshot()
+
+    def observe(
+        self,
+        payload: ScoreRequest,
+        fraud_probability: float,
+        *,
+        prescreened: bool = False,
+    ) -> None:
+        self.sketch.observe(
+            amount=payload.amount,
+            device_trust_score=payload.device_trust_score,
+            merchant_category=payload.merchant_category,
+            fraud_probability=None if prescreened else fraud_probability,
+        )
+
+    def write_snapshot(self) -> None:
+        """Replace this worker's file atomically, so readers never see half."""
+        partial = self.snapshot_path.with_suffix(".tmp")
+        try:
+            partial.write_text(json.dumps(self.sketch.to_dict()), encoding="utf-8")
+            partial.replace(self.snapshot_path)
+        except OSError:
+            logger.exception("Writing drift snapshot %s failed", self.snapshot_path)
+
+    def read_snapshots(self) -> tuple[DriftSketch, int]:
+        """Merged fresh snapshots of the other workers, and how many there were."""
+        merged = DriftSketch()
+        workers = 0
+        cutoff = time.time() - self.max_age_seconds
+        for path in self.snapshot_dir.glob("*.json"):
+            if path == self.snapshot_path:
+                continue
+            try:
+                if path.stat().st_mtime < cutoff:
+                    continue
+                sketch = DriftSketch.from_dict(json.loads(path.read_text("utf-8")))
+            except (OSError, ValueError, KeyError):
+                logger.warning("Skipping unreadable drift snapshot %s", path)
+                continue
+            merged.merge(sketch)
+            workers += 1
+        return merged, workers
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval_seconds)
+            except TimeoutError:
+                self.write_snapshot()
+
+
+def get_drift_monitor() -> DriftMonitor | None:
+    return _monitor
+
+
+def observe_score(
+    payload: ScoreRequest, fraud_probability: float, *, prescreened: bool = False
+) -> None:
+    """
+    Record a live score; a no-op when monitoring is off. A pre-screened
+    score counts towards feature drift only, since it is not the model's.
+    """
+    if _monitor is not None:
+        _monitor.observe(payload, fraud_probability, prescreened=prescreened)
+
+
+def start_drift_monitor(
+    snapshot_dir: Path,
+    *,
+    baseline_path: Path,
+    interval_seconds: float,
+    max_age_seconds: float,
+) -> DriftMonitor:
+    global _monitor
+    _monitor = DriftMonitor(
+        snapshot_dir,
+        baseline_path=baseline_path,
+        interval_seconds=interval_seconds,
+        max_age_seconds=max_age_seconds,
+    )
+    _monitor.start()
+    return _monitor
+
+
+async def stop_drift_monitor() -> None:
+    global _monitor
+    if _monitor is None:
+        return
+    monitor, _monitor = _monitor, None
+    await monitor.stop()
+
+
+def build_baseline(csv_path: Path) -> DriftSketch:
+    """
+    Sketch of a transactions CSV as scored by the loaded model. With a
+    cascade in the bundle, only rows its pre-screen escalates count towards
+    the score distribution, matching the live scores the full model makes.
+    """
+    with csv_path.open("r", encoding="utf-8-sig", newline="") as source:
+        features_df = read_feature_frame(source)
+    cascade = get_cascade()
+    escalated = (
+        None
+        if cascade is None
+        else cascade.band.escalated(cascade.prescreen.probabilities(features_df))
+    )
+    baseline = DriftSketch()
+    baseline.observe_frame(
+        features_df,
+        predict_probabilities(get_model(), features_df),
+        scored=escalated,
+    )
+    logger.info("Drift baseline built from %s rows of %s", baseline.rows, csv_path)
+    return baseline
+
+
+def get_baseline(csv_path: Path) -> DriftSketch:
+    """The baseline sketch, built once per process."""
+    global _baseline
+    if _baseline is None:
+        _baseline = build_baseline(csv_path)
+    return _baseline
+
+
+def _quantiles(counts: BinnedCounts) -> ProbabilityQuantiles:
+    return ProbabilityQuantiles(
+        p50=counts.quantile(0.5),
+        p90=counts.quantile(0.9),
+        p99=counts.quantile(0.99),
+    )
+
+
+def drift_report(
+    live: DriftSketch, baseline: DriftSketch, *, workers: int, enabled: bool = True
+) -> DriftReport:
+    categories = list(baseline.merchant_category)
+    values = {
+        "amount": grouped_psi(baseline.amount, live.amount),
+        "device_trust_score": grouped_psi(
+            baseline.device_trust_score, live.device_trust_score
+        ),
+        "merchant_category": psi(
+            [baseline.merchant_category[category] for category in categories],
+            [live.merchant_category.get(category, 0) for category in categories],
+        ),
+        "fraud_probability": grouped_psi(
+            baseline.fraud_probability, live.fraud_probability
+        ),
+    }
+    return DriftReport(
+        enabled=enabled,
+        live_rows=live.rows,
+        baseline_rows=baseline.rows,
+        workers=workers,
+        features=[
+            FeatureDrift(feature=feature, psi=value, status=drift_status(value))
+            for feature, value in values.items()
+        ],
+        baseline_probability=_quantiles(baseline.fraud_probability),
+        live_probability=_quantiles(live.fraud_probability),
+    )
+
+
+async def current_drift_report() -> DriftReport:
+    """
+    Drift of live traffic across workers against the CSV baseline. Reads only
+    memory and snapshot files, never the database.
+    """
+    monitor = _monitor
+    if monitor is None:
+        return drift_report(DriftSketch(), DriftSketch(), workers=0, enabled=False)
+    live = DriftSketch.from_dict(monitor.sketch.to_dict())
+    others, workers = await asyncio.to_thread(monitor.read_snapshots)
+    live.merge(others)
+    baseline = await asyncio.to_thread(get_baseline, monitor.baseline_path)
+    return drift_report(live, baseline, workers=workers + 1)
@@ -0,0 +1,112 @@
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any, TextIO, cast
+
+import pandas as pd  # type: ignore[import-untyped]
+
+from api.core.logfire import get_logger
+from api.domain.evaluation import ConfusionCounts, ScoreHistogram
+from api.domain.fraud_scoring import FEATURE_COLUMNS, predict_probabilities
+from api.schemas import ModelEvaluationReport, ThresholdMetrics
+from api.services.csv_import import (
+    CSV_REQUIRED_COLUMNS,
+    iter_csv_blocks,
+    parse_bool_column,
+    parse_transaction_block,
+    read_csv_header,
+)
+
+logger = get_logger(__name__)
+
+CSV_LABEL_COLUMN = "is_fraud"
+DEFAULT_CHUNK_SIZE = 250_000
+DEFAULT_THRESHOLD_SWEEP = tuple(step / 100 for step in range(101))
+
+
+def _threshold_metrics(counts: ConfusionCounts) -> ThresholdMetrics:
+    flagged = counts.true_positives + counts.false_positives
+    actual_positives = counts.true_positives + counts.false_negatives
+    actual_negatives = counts.false_positives + counts.true_negatives
+    return ThresholdMetrics(
+        threshold=counts.threshold,
+        true_positives=counts.true_positives,
+        false_positives=counts.false_positives,
+        true_negatives=counts.true_negatives,
+        false_negatives=counts.false_negatives,
+        precision=counts.true_positives / flagged if flagged else 0.0,
+        recall=counts.true_positives / actual_positives if actual_positives else 0.0,
+        false_positive_rate=(
+            counts.false_positives / actual_negatives if actual_negatives else 0.0
+        ),
+        cost=counts.cost,
+    )
+
+
+def evaluate_labeled_csv(
+    source: str | Path | TextIO,
+    *,
+    model: Any,
+    threshold: float,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    thresholds: Iterable[float] = DEFAULT_THRESHOLD_SWEEP,
+    fp_cost: float = 1.0,
+    fn_cost: float = 1.0,
+    bins: int = 100_000,
+) -> ModelEvaluationReport:
+    """
+    Score a labeled CSV chunk by chunk and build an evaluation report.
+
+    Memory is bounded by ``chunk_size`` plus a fixed-size score histogram, so
+    the whole threshold sweep comes out of one scoring pass over the file.
+    """
+    if isinstance(source, str | Path):
+        with Path(source).open("r", encoding="utf-8-sig", newline="") as csv_file:
+            return evaluate_labeled_csv(
+                csv_file,
+                model=model,
+                threshold=threshold,
+                chunk_size=chunk_size,
+                thresholds=thresholds,
+                fp_cost=fp_cost,
+                fn_cost=fn_cost,
+                bins=bins,
+            )
+
+    fieldnames = read_csv_header(source, CSV_REQUIRED_COLUMNS | {CSV_LABEL_COLUMN})
+    histogram = ScoreHistogram(bins=bins)
+    total_rows = 0
+    evaluated_rows = 0
+
+    for first_line, chunk in iter_csv_blocks(source, fieldnames, block_size=chunk_size):
+        block = parse_transaction_block(
+            chunk, first_line=first_line, max_error_details=0
+        )
+        labels, labeled = parse_bool_column(cast(pd.Series, chunk[CSV_LABEL_COLUMN]))
+        labels = labels[block.valid]
+        labeled = labeled[block.valid]
+        total_rows += block.total_rows
+        if not labeled.any():
+            continue
+        features_df = block.transactions.loc[labeled, list(FEATURE_COLUMNS)]
+        histogram.update(predict_probabilities(model, features_df), labels[labeled])
+        evaluated_rows += len(features_df)
+        logger.debug("Evaluated %s of %s rows", evaluated_rows, total_rows)
+
+    sweep = histogram.confusion_at(thresholds, fp_cost=fp_cost, fn_cost=fn_cost)
+    current = histogram.confusion_at([threshold], fp_cost=fp_cost, fn_cost=fn_cost)
+    optimal = histogram.cost_optimal_threshold(fp_cost=fp_cost, fn_cost=fn_cost)
+
+    return ModelEvaluationReport(
+        total_rows=total_rows,
+        evaluated_rows=evaluated_rows,
+        skipped_invalid=total_rows - evaluated_rows,
+        positives=histogram.total_positives,
+        negatives=histogram.total_negatives,
+        roc_auc=histogram.roc_auc(),
+        average_precision=histogram.average_precision(),
+        fp_cost=fp_cost,
+        fn_cost=fn_cost,
+        current_threshold=_threshold_metrics(current[0]),
+        cost_optimal_threshold=_threshold_metrics(optimal),
+        sweep=[_threshold_metrics(counts) for counts in sweep],
+    )
@@ -0,0 +1,145 @@
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from typing import Any
+
+import numpy as np
+import pandas as pd  # type: ignore[import-untyped]
+
+from api.core.exceptions import (
+    ExplanationUnavailableError,
+    PredictionNotFoundError,
+    TransactionNotFoundError,
+)
+from api.core.logfire import get_logger
+from api.core.model_loader import get_model, get_model_version
+from api.domain.explanations import LinearExplainer, linear_explainer
+from api.domain.fraud_scoring import FEATURE_COLUMNS, sigmoid
+from api.repositories import explanations as explanation_repo
+from api.repositories import transactions as transaction_repo
+from api.repositories.explanations import ExplanationRow
+from api.schemas import ExplanationRead, FeatureContribution
+
+logger = get_logger(__name__)
+
+_explainer: LinearExplainer | None = None
+_explainer_error: str | None = None
+
+
+def get_explainer() -> LinearExplainer:
+    """Explainer for the loaded model, built once per process."""
+    global _explainer, _explainer_error
+    if _explainer is None and _explainer_error is None:
+        try:
+            _explainer = linear_explainer(get_model())
+        except ValueError as exc:
+            logger.warning("Explanations unavailable for the loaded model: %s", exc)
+            _explainer_error = str(exc)
+    if _explainer is None:
+        raise ExplanationUnavailableError
+    return _explainer
+
+
+def explain_feature_rows(
+    explainer: LinearExplainer,
+    feature_rows: Sequence[dict[str, Any]],
+    *,
+    model_version: str,
+) -> list[ExplanationRow]:
+    """
+    Explain rows of ``id`` plus ``FEATURE_COLUMNS`` in one vectorized call.
+    Contributions are ordered by absolute size, largest first.
+    """
+    features_df = pd.DataFrame(feature_rows, columns=pd.Index(FEATURE_COLUMNS))
+    explanations = explainer.explain(features_df)
+    order = np.argsort(-np.abs(explanations.contributions), axis=1, kind="stable")
+    created_at = datetime.now(UTC)
+    rows: list[ExplanationRow] = []
+    for row, base_value, contributions, ranked in zip(
+        feature_rows,
+        explanations.base_values.tolist(),
+        explanations.contributions.tolist(),
+        order.tolist(),
+        strict=True,
+    ):
+        rows.append(
+            ExplanationRow(
+                prediction_id=row["id"],
+                model_version=model_version,
+                method=explainer.method,
+                base_value=base_value,
+                contributions=[
+                    {
+                        "feature": FEATURE_COLUMNS[index],
+                        "value": row[FEATURE_COLUMNS[index]],
+                        "contribution": contributions[index],
+                    }
+                    for index in ranked
+                ],
+                created_at=created_at,
+            )
+        )
+    return rows
+
+
+async def explain_predictions(
+    prediction_ids: Sequence[int],
+) -> dict[int, ExplanationRow]:
+    """
+    Explanations of ``prediction_ids`` under the loaded model version. Stored
+    ones are reused; the rest are computed in one batch and stored.
+    """
+    explainer = get_explainer()
+    model_version = get_model_version()
+    explained = await explanation_repo.get_explanations(model_version, prediction_ids)
+    missing = [
+        prediction_id
+        for prediction_id in prediction_ids
+        if prediction_id not in explained
+    ]
+    if missing:
+        feature_rows = await explanation_repo.get_prediction_features(missing)
+        if feature_rows:
+            computed = explain_feature_rows(
+                explainer, feature_rows, model_version=model_version
+            )
+            await explanation_repo.bulk_insert_explanations(computed)
+            explained.update((row["prediction_id"], row) for row in computed)
+    return explained
+
+
+async def explain_transaction(transaction_id: str) -> ExplanationRead:
+    """
+    Explain the latest prediction of a transaction. A pre-screened one is
+    explained by the full model, whose probability is reported alongside.
+    """
+    transaction = await transaction_repo.get_transaction_by_external_id(transaction_id)
+    if transaction is None:
+        raise TransactionNotFoundError(transaction_id)
+    predictions = await transaction_repo.list_prediction_rows_for_transaction(
+        transaction
+    )
+    if not predictions:
+        raise PredictionNotFoundError(transaction_id)
+
+    prediction = predictions[0]
+    prediction_id = prediction["id"]
+    explanation = (await explain_predictions([prediction_id]))[prediction_id]
+    contributions = [
+        FeatureContribution(**contribution)
+        for contribution in explanation["contributions"]
+    ]
+    log_odds = explanation["base_value"] + sum(
+        contribution.contribution for contribution in contributions
+    )
+    return ExplanationRead(
+        transaction_id=transaction_id,
+        prediction_id=prediction_id,
+        model_version=explanation["model_version"],
+        method=explanation["method"],
+        base_value=explanation["base_value"],
+        log_odds=log_odds,
+        model_probability=sigmoid(log_odds),
+        prescreened=prediction["prescreened"],
+        contributions=contributions,
+        created_at=explanation["created_at"],
+    )
@@ -0,0 +1,147 @@
+import io
+from collections.abc import AsyncIterator, Sequence
+from typing import Any, Literal
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from pydantic_core import to_json
+
+ExportFormat = Literal["csv", "ndjson", "parquet"]
+
+EXPORT_MEDIA_TYPES: dict[str, str] = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+_TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+TRANSACTION_EXPORT_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("transaction_id", pa.string()),
+        ("amount", pa.float64()),
+        ("transaction_hour", pa.int32()),
+        ("merchant_category", pa.string()),
+        ("foreign_transaction", pa.bool_()),
+        ("location_mismatch", pa.bool_()),
+        ("device_trust_score", pa.int32()),
+        ("velocity_last_24h", pa.int32()),
+        ("cardholder_age", pa.int32()),
+        ("created_at", _TIMESTAMP),
+    ]
+)
+PREDICTION_EXPORT_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("transaction_id", pa.string()),
+        ("fraud_probability", pa.float64()),
+        ("decision", pa.int32()),
+        ("prescreened", pa.bool_()),
+        ("scored_at", _TIMESTAMP),
+    ]
+)
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object that hands written bytes back through ``drain``.
+
+    Lets ``ParquetWriter`` emit row groups as they are finished instead of
+    buffering the whole file.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def rows_to_record_batch(
+    rows: Sequence[tuple[Any, ...]], schema: pa.Schema
+) -> pa.RecordBatch:
+    columns = zip(*rows, strict=True) if rows else ([] for _ in schema)
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array(column, type=field.type)
+            for column, field in zip(columns, schema, strict=True)
+        ],
+        schema=schema,
+    )
+
+
+async def _encode_csv(
+    batches: AsyncIterator[list[tuple[Any, ...]]], schema: pa.Schema
+) -> AsyncIterator[bytes]:
+    sink = pa.BufferOutputStream()
+    pacsv.write_csv(schema.empty_table(), sink)
+    yield sink.getvalue().to_pybytes()
+    options = pacsv.WriteOptions(include_header=False)
+    async for rows in batches:
+        sink = pa.BufferOutputStream()
+        pacsv.write_csv(rows_to_record_batch(rows, schema), sink, options)
+        yield sink.getvalue().to_pybytes()
+
+
+async def _encode_ndjson(
+    batches: AsyncIterator[list[tuple[Any, ...]]], schema: pa.Schema
+) -> AsyncIterator[bytes]:
+    names = schema.names
+    async for rows in batches:
+        yield b"".join(
+            to_json(dict(zip(names, row, strict=True))) + b"\n" for row in rows
+        )
+
+
+async def _encode_parquet(
+    batches: AsyncIterator[list[tuple[Any, ...]]], schema: pa.Schema
+) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for rows in batches:
+            writer.write_batch(rows_to_record_batch(rows, schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def encode_export(
+    batches: AsyncIterator[list[tuple[Any, ...]]],
+    *,
+    schema: pa.Schema,
+    export_format: ExportFormat,
+) -> AsyncIterator[bytes]:
+    """
+    Encode cursor batches as a byte stream in ``export_format``.
+
+    Each database batch becomes one chunk (one row group for Parquet), so
+    memory is bounded by the batch size rather than the export size. Column
+    order follows ``schema``, which must match the row tuples.
+    """
+    if export_format == "parquet":
+        return _encode_parquet(batches, schema)
+    if export_format == "ndjson":
+        return _encode_ndjson(batches, schema)
+    return _encode_csv(batches, schema)
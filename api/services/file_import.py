@@ -0,0 +1,135 @@
+import gzip
+import io
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import IO, TextIO
+
+import pandas as pd  # type: ignore[import-untyped]
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import zstandard
+
+from api.core.exceptions import InvalidCSVError
+from api.schemas import TransactionImportResponse
+from api.services.csv_import import (
+    CSV_REQUIRED_COLUMNS,
+    DEFAULT_BLOCK_SIZE,
+    import_transaction_blocks,
+    import_transactions_from_csv,
+)
+
+CSV_FORMAT = "csv"
+CSV_GZIP_FORMAT = "csv.gz"
+CSV_ZSTD_FORMAT = "csv.zst"
+PARQUET_FORMAT = "parquet"
+# Longest suffix first, so "x.csv.gz" is not taken for "x.gz".
+IMPORT_FORMATS = (CSV_GZIP_FORMAT, CSV_ZSTD_FORMAT, PARQUET_FORMAT, CSV_FORMAT)
+
+# Corrupt or mislabelled input; anything else is a server-side failure.
+_READ_ERRORS: tuple[type[Exception], ...] = (
+    EOFError,
+    gzip.BadGzipFile,
+    UnicodeDecodeError,
+    pa.ArrowException,
+    zstandard.ZstdError,
+)
+
+
+def detect_import_format(filename: str) -> str | None:
+    lowered = filename.lower()
+    for import_format in IMPORT_FORMATS:
+        if lowered.endswith(f".{import_format}"):
+            return import_format
+    return None
+
+
+@contextmanager
+def open_csv_text(binary_stream: IO[bytes], import_format: str) -> Iterator[TextIO]:
+    """
+    Decode a plain or compressed CSV as a text stream.
+
+    Compressed input is decompressed incrementally as the CSV reader pulls
+    from it, so memory does not grow with the file. ``binary_stream`` is
+    left open.
+    """
+    raw: IO[bytes] | io.BufferedIOBase
+    if import_format == CSV_GZIP_FORMAT:
+        raw = gzip.GzipFile(fileobj=binary_stream, mode="rb")
+    elif import_format == CSV_ZSTD_FORMAT:
+        raw = zstandard.ZstdDecompressor().stream_reader(binary_stream, closefd=False)
+    else:
+        raw = binary_stream
+
+    text_stream = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    try:
+        yield text_stream
+    finally:
+        text_stream.detach()
+        if raw is not binary_stream:
+            raw.close()
+
+
+def iter_parquet_blocks(
+    source: IO[bytes],
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> Iterator[tuple[int, pd.DataFrame]]:
+    """
+    Read a Parquet file as ``(row number, typed rows)`` blocks.
+
+    Only the required columns are decoded, one row group at a time and at
+    most ``block_size`` rows per batch. Numeric columns without nulls reach
+    pandas without a copy. Row numbers start at 1.
+    """
+    parquet_file = pq.ParquetFile(source)
+    missing_columns = CSV_REQUIRED_COLUMNS - set(parquet_file.schema_arrow.names)
+    if missing_columns:
+        missing = ", ".join(sorted(missing_columns))
+        msg = f"Parquet file missing required columns: {missing}"
+        raise InvalidCSVError(msg)
+
+    first_row = 1
+    for batch in parquet_file.iter_batches(
+        batch_size=block_size, columns=sorted(CSV_REQUIRED_COLUMNS)
+    ):
+        transaction_ids = batch.column("transaction_id")
+        if not pa.types.is_string(transaction_ids.type):
+            batch = batch.set_column(
+                batch.schema.get_field_index("transaction_id"),
+                "transaction_id",
+                pc.cast(transaction_ids, pa.string()),
+            )
+        yield first_row, batch.to_pandas(split_blocks=True)
+        first_row += batch.num_rows
+
+
+async def import_transactions_from_file(
+    binary_stream: IO[bytes],
+    *,
+    import_format: str,
+    max_error_details: int = 50,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> TransactionImportResponse:
+    """
+    Import a ``.csv``, ``.csv.gz``, ``.csv.zst`` or ``.parquet`` upload.
+
+    All formats share the block pipeline, so duplicate, invalid and scoring
+    error accounting is the same. Errors point at CSV lines, or at 1-based
+    rows for Parquet.
+    """
+    try:
+        if import_format == PARQUET_FORMAT:
+            return await import_transaction_blocks(
+                iter_parquet_blocks(binary_stream, block_size=block_size),
+                max_error_details=max_error_details,
+            )
+        with open_csv_text(binary_stream, import_format) as csv_stream:
+            return await import_transactions_from_csv(
+                csv_stream=csv_stream,
+                max_error_details=max_error_details,
+                block_size=block_size,
+            )
+    except _READ_ERRORS as exc:
+        msg = f"Could not read {import_format} file: {exc}"
+        raise InvalidCSVError(msg) from exc
@@ -0,0 +1,146 @@
+import asyncio
+import signal
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from types import FrameType
+
+import asyncpg
+from tortoise import connections
+from tortoise.exceptions import BaseORMException
+
+from api.core.logfire import get_logger
+from api.core.model_loader import model_bundle_loaded
+from api.database import PRIMARY_CONNECTION
+from api.schemas import ReadinessReport
+
+logger = get_logger(__name__)
+
+_probe: "ReadinessProbe | None" = None
+
+
+class ReadinessProbe:
+    """
+    Whether this worker should get traffic: the model bundle is loaded, the
+    primary database answers within ``db_timeout_seconds``, and the worker
+    is not draining for shutdown.
+
+    A report is reused for ``cache_seconds``, and concurrent checks share one
+    database round trip, so frequent probes cost next to nothing. Draining
+    takes effect at once, without waiting for the cache, and runs the
+    ``on_drain`` callbacks once.
+    """
+
+    def __init__(self, *, cache_seconds: float, db_timeout_seconds: float) -> None:
+        self.cache_seconds = cache_seconds
+        self.db_timeout = db_timeout_seconds
+        self.draining = False
+        self._on_drain: list[Callable[[], None]] = []
+        self._lock = asyncio.Lock()
+        self._report: ReadinessReport | None = None
+        self._checked_at = 0.0
+
+    def on_drain(self, callback: Callable[[], None]) -> None:
+        self._on_drain.append(callback)
+
+    def drain(self) -> None:
+        if self.draining:
+            return
+        logger.info("Draining: reporting not ready")
+        self.draining = True
+        for callback in self._on_drain:
+            callback()
+
+    async def check(self) -> ReadinessReport:
+        async with self._lock:
+            if (
+                self._report is None
+                or time.monotonic() - self._checked_at >= self.cache_seconds
+            ):
+                self._report = await self._check_now()
+                self._checked_at = time.monotonic()
+            report = self._report
+        if self.draining:
+            return report.model_copy(update={"ready": False, "draining": True})
+        return report
+
+    async def _check_now(self) -> ReadinessReport:
+        model_loaded = model_bundle_loaded()
+        database = await self._database_available()
+        return ReadinessReport(
+            ready=model_loaded and database and not self.draining,
+            model_loaded=model_loaded,
+            database=database,
+            draining=self.draining,
+            checked_at=datetime.now(UTC),
+        )
+
+    async def _database_available(self) -> bool:
+        try:
+            client = connections.get(PRIMARY_CONNECTION)
+            await asyncio.wait_for(client.execute_query("SELECT 1"), self.db_timeout)
+        except (
+            OSError,
+            TimeoutError,
+            BaseORMException,
+            asyncpg.PostgresError,
+            asyncpg.InterfaceError,
+        ) as exc:
+            logger.warning("Readiness check could not reach the database: %r", exc)
+            return False
+        return True
+
+
+def get_readiness_probe() -> ReadinessProbe | None:
+    return _probe
+
+
+def start_readiness_probe(
+    *, cache_seconds: float, db_timeout_seconds: float
+) -> ReadinessProbe:
+    global _probe
+    _probe = ReadinessProbe(
+        cache_seconds=cache_seconds, db_timeout_seconds=db_timeout_seconds
+    )
+    return _probe
+
+
+def stop_readiness_probe() -> None:
+    global _probe
+    _probe = None
+
+
+def drain_on_shutdown_signal(probe: ReadinessProbe, *, drain_seconds: float) -> None:
+    """
+    Report not ready for ``drain_seconds`` after SIGTERM before passing the
+    signal on to the server, so load balancers stop routing here while
+    requests still succeed. A second signal is passed on at once.
+
+    Draining runs on the event loop, so its callbacks can touch asyncio
+    objects. It has to happen here rather than in lifespan shutdown, which
+    the server only reaches once every open response has finished.
+
+    Wraps the handler the server installed, so call it from lifespan startup
+    in the main thread; elsewhere it does nothing.
+    """
+    previous = signal.getsignal(signal.SIGTERM)
+    if not callable(previous):
+        return
+    loop = asyncio.get_running_loop()
+    signalled = False
+
+    def handle(signum: int, frame: FrameType | None) -> None:
+        nonlocal signalled
+        if signalled or probe.draining:
+            previous(signum, frame)
+            return
+        signalled = True
+        loop.call_soon_threadsafe(probe.drain)
+        loop.call_soon_threadsafe(
+            loop.call_later, drain_seconds, previous, signum, None
+        )
+
+    try:
+        signal.signal(signal.SIGTERM, handle)
+    except ValueError:
+        logger.warning("Not in the main thread, SIGTERM will not drain first")
@@ -0,0 +1,254 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from api.core.exceptions import IdempotencyKeyInProgressError, IdempotencyKeyReusedError
+from api.core.logfire import get_logger
+from api.repositories import idempotency as idempotency_repo
+from api.schemas import IdempotencyStats, ScoreRequest, ScoreResponse
+from api.services.scoring import create_or_score_transaction
+
+logger = get_logger(__name__)
+
+# A claim with no response after this long belongs to a request that died.
+ABANDONED_SECONDS = 60
+POLL_INTERVAL_SECONDS = 0.1
+PURGE_INTERVAL_SECONDS = 3600
+
+_store: "IdempotencyStore | None" = None
+
+
+def request_fingerprint(payload: ScoreRequest) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class _CachedResponse:
+    request_hash: str
+    response: ScoreResponse
+    expires_at: float
+
+
+@dataclass(frozen=True)
+class _InFlight:
+    request_hash: str
+    future: "asyncio.Future[ScoreResponse]"
+
+
+class IdempotencyStore:
+    """
+    Replays the response of a scoring request to retries with the same
+    ``Idempotency-Key``, so a retry neither reruns the model nor records
+    another prediction.
+
+    Keys are kept in ``idempotency_key`` for ``ttl_seconds`` and the latest
+    ``cache_size`` responses also in memory. Concurrent requests with one key
+    in a worker share a single scoring. Across workers, the first request
+    claims the key in Postgres and the others poll for its response for up to
+    ``wait_seconds`` before getting a 409. A key sent with a different body is
+    rejected. A background task deletes expired keys.
+    """
+
+    def __init__(
+        self,
+        *,
+        cache_size: int,
+        ttl_seconds: float,
+        wait_seconds: float,
+        purge_interval_seconds: float = PURGE_INTERVAL_SECONDS,
+    ) -> None:
+        self.cache_size = cache_size
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.purge_interval = purge_interval_seconds
+        self._cache: OrderedDict[str, _CachedResponse] = OrderedDict()
+        self._in_flight: dict[str, _InFlight] = {}
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._scored = 0
+        self._replayed = 0
+        self._coalesced = 0
+        self._reused = 0
+        self._in_progress = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def stats(self) -> IdempotencyStats:
+        return IdempotencyStats(
+            enabled=True,
+            cached=len(self._cache),
+            in_flight=len(self._in_flight),
+            scored=self._scored,
+            replayed=self._replayed,
+            coalesced=self._coalesced,
+            reused=self._reused,
+            in_progress=self._in_progress,
+        )
+
+    async def run(
+        self,
+        key: str,
+        payload: ScoreRequest,
+        score: Callable[[], Awaitable[ScoreResponse]],
+    ) -> tuple[ScoreResponse, bool]:
+        """
+        Score ``payload`` under ``key`` once and return the response, and
+        whether it was replayed instead of scored by this call.
+        """
+        request_hash = request_fingerprint(payload)
+        cached = self._cache.get(key)
+        if cached is not None and cached.expires_at > time.monotonic():
+            self._check_request(key, cached.request_hash, request_hash)
+            self._cache.move_to_end(key)
+            self._replayed += 1
+            return cached.response, True
+
+        while (in_flight := self._in_flight.get(key)) is not None:
+            self._check_request(key, in_flight.request_hash, request_hash)
+            try:
+                response = await asyncio.shield(in_flight.future)
+            except asyncio.CancelledError:
+                if in_flight.future.cancelled():
+                    # The first request was cancelled, take over from it.
+                    continue
+                raise
+            self._coalesced += 1
+            return response, True
+
+        future: asyncio.Future[ScoreResponse] = (
+            asyncio.get_running_loop().create_future()
+        )
+        # Marks a failure as retrieved even when no duplicate was waiting on it.
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._in_flight[key] = _InFlight(request_hash, future)
+        try:
+            response, replayed = await self._claim_or_wait(key, request_hash, score)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            del self._in_flight[key]
+        future.set_result(response)
+        self._remember(key, request_hash, response)
+        return response, replayed
+
+    def _check_request(self, key: str, stored_hash: str, request_hash: str) -> None:
+        if stored_hash != request_hash:
+            self._reused += 1
+            raise IdempotencyKeyReusedError(key)
+
+    def _remember(self, key: str, request_hash: str, response: ScoreResponse) -> None:
+        self._cache[key] = _CachedResponse(
+            request_hash, response, time.monotonic() + self.ttl_seconds
+        )
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _claim_or_wait(
+        self,
+        key: str,
+        request_hash: str,
+        score: Callable[[], Awaitable[ScoreResponse]],
+    ) -> tuple[ScoreResponse, bool]:
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            if await idempotency_repo.claim_idempotency_key(
+                key,
+                request_hash,
+                ttl_seconds=self.ttl_seconds,
+                abandoned_seconds=ABANDONED_SECONDS,
+            ):
+                return await self._score_claimed(key, score), False
+            stored = await idempotency_repo.get_idempotency_key(key)
+            if stored is not None:
+                self._check_request(key, stored.request_hash, request_hash)
+                if stored.response is not None:
+                    self._replayed += 1
+                    return ScoreResponse.model_validate(stored.response), True
+            if time.monotonic() >= deadline:
+                self._in_progress += 1
+                raise IdempotencyKeyInProgressError(key)
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+    async def _score_claimed(
+        self, key: str, score: Callable[[], Awaitable[ScoreResponse]]
+    ) -> ScoreResponse:
+        try:
+            response = await score()
+        except BaseException:
+            try:
+                await idempotency_repo.release_idempotency_key(key)
+            except Exception:
+                logger.exception("Could not release idempotency key %s", key)
+            raise
+        self._scored += 1
+        try:
+            await idempotency_repo.save_idempotent_response(
+                key, response.model_dump(mode="json")
+            )
+        except Exception:
+            # The prediction is recorded; only replays to other workers are lost.
+            logger.exception("Could not store the response for idempotency key %s", key)
+        return response
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                deleted = await idempotency_repo.delete_expired_idempotency_keys(
+                    self.ttl_seconds
+                )
+                logger.debug("Deleted %s expired idempotency keys", deleted)
+            except Exception:
+                logger.exception("Deleting expired idempotency keys failed")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.purge_interval)
+            except TimeoutError:
+                continue
+
+
+async def score_idempotently(
+    key: str, payload: ScoreRequest
+) -> tuple[ScoreResponse, bool]:
+    """``create_or_score_transaction`` under ``key``; plain scoring without a store."""
+    store = _store
+    if store is None:
+        return await create_or_score_transaction(payload), False
+    return await store.run(key, payload, lambda: create_or_score_transaction(payload))
+
+
+def get_idempotency_store() -> IdempotencyStore | None:
+    return _store
+
+
+def start_idempotency_store(
+    *, cache_size: int, ttl_seconds: float, wait_seconds: float
+) -> IdempotencyStore:
+    global _store
+    _store = IdempotencyStore(
+        cache_size=cache_size, ttl_seconds=ttl_seconds, wait_seconds=wait_seconds
+    )
+    _store.start()
+    return _store
+
+
+async def stop_idempotency_store() -> None:
+    global _store
+    if _store is None:
+        return
+    store, _store = _store, None
+    await store.stop()
@@ -0,0 +1,401 @@
+import asyncio
+import functools
+import operator
+from collections.abc import AsyncIterator, Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from api.core.logfire import get_logger
+from api.domain.partitions import (
+    DEFAULT_PARTITION,
+    add_months,
+    as_utc,
+    month_floor,
+    month_range,
+    partition_month,
+    partition_name,
+    retention_cutoff,
+)
+from api.repositories import partitions as partition_repo
+from api.repositories.transactions import PREDICTION_EXPORT_COLUMNS, TransactionFilters
+from api.schemas import (
+    PartitionMaintenanceReport,
+    PartitionStatus,
+    PredictionArchiveFile,
+    PredictionPartition,
+)
+from api.services.export import PREDICTION_EXPORT_SCHEMA, rows_to_record_batch
+
+logger = get_logger(__name__)
+
+_job: "PartitionMaintenanceJob | None" = None
+
+DEFAULT_MONTHS_AHEAD = 3
+ARCHIVE_BATCH_SIZE = 10_000
+
+ARCHIVE_SCHEMA = pa.schema(
+    [
+        *PREDICTION_EXPORT_SCHEMA,
+        pa.field("merchant_category", pa.string()),
+        pa.field("amount", pa.float64()),
+        pa.field("foreign_transaction", pa.bool_()),
+    ]
+)
+
+# Columns read back from archive files, in export order. A missing
+# prescreened reads as null; Kleene ``&`` with is_valid() turns that into false.
+_ARCHIVE_EXPORT_COLUMNS = {
+    name: pc.field(name) for name in PREDICTION_EXPORT_COLUMNS
+} | {"prescreened": pc.field("prescreened").is_valid() & pc.field("prescreened")}
+
+
+def archive_filter(filters: TransactionFilters) -> Any:
+    """
+    The export filters as a pyarrow expression, applied to archived rows the
+    way ``score_query`` applies them in SQL. None when no filter is set.
+    """
+    merchant_category = (
+        None if filters.merchant_category is None else filters.merchant_category.value
+    )
+    predicates: list[tuple[str, Callable[[Any, Any], Any], Any]] = [
+        ("merchant_category", operator.eq, merchant_category),
+        ("amount", operator.ge, filters.min_amount),
+        ("amount", operator.le, filters.max_amount),
+        ("foreign_transaction", operator.eq, filters.foreign_transaction),
+        ("decision", operator.eq, filters.decision),
+        ("fraud_probability", operator.ge, filters.min_probability),
+        ("fraud_probability", operator.le, filters.max_probability),
+        ("scored_at", operator.ge, filters.start and as_utc(filters.start)),
+        ("scored_at", operator.lt, filters.end and as_utc(filters.end)),
+    ]
+    conditions = [
+        compare(pc.field(column), value)
+        for column, compare, value in predicates
+        if value is not None
+    ]
+    return functools.reduce(operator.and_, conditions) if conditions else None
+
+
+def _month_in_range(month: datetime, filters: TransactionFilters) -> bool:
+    if filters.start is not None and add_months(month, 1) <= as_utc(filters.start):
+        return False
+    return filters.end is None or month < as_utc(filters.end)
+
+
+class PredictionArchive:
+    """
+    Predictions past retention, one zstd-compressed Parquet file per month in
+    ``directory``, named after the partition they came from.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+
+    def path(self, name: str) -> Path:
+        return self.directory / f"{name}.parquet"
+
+    def files(self) -> list[tuple[datetime, Path]]:
+        """Archived months and their files, oldest first."""
+        if not self.directory.is_dir():
+            return []
+        found = []
+        for path in self.directory.glob("*.parquet"):
+            month = partition_month(path.stem)
+            if month is not None:
+                found.append((month, path))
+        return sorted(found)
+
+    def describe(self, month: datetime, path: Path) -> PredictionArchiveFile:
+        return PredictionArchiveFile(
+            name=path.stem,
+            month=month,
+            rows=pq.ParquetFile(path).metadata.num_rows,
+            bytes=path.stat().st_size,
+        )
+
+    async def write(
+        self, name: str, batches: AsyncIterator[list[tuple[Any, ...]]]
+    ) -> PredictionArchiveFile:
+        """
+        Write ``ARCHIVE_SCHEMA`` rows to the month's file. Rows go to a
+        ``.partial`` file that is renamed into place once complete, so readers
+        never see a half-written archive.
+        """
+        month = partition_month(name)
+        if month is None:
+            msg = f"Not a monthly prediction partition: {name!r}"
+            raise ValueError(msg)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(name)
+        partial = path.with_suffix(".partial")
+        writer = pq.ParquetWriter(str(partial), ARCHIVE_SCHEMA, compression="zstd")
+        try:
+            async for rows in batches:
+                await asyncio.to_thread(
+                    writer.write_batch, rows_to_record_batch(rows, ARCHIVE_SCHEMA)
+                )
+        finally:
+            writer.close()
+        partial.replace(path)
+        return self.describe(month, path)
+
+    async def stream(
+        self, filters: TransactionFilters, *, batch_size: int = ARCHIVE_BATCH_SIZE
+    ) -> AsyncIterator[list[tuple[Any, ...]]]:
+        """
+        Stream archived ``PREDICTION_EXPORT_COLUMNS`` rows matching
+        ``filters``, month by month. Months outside ``start``/``end`` are
+        skipped without opening their file, and the filter is pushed down to
+        the Parquet row groups. Files written before predictions carried
+        ``prescreened`` read back with it false, as migration 0008 set it.
+        """
+        expression = archive_filter(filters)
+        for month, path in self.files():
+            if not _month_in_range(month, filters):
+                continue
+            dataset = ds.dataset(str(path), format="parquet", schema=ARCHIVE_SCHEMA)
+            scanner = dataset.scanner(
+                columns=_ARCHIVE_EXPORT_COLUMNS,
+                filter=expression,
+                batch_size=batch_size,
+            )
+            batches = iter(scanner.to_batches())
+            while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+                if batch.num_rows:
+                    yield list(
+                        zip(
+                            *(column.to_pylist() for column in batch.columns),
+                            strict=True,
+                        )
+                    )
+
+
+async def _archive_partition(
+    connection: Any,
+    archive: PredictionArchive,
+    name: str,
+    *,
+    attached: bool,
+    batch_size: int,
+) -> PredictionArchiveFile:
+    """
+    Detach first, so no insert or re-decide can touch the rows while they are
+    written out; drop the table only once its file is complete. A run that
+    dies in between leaves a detached table, which the next run archives.
+    """
+    if attached:
+        await partition_repo.detach_partition(connection, name)
+    archived = await archive.write(
+        name,
+        partition_repo.stream_archive_rows(connection, name, batch_size=batch_size),
+    )
+    await partition_repo.drop_partition_table(connection, name)
+    logger.info("Archived partition %s: %s rows", name, archived.rows)
+    return archived
+
+
+async def maintain_partitions(
+    archive: PredictionArchive | None,
+    *,
+    retention_months: int,
+    months_ahead: int = DEFAULT_MONTHS_AHEAD,
+    now: datetime | None = None,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> PartitionMaintenanceReport:
+    """
+    Create the partitions for this month and ``months_ahead`` more, then
+    archive partitions whose whole month is older than ``retention_months``.
+
+    A partition is only archived once the analytics rollup has consumed it,
+    so dashboards keep its totals. ``retention_months`` of 0 keeps everything.
+    Only one worker runs this at a time; the others get ``locked=False``.
+    """
+    now = now or datetime.now(UTC)
+    created: list[str] = []
+    archived: list[PredictionArchiveFile] = []
+    waiting: list[str] = []
+    async with partition_repo.maintenance_connection() as connection:
+        if connection is None:
+            return PartitionMaintenanceReport(
+                locked=False, created=[], archived=[], waiting_for_rollup=[]
+            )
+        partitions = await partition_repo.list_partitions(connection)
+        existing = {row["name"] for row in partitions}
+        if DEFAULT_PARTITION not in existing:
+            logger.warning("Skipping partition maintenance: run migrations first")
+            return PartitionMaintenanceReport(
+                locked=True, created=[], archived=[], waiting_for_rollup=[]
+            )
+
+        current = month_floor(now)
+        for month in month_range(current, add_months(current, months_ahead + 1)):
+            name = partition_name(month)
+            if name not in existing:
+                await partition_repo.create_month_partition(connection, name)
+                created.append(name)
+
+        if archive is not None and retention_months > 0:
+            cutoff = retention_cutoff(now, retention_months)
+            watermark = await partition_repo.get_rollup_watermark(connection)
+            for row in partitions:
+                start = partition_month(row["name"])
+                if start is None:
+                    continue
+                end = add_months(start, 1)
+                if row["attached"] and end > cutoff:
+                    continue
+                if row["attached"] and (watermark is None or watermark < end):
+                    waiting.append(row["name"])
+                    continue
+                archived.append(
+                    await _archive_partition(
+                        connection,
+                        archive,
+                        row["name"],
+                        attached=row["attached"],
+                        batch_size=batch_size,
+                    )
+                )
+    if created:
+        logger.info("Created prediction partitions: %s", ", ".join(created))
+    if waiting:
+        logger.warning(
+            "Partitions past retention wait for the analytics rollup: %s",
+            ", ".join(waiting),
+        )
+    return PartitionMaintenanceReport(
+        locked=True, created=created, archived=archived, waiting_for_rollup=waiting
+    )
+
+
+class PartitionMaintenanceJob:
+    """
+    Background task that runs ``maintain_partitions`` every
+    ``interval_seconds``. A failed run is logged and retried on the next tick.
+    """
+
+    def __init__(
+        self,
+        archive: PredictionArchive,
+        *,
+        retention_months: int,
+        months_ahead: int,
+        interval_seconds: float,
+    ) -> None:
+        self.archive = archive
+        self.retention_months = retention_months
+        self.months_ahead = months_ahead
+        self.interval = interval_seconds
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def run_once(self) -> PartitionMaintenanceReport:
+        return await maintain_partitions(
+            self.archive,
+            retention_months=self.retention_months,
+            months_ahead=self.months_ahead,
+        )
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Partition maintenance failed")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except TimeoutError:
+                continue
+
+
+def get_partition_job() -> PartitionMaintenanceJob | None:
+    return _job
+
+
+def start_partition_maintenance(
+    archive_dir: Path,
+    *,
+    retention_months: int,
+    months_ahead: int,
+    interval_seconds: float,
+) -> PartitionMaintenanceJob:
+    global _job
+    _job = PartitionMaintenanceJob(
+        PredictionArchive(archive_dir),
+        retention_months=retention_months,
+        months_ahead=months_ahead,
+        interval_seconds=interval_seconds,
+    )
+    _job.start()
+    return _job
+
+
+async def stop_partition_maintenance() -> None:
+    global _job
+    if _job is None:
+        return
+    job, _job = _job, None
+    await job.stop()
+
+
+async def run_partition_maintenance() -> PartitionMaintenanceReport:
+    """One maintenance run now; without the job, partitions are only created."""
+    job = _job
+    if job is None:
+        return await maintain_partitions(None, retention_months=0)
+    return await job.run_once()
+
+
+async def partition_status() -> PartitionStatus:
+    async with partition_repo.acquire() as connection:
+        partitions = await partition_repo.list_partitions(connection)
+    job = _job
+    archives = (
+        []
+        if job is None
+        else [job.archive.describe(month, path) for month, path in job.archive.files()]
+    )
+    return PartitionStatus(
+        retention_months=0 if job is None else job.retention_months,
+        archive_dir=None if job is None else str(job.archive.directory),
+        partitions=[
+            PredictionPartition(month=partition_month(row["name"]), **row)
+            for row in partitions
+        ],
+        archives=archives,
+    )
+
+
+async def with_archived_predictions(
+    filters: TransactionFilters,
+    live_batches: AsyncIterator[list[tuple[Any, ...]]],
+    *,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> AsyncIterator[list[tuple[Any, ...]]]:
+    """
+    Archived predictions matching ``filters``, oldest month first, followed by
+    ``live_batches``. The month being archived while an export runs may be
+    missing from or repeated in that export.
+    """
+    job = _job
+    if job is not None:
+        async for rows in job.archive.stream(filters, batch_size=batch_size):
+            yield rows
+    async for rows in live_batches:
+        yield rows
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from tortoise.transactions import in_transaction
+
+from api.core.logfire import get_logger
+from api.repositories import transactions as transaction_repo
+from api.schemas import WriteBehindStats
+
+logger = get_logger(__name__)
+
+_writer: "PredictionWriteBehind | None" = None
+
+
+@dataclass(frozen=True)
+class PendingPrediction:
+    fields: dict[str, Any]
+    fraud_probability: float
+    decision: int
+    scored_at: datetime
+    prescreened: bool = False
+
+
+class PredictionWriteBehind:
+    """
+    Bounded in-process queue that persists scored transactions in batches.
+
+    ``enqueue`` returns as soon as the item is queued and waits only while the
+    queue is full, which is the backpressure on callers. A background task
+    drains the queue every ``flush_interval_ms``, writing up to ``batch_size``
+    items per transaction. ``stop`` drains everything still queued.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int,
+        flush_interval_ms: int,
+        batch_size: int,
+        max_attempts: int = 3,
+    ) -> None:
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._queue: asyncio.Queue[PendingPrediction] = asyncio.Queue(max_size)
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._enqueued = 0
+        self._flushed = 0
+        self._failed = 0
+        self._batches = 0
+        self._backpressure_waits = 0
+        self._last_flush_ms: float | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self._drain()
+
+    async def enqueue(self, item: PendingPrediction) -> None:
+        if self._queue.full():
+            self._backpressure_waits += 1
+        await self._queue.put(item)
+        self._enqueued += 1
+
+    def stats(self) -> WriteBehindStats:
+        return WriteBehindStats(
+            enabled=True,
+            queue_depth=self._queue.qsize(),
+            enqueued=self._enqueued,
+            flushed=self._flushed,
+            failed=self._failed,
+            batches=self._batches,
+            backpressure_waits=self._backpressure_waits,
+            last_flush_ms=self._last_flush_ms,
+        )
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except TimeoutError:
+                await self._drain()
+
+    async def _drain(self) -> None:
+        while not self._queue.empty():
+            batch: list[PendingPrediction] = []
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[PendingPrediction]) -> None:
+        started = time.perf_counter()
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await _persist(batch)
+            except Exception:
+                logger.exception(
+                    "Write-behind flush of %s predictions failed (attempt %s/%s)",
+                    len(batch),
+                    attempt,
+                    self.max_attempts,
+                )
+                if attempt < self.max_attempts:
+                    await asyncio.sleep(self.flush_interval * attempt)
+                continue
+            self._flushed += len(batch)
+            self._batches += 1
+            self._last_flush_ms = (time.perf_counter() - started) * 1000
+            return
+        self._failed += len(batch)
+
+
+async def _persist(batch: list[PendingPrediction]) -> None:
+    async with in_transaction() as connection:
+        upserted = await transaction_repo.upsert_transactions(
+            [item.fields for item in batch],
+            connection=connection,
+        )
+        transaction_pks = {row["transaction_id"]: row["id"] for row in upserted}
+        await transaction_repo.bulk_insert_predictions(
+            transaction_ids=[
+                transaction_pks[item.fields["transaction_id"]] for item in batch
+            ],
+            fraud_probabilities=[item.fraud_probability for item in batch],
+            decisions=[item.decision for item in batch],
+            prescreened=[item.prescreened for item in batch],
+            scored_at=[item.scored_at for item in batch],
+            connection=connection,
+        )
+
+
+def get_prediction_writer() -> PredictionWriteBehind | None:
+    return _writer
+
+
+def start_prediction_writer(
+    *,
+    max_size: int,
+    flush_interval_ms: int,
+    batch_size: int,
+) -> PredictionWriteBehind:
+    global _writer
+    _writer = PredictionWriteBehind(
+        max_size=max_size,
+        flush_interval_ms=flush_interval_ms,
+        batch_size=batch_size,
+    )
+    _writer.start()
+    return _writer
+
+
+async def stop_prediction_writer() -> None:
+    global _writer
+    if _writer is None:
+        return
+    writer, _writer = _writer, None
+    await writer.stop()
+    logger.info("Write-behind queue drained: %s", writer.stats().model_dump())
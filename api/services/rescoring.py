@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections.abc import Callable
+
+import pandas as pd  # type: ignore[import-untyped]
+
+from api.core.logfire import get_logger
+from api.core.model_loader import get_model
+from api.domain.fraud_scoring import score_frame
+from api.repositories import transactions as transaction_repo
+from api.schemas import RescoreRequest, RescoreResponse
+from api.services.thresholds import current_threshold
+
+logger = get_logger(__name__)
+
+# Bounds of one POST /admin/rescore call, well inside the proxy read timeout;
+# the caller resumes from last_id.
+REQUEST_MAX_ROWS = 50_000
+REQUEST_MAX_SECONDS = 20.0
+
+
+class RateLimiter:
+    """Paces a batch loop so it averages at most ``rows_per_second``."""
+
+    def __init__(self, rows_per_second: float | None) -> None:
+        self.rows_per_second = rows_per_second
+        self._started = time.monotonic()
+        self._rows = 0
+
+    async def throttle(self, rows: int) -> None:
+        self._rows += rows
+        if self.rows_per_second is None:
+            return
+        expected_elapsed = self._rows / self.rows_per_second
+        delay = expected_elapsed - (time.monotonic() - self._started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def rescore_transactions(
+    request: RescoreRequest,
+    *,
+    checkpoint: Callable[[int], None] | None = None,
+    max_seconds: float | None = None,
+) -> RescoreResponse:
+    """
+    Rescore stored transactions with the current model, in id order.
+
+    Each batch is read with one keyset query, scored with one vectorized model
+    call and persisted with one bulk insert; no transaction stays open between
+    batches, and throttling only sleeps between them. ``checkpoint`` receives
+    the last rescored id after each batch, and passing it back as ``after_id``
+    resumes the run. The run also stops, not done, after the batch that
+    crosses ``max_seconds``.
+    """
+    model = get_model()
+    threshold = await current_threshold()
+    limiter = RateLimiter(request.rows_per_second)
+    started = time.monotonic()
+    processed = 0
+    batches = 0
+    last_id = request.after_id
+    done = False
+
+    while True:
+        limit = request.batch_size
+        if request.max_rows is not None:
+            limit = min(limit, request.max_rows - processed)
+        rows = await transaction_repo.fetch_transaction_feature_batch(
+            after_id=last_id, limit=limit
+        )
+        if rows:
+            batch_df = pd.DataFrame(
+                rows, columns=pd.Index(transaction_repo.TRANSACTION_FEATURE_COLUMNS)
+            )
+            transaction_ids = batch_df.pop("id")
+            fraud_probabilities, decisions = score_frame(
+                batch_df, model=model, threshold=threshold
+            )
+            await transaction_repo.bulk_insert_predictions(
+                transaction_ids=transaction_ids.tolist(),
+                fraud_probabilities=fraud_probabilities.tolist(),
+                decisions=decisions.tolist(),
+            )
+
+            processed += len(rows)
+            batches += 1
+            last_id = int(transaction_ids.iloc[-1])
+            if checkpoint is not None:
+                checkpoint(last_id)
+            logger.debug("Rescored %s transactions up to id=%s", processed, last_id)
+
+        if len(rows) < limit:
+            done = True
+            break
+        if request.max_rows is not None and processed >= request.max_rows:
+            break
+        if max_seconds is not None and time.monotonic() - started >= max_seconds:
+            break
+        await limiter.throttle(len(rows))
+
+    logger.info(
+        "Rescore run complete: processed=%s batches=%s last_id=%s done=%s",
+        processed,
+        batches,
+        last_id,
+        done,
+    )
+    return RescoreResponse(
+        processed=processed,
+        batches=batches,
+        last_id=last_id,
+        done=done,
+    )
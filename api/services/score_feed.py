@@ -0,0 +1,384 @@
+import asyncio
+from collections.abc import AsyncIterator, Iterable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import asyncpg
+from pydantic import TypeAdapter, ValidationError
+from tortoise import connections
+
+from api.core.logfire import get_logger
+from api.enums import MerchantCategory
+from api.schemas import ScoreEvent, ScoreFeedStats
+
+logger = get_logger(__name__)
+
+SCORE_EVENT_LIST_ADAPTER = TypeAdapter(list[ScoreEvent])
+DEFAULT_BUFFER_SIZE = 1_000
+# Publish calls waiting for NOTIFY; beyond this they are delivered locally.
+DEFAULT_NOTIFY_QUEUE_SIZE = 1_000
+# pg_notify rejects payloads of 8000 bytes or more.
+MAX_NOTIFY_PAYLOAD_BYTES = 7_500
+KEEPALIVE_SECONDS = 15.0
+LISTENER_RETRY_SECONDS = 5.0
+
+_DROPPED_EVENT = b'event: dropped\ndata: {"reason":"subscriber buffer overflow"}\n\n'
+_CLOSED_EVENT = b'event: closed\ndata: {"reason":"server shutting down"}\n\n'
+
+
+@dataclass(frozen=True)
+class ScoreEventFilter:
+    decision: int | None = None
+    min_probability: float | None = None
+    merchant_category: MerchantCategory | None = None
+
+    def matches(self, event: ScoreEvent) -> bool:
+        return (
+            (self.decision is None or event.decision == self.decision)
+            and (
+                self.min_probability is None
+                or event.fraud_probability >= self.min_probability
+            )
+            and (
+                self.merchant_category is None
+                or event.merchant_category == self.merchant_category
+            )
+        )
+
+
+class ScoreSubscription:
+    """
+    Bounded per-subscriber buffer. When it is full the subscriber is dropped:
+    a ``None`` sentinel is queued after the buffered events and nothing more is
+    delivered, so one slow client never holds up the others. ``close`` ends
+    the subscription the same way when the server shuts down.
+    """
+
+    def __init__(self, filters: ScoreEventFilter, *, max_buffer: int) -> None:
+        self.filters = filters
+        self.max_buffer = max_buffer
+        self.dropped = False
+        self.closed = False
+        # One extra slot so the drop sentinel always fits.
+        self._queue: asyncio.Queue[ScoreEvent | None] = asyncio.Queue(max_buffer + 1)
+
+    def offer(self, event: ScoreEvent) -> bool:
+        """Queue ``event``; returns False once the subscriber has been dropped."""
+        if self.dropped:
+            return False
+        if self._queue.qsize() >= self.max_buffer:
+            self.dropped = True
+            self._queue.put_nowait(None)
+            return False
+        self._queue.put_nowait(event)
+        return True
+
+    def close(self) -> None:
+        if self.dropped or self.closed:
+            return
+        self.closed = True
+        self._queue.put_nowait(None)
+
+    async def get(self) -> ScoreEvent | None:
+        return await self._queue.get()
+
+    def get_ready(self) -> list[ScoreEvent | None]:
+        ready: list[ScoreEvent | None] = []
+        while not self._queue.empty():
+            ready.append(self._queue.get_nowait())
+        return ready
+
+
+class ScoreBroadcaster:
+    """
+    In-process fan-out of score events to live subscribers.
+
+    With a NOTIFY channel set, ``publish`` queues events for a background
+    task that sends them through Postgres, and every worker, this one
+    included, delivers them from its listener. Writers never wait on the
+    round trip; when the queue is full or NOTIFY fails, events are delivered
+    locally instead. Without a channel events are delivered locally.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_buffer: int = DEFAULT_BUFFER_SIZE,
+        notify_queue_size: int = DEFAULT_NOTIFY_QUEUE_SIZE,
+    ) -> None:
+        self.max_buffer = max_buffer
+        self.notify_channel: str | None = None
+        self._subscribers: set[ScoreSubscription] = set()
+        self._closed = False
+        self._notify_queue: asyncio.Queue[list[ScoreEvent] | None] = asyncio.Queue(
+            notify_queue_size
+        )
+        self._notify_task: asyncio.Task[None] | None = None
+        self._published = 0
+        self._delivered = 0
+        self._dropped = 0
+        self._notify_overflows = 0
+
+    def start(self) -> None:
+        if self._notify_task is None:
+            self._notify_task = asyncio.create_task(self._send_notifications())
+
+    async def stop(self) -> None:
+        """Send what is still queued, then stop the NOTIFY task."""
+        if self._notify_task is None:
+            return
+        await self._notify_queue.put(None)
+        await self._notify_task
+        self._notify_task = None
+
+    @property
+    def active(self) -> bool:
+        """Whether published events can reach anyone at all."""
+        return bool(self._subscribers) or self.notify_channel is not None
+
+    def subscribe(self, filters: ScoreEventFilter) -> ScoreSubscription:
+        subscription = ScoreSubscription(filters, max_buffer=self.max_buffer)
+        if self._closed:
+            subscription.close()
+        else:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def close_subscriptions(self) -> None:
+        """
+        End every stream and any opened later, so open feeds do not hold up a
+        graceful shutdown. Call it when the worker starts draining.
+        """
+        self._closed = True
+        subscribers, self._subscribers = self._subscribers, set()
+        for subscription in subscribers:
+            subscription.close()
+        if subscribers:
+            logger.info("Closed %s score feed subscribers", len(subscribers))
+
+    def unsubscribe(self, subscription: ScoreSubscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def deliver(self, events: Iterable[ScoreEvent]) -> None:
+        for event in events:
+            for subscription in list(self._subscribers):
+                if not subscription.filters.matches(event):
+                    continue
+                if subscription.offer(event):
+                    self._delivered += 1
+                else:
+                    self._subscribers.discard(subscription)
+                    self._dropped += 1
+                    logger.warning("Dropped slow score feed subscriber")
+
+    async def publish(self, events: Sequence[ScoreEvent]) -> None:
+        """Publish ``events``; failures are logged, never raised to the writer."""
+        if not events or not self.active:
+            return
+        self._published += len(events)
+        if self.notify_channel is None or self._notify_task is None:
+            self.deliver(events)
+            return
+        try:
+            self._notify_queue.put_nowait(list(events))
+        except asyncio.QueueFull:
+            self._notify_overflows += 1
+            self.deliver(events)
+
+    async def _send_notifications(self) -> None:
+        """Send queued events, combining whatever queued up meanwhile."""
+        stopping = False
+        while not stopping:
+            first = await self._notify_queue.get()
+            if first is None:
+                break
+            events = first
+            while not self._notify_queue.empty():
+                queued = self._notify_queue.get_nowait()
+                if queued is None:
+                    stopping = True
+                    break
+                events.extend(queued)
+            await self._notify(events)
+
+    async def _notify(self, events: list[ScoreEvent]) -> None:
+        channel = self.notify_channel
+        if channel is None:
+            self.deliver(events)
+            return
+        try:
+            for payload in notify_payloads(events):
+                await connections.get("default").execute_query(
+                    "SELECT pg_notify($1, $2)", [channel, payload]
+                )
+        except Exception:
+            logger.exception("Score feed NOTIFY failed, delivering locally")
+            self.deliver(events)
+
+    def stats(self) -> ScoreFeedStats:
+        return ScoreFeedStats(
+            subscribers=len(self._subscribers),
+            published=self._published,
+            delivered=self._delivered,
+            dropped_subscribers=self._dropped,
+            notify_channel=self.notify_channel,
+            notify_queue_depth=self._notify_queue.qsize(),
+            notify_overflows=self._notify_overflows,
+        )
+
+
+def notify_payloads(events: Sequence[ScoreEvent]) -> list[str]:
+    """Pack events into JSON arrays that each fit in one NOTIFY payload."""
+    payloads: list[str] = []
+    batch: list[str] = []
+    size = 2
+    for event in events:
+        encoded = event.model_dump_json()
+        if batch and size + len(encoded) + 1 > MAX_NOTIFY_PAYLOAD_BYTES:
+            payloads.append(f"[{','.join(batch)}]")
+            batch, size = [], 2
+        batch.append(encoded)
+        size += len(encoded) + 1
+    if batch:
+        payloads.append(f"[{','.join(batch)}]")
+    return payloads
+
+
+class ScoreFeedListener:
+    """
+    Dedicated connection that LISTENs on the feed channel and hands every
+    notification to the local broadcaster. Reconnects after connection loss;
+    while disconnected, publishes from this worker are delivered locally.
+    """
+
+    def __init__(
+        self, broadcaster: ScoreBroadcaster, *, dsn: str, channel: str
+    ) -> None:
+        self.broadcaster = broadcaster
+        self.dsn = dsn
+        self.channel = channel
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def on_notify(
+        self, _connection: Any, _pid: int, _channel: str, payload: str
+    ) -> None:
+        try:
+            events = SCORE_EVENT_LIST_ADAPTER.validate_json(payload)
+        except ValidationError:
+            logger.exception("Ignoring malformed score feed notification")
+            return
+        self.broadcaster.deliver(events)
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self._listen()
+            except (OSError, asyncpg.PostgresError):
+                logger.exception("Score feed listener lost its connection")
+            if not self._stopping.is_set():
+                await _wait_first(self._stopping, timeout=LISTENER_RETRY_SECONDS)
+
+    async def _listen(self) -> None:
+        """LISTEN until stopped or the connection drops."""
+        lost = asyncio.Event()
+        connection = await asyncpg.connect(self.dsn)
+        try:
+            connection.add_termination_listener(lambda _: lost.set())
+            await connection.add_listener(self.channel, self.on_notify)
+            self.broadcaster.notify_channel = self.channel
+            logger.info("Score feed listening on %s", self.channel)
+            await _wait_first(self._stopping, lost)
+        finally:
+            self.broadcaster.notify_channel = None
+            await connection.close()
+
+
+async def _wait_first(*events: asyncio.Event, timeout: float | None = None) -> None:
+    waiters = [asyncio.ensure_future(event.wait()) for event in events]
+    try:
+        await asyncio.wait(
+            waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+
+
+async def stream_score_events(
+    broadcaster: ScoreBroadcaster, filters: ScoreEventFilter
+) -> AsyncIterator[bytes]:
+    """
+    Server-Sent Events for one subscriber. Events queued together are sent in
+    one chunk; a comment line keeps idle connections open.
+    """
+    subscription = broadcaster.subscribe(filters)
+    try:
+        yield b": connected\n\n"
+        while True:
+            try:
+                first = await asyncio.wait_for(subscription.get(), KEEPALIVE_SECONDS)
+            except TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            chunk = bytearray()
+            for event in [first, *subscription.get_ready()]:
+                if event is None:
+                    ended = _CLOSED_EVENT if subscription.closed else _DROPPED_EVENT
+                    yield bytes(chunk) + ended
+                    return
+                chunk += b"event: score\ndata: "
+                chunk += event.model_dump_json().encode()
+                chunk += b"\n\n"
+            yield bytes(chunk)
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+_broadcaster = ScoreBroadcaster()
+_listener: ScoreFeedListener | None = None
+
+
+def get_score_broadcaster() -> ScoreBroadcaster:
+    return _broadcaster
+
+
+async def publish_scores(events: Sequence[ScoreEvent]) -> None:
+    await _broadcaster.publish(events)
+
+
+def close_score_feeds() -> None:
+    _broadcaster.close_subscriptions()
+
+
+def start_score_feed(
+    *,
+    buffer_size: int,
+    notify_dsn: str | None = None,
+    channel: str = "score_events",
+) -> None:
+    global _broadcaster, _listener
+    _broadcaster = ScoreBroadcaster(max_buffer=buffer_size)
+    if notify_dsn is not None:
+        _broadcaster.start()
+        _listener = ScoreFeedListener(_broadcaster, dsn=notify_dsn, channel=channel)
+        _listener.start()
+
+
+async def stop_score_feed() -> None:
+    global _listener
+    await _broadcaster.stop()
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    await listener.stop()
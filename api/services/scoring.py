@@ -1,10 +1,24 @@
-from tortoise.transactions import in_transaction
+from datetime import UTC, datetime
 
-from api.core.exceptions import TransactionNotFoundError
+from api.core.exceptions import (
+    TransactionNotFoundError,
+    TransactionUpdateConflictError,
+)
+from api.core.logfire import get_logger
 from api.core.model_loader import get_model, get_threshold
 from api.domain.fraud_scoring import score_request
 from api.repositories import transactions as transaction_repo
-from api.schemas import ScoreRequest, ScoreResponse, TransactionUpdate
+from api.schemas import ScoreEvent, ScoreRequest, ScoreResponse, TransactionUpdate
+from api.services.cascade import prescreen_payload
+from api.services.drift import observe_score
+from api.services.prediction_writer import PendingPrediction, get_prediction_writer
+from api.services.score_feed import publish_scores
+from api.services.shadow_scoring import submit_shadow
+from api.services.thresholds import current_threshold
+
+logger = get_logger(__name__)
+
+UPDATE_MAX_ATTEMPTS = 5
 
 
 def score_payload(
@@ -12,55 +26,98 @@ def score_payload(
     *,
     model=None,
     threshold: float | None = None,
-) -> tuple[float, int, float]:
-    scoring_model = model or get_model()
+) -> tuple[float, int, float, bool]:
+    """
+    Probability, decision and threshold of ``payload``, and whether the
+    cascade pre-screen decided it instead of the full model.
+    """
     scoring_threshold = threshold if threshold is not None else get_threshold()
+    if model is None:
+        screened = prescreen_payload(payload, threshold=scoring_threshold)
+        if screened is not None:
+            return *screened, scoring_threshold, True
+    scoring_model = model or get_model()
     fraud_probability, decision = score_request(
         payload, model=scoring_model, threshold=scoring_threshold
     )
-    return fraud_probability, decision, scoring_threshold
+    return fraud_probability, decision, scoring_threshold, False
 
 
 async def create_or_score_transaction(payload: ScoreRequest) -> ScoreResponse:
-    fraud_probability, decision, threshold = score_payload(payload)
-    payload_data = payload.model_dump()
-    create_defaults = payload_data.copy()
-    create_defaults.pop("transaction_id", None)
-
-    async with in_transaction() as connection:
-        transaction, _ = await transaction_repo.get_or_create_transaction(
-            transaction_id=payload.transaction_id,
-            defaults=create_defaults,
-            connection=connection,
-        )
+    fraud_probability, decision, threshold, prescreened = score_payload(
+        payload, threshold=await current_threshold()
+    )
+    scored_at = datetime.now(UTC)
 
-        prediction = await transaction_repo.create_prediction(
-            transaction=transaction,
+    writer = get_prediction_writer()
+    if writer is not None:
+        await writer.enqueue(
+            PendingPrediction(
+                fields=payload.model_dump(),
+                fraud_probability=fraud_probability,
+                decision=decision,
+                prescreened=prescreened,
+                scored_at=scored_at,
+            )
+        )
+    else:
+        scored = await transaction_repo.create_or_score_transaction_row(
+            fields=payload.model_dump(),
             fraud_probability=fraud_probability,
             decision=decision,
-            connection=connection,
+            prescreened=prescreened,
+            scored_at=scored_at,
         )
+        scored_at = scored["scored_at"]
 
+    observe_score(payload, fraud_probability, prescreened=prescreened)
+    submit_shadow(
+        payload,
+        champion_probability=fraud_probability,
+        champion_decision=decision,
+        threshold=threshold,
+        scored_at=scored_at,
+    )
+    await publish_scores(
+        [
+            ScoreEvent(
+                transaction_id=payload.transaction_id,
+                fraud_probability=fraud_probability,
+                decision=decision,
+                merchant_category=payload.merchant_category,
+                amount=payload.amount,
+                scored_at=scored_at,
+                source="create",
+            )
+        ]
+    )
     return ScoreResponse(
         transaction_id=payload.transaction_id,
         fraud_probability=fraud_probability,
         decision=decision,
         threshold=threshold,
-        scored_at=prediction.scored_at,
+        scored_at=scored_at,
     )
 
 
 async def update_and_rescore_transaction(
     transaction_id: str,
     payload: TransactionUpdate,
+    *,
+    max_attempts: int = UPDATE_MAX_ATTEMPTS,
 ) -> ScoreResponse:
+    """
+    Apply ``payload`` and record a fresh prediction, without holding a lock
+    while the model runs.
+
+    The transaction is read without a lock and scored, then written only if
+    its ``version`` is unchanged. A concurrent write makes the attempt start
+    over from a fresh read; after ``max_attempts`` the update is rejected.
+    """
     update_data = payload.model_dump(exclude_none=True)
 
-    async with in_transaction() as connection:
-        tx = await transaction_repo.get_transaction_for_update(
-            transaction_id,
-            connection=connection,
-        )
+    for attempt in range(1, max_attempts + 1):
+        tx = await transaction_repo.get_transaction(transaction_id)
         if tx is None:
             raise TransactionNotFoundError(transaction_id)
 
@@ -85,25 +142,54 @@ async def update_and_rescore_transaction(
             ),
             cardholder_age=update_data.get("cardholder_age", tx.cardholder_age),
         )
-        fraud_probability, decision, threshold = score_payload(score_payload_data)
-
-        await transaction_repo.update_transaction_fields(
-            tx,
-            fields=update_data,
-            connection=connection,
+        fraud_probability, decision, threshold, prescreened = score_payload(
+            score_payload_data, threshold=await current_threshold()
         )
 
-        prediction = await transaction_repo.create_prediction(
-            transaction=tx,
+        scored_at = await transaction_repo.rescore_transaction_if_version(
+            transaction_pk=tx.pk,
+            version=tx.version,
+            fields=update_data,
             fraud_probability=fraud_probability,
             decision=decision,
-            connection=connection,
+            prescreened=prescreened,
         )
+        if scored_at is not None:
+            break
+        logger.info(
+            "Transaction %s changed while rescoring (attempt %s/%s)",
+            transaction_id,
+            attempt,
+            max_attempts,
+        )
+    else:
+        raise TransactionUpdateConflictError(transaction_id)
 
+    observe_score(score_payload_data, fraud_probability, prescreened=prescreened)
+    submit_shadow(
+        score_payload_data,
+        champion_probability=fraud_probability,
+        champion_decision=decision,
+        threshold=threshold,
+        scored_at=scored_at,
+    )
+    await publish_scores(
+        [
+            ScoreEvent(
+                transaction_id=transaction_id,
+                fraud_probability=fraud_probability,
+                decision=decision,
+                merchant_category=score_payload_data.merchant_category,
+                amount=score_payload_data.amount,
+                scored_at=scored_at,
+                source="update",
+            )
+        ]
+    )
     return ScoreResponse(
         transaction_id=transaction_id,
         fraud_probability=fraud_probability,
         decision=decision,
         threshold=threshold,
-        scored_at=prediction.scored_at,
+        scored_at=scored_at,
     )
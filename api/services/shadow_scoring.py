@@ -0,0 +1,250 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+import pandas as pd  # type: ignore[import-untyped]
+
+from api.core.logfire import get_logger
+from api.domain.fraud_scoring import FEATURE_COLUMNS, predict_probabilities
+from api.repositories import shadow as shadow_repo
+from api.repositories.shadow import ShadowPredictionRow
+from api.schemas import ScoreRequest, ShadowModelReport, ShadowScoringStats
+
+logger = get_logger(__name__)
+
+_scorer: "ShadowScorer | None" = None
+
+
+@dataclass(frozen=True)
+class ShadowItem:
+    transaction_id: str
+    features: dict[str, Any]
+    champion_probability: float
+    champion_decision: int
+    threshold: float
+    scored_at: datetime
+
+
+def score_shadow_batch(
+    bundles: dict[str, dict[str, Any]], batch: list[ShadowItem]
+) -> tuple[list[ShadowPredictionRow], list[str]]:
+    """
+    Score one batch with every challenger, one model call each. A challenger
+    decides at its bundle's threshold, or at the champion's when it has none.
+    Returns the rows to store and the names of challengers that failed.
+    """
+    features_df = pd.DataFrame(
+        [item.features for item in batch], columns=pd.Index(FEATURE_COLUMNS)
+    )
+    champion_thresholds = np.array([item.threshold for item in batch])
+    rows: list[ShadowPredictionRow] = []
+    failed: list[str] = []
+    for name, bundle in bundles.items():
+        try:
+            probabilities = predict_probabilities(bundle["model"], features_df)
+        except Exception:
+            logger.exception("Shadow model %s failed to score a batch", name)
+            failed.append(name)
+            continue
+        thresholds = (
+            float(bundle["threshold"]) if "threshold" in bundle else champion_thresholds
+        )
+        decisions = (probabilities >= thresholds).astype(np.int64)
+        rows.extend(
+            ShadowPredictionRow(
+                transaction_id=item.transaction_id,
+                model_name=name,
+                fraud_probability=float(probability),
+                decision=int(decision),
+                champion_probability=item.champion_probability,
+                champion_decision=item.champion_decision,
+                scored_at=item.scored_at,
+            )
+            for item, probability, decision in zip(
+                batch, probabilities, decisions, strict=True
+            )
+        )
+    return rows, failed
+
+
+class ShadowScorer:
+    """
+    Scores live transactions with challenger models off the response path.
+
+    ``submit`` never waits: when the bounded queue is full the item is dropped
+    and counted, so shadow scoring cannot slow down requests. A background
+    task takes up to ``batch_size`` items every ``flush_interval_ms``, scores
+    them with each challenger in a single worker thread and stores the scores
+    with one insert.
+    """
+
+    def __init__(
+        self,
+        bundles: dict[str, dict[str, Any]],
+        *,
+        max_size: int,
+        flush_interval_ms: int,
+        batch_size: int,
+    ) -> None:
+        self.bundles = bundles
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self._queue: asyncio.Queue[ShadowItem] = asyncio.Queue(max_size)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="shadow-scoring"
+        )
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._enqueued = 0
+        self._dropped = 0
+        self._scored = 0
+        self._failed = 0
+        self._batches = 0
+        self._last_batch_ms: float | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self._drain()
+        self._executor.shutdown(wait=True)
+
+    def submit(self, item: ShadowItem) -> bool:
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self._dropped += 1
+            return False
+        self._enqueued += 1
+        return True
+
+    def stats(self) -> ShadowScoringStats:
+        return ShadowScoringStats(
+            enabled=True,
+            models=list(self.bundles),
+            queue_depth=self._queue.qsize(),
+            enqueued=self._enqueued,
+            dropped=self._dropped,
+            scored=self._scored,
+            failed=self._failed,
+            batches=self._batches,
+            last_batch_ms=self._last_batch_ms,
+        )
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except TimeoutError:
+                await self._drain()
+
+    async def _drain(self) -> None:
+        while not self._queue.empty():
+            batch: list[ShadowItem] = []
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._process(batch)
+
+    async def _process(self, batch: list[ShadowItem]) -> None:
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            rows, failed = await loop.run_in_executor(
+                self._executor, score_shadow_batch, self.bundles, batch
+            )
+            await shadow_repo.bulk_insert_shadow_predictions(rows)
+        except Exception:
+            logger.exception("Shadow scoring of %s transactions failed", len(batch))
+            self._failed += len(batch) * len(self.bundles)
+            return
+        self._scored += len(rows)
+        self._failed += len(batch) * len(failed)
+        self._batches += 1
+        self._last_batch_ms = (time.perf_counter() - started) * 1000
+
+
+def get_shadow_scorer() -> ShadowScorer | None:
+    return _scorer
+
+
+def submit_shadow(
+    payload: ScoreRequest,
+    *,
+    champion_probability: float,
+    champion_decision: int,
+    threshold: float,
+    scored_at: datetime,
+) -> None:
+    """Queue ``payload`` for the challengers; a no-op when none are loaded."""
+    if _scorer is None:
+        return
+    _scorer.submit(
+        ShadowItem(
+            transaction_id=payload.transaction_id,
+            features=payload.model_dump(exclude={"transaction_id"}),
+            champion_probability=champion_probability,
+            champion_decision=champion_decision,
+            threshold=threshold,
+            scored_at=scored_at,
+        )
+    )
+
+
+def start_shadow_scorer(
+    bundles: dict[str, dict[str, Any]],
+    *,
+    max_size: int,
+    flush_interval_ms: int,
+    batch_size: int,
+) -> ShadowScorer:
+    global _scorer
+    _scorer = ShadowScorer(
+        bundles,
+        max_size=max_size,
+        flush_interval_ms=flush_interval_ms,
+        batch_size=batch_size,
+    )
+    _scorer.start()
+    return _scorer
+
+
+async def stop_shadow_scorer() -> None:
+    global _scorer
+    if _scorer is None:
+        return
+    scorer, _scorer = _scorer, None
+    await scorer.stop()
+    logger.info("Shadow scoring queue drained: %s", scorer.stats().model_dump())
+
+
+async def shadow_report(
+    *,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[ShadowModelReport]:
+    rows = await shadow_repo.shadow_report(start=start, end=end)
+    return [
+        ShadowModelReport(
+            model_name=row["model_name"],
+            prediction_count=row["prediction_count"],
+            agreement_rate=row["agreements"] / row["prediction_count"],
+            both_flagged=row["both_flagged"],
+            shadow_only_flagged=row["shadow_only_flagged"],
+            champion_only_flagged=row["champion_only_flagged"],
+            mean_delta=row["mean_delta"],
+            mean_abs_delta=row["mean_abs_delta"],
+            p95_abs_delta=row["p95_abs_delta"],
+            max_abs_delta=row["max_abs_delta"],
+            correlation=row["correlation"],
+        )
+        for row in rows
+    ]
@@ -0,0 +1,313 @@
+import asyncio
+import io
+import mmap
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd  # type: ignore[import-untyped]
+
+from api.core.exceptions import InvalidCSVError
+from api.core.logfire import get_logger
+from api.core.model_loader import get_model, get_model_bundle
+from api.domain.fraud_scoring import FEATURE_COLUMNS
+from api.schemas import TransactionImportError, TransactionImportResponse
+from api.services.csv_import import (
+    DEFAULT_BLOCK_SIZE,
+    iter_csv_blocks,
+    parse_transaction_block,
+    persist_scored_rows,
+    read_csv_header,
+    score_transactions,
+)
+from api.services.thresholds import current_threshold
+
+logger = get_logger(__name__)
+
+DEFAULT_SHARD_BYTES = 32 * 1024 * 1024
+DEFAULT_WRITE_BATCH_SIZE = 5_000
+
+
+@dataclass(frozen=True)
+class Shard:
+    """Byte range ``[start, end)`` of the CSV body; both ends sit on line starts."""
+
+    start: int
+    end: int
+
+
+@dataclass
+class ShardResult:
+    """
+    Parsed and scored rows of one shard, in file order.
+
+    Line numbers are zero-based record indexes within the shard; the parent
+    shifts them once the rows of the preceding shards are counted.
+    """
+
+    transactions: pd.DataFrame
+    line_numbers: np.ndarray
+    fraud_probabilities: np.ndarray
+    decisions: np.ndarray
+    errors: list[TransactionImportError] = field(default_factory=list)
+    total_rows: int = 0
+    skipped_invalid: int = 0
+    skipped_scoring_errors: int = 0
+    parse_seconds: float = 0.0
+    score_seconds: float = 0.0
+
+
+@dataclass
+class ImportStageStats:
+    """
+    Per-stage timings of a sharded import.
+
+    Parse and score seconds are summed over workers, so their rates are per
+    core; ``wall_seconds`` covers the whole pipeline.
+    """
+
+    rows: int = 0
+    parse_seconds: float = 0.0
+    score_seconds: float = 0.0
+    write_seconds: float = 0.0
+    wall_seconds: float = 0.0
+
+    def rows_per_second(self, seconds: float) -> float:
+        return self.rows / seconds if seconds > 0 else 0.0
+
+
+def plan_shards(
+    path: Path,
+    *,
+    shard_bytes: int = DEFAULT_SHARD_BYTES,
+) -> tuple[list[str], list[Shard]]:
+    """
+    Read and check the header, then split the rest of the file into
+    line-aligned shards.
+
+    Only the bytes around each boundary are touched through the mmap, so
+    planning is cheap even for files far larger than memory. Records must not
+    contain embedded newlines.
+    """
+    if shard_bytes < 1:
+        msg = "shard_bytes must be positive"
+        raise ValueError(msg)
+
+    with path.open("rb") as csv_file:
+        size = os.fstat(csv_file.fileno()).st_size
+        if size == 0:
+            msg = "CSV header is missing"
+            raise InvalidCSVError(msg)
+        with mmap.mmap(csv_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            newline = mapped.find(b"\n")
+            header_end = size if newline == -1 else newline + 1
+            fieldnames = read_csv_header(
+                io.StringIO(mapped[:header_end].decode("utf-8-sig"))
+            )
+
+            shards = []
+            start = header_end
+            while start < size:
+                newline = mapped.find(b"\n", min(start + shard_bytes, size) - 1)
+                end = size if newline == -1 else newline + 1
+                shards.append(Shard(start=start, end=end))
+                start = end
+    return fieldnames, shards
+
+
+def process_shard(
+    path: str,
+    shard: Shard,
+    fieldnames: list[str],
+    max_error_details: int,
+    threshold: float,
+) -> ShardResult:
+    """Parse, validate and score one shard. Runs inside a worker process."""
+    parse_started = time.perf_counter()
+    with (
+        Path(path).open("rb") as csv_file,
+        mmap.mmap(csv_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped,
+    ):
+        shard_bytes = io.BytesIO(mapped[shard.start : shard.end])
+    blocks = []
+    errors: list[TransactionImportError] = []
+    total_rows = 0
+    for first_line, chunk in iter_csv_blocks(
+        shard_bytes, fieldnames, block_size=DEFAULT_BLOCK_SIZE, first_line=0
+    ):
+        block = parse_transaction_block(
+            chunk,
+            first_line=first_line,
+            max_error_details=max_error_details - len(errors),
+        )
+        blocks.append(block)
+        errors.extend(block.errors)
+        total_rows += block.total_rows
+
+    if blocks:
+        transactions = pd.concat(
+            [block.transactions for block in blocks], ignore_index=True
+        )
+        line_numbers = np.concatenate([block.line_numbers for block in blocks])
+    else:
+        transactions = pd.DataFrame(
+            columns=pd.Index(["transaction_id", *FEATURE_COLUMNS])
+        )
+        line_numbers = np.zeros(0, dtype=np.int64)
+    parse_seconds = time.perf_counter() - parse_started
+
+    model = get_model()
+    score_started = time.perf_counter()
+    fraud_probabilities = np.zeros(0, dtype=np.float64)
+    decisions = np.zeros(0, dtype=np.int64)
+    failures: dict[int, Exception] = {}
+    if len(transactions):
+        fraud_probabilities, decisions, failures = score_transactions(
+            transactions.loc[:, list(FEATURE_COLUMNS)],
+            model=model,
+            threshold=threshold,
+        )
+    scoring_errors = [
+        TransactionImportError(
+            line=int(line_numbers[index]),
+            transaction_id=transactions.at[index, "transaction_id"],
+            error=f"Scoring failed: {exc}",
+        )
+        for index, exc in list(failures.items())[:max_error_details]
+    ]
+    scored = np.ones(len(transactions), dtype=bool)
+    scored[list(failures)] = False
+    score_seconds = time.perf_counter() - score_started
+
+    return ShardResult(
+        transactions=transactions.loc[scored].reset_index(drop=True),
+        line_numbers=line_numbers[scored],
+        fraud_probabilities=fraud_probabilities[scored],
+        decisions=decisions[scored],
+        errors=sorted(errors + scoring_errors, key=lambda error: error.line)[
+            :max_error_details
+        ],
+        total_rows=total_rows,
+        skipped_invalid=total_rows - len(transactions),
+        skipped_scoring_errors=len(failures),
+        parse_seconds=parse_seconds,
+        score_seconds=score_seconds,
+    )
+
+
+async def import_csv_file_sharded(
+    path: Path,
+    *,
+    workers: int | None = None,
+    shard_bytes: int = DEFAULT_SHARD_BYTES,
+    batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+    max_error_details: int = 50,
+    executor: Executor | None = None,
+) -> tuple[TransactionImportResponse, ImportStageStats]:
+    """
+    Import a local CSV file with a pool of worker processes.
+
+    Workers parse, validate and score shards in parallel while this process
+    persists finished shards strictly in file order, in bulk batches. Because
+    a ``transaction_id`` is only inserted when it is not stored yet, the first
+    occurrence in the file wins even when duplicates span shards. At most two
+    shards per worker are in flight, which bounds memory.
+    """
+    started = time.perf_counter()
+    fieldnames, shards = plan_shards(path, shard_bytes=shard_bytes)
+
+    workers = workers or os.cpu_count() or 1
+    # Resolved once here, because worker processes have no database connection.
+    threshold = await current_threshold()
+    pool = executor or ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=get_model_bundle,
+    )
+    loop = asyncio.get_running_loop()
+    remaining = iter(shards)
+    in_flight: deque[asyncio.Future[ShardResult]] = deque()
+
+    def submit_next() -> None:
+        shard = next(remaining, None)
+        if shard is not None:
+            in_flight.append(
+                loop.run_in_executor(
+                    pool,
+                    process_shard,
+                    str(path),
+                    shard,
+                    fieldnames,
+                    max_error_details,
+                    threshold,
+                )
+            )
+
+    stats = ImportStageStats()
+    errors: list[TransactionImportError] = []
+    rows_before = 0
+    imported = 0
+    skipped_duplicates = 0
+    skipped_invalid = 0
+    skipped_scoring_errors = 0
+
+    try:
+        for _ in range(workers * 2):
+            submit_next()
+        while in_flight:
+            result = await in_flight.popleft()
+            submit_next()
+
+            first_line = rows_before + 2
+            rows_before += result.total_rows
+            skipped_invalid += result.skipped_invalid
+            skipped_scoring_errors += result.skipped_scoring_errors
+            stats.parse_seconds += result.parse_seconds
+            stats.score_seconds += result.score_seconds
+            errors.extend(
+                error.model_copy(update={"line": first_line + error.line})
+                for error in result.errors[: max_error_details - len(errors)]
+            )
+
+            write_started = time.perf_counter()
+            for offset in range(0, len(result.transactions), batch_size):
+                batch = slice(offset, offset + batch_size)
+                batch_imported, batch_duplicates = await persist_scored_rows(
+                    result.transactions.iloc[batch].to_dict("records"),
+                    fraud_probabilities=result.fraud_probabilities[batch].tolist(),
+                    decisions=result.decisions[batch].tolist(),
+                )
+                imported += batch_imported
+                skipped_duplicates += batch_duplicates
+            stats.write_seconds += time.perf_counter() - write_started
+            logger.debug("Imported %s rows so far", imported)
+    finally:
+        for pending in in_flight:
+            pending.cancel()
+        if executor is None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    stats.rows = rows_before
+    stats.wall_seconds = time.perf_counter() - started
+    summary = TransactionImportResponse(
+        total_rows=rows_before,
+        imported=imported,
+        skipped_duplicates=skipped_duplicates,
+        skipped_invalid=skipped_invalid,
+        skipped_scoring_errors=skipped_scoring_errors,
+        errors=errors,
+    )
+    logger.info(
+        "Sharded CSV import complete: total=%s imported=%s duplicates=%s invalid=%s scoring_errors=%s",
+        summary.total_rows,
+        summary.imported,
+        summary.skipped_duplicates,
+        summary.skipped_invalid,
+        summary.skipped_scoring_errors,
+    )
+    return summary, stats
@@ -0,0 +1,211 @@
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+from api.core.exceptions import ThresholdVersionNotFoundError
+from api.core.logfire import get_logger
+from api.core.model_loader import get_threshold
+from api.domain.evaluation import flagged_at
+from api.models import ThresholdVersion
+from api.repositories import thresholds as threshold_repo
+from api.schemas import (
+    RedecideRequest,
+    RedecideResponse,
+    ThresholdCandidate,
+    ThresholdVersionCreate,
+    ThresholdVersionList,
+    ThresholdVersionRead,
+    ThresholdWhatIf,
+)
+
+logger = get_logger(__name__)
+
+# How long a worker keeps using a threshold before checking for a newer version.
+ACTIVE_THRESHOLD_TTL_SECONDS = 30.0
+WHAT_IF_BINS = 10_000
+
+
+@dataclass(frozen=True)
+class ActiveThreshold:
+    threshold: float
+    version: int | None
+
+
+_active: ActiveThreshold | None = None
+_active_loaded_at = 0.0
+
+
+def _from_version(version: ThresholdVersion | None) -> ActiveThreshold:
+    """The latest version wins; without any, the model bundle's threshold."""
+    if version is None:
+        return ActiveThreshold(threshold=get_threshold(), version=None)
+    return ActiveThreshold(threshold=version.threshold, version=version.id)
+
+
+def _cache(active: ActiveThreshold) -> ActiveThreshold:
+    global _active, _active_loaded_at
+    _active = active
+    _active_loaded_at = time.monotonic()
+    return active
+
+
+def forget_active_threshold() -> None:
+    """Drop the cached threshold, so the next score looks it up again."""
+    global _active
+    _active = None
+
+
+async def get_active_threshold() -> ActiveThreshold:
+    """
+    Threshold new scores are decided with, cached per worker for
+    ``ACTIVE_THRESHOLD_TTL_SECONDS``. If the lookup fails the previous value,
+    or the model bundle's threshold, is used until the next attempt.
+    """
+    if (
+        _active is not None
+        and time.monotonic() - _active_loaded_at < ACTIVE_THRESHOLD_TTL_SECONDS
+    ):
+        return _active
+    try:
+        version = await threshold_repo.latest_threshold_version()
+    except Exception:
+        logger.exception("Could not load the active threshold version")
+        return _cache(_active or _from_version(None))
+    return _cache(_from_version(version))
+
+
+async def current_threshold() -> float:
+    return (await get_active_threshold()).threshold
+
+
+async def list_threshold_versions(*, limit: int) -> ThresholdVersionList:
+    versions = await threshold_repo.list_threshold_versions(limit=limit)
+    active = _cache(_from_version(versions[0] if versions else None))
+    return ThresholdVersionList(
+        active_threshold=active.threshold,
+        active_version=active.version,
+        versions=[
+            ThresholdVersionRead.model_validate(version, from_attributes=True)
+            for version in versions
+        ],
+    )
+
+
+async def create_threshold_version(
+    payload: ThresholdVersionCreate,
+) -> ThresholdVersionRead:
+    version = await threshold_repo.create_threshold_version(
+        threshold=payload.threshold, note=payload.note
+    )
+    _cache(_from_version(version))
+    logger.info(
+        "Threshold version %s activated threshold=%s", version.id, version.threshold
+    )
+    return ThresholdVersionRead.model_validate(version, from_attributes=True)
+
+
+async def redecide_predictions(request: RedecideRequest) -> RedecideResponse:
+    """
+    Re-decide stored predictions at a threshold version, in id order, from
+    their stored probabilities. The model is not run.
+
+    Each batch is one set-based UPDATE that only writes the rows whose decision
+    flips. Pre-screened predictions are counted but left alone. Passing
+    ``last_id`` back as ``after_id`` resumes the run.
+    """
+    if request.threshold_version is None:
+        target = _from_version(await threshold_repo.latest_threshold_version())
+    else:
+        version = await threshold_repo.get_threshold_version(request.threshold_version)
+        if version is None:
+            raise ThresholdVersionNotFoundError(request.threshold_version)
+        target = _from_version(version)
+
+    scanned = 0
+    prescreened = 0
+    changed = 0
+    batches = 0
+    last_id = request.after_id
+    while request.max_rows is None or scanned < request.max_rows:
+        batch_size = request.batch_size
+        if request.max_rows is not None:
+            batch_size = min(batch_size, request.max_rows - scanned)
+        batch = await threshold_repo.redecide_prediction_batch(
+            threshold=target.threshold, after_id=last_id, batch_size=batch_size
+        )
+        if batch["last_id"] is None:
+            break
+        scanned += batch["scanned"]
+        prescreened += batch["prescreened"]
+        changed += batch["changed"]
+        batches += 1
+        last_id = batch["last_id"]
+        logger.debug("Re-decided %s predictions up to id=%s", scanned, last_id)
+        if batch["scanned"] < batch_size:
+            break
+
+    done = request.max_rows is None or scanned < request.max_rows
+    logger.info(
+        "Re-decide run complete: threshold=%s scanned=%s prescreened=%s changed=%s "
+        "last_id=%s done=%s",
+        target.threshold,
+        scanned,
+        prescreened,
+        changed,
+        last_id,
+        done,
+    )
+    return RedecideResponse(
+        threshold=target.threshold,
+        threshold_version=target.version,
+        scanned=scanned,
+        prescreened=prescreened,
+        changed=changed,
+        batches=batches,
+        last_id=last_id,
+        done=done,
+    )
+
+
+async def threshold_what_if(
+    thresholds: Sequence[float],
+    *,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> ThresholdWhatIf:
+    """
+    Flagged counts at each candidate threshold, from one histogram query over
+    the stored probabilities of model-scored predictions. Exact for
+    thresholds on the ``1 / WHAT_IF_BINS`` grid.
+    """
+    rows = await threshold_repo.probability_histogram(
+        bins=WHAT_IF_BINS, start=start, end=end
+    )
+    counts = np.zeros(WHAT_IF_BINS, dtype=np.int64)
+    for row in rows:
+        counts[row["bucket"]] = row["predictions"]
+    total = int(counts.sum())
+    flagged_now = sum(row["flagged"] for row in rows)
+    prescreened = sum(row["prescreened"] for row in rows)
+    active = await get_active_threshold()
+    return ThresholdWhatIf(
+        prediction_count=total,
+        flagged_count=flagged_now,
+        prescreened_count=prescreened,
+        active_threshold=active.threshold,
+        resolution=1 / WHAT_IF_BINS,
+        candidates=[
+            ThresholdCandidate(
+                threshold=threshold,
+                flagged_count=flagged,
+                flag_rate=flagged / total if total else 0.0,
+                change=flagged - flagged_now,
+            )
+            for threshold, flagged in zip(
+                thresholds, flagged_at(counts, thresholds), strict=True
+            )
+        ],
+    )
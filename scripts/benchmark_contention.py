@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from collections.abc import Awaitable, Callable
+
+from tortoise.transactions import in_transaction
+
+from api.config import settings
+from api.core.exceptions import TransactionUpdateConflictError
+from api.database import close_db, init_db
+from api.enums import MerchantCategory
+from api.models import Transaction
+from api.repositories import transactions as transaction_repo
+from api.schemas import ScoreRequest, TransactionUpdate
+from api.services.scoring import score_payload, update_and_rescore_transaction
+from api.services.thresholds import current_threshold
+
+PREFIX = "bench_contention_"
+
+
+async def _locked_update(transaction_id: str, payload: TransactionUpdate) -> None:
+    """The previous flow: row lock held across scoring, for comparison."""
+    async with in_transaction() as connection:
+        tx = await (
+            Transaction.filter(transaction_id=transaction_id)
+            .using_db(connection)
+            .select_for_update()
+            .get()
+        )
+        for field_name, value in payload.model_dump(exclude_none=True).items():
+            setattr(tx, field_name, value)
+        tx.version += 1
+        request = ScoreRequest.model_validate(tx, from_attributes=True)
+        fraud_probability, decision, *_ = score_payload(
+            request, threshold=await current_threshold()
+        )
+        await tx.save(using_db=connection)
+        await transaction_repo.create_prediction(
+            transaction=tx,
+            fraud_probability=fraud_probability,
+            decision=decision,
+            connection=connection,
+        )
+
+
+async def _optimistic_update(transaction_id: str, payload: TransactionUpdate) -> None:
+    await update_and_rescore_transaction(transaction_id, payload)
+
+
+async def _seed(hot_ids: int) -> list[str]:
+    await Transaction.filter(transaction_id__startswith=PREFIX).delete()
+    ids = [f"{PREFIX}{index}" for index in range(hot_ids)]
+    await transaction_repo.upsert_transactions(
+        [
+            {
+                "transaction_id": transaction_id,
+                "amount": 100.0,
+                "transaction_hour": 12,
+                "merchant_category": MerchantCategory.TRAVEL,
+                "foreign_transaction": False,
+                "location_mismatch": False,
+                "device_trust_score": 70,
+                "velocity_last_24h": 3,
+                "cardholder_age": 40,
+            }
+            for transaction_id in ids
+        ]
+    )
+    return ids
+
+
+async def _run(
+    update: Callable[[str, TransactionUpdate], Awaitable[None]],
+    ids: list[str],
+    *,
+    requests: int,
+    concurrency: int,
+) -> dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    failures = 0
+
+    async def one(index: int) -> None:
+        nonlocal failures
+        payload = TransactionUpdate(amount=100.0 + index)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await update(ids[index % len(ids)], payload)
+            except TransactionUpdateConflictError:
+                failures += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    elapsed = time.perf_counter() - started
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "per_second": requests / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "failures": failures,
+    }
+
+
+async def benchmark(
+    *, hot_ids: int, requests: int, concurrency: int
+) -> dict[str, dict[str, float]]:
+    await init_db(settings.DATABASE_URI, generate_schemas=False)
+    try:
+        ids = await _seed(hot_ids)
+        results = {}
+        for name, update in (
+            ("row lock", _locked_update),
+            ("optimistic", _optimistic_update),
+        ):
+            results[name] = await _run(
+                update, ids, requests=requests, concurrency=concurrency
+            )
+        await Transaction.filter(transaction_id__startswith=PREFIX).delete()
+    finally:
+        await close_db()
+    return results
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare concurrent PUT-style updates on a few hot transactions "
+            "with a row lock and with version checks, against DATABASE_URI."
+        )
+    )
+    parser.add_argument("--hot-ids", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    args = _parse_args()
+    results = asyncio.run(
+        benchmark(
+            hot_ids=args.hot_ids, requests=args.requests, concurrency=args.concurrency
+        )
+    )
+    lines = [
+        f"{args.requests} updates on {args.hot_ids} hot ids, "
+        f"{args.concurrency} at a time",
+        "",
+        f"{'flow':<12}{'updates/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'409s':>8}",
+    ]
+    lines += [
+        f"{name:<12}{result['per_second']:>12,.0f}{result['p50_ms']:>10.1f}"
+        f"{result['p99_ms']:>10.1f}{result['failures']:>8.0f}"
+        for name, result in results.items()
+    ]
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from api.core.model_loader import get_model
+from api.domain.explanations import linear_explainer
+from api.services.csv_import import read_feature_frame
+from api.services.explanations import explain_feature_rows
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CSV_PATH = REPO_ROOT / "resources" / "credit_card_fraud_10k.csv"
+BATCH_SIZES = (1, 100, 10_000)
+MIN_SECONDS = 1.0
+
+
+def _feature_rows() -> list[dict[str, Any]]:
+    with CSV_PATH.open("r", encoding="utf-8-sig", newline="") as source:
+        rows = read_feature_frame(source).to_dict("records")
+    for index, row in enumerate(rows):
+        row["id"] = index
+    return rows
+
+
+def _per_second(explain: Callable[[list[dict[str, Any]]], Any], batch: list) -> float:
+    explained = 0
+    started = time.perf_counter()
+    while (elapsed := time.perf_counter() - started) < MIN_SECONDS:
+        explain(batch)
+        explained += len(batch)
+    return explained / elapsed
+
+
+def main() -> None:
+    explainer = linear_explainer(get_model())
+    rows = _feature_rows()
+
+    def stored(batch: list[dict[str, Any]]) -> Any:
+        return explain_feature_rows(explainer, batch, model_version="benchmark")
+
+    lines = [f"{explainer.method} explainer, {len(rows)} rows available", ""]
+    lines.append(f"{'batch size':>10}{'explanations/s':>18}{'one at a time/s':>18}")
+    for batch_size in BATCH_SIZES:
+        batch = rows[:batch_size]
+        batched = _per_second(stored, batch)
+        single = _per_second(lambda batch: [stored([row]) for row in batch], batch)
+        lines.append(f"{batch_size:>10}{batched:>18,.0f}{single:>18,.0f}")
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import sys
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from functools import partial
+from types import SimpleNamespace
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_model_field
+from pydantic import TypeAdapter
+from starlette.requests import Request
+
+from api.core.responses import encode_response
+from api.enums import MerchantCategory
+from api.schemas import PredictionRead, TransactionRead
+
+PAGE_SIZE = 100
+ITERATIONS = 500
+CATEGORIES = list(MerchantCategory)
+
+
+def _transactions_page() -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(
+            id=index,
+            transaction_id=f"tx_{index:08d}",
+            amount=round(10 + index * 3.17, 2),
+            transaction_hour=index % 24,
+            merchant_category=CATEGORIES[index % len(CATEGORIES)],
+            foreign_transaction=index % 3 == 0,
+            location_mismatch=index % 5 == 0,
+            device_trust_score=index % 101,
+            velocity_last_24h=index % 9,
+            cardholder_age=18 + index % 60,
+        )
+        for index in range(PAGE_SIZE)
+    ]
+
+
+def _scores_page() -> list[dict[str, Any]]:
+    started = datetime(2024, 1, 1, tzinfo=UTC)
+    return [
+        {
+            "id": index,
+            "transaction_id": f"tx_{index:08d}",
+            "fraud_probability": (index * 7919 % 10_000) / 10_000,
+            "decision": index % 2,
+            "scored_at": started + timedelta(seconds=index),
+        }
+        for index in range(PAGE_SIZE)
+    ]
+
+
+def _request(headers: dict[str, str]) -> Request:
+    raw_headers = [
+        (name.lower().encode(), value.encode()) for name, value in headers.items()
+    ]
+    return Request(scope={"type": "http", "headers": raw_headers})
+
+
+def _fastapi_default(field: Any, page: list[Any]) -> bytes:
+    """
+    Mirror of ``fastapi.routing.serialize_response`` plus ``JSONResponse`` for a
+    ``response_model`` route returning plain objects.
+    """
+    value, _ = field.validate(page, {}, loc=("response",))
+    return bytes(JSONResponse(field.serialize(value)).body)
+
+
+def _negotiated(request: Request, adapter: TypeAdapter[Any], page: list[Any]) -> bytes:
+    return bytes(encode_response(request, adapter, page).body)
+
+
+def _measure(encode: Callable[[], bytes]) -> tuple[int, float]:
+    size = len(encode())
+    started = time.process_time()
+    for _ in range(ITERATIONS):
+        encode()
+    cpu_us = (time.process_time() - started) / ITERATIONS * 1_000_000
+    return size, cpu_us
+
+
+def main() -> None:
+    from api.routers.transactions import (
+        PREDICTION_LIST_ADAPTER,
+        TRANSACTION_LIST_ADAPTER,
+    )
+
+    variants: dict[str, dict[str, str]] = {
+        "json": {},
+        "json+gzip": {"Accept-Encoding": "gzip"},
+        "json+zstd": {"Accept-Encoding": "zstd"},
+        "msgpack": {"Accept": "application/msgpack"},
+        "msgpack+zstd": {"Accept": "application/msgpack", "Accept-Encoding": "zstd"},
+    }
+    pages: dict[str, tuple[Any, TypeAdapter[Any], list[Any]]] = {
+        "transactions": (
+            list[TransactionRead],
+            TRANSACTION_LIST_ADAPTER,
+            _transactions_page(),
+        ),
+        "scores": (list[PredictionRead], PREDICTION_LIST_ADAPTER, _scores_page()),
+    }
+
+    lines = [f"{PAGE_SIZE} rows/page, {ITERATIONS} iterations", ""]
+    lines.append(f"{'page':<14}{'encoding':<22}{'bytes':>8}{'cpu us/page':>14}")
+    for page_name, (response_type, adapter, page) in pages.items():
+        field = create_model_field(
+            name="response", type_=response_type, mode="serialization"
+        )
+        size, cpu_us = _measure(partial(_fastapi_default, field, page))
+        lines.append(
+            f"{page_name:<14}{'fastapi default json':<22}{size:>8}{cpu_us:>14.1f}"
+        )
+        for variant, headers in variants.items():
+            size, cpu_us = _measure(
+                partial(_negotiated, _request(headers), adapter, page)
+            )
+            lines.append(f"{page_name:<14}{variant:<22}{size:>8}{cpu_us:>14.1f}")
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    main()
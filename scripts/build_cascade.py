@@ -0,0 +1,74 @@
+import argparse
+import sys
+from pathlib import Path
+
+import joblib  # type: ignore[import-untyped]
+
+from api.config import settings
+from api.core.logfire import configure_logfire, get_logger
+from api.core.model_loader import get_model_bundle, get_threshold
+from api.schemas import CascadeBuildReport
+from api.services.cascade import DEFAULT_CHUNK_SIZE, build_cascade
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CSV_PATH = REPO_ROOT / "resources" / "credit_card_fraud_10k.csv"
+logger = get_logger(__name__)
+
+
+def build_cascade_bundle(
+    output: Path,
+    csv_path: Path = CSV_PATH,
+    *,
+    validation_fraction: float = 0.3,
+    margin: float = 0.01,
+    seed: int = 42,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> CascadeBuildReport:
+    """Write a copy of the MODEL_PATH bundle with a cascade stage added."""
+    if not csv_path.exists():
+        msg = f"CSV file not found: {csv_path}"
+        raise FileNotFoundError(msg)
+
+    bundle = get_model_bundle()
+    cascade, report = build_cascade(
+        csv_path,
+        model=bundle["model"],
+        threshold=get_threshold(),
+        validation_fraction=validation_fraction,
+        margin=margin,
+        seed=seed,
+        chunk_size=chunk_size,
+    )
+    joblib.dump({**bundle, "cascade": cascade.to_dict()}, output)
+    logger.info("Cascade bundle written to %s", output)
+    return report
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Add a pre-screen stage to the model bundle, with band edges that "
+            "keep every decision on held-out rows of a CSV."
+        )
+    )
+    parser.add_argument("output", type=Path)
+    parser.add_argument("csv_path", nargs="?", type=Path, default=CSV_PATH)
+    parser.add_argument("--validation-fraction", type=float, default=0.3)
+    parser.add_argument("--margin", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    configure_logfire(settings)
+    args = _parse_args()
+    report = build_cascade_bundle(
+        args.output,
+        args.csv_path,
+        validation_fraction=args.validation_fraction,
+        margin=args.margin,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+    )
+    sys.stdout.write(report.model_dump_json(indent=2) + "\n")
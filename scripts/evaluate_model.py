@@ -0,0 +1,70 @@
+import argparse
+import sys
+from pathlib import Path
+
+from api.config import settings
+from api.core.logfire import configure_logfire, get_logger
+from api.core.model_loader import get_model, get_threshold
+from api.schemas import ModelEvaluationReport
+from api.services.evaluation import DEFAULT_CHUNK_SIZE, evaluate_labeled_csv
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CSV_PATH = REPO_ROOT / "resources" / "credit_card_fraud_10k.csv"
+logger = get_logger(__name__)
+
+
+def evaluate_model_from_path(
+    csv_path: Path = CSV_PATH,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    fp_cost: float = 1.0,
+    fn_cost: float = 1.0,
+) -> ModelEvaluationReport:
+    if not csv_path.exists():
+        msg = f"CSV file not found: {csv_path}"
+        raise FileNotFoundError(msg)
+
+    report = evaluate_labeled_csv(
+        csv_path,
+        model=get_model(),
+        threshold=get_threshold(),
+        chunk_size=chunk_size,
+        fp_cost=fp_cost,
+        fn_cost=fn_cost,
+    )
+    logger.info(
+        "Model evaluation complete: rows=%s evaluated=%s roc_auc=%s optimal_threshold=%s",
+        report.total_rows,
+        report.evaluated_rows,
+        report.roc_auc,
+        report.cost_optimal_threshold.threshold,
+    )
+    return report
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Evaluate the model bundle against a labeled CSV."
+    )
+    parser.add_argument("csv_path", nargs="?", type=Path, default=CSV_PATH)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--fp-cost", type=float, default=1.0)
+    parser.add_argument("--fn-cost", type=float, default=1.0)
+    parser.add_argument("--output", type=Path, default=None)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    configure_logfire(settings)
+    args = _parse_args()
+    report = evaluate_model_from_path(
+        args.csv_path,
+        chunk_size=args.chunk_size,
+        fp_cost=args.fp_cost,
+        fn_cost=args.fn_cost,
+    )
+    report_json = report.model_dump_json(indent=2)
+    if args.output is None:
+        sys.stdout.write(report_json + "\n")
+    else:
+        args.output.write_text(report_json, encoding="utf-8")
@@ -1,25 +1,71 @@
+import argparse
 import asyncio
+import sys
 from pathlib import Path
 
 from api.config import settings
 from api.core.logfire import configure_logfire, get_logger
 from api.database import close_db, init_db
-from api.services.csv_import import import_transactions_from_csv
+from api.services.file_import import (
+    CSV_FORMAT,
+    detect_import_format,
+    import_transactions_from_file,
+)
+from api.services.sharded_import import (
+    DEFAULT_SHARD_BYTES,
+    ImportStageStats,
+    import_csv_file_sharded,
+)
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 CSV_PATH = REPO_ROOT / "resources" / "credit_card_fraud_10k.csv"
 logger = get_logger(__name__)
 
 
-async def import_transactions_from_path(csv_path: Path = CSV_PATH) -> None:
+def _format_stage_stats(stats: ImportStageStats) -> str:
+    stages = (
+        ("parse (per core)", stats.parse_seconds),
+        ("score (per core)", stats.score_seconds),
+        ("write", stats.write_seconds),
+        ("total (wall)", stats.wall_seconds),
+    )
+    lines = [f"{'stage':<18}{'seconds':>10}{'rows/sec':>14}"]
+    lines.extend(
+        f"{name:<18}{seconds:>10.2f}{stats.rows_per_second(seconds):>14,.0f}"
+        for name, seconds in stages
+    )
+    return "\n".join(lines) + "\n"
+
+
+async def import_transactions_from_path(
+    csv_path: Path = CSV_PATH,
+    *,
+    workers: int = 1,
+    shard_bytes: int = DEFAULT_SHARD_BYTES,
+) -> None:
     if not csv_path.exists():
         msg = f"CSV file not found: {csv_path}"
         raise FileNotFoundError(msg)
+    import_format = detect_import_format(csv_path.name)
+    if import_format is None:
+        msg = f"Unsupported import file: {csv_path.name}"
+        raise ValueError(msg)
+    if workers > 1 and import_format != CSV_FORMAT:
+        msg = "--workers only applies to uncompressed .csv files"
+        raise ValueError(msg)
 
-    await init_db(settings.DATABASE_URI, generate_schemas=True)
+    await init_db(settings.DATABASE_URI, generate_schemas=True, migrate=True)
     try:
-        with csv_path.open("r", encoding="utf-8-sig", newline="") as csv_file:
-            summary = await import_transactions_from_csv(csv_stream=csv_file)
+        if workers > 1:
+            summary, stats = await import_csv_file_sharded(
+                csv_path, workers=workers, shard_bytes=shard_bytes
+            )
+            sys.stdout.write(_format_stage_stats(stats))
+        else:
+            with csv_path.open("rb") as import_file:
+                summary = await import_transactions_from_file(
+                    import_file, import_format=import_format
+                )
         logger.info(
             "Initial migration import complete: total=%s imported=%s duplicates=%s invalid=%s scoring_errors=%s",
             summary.total_rows,
@@ -32,6 +78,36 @@ async def import_transactions_from_path(csv_path: Path = CSV_PATH) -> None:
         await close_db()
 
 
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Import and score a .csv, .csv.gz, .csv.zst or .parquet file "
+            "of transactions."
+        )
+    )
+    parser.add_argument("csv_path", nargs="?", type=Path, default=CSV_PATH)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes; above 1 the file is split into shards",
+    )
+    parser.add_argument(
+        "--shard-mb",
+        type=int,
+        default=DEFAULT_SHARD_BYTES // (1024 * 1024),
+        help="Approximate shard size in MiB for the parallel mode",
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
     configure_logfire(settings)
-    asyncio.run(import_transactions_from_path())
+    args = _parse_args()
+    asyncio.run(
+        import_transactions_from_path(
+            args.csv_path,
+            workers=args.workers,
+            shard_bytes=args.shard_mb * 1024 * 1024,
+        )
+    )
@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import sys
+from typing import Any
+
+from tortoise import connections
+
+from api.config import settings
+from api.core.logfire import configure_logfire
+from api.database import close_db, init_db
+
+SCHEMA = "storage_measure"
+DEFAULT_ROWS = 1_000_000
+_TABLES = (
+    "transaction_wide",
+    "transaction_compact",
+    "prediction_wide",
+    "prediction_compact",
+)
+
+# The layout before 0002_compact_storage and the one after it, with the
+# indexes each table carries. Partitioning is left out; it does not change
+# row or index size.
+_LAYOUTS: dict[str, str] = {
+    "wide": """
+CREATE TABLE {schema}.transaction_wide (
+    id SERIAL PRIMARY KEY,
+    transaction_id VARCHAR(255) NOT NULL UNIQUE,
+    amount DOUBLE PRECISION NOT NULL,
+    transaction_hour INT NOT NULL,
+    merchant_category VARCHAR(100) NOT NULL,
+    foreign_transaction BOOL NOT NULL,
+    location_mismatch BOOL NOT NULL,
+    device_trust_score INT NOT NULL,
+    velocity_last_24h INT NOT NULL,
+    cardholder_age INT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX ON {schema}.transaction_wide (created_at);
+CREATE INDEX ON {schema}.transaction_wide (merchant_category, created_at);
+CREATE INDEX ON {schema}.transaction_wide (created_at) WHERE foreign_transaction;
+INSERT INTO {schema}.transaction_wide (
+    transaction_id, amount, transaction_hour, merchant_category,
+    foreign_transaction, location_mismatch, device_trust_score,
+    velocity_last_24h, cardholder_age, created_at
+)
+SELECT 'tx_' || lpad(n::text, 8, '0'), round((random() * 5000)::numeric, 2),
+       n % 24, (ARRAY['Electronics', 'Travel', 'Grocery', 'Food', 'Clothing'])[n % 5 + 1],
+       n % 7 = 0, n % 11 = 0, n % 101, n % 20, 18 + n % 70,
+       now() - make_interval(secs => n)
+FROM generate_series(1, $1) AS n;
+CREATE TABLE {schema}.prediction_wide (
+    id SERIAL,
+    fraud_probability DOUBLE PRECISION NOT NULL,
+    decision INT NOT NULL,
+    scored_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    transaction_id INT NOT NULL,
+    PRIMARY KEY (id, scored_at)
+);
+CREATE INDEX ON {schema}.prediction_wide (scored_at);
+CREATE INDEX ON {schema}.prediction_wide (transaction_id, scored_at, id);
+CREATE INDEX ON {schema}.prediction_wide (scored_at) WHERE decision = 1;
+INSERT INTO {schema}.prediction_wide (
+    fraud_probability, decision, scored_at, transaction_id
+)
+SELECT p, (p >= 0.5)::int, now() - make_interval(secs => n), n
+FROM generate_series(1, $1) AS n, LATERAL (SELECT random() AS p) r;
+""",
+    "compact": """
+CREATE TABLE {schema}.transaction_compact (
+    id SERIAL PRIMARY KEY,
+    transaction_id VARCHAR(255) NOT NULL UNIQUE,
+    amount DOUBLE PRECISION NOT NULL,
+    transaction_hour SMALLINT NOT NULL,
+    merchant_category SMALLINT NOT NULL,
+    foreign_transaction BOOL NOT NULL,
+    location_mismatch BOOL NOT NULL,
+    device_trust_score SMALLINT NOT NULL,
+    velocity_last_24h INT NOT NULL,
+    cardholder_age SMALLINT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX ON {schema}.transaction_compact (created_at);
+CREATE INDEX ON {schema}.transaction_compact (merchant_category, created_at);
+CREATE INDEX ON {schema}.transaction_compact (created_at) WHERE foreign_transaction;
+INSERT INTO {schema}.transaction_compact (
+    transaction_id, amount, transaction_hour, merchant_category,
+    foreign_transaction, location_mismatch, device_trust_score,
+    velocity_last_24h, cardholder_age, created_at
+)
+SELECT 'tx_' || lpad(n::text, 8, '0'), round((random() * 5000)::numeric, 2),
+       n % 24, n % 5 + 1, n % 7 = 0, n % 11 = 0, n % 101, n % 20, 18 + n % 70,
+       now() - make_interval(secs => n)
+FROM generate_series(1, $1) AS n;
+CREATE TABLE {schema}.prediction_compact (
+    id SERIAL,
+    fraud_probability REAL NOT NULL,
+    scored_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    decision BOOLEAN NOT NULL,
+    transaction_id INT NOT NULL,
+    PRIMARY KEY (id, scored_at)
+);
+CREATE INDEX ON {schema}.prediction_compact (scored_at);
+CREATE INDEX ON {schema}.prediction_compact (transaction_id, scored_at, id);
+CREATE INDEX ON {schema}.prediction_compact (scored_at) WHERE decision;
+INSERT INTO {schema}.prediction_compact (
+    fraud_probability, decision, scored_at, transaction_id
+)
+SELECT p, p >= 0.5, now() - make_interval(secs => n), n
+FROM generate_series(1, $1) AS n, LATERAL (SELECT random() AS p) r;
+""",
+}
+
+_SIZES_SQL = """
+SELECT c.relname AS name,
+       pg_table_size(c.oid) AS table_bytes,
+       pg_indexes_size(c.oid) AS index_bytes
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = $1 AND c.relkind = 'r'
+ORDER BY c.relname
+"""
+
+
+async def _build(connection: Any, rows: int) -> None:
+    await connection.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await connection.execute(f"CREATE SCHEMA {SCHEMA}")
+    for layout in _LAYOUTS.values():
+        # Statements with a parameter cannot be batched, so run them one by one.
+        for statement in layout.format(schema=SCHEMA).split(";"):
+            if not statement.strip():
+                continue
+            if "$1" in statement:
+                await connection.execute(statement, rows)
+            else:
+                await connection.execute(statement)
+    for table in _TABLES:
+        await connection.execute(f"VACUUM ANALYZE {SCHEMA}.{table}")
+
+
+async def measure_storage(*, rows: int, keep: bool = False) -> list[dict[str, Any]]:
+    """
+    Build the wide and compact layouts with ``rows`` rows each in a scratch
+    schema and return table and index sizes in MiB per million rows.
+    """
+    await init_db(settings.DATABASE_URI)
+    try:
+        async with connections.get("default").acquire_connection() as connection:
+            try:
+                await _build(connection, rows)
+                sizes = await connection.fetch(_SIZES_SQL, SCHEMA)
+            finally:
+                if not keep:
+                    await connection.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    finally:
+        await close_db()
+    scale = 1_000_000 / rows / 2**20
+    return [
+        {
+            "name": row["name"],
+            "table_mib": row["table_bytes"] * scale,
+            "index_mib": row["index_bytes"] * scale,
+        }
+        for row in sizes
+    ]
+
+
+def _report(sizes: list[dict[str, Any]]) -> str:
+    by_name = {row["name"]: row for row in sizes}
+    lines = [f"{'table':<22}{'heap MiB/M':>12}{'index MiB/M':>13}"]
+    lines += [
+        f"{row['name']:<22}{row['table_mib']:>12.1f}{row['index_mib']:>13.1f}"
+        for row in sizes
+    ]
+    for table in ("transaction", "prediction"):
+        wide, compact = by_name[f"{table}_wide"], by_name[f"{table}_compact"]
+        before = wide["table_mib"] + wide["index_mib"]
+        after = compact["table_mib"] + compact["index_mib"]
+        lines.append(f"{table}: {after / before:.0%} of the wide layout")
+    return "\n".join(lines) + "\n"
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare table and index size of the wide and compact layouts "
+            "in a scratch schema of DATABASE_URI."
+        )
+    )
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the scratch schema afterwards"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    configure_logfire(settings)
+    args = _parse_args()
+    sys.stdout.write(
+        _report(asyncio.run(measure_storage(rows=args.rows, keep=args.keep)))
+    )
@@ -0,0 +1,45 @@
+import argparse
+import asyncio
+import sys
+
+from api.config import settings
+from api.core.logfire import configure_logfire, get_logger
+from api.database import close_db, init_db
+from api.schemas import PartitionMaintenanceReport
+from api.services.partitions import run_partition_maintenance
+
+logger = get_logger(__name__)
+
+
+async def migrate_database(
+    *, generate_schemas: bool = False
+) -> PartitionMaintenanceReport:
+    """Apply pending migrations, then create any missing prediction partitions."""
+    await init_db(
+        settings.DATABASE_URI, generate_schemas=generate_schemas, migrate=True
+    )
+    try:
+        report = await run_partition_maintenance()
+    finally:
+        await close_db()
+    logger.info("Partitions created: %s", report.created)
+    return report
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Apply pending schema migrations to DATABASE_URI."
+    )
+    parser.add_argument(
+        "--generate-schemas",
+        action="store_true",
+        help="Create missing ORM tables first, as on a fresh database",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    configure_logfire(settings)
+    args = _parse_args()
+    report = asyncio.run(migrate_database(generate_schemas=args.generate_schemas))
+    sys.stdout.write(f"Migrations applied, partitions created: {report.created}\n")
@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+from pathlib import Path
+
+from api.config import settings
+from api.core.logfire import configure_logfire, get_logger
+from api.database import close_db, init_db
+from api.schemas import RescoreRequest
+from api.services.rescoring import rescore_transactions
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CHECKPOINT_PATH = REPO_ROOT / ".rescore_checkpoint"
+logger = get_logger(__name__)
+
+
+def _read_checkpoint(checkpoint_path: Path) -> int:
+    if not checkpoint_path.exists():
+        return 0
+    return int(checkpoint_path.read_text(encoding="utf-8").strip() or 0)
+
+
+def _write_checkpoint(checkpoint_path: Path, last_id: int) -> None:
+    checkpoint_path.write_text(str(last_id), encoding="utf-8")
+
+
+async def rescore_all_transactions(
+    checkpoint_path: Path = CHECKPOINT_PATH,
+    *,
+    batch_size: int = 5_000,
+    rows_per_second: float | None = None,
+    segment_rows: int = 100_000,
+) -> None:
+    """Rescore every stored transaction, resuming from ``checkpoint_path``."""
+    await init_db(settings.DATABASE_URI, generate_schemas=False)
+    try:
+        after_id = _read_checkpoint(checkpoint_path)
+        total = 0
+        while True:
+            result = await rescore_transactions(
+                RescoreRequest(
+                    after_id=after_id,
+                    max_rows=segment_rows,
+                    batch_size=batch_size,
+                    rows_per_second=rows_per_second,
+                ),
+                checkpoint=lambda last_id: _write_checkpoint(checkpoint_path, last_id),
+            )
+            total += result.processed
+            after_id = result.last_id
+            if result.done:
+                break
+        checkpoint_path.unlink(missing_ok=True)
+        logger.info("Bulk rescore complete: processed=%s last_id=%s", total, after_id)
+    finally:
+        await close_db()
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Rescore stored transactions with the current model bundle."
+    )
+    parser.add_argument("--checkpoint", type=Path, default=CHECKPOINT_PATH)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument("--rows-per-second", type=float, default=None)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    configure_logfire(settings)
+    args = _parse_args()
+    asyncio.run(
+        rescore_all_transactions(
+            args.checkpoint,
+            batch_size=args.batch_size,
+            rows_per_second=args.rows_per_second,
+        )
+    )
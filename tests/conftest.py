@@ -1,12 +1,61 @@
+import asyncio
+from collections.abc import Callable
 from datetime import UTC, datetime
 from types import SimpleNamespace
 
+import numpy as np
+import pandas as pd
 import pytest
 from fastapi.testclient import TestClient
+from starlette.requests import Request
 
 from api.config import SettingsTest
+from api.database import close_db, init_db, reset_tables
 from api.enums import MerchantCategory
 from api.main import create_application
+from api.schemas import ScoreRequest
+from api.services.thresholds import forget_active_threshold
+
+
+class _StubModel:
+    def __init__(self, probabilities: Callable[[pd.DataFrame], np.ndarray]) -> None:
+        self.probabilities = probabilities
+
+    def predict_proba(self, df: pd.DataFrame) -> np.ndarray:
+        probability = self.probabilities(df)
+        return np.column_stack([1 - probability, probability])
+
+
+class _RecordingConnection:
+    """Stand-in DB client that records every round trip it is asked to make."""
+
+    def __init__(
+        self,
+        results: list[list[dict]] | None = None,
+        *,
+        release: asyncio.Event | None = None,
+    ) -> None:
+        self.queries: list[tuple[str, list]] = []
+        self._results = list(results or [])
+        self._release = release
+
+    async def execute_query(self, query: str, values: list | None = None):
+        if self._release is not None:
+            await self._release.wait()
+        self.queries.append((query, values or []))
+        rows = self._results.pop(0) if self._results else []
+        return len(rows), rows
+
+
+class _TransactionContext:
+    def __init__(self, connection: _RecordingConnection) -> None:
+        self.connection = connection
+
+    async def __aenter__(self):
+        return self.connection
+
+    async def __aexit__(self, *exc_info):
+        return False
 
 
 @pytest.fixture
@@ -18,6 +67,32 @@ def client():
         yield client
 
 
+@pytest.fixture
+async def db():
+    settings_test = SettingsTest()
+    await init_db(settings_test.DATABASE_URI, generate_schemas=True, migrate=True)
+    await reset_tables()
+    forget_active_threshold()
+    yield
+    await reset_tables()
+    forget_active_threshold()
+    await close_db()
+
+
+@pytest.fixture
+def make_request():
+    def _make_request(headers: dict[str, str] | None = None) -> Request:
+        raw_headers = [
+            (name.lower().encode(), value.encode())
+            for name, value in (headers or {}).items()
+        ]
+        return Request(
+            scope={"type": "http", "method": "GET", "path": "/", "headers": raw_headers}
+        )
+
+    return _make_request
+
+
 @pytest.fixture
 def make_transaction():
     def _make_transaction(transaction_id: str = "tx_1", **overrides):
@@ -32,6 +107,7 @@ def make_transaction():
             "device_trust_score": 80,
             "velocity_last_24h": 5,
             "cardholder_age": 30,
+            "version": 1,
         }
         base.update(overrides)
         return SimpleNamespace(**base)
@@ -46,9 +122,57 @@ def make_prediction():
             "id": 1,
             "fraud_probability": 0.75,
             "decision": 1,
+            "prescreened": False,
             "scored_at": datetime.now(UTC),
         }
         base.update(overrides)
         return base
 
     return _make_prediction
+
+
+@pytest.fixture
+def make_score_request():
+    def _make_score_request(transaction_id: str = "tx_1", **overrides):
+        base = {
+            "transaction_id": transaction_id,
+            "amount": 100.0,
+            "transaction_hour": 12,
+            "merchant_category": MerchantCategory.ELECTRONICS,
+            "foreign_transaction": False,
+            "location_mismatch": False,
+            "device_trust_score": 80,
+            "velocity_last_24h": 5,
+            "cardholder_age": 30,
+        }
+        base.update(overrides)
+        return ScoreRequest.model_validate(base)
+
+    return _make_score_request
+
+
+@pytest.fixture
+def make_model():
+    """Stub model whose fraud probabilities for a frame are ``probabilities(df)``."""
+    return _StubModel
+
+
+@pytest.fixture
+def amount_model(make_model):
+    """Scores each row by its amount / 1000, so expected values are easy to derive."""
+    return make_model(lambda df: df["amount"].to_numpy() / 1000)
+
+
+@pytest.fixture
+def make_connection():
+    """
+    Recording DB client answering each query with the next of ``results``.
+    With ``release`` set, queries wait for that event first.
+    """
+    return _RecordingConnection
+
+
+@pytest.fixture
+def make_transaction_context():
+    """Stand-in for ``in_transaction()`` that hands out ``connection``."""
+    return _TransactionContext
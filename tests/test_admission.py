@@ -0,0 +1,150 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from api.core.exceptions import NotFoundError, register_exception_handlers
+from api.services import admission as admission_service
+from api.services.admission import (
+    AdmissionController,
+    Priority,
+    admission,
+    start_admission_control,
+)
+
+
+def _controller(**overrides) -> AdmissionController:
+    options: dict = {
+        "initial_limit": 4,
+        "min_limit": 2,
+        "max_limit": 5,
+        "latency_target_ms": 100,
+        "batch_share": 0.5,
+        "retry_after_seconds": 3,
+    }
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+@pytest.fixture(autouse=True)
+def _reset_controller():
+    admission_service._controller = None
+    yield
+    admission_service._controller = None
+
+
+def test_requests_beyond_the_limit_are_rejected():
+    controller = _controller()
+
+    admitted = [controller.try_acquire(Priority.SCORING) for _ in range(5)]
+
+    assert admitted == [True, True, True, True, False]
+    stats = controller.stats()
+    assert (stats.in_flight, stats.admitted, stats.rejected) == (4, 4, 1)
+
+
+def test_batch_work_only_fills_its_share_of_the_limit():
+    controller = _controller()
+
+    assert controller.try_acquire(Priority.BATCH)
+    assert controller.try_acquire(Priority.BATCH)
+    assert not controller.try_acquire(Priority.BATCH)
+    assert controller.try_acquire(Priority.SCORING)
+    assert controller.stats().batch_rejected == 1
+
+
+def test_slow_or_failed_scoring_cuts_the_limit_down_to_the_minimum():
+    controller = _controller()
+
+    for failed, latency in [(False, 0.5), (True, 0.01)] + [(True, 0.01)] * 10:
+        controller.try_acquire(Priority.SCORING)
+        controller.release(Priority.SCORING, latency=latency, failed=failed)
+
+    assert controller.limit == 2
+    assert controller.stats().limit_decreases == 12
+
+
+def test_a_burst_of_slow_scoring_cuts_the_limit_once():
+    controller = _controller()
+    for _ in range(4):
+        controller.try_acquire(Priority.SCORING)
+
+    for _ in range(4):
+        controller.release(Priority.SCORING, latency=0.5, failed=False)
+
+    assert controller.limit == 3
+    assert controller.stats().limit_decreases == 1
+
+    controller.try_acquire(Priority.SCORING)
+    controller.release(Priority.SCORING, latency=0.5, failed=True)
+
+    assert controller.stats().limit_decreases == 2
+
+
+def test_fast_scoring_under_load_grows_the_limit_up_to_the_maximum():
+    controller = _controller()
+
+    for _ in range(40):
+        for _ in range(controller.limit):
+            controller.try_acquire(Priority.SCORING)
+        for _ in range(controller.limit):
+            controller.release(Priority.SCORING, latency=0.01, failed=False)
+
+    assert controller.limit == 5
+
+
+def test_batch_latency_does_not_move_the_limit():
+    controller = _controller()
+    controller.try_acquire(Priority.BATCH)
+
+    controller.release(Priority.BATCH, latency=60, failed=True)
+
+    assert controller.limit == 4
+    assert controller.stats().limit_decreases == 0
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    register_exception_handlers(app)
+
+    @app.post("/score", dependencies=[Depends(admission(Priority.SCORING))])
+    async def score():
+        controller = admission_service.get_admission_controller()
+        assert controller is not None
+        return {"in_flight": controller.in_flight}
+
+    @app.post("/missing", dependencies=[Depends(admission(Priority.SCORING))])
+    async def missing():
+        raise NotFoundError
+
+    return app
+
+
+def test_dependency_holds_a_slot_and_sheds_with_retry_after():
+    controller = start_admission_control(
+        initial_limit=1,
+        min_limit=1,
+        max_limit=1,
+        latency_target_ms=10_000,
+        batch_share=1,
+        retry_after_seconds=3,
+    )
+    client = TestClient(_app())
+
+    assert client.post("/score").json() == {"in_flight": 1}
+    assert client.post("/missing").status_code == 404
+    assert controller.stats().limit_decreases == 0
+
+    controller.try_acquire(Priority.SCORING)
+    response = client.post("/score")
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+    assert controller.stats().rejected == 1
+
+
+def test_dependency_admits_everything_without_a_controller():
+    client = TestClient(_app())
+
+    response = client.post("/missing")
+
+    assert response.status_code == 404
@@ -0,0 +1,152 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from chainmock import mocker
+
+from api.core.exceptions import InvalidTimeRangeError
+from api.enums import MerchantCategory
+from api.repositories import analytics as analytics_repo
+from api.repositories.analytics import (
+    combined_rollup_sql,
+    refresh_prediction_rollup,
+)
+from api.routers import analytics as analytics_router
+from api.services import analytics as analytics_service
+from api.services.analytics import RollupJob, align_range, fraud_timeseries
+
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=UTC)
+
+
+@pytest.fixture
+def use_connection(make_transaction_context):
+    def _use_connection(connection) -> None:
+        mocker(analytics_repo).mock("in_transaction").return_value(
+            make_transaction_context(connection)
+        )
+
+    return _use_connection
+
+
+def test_align_range_widens_to_whole_buckets():
+    start = datetime(2024, 3, 1, 10, 15, tzinfo=UTC)
+    end = datetime(2024, 3, 2, 0, 0, 1)
+
+    assert align_range(start, end, "hour") == (
+        datetime(2024, 3, 1, 10, tzinfo=UTC),
+        datetime(2024, 3, 2, 1, tzinfo=UTC),
+    )
+    assert align_range(start, end, "day") == (
+        datetime(2024, 3, 1, tzinfo=UTC),
+        datetime(2024, 3, 3, tzinfo=UTC),
+    )
+    assert align_range(None, NOW, "hour") == (None, NOW)
+
+
+def test_combined_rollup_sql_applies_filters_to_both_sources():
+    query, values = combined_rollup_sql(
+        start=NOW, end=None, merchant_category=MerchantCategory.TRAVEL
+    )
+
+    assert "WHERE r.bucket_start >= $2 AND r.merchant_category = $3" in query
+    assert "AND p.scored_at >= $2 AND t.merchant_category = $3" in query
+    assert values == ["prediction_rollup", NOW, 2]
+
+
+@pytest.mark.anyio
+async def test_refresh_rolls_up_window_and_advances_watermark(
+    make_connection, use_connection
+):
+    watermark = NOW - timedelta(minutes=5)
+    until = NOW - timedelta(minutes=1)
+    connection = make_connection(
+        [
+            [],
+            [{"watermark": watermark, "until": until}],
+            [{"predictions": 40, "buckets": 3}],
+        ]
+    )
+    use_connection(connection)
+
+    refresh = await refresh_prediction_rollup(settle_seconds=60)
+
+    assert refresh == {"predictions": 40, "buckets": 3, "watermark": until}
+    assert len(connection.queries) == 4
+    assert "FOR UPDATE" in connection.queries[1][0]
+    rollup_query, rollup_values = connection.queries[2]
+    assert "p.scored_at >= $2 AND p.scored_at < $1" in rollup_query
+    assert "ON CONFLICT (bucket_start, merchant_category, decision)" in rollup_query
+    assert rollup_values == [until, watermark]
+    assert connection.queries[3][1] == ["prediction_rollup", until]
+
+
+@pytest.mark.anyio
+async def test_refresh_is_a_noop_until_the_window_settles(
+    make_connection, use_connection
+):
+    connection = make_connection([[], [{"watermark": NOW, "until": NOW}]])
+    use_connection(connection)
+
+    refresh = await refresh_prediction_rollup(settle_seconds=60)
+
+    assert refresh == {"predictions": 0, "buckets": 0, "watermark": NOW}
+    assert len(connection.queries) == 2
+
+
+@pytest.mark.anyio
+async def test_fraud_timeseries_aligns_range_and_derives_flag_rate():
+    mocker(analytics_repo).mock("rollup_timeseries", force_async=True).return_value(
+        [
+            {
+                "bucket_start": NOW,
+                "prediction_count": 8,
+                "flagged_count": 2,
+                "mean_probability": 0.3,
+                "amount_sum": 800.0,
+                "flagged_amount_sum": 500.0,
+            }
+        ]
+    ).awaited_once_with(
+        granularity="day",
+        start=datetime(2024, 3, 1, tzinfo=UTC),
+        end=datetime(2024, 3, 2, tzinfo=UTC),
+        merchant_category=None,
+    )
+
+    buckets = await fraud_timeseries(
+        granularity="day", start=NOW, end=NOW + timedelta(hours=1)
+    )
+
+    assert buckets[0].flag_rate == 0.25
+    assert buckets[0].prediction_count == 8
+
+
+@pytest.mark.anyio
+async def test_timeseries_endpoint_rejects_empty_time_range():
+    with pytest.raises(InvalidTimeRangeError):
+        await analytics_router.timeseries(
+            granularity="hour", start=NOW, end=NOW, merchant_category=None
+        )
+
+
+@pytest.mark.anyio
+async def test_rollup_job_keeps_running_after_a_failed_refresh():
+    calls = 0
+    refreshed = asyncio.Event()
+
+    async def refresh(*, settle_seconds):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            msg = "database unavailable"
+            raise RuntimeError(msg)
+        refreshed.set()
+
+    mocker(analytics_service).mock("refresh_rollups").side_effect(refresh)
+    job = RollupJob(interval_seconds=0.01, settle_seconds=60)
+
+    job.start()
+    await asyncio.wait_for(refreshed.wait(), 1)
+    await job.stop()
+
+    assert calls >= 2
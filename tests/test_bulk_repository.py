@@ -0,0 +1,336 @@
+import re
+from datetime import UTC, datetime
+
+import pytest
+from chainmock import mocker
+
+from api.enums import MerchantCategory
+from api.repositories import transactions as transaction_repo
+from api.repositories.transactions import (
+    PREDICTION_EXPORT_COLUMNS,
+    TRANSACTION_EXPORT_COLUMNS,
+    TransactionFilters,
+    bulk_get_by_external_ids,
+    bulk_insert_predictions,
+    bulk_insert_transactions,
+    create_or_score_transaction_row,
+    fetch_transaction_feature_batch,
+    insert_missing_transactions,
+    rescore_transaction_if_version,
+    score_query,
+    stream_predictions_for_export,
+    stream_transactions_for_export,
+    transaction_query,
+    upsert_transactions,
+)
+
+
+def _transaction_row(transaction_id: str, amount: float = 100.0) -> dict:
+    return {
+        "transaction_id": transaction_id,
+        "amount": amount,
+        "transaction_hour": 12,
+        "merchant_category": MerchantCategory.ELECTRONICS,
+        "foreign_transaction": False,
+        "location_mismatch": False,
+        "device_trust_score": 80,
+        "velocity_last_24h": 5,
+        "cardholder_age": 30,
+    }
+
+
+def _selected_columns(query: str) -> tuple[str, ...]:
+    """Output column names of a ``SELECT ... FROM`` statement, in order."""
+    select = query.split(" FROM ", 1)[0]
+    return tuple(re.findall(r"(?:\bAS |\b[pt]\.)(\w+)(?=,|$)", select))
+
+
+@pytest.mark.anyio
+async def test_bulk_get_by_external_ids_is_one_round_trip(make_connection):
+    connection = make_connection(
+        [[{"id": 1, "transaction_id": "tx_1"}, {"id": 3, "transaction_id": "tx_3"}]]
+    )
+
+    found = await bulk_get_by_external_ids(
+        [f"tx_{index}" for index in range(1_000)], connection=connection
+    )
+
+    assert found == {"tx_1": 1, "tx_3": 3}
+    assert len(connection.queries) == 1
+    query, values = connection.queries[0]
+    assert "ANY($1::text[])" in query
+    assert len(values[0]) == 1_000
+
+
+@pytest.mark.anyio
+async def test_bulk_operations_skip_database_for_empty_input(make_connection):
+    connection = make_connection()
+
+    assert await bulk_get_by_external_ids([], connection=connection) == {}
+    assert await bulk_insert_transactions([], connection=connection) == []
+    assert await upsert_transactions([], connection=connection) == []
+    assert await insert_missing_transactions([], connection=connection) == {}
+    assert (
+        await bulk_insert_predictions(
+            transaction_ids=[],
+            fraud_probabilities=[],
+            decisions=[],
+            connection=connection,
+        )
+        == []
+    )
+    assert connection.queries == []
+
+
+@pytest.mark.anyio
+async def test_bulk_insert_transactions_returns_ids_in_input_order(make_connection):
+    rows = [_transaction_row(f"tx_{index}") for index in range(500)]
+    connection = make_connection(
+        [
+            [
+                {"id": 1_000 + index, "transaction_id": f"tx_{index}"}
+                for index in reversed(range(500))
+            ]
+        ]
+    )
+
+    ids = await bulk_insert_transactions(rows, connection=connection)
+
+    assert ids == [1_000 + index for index in range(500)]
+    assert len(connection.queries) == 1
+    query, values = connection.queries[0]
+    assert "unnest($1::text[], $2::float8[]" in query
+    assert "RETURNING id, transaction_id" in query
+    assert len(values) == 9
+    assert values[3][0] == 1
+
+
+@pytest.mark.anyio
+async def test_upsert_transactions_collapses_duplicates_in_one_statement(
+    make_connection,
+):
+    rows = [
+        _transaction_row("tx_1", amount=10.0),
+        _transaction_row("tx_2"),
+        _transaction_row("tx_1", amount=99.0),
+    ]
+    connection = make_connection(
+        [
+            [
+                {"id": 7, "transaction_id": "tx_2", "created": True},
+                {"id": 3, "transaction_id": "tx_1", "created": False},
+            ]
+        ]
+    )
+
+    upserted = await upsert_transactions(rows, connection=connection)
+
+    assert upserted == [
+        {"id": 3, "transaction_id": "tx_1", "created": False},
+        {"id": 7, "transaction_id": "tx_2", "created": True},
+    ]
+    assert len(connection.queries) == 1
+    query, values = connection.queries[0]
+    assert "ON CONFLICT (transaction_id) DO UPDATE SET" in query
+    assert "amount = EXCLUDED.amount" not in query
+    assert values[0] == ["tx_1", "tx_2"]
+    assert values[1] == [10.0, 100.0]
+
+
+@pytest.mark.anyio
+async def test_upsert_transactions_can_overwrite_existing_rows(make_connection):
+    connection = make_connection(
+        [[{"id": 3, "transaction_id": "tx_1", "created": False}]]
+    )
+
+    await upsert_transactions(
+        [_transaction_row("tx_1")], update_existing=True, connection=connection
+    )
+
+    query, _ = connection.queries[0]
+    assert "amount = EXCLUDED.amount" in query
+    assert "cardholder_age = EXCLUDED.cardholder_age" in query
+
+
+@pytest.mark.anyio
+async def test_bulk_insert_predictions_is_one_round_trip(make_connection):
+    scored_at = datetime(2024, 1, 1, tzinfo=UTC)
+    connection = make_connection([[{"id": 11}, {"id": 12}, {"id": 13}]])
+
+    ids = await bulk_insert_predictions(
+        transaction_ids=[1, 2, 3],
+        fraud_probabilities=[0.1, 0.5, 0.9],
+        decisions=[0, 0, 1],
+        prescreened=[True, False, False],
+        scored_at=scored_at,
+        connection=connection,
+    )
+
+    assert ids == [11, 12, 13]
+    assert len(connection.queries) == 1
+    _, values = connection.queries[0]
+    assert values == [
+        [1, 2, 3],
+        [0.1, 0.5, 0.9],
+        [0, 0, 1],
+        [True, False, False],
+        [scored_at, scored_at, scored_at],
+    ]
+
+
+@pytest.mark.anyio
+async def test_create_or_score_transaction_row_is_one_round_trip(make_connection):
+    scored_at = datetime(2024, 1, 1, tzinfo=UTC)
+    connection = make_connection(
+        [
+            [
+                {
+                    "prediction_id": 11,
+                    "transaction_pk": 3,
+                    "scored_at": scored_at,
+                    "created": False,
+                }
+            ]
+        ]
+    )
+
+    scored = await create_or_score_transaction_row(
+        fields=_transaction_row("tx_1"),
+        fraud_probability=0.9,
+        decision=1,
+        scored_at=scored_at,
+        connection=connection,
+    )
+
+    assert scored == {
+        "transaction_pk": 3,
+        "prediction_id": 11,
+        "scored_at": scored_at,
+        "created": False,
+    }
+    assert len(connection.queries) == 1
+    query, values = connection.queries[0]
+    assert query.startswith("WITH upserted AS (")
+    assert "ON CONFLICT (transaction_id)" in query
+    assert 'INSERT INTO "prediction"' in query
+    assert values[0] == "tx_1"
+    assert values[-4:] == [0.9, 1, False, scored_at]
+
+
+@pytest.mark.anyio
+async def test_rescore_if_version_updates_and_scores_in_one_statement(make_connection):
+    scored_at = datetime(2024, 1, 1, tzinfo=UTC)
+    connection = make_connection([[{"scored_at": scored_at}], []])
+    arguments = {
+        "transaction_pk": 3,
+        "version": 4,
+        "fields": {"amount": 50.0, "merchant_category": MerchantCategory.FOOD},
+        "fraud_probability": 0.3,
+        "decision": 0,
+        "scored_at": scored_at,
+        "connection": connection,
+    }
+
+    assert await rescore_transaction_if_version(**arguments) == scored_at
+    assert await rescore_transaction_if_version(**arguments) is None
+    query, values = connection.queries[0]
+    assert (
+        "SET amount = $3::float8, merchant_category = $4::int2, "
+        "version = version + 1 WHERE id = $1 AND version = $2"
+    ) in query
+    assert (
+        "SELECT id, $5::float8, $6::bool, $7::bool, $8::timestamptz FROM updated"
+    ) in query
+    assert values == [3, 4, 50.0, 4, 0.3, False, False, scored_at]
+
+
+@pytest.mark.anyio
+async def test_insert_missing_transactions_returns_only_inserted_rows(make_connection):
+    connection = make_connection([[{"id": 7, "transaction_id": "tx_2"}]])
+
+    inserted = await insert_missing_transactions(
+        [_transaction_row("tx_1"), _transaction_row("tx_2")], connection=connection
+    )
+
+    assert inserted == {"tx_2": 7}
+    assert len(connection.queries) == 1
+    query, values = connection.queries[0]
+    assert "ON CONFLICT (transaction_id) DO NOTHING" in query
+    assert values[0] == ["tx_1", "tx_2"]
+
+
+def test_filter_queries_only_render_given_predicates():
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+
+    query, values = transaction_query("count(*)")
+    assert query == 'SELECT count(*) FROM "transaction" t'
+    assert values == []
+
+    query, values = score_query(
+        "p.id",
+        TransactionFilters(
+            merchant_category=MerchantCategory.ELECTRONICS, decision=1, start=start
+        ),
+    )
+    assert query.endswith(
+        "WHERE t.merchant_category = $1 AND p.decision = $2 AND p.scored_at >= $3"
+    )
+    assert values == [1, True, start]
+
+
+def test_transaction_prediction_filters_use_latest_prediction():
+    end = datetime(2024, 2, 1, tzinfo=UTC)
+
+    query, values = transaction_query(
+        "t.id",
+        TransactionFilters(
+            min_amount=10.0,
+            foreign_transaction=True,
+            min_probability=0.8,
+            end=end,
+        ),
+    )
+
+    assert "JOIN LATERAL" in query
+    assert "ORDER BY latest.scored_at DESC, latest.id DESC LIMIT 1) p ON TRUE" in query
+    assert query.endswith(
+        "WHERE t.amount >= $1 AND t.foreign_transaction = $2"
+        " AND p.fraud_probability >= $3 AND t.created_at < $4"
+    )
+    assert values == [10.0, True, 0.8, end]
+
+
+@pytest.mark.anyio
+async def test_fetch_transaction_feature_batch_is_one_keyset_statement(make_connection):
+    connection = make_connection([[{"id": 4, "amount": 10.0}]])
+
+    rows = await fetch_transaction_feature_batch(
+        after_id=3, limit=500, connection=connection
+    )
+
+    assert rows == [(4, 10.0)]
+    ((query, values),) = connection.queries
+    assert "WHERE t.id > $1 ORDER BY t.id LIMIT $2" in query
+    assert values == [3, 500]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ("stream", "columns"),
+    [
+        (stream_transactions_for_export, TRANSACTION_EXPORT_COLUMNS),
+        (stream_predictions_for_export, PREDICTION_EXPORT_COLUMNS),
+    ],
+)
+async def test_export_streams_select_the_export_columns(stream, columns):
+    queries = []
+
+    async def stream_query(query, values, *, batch_size, isolation):
+        queries.append(query)
+        yield []
+
+    mocker(transaction_repo).mock("_stream_query").side_effect(stream_query)
+
+    [batch async for batch in stream(TransactionFilters(decision=1))]
+
+    assert [_selected_columns(query) for query in queries] == [columns]
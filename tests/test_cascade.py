@@ -0,0 +1,228 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from chainmock import mocker
+
+from api.domain.cascade import (
+    NUMERIC_FEATURES,
+    Cascade,
+    CascadeBand,
+    LinearPrescreen,
+    fit_prescreen,
+    pick_band,
+)
+from api.domain.fraud_scoring import FEATURE_COLUMNS
+from api.enums import MerchantCategory
+from api.services import cascade as cascade_service
+from api.services import scoring as scoring_service
+from api.services.cascade import CascadeMetrics, build_cascade, prescreen_payload
+from api.services.csv_import import CSV_REQUIRED_COLUMNS
+
+PRESCREEN = LinearPrescreen(
+    intercept=-4.0,
+    weights={name: 0.0 for name in NUMERIC_FEATURES} | {"amount": 0.01},
+    category_weights={"Electronics": 0.5},
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_cascade():
+    cascade_service._cascade = None
+    cascade_service._cascade_loaded = False
+    cascade_service._metrics = CascadeMetrics()
+    yield
+    cascade_service._cascade = None
+    cascade_service._cascade_loaded = False
+    cascade_service._metrics = CascadeMetrics()
+
+
+def _features(amount: float = 100.0) -> dict:
+    return {
+        "amount": amount,
+        "transaction_hour": 12,
+        "merchant_category": MerchantCategory.ELECTRONICS,
+        "foreign_transaction": False,
+        "location_mismatch": False,
+        "device_trust_score": 80,
+        "velocity_last_24h": 5,
+        "cardholder_age": 30,
+    }
+
+
+def _request(amount: float = 100.0) -> scoring_service.ScoreRequest:
+    return scoring_service.ScoreRequest(transaction_id="tx_1", **_features(amount))
+
+
+def _use_cascade(low: float, high: float, threshold: float = 0.5) -> None:
+    cascade_service._cascade = Cascade(
+        prescreen=PRESCREEN, band=CascadeBand(low=low, high=high), threshold=threshold
+    )
+    cascade_service._cascade_loaded = True
+
+
+def _csv(rows: int) -> io.StringIO:
+    rng = np.random.default_rng(3)
+    categories = [category.value for category in MerchantCategory]
+    lines = [",".join(CSV_REQUIRED_COLUMNS)]
+    for index in range(rows):
+        values = {
+            "transaction_id": f"tx_{index}",
+            "amount": f"{rng.uniform(0, 800):.2f}",
+            "transaction_hour": str(rng.integers(0, 24)),
+            "merchant_category": categories[index % len(categories)],
+            "foreign_transaction": str(rng.integers(0, 2)),
+            "location_mismatch": str(rng.integers(0, 2)),
+            "device_trust_score": str(rng.integers(0, 101)),
+            "velocity_last_24h": str(rng.integers(0, 10)),
+            "cardholder_age": str(rng.integers(18, 90)),
+            "is_fraud": "0",
+        }
+        lines.append(",".join(values[column] for column in CSV_REQUIRED_COLUMNS))
+    return io.StringIO("\n".join(lines) + "\n")
+
+
+def test_prescreen_probability_matches_vectorized_probabilities():
+    features = [_features(amount) for amount in (0.0, 250.0, 700.0)]
+    features_df = pd.DataFrame(features, columns=pd.Index(FEATURE_COLUMNS))
+
+    expected = PRESCREEN.probabilities(features_df)
+
+    assert [PRESCREEN.probability(row) for row in features] == pytest.approx(expected)
+
+
+def test_fit_prescreen_recovers_a_linear_model():
+    rng = np.random.default_rng(11)
+    features_df = pd.DataFrame(
+        [_features(float(amount)) for amount in rng.uniform(0, 800, 200)],
+        columns=pd.Index(FEATURE_COLUMNS),
+    )
+    features_df["transaction_hour"] = rng.integers(0, 24, 200)
+    features_df["merchant_category"] = rng.choice(
+        [MerchantCategory.ELECTRONICS, MerchantCategory.TRAVEL], 200
+    )
+
+    fitted = fit_prescreen(features_df, PRESCREEN.probabilities(features_df))
+
+    assert fitted.probabilities(features_df) == pytest.approx(
+        PRESCREEN.probabilities(features_df)
+    )
+    assert set(fitted.category_weights) == {"Electronics", "Travel"}
+    assert all(type(name) is str for name in fitted.category_weights)
+
+
+def test_pick_band_keeps_every_sample_decision():
+    probabilities = np.array([0.05, 0.2, 0.45, 0.4, 0.7, 0.9])
+    decisions = np.array([0, 0, 0, 1, 1, 1])
+
+    band = pick_band(probabilities, decisions, threshold=0.5)
+
+    assert band.low == 0.4
+    assert 0.5 <= band.high < 0.5 + 1e-12
+    assert [band.stage(p) for p in probabilities] == [0, 0, None, None, 1, 1]
+
+
+def test_pick_band_covers_threshold_and_applies_margin():
+    band = pick_band(
+        np.array([0.1, 0.2, 0.8, 0.9]),
+        np.array([0, 0, 1, 1]),
+        threshold=0.5,
+        margin=0.05,
+    )
+
+    assert (band.low, band.high) == pytest.approx((0.45, 0.55))
+
+
+def test_pick_band_requires_both_classes():
+    with pytest.raises(ValueError, match="both cleared and flagged"):
+        pick_band(np.array([0.1, 0.2]), np.array([0, 0]), threshold=0.5)
+
+
+def test_cascade_round_trips_through_dict():
+    cascade = Cascade(
+        prescreen=PRESCREEN, band=CascadeBand(low=0.1, high=0.6), threshold=0.5
+    )
+
+    assert Cascade.from_dict(cascade.to_dict()) == cascade
+
+
+def test_prescreen_payload_counts_each_stage():
+    _use_cascade(low=0.1, high=0.6)
+
+    assert prescreen_payload(_request(10.0), threshold=0.5) == (
+        pytest.approx(PRESCREEN.probability(_features(10.0))),
+        0,
+    )
+    assert prescreen_payload(_request(800.0), threshold=0.5) == (
+        pytest.approx(PRESCREEN.probability(_features(800.0))),
+        1,
+    )
+    assert prescreen_payload(_request(300.0), threshold=0.5) is None
+    assert prescreen_payload(_request(10.0), threshold=0.7) is None
+
+    stats = cascade_service.cascade_stats()
+    assert (stats.prescreened, stats.cleared, stats.flagged) == (3, 1, 1)
+    assert (stats.escalated, stats.bypassed) == (1, 1)
+    assert stats.hit_rate == pytest.approx(2 / 3)
+
+
+def test_prescreen_payload_is_a_noop_without_cascade(make_model):
+    mocker(cascade_service).mock("get_model_bundle").return_value(
+        {"model": make_model(PRESCREEN.probabilities), "threshold": 0.5}
+    ).called_once()
+
+    assert prescreen_payload(_request(), threshold=0.5) is None
+    assert prescreen_payload(_request(), threshold=0.5) is None
+    assert cascade_service.cascade_stats().enabled is False
+
+
+def test_score_payload_returns_early_exit_without_full_model():
+    _use_cascade(low=0.1, high=0.6)
+    mocker(scoring_service).mock("get_model").not_called()
+
+    fraud_probability, decision, threshold, prescreened = scoring_service.score_payload(
+        _request(10.0), threshold=0.5
+    )
+
+    assert fraud_probability == pytest.approx(PRESCREEN.probability(_features(10.0)))
+    assert (decision, threshold, prescreened) == (0, 0.5, True)
+
+
+def test_score_payload_escalates_to_full_model(make_model):
+    _use_cascade(low=0.1, high=0.6)
+    mocker(scoring_service).mock("get_model").return_value(
+        make_model(PRESCREEN.probabilities)
+    ).called_once()
+
+    _, decision, _, prescreened = scoring_service.score_payload(
+        _request(300.0), threshold=0.5
+    )
+
+    assert (decision, prescreened) == (0, False)
+    assert cascade_service.cascade_stats().escalated == 1
+
+
+def test_score_payload_with_explicit_model_skips_cascade(make_model):
+    _use_cascade(low=0.1, high=0.6)
+
+    scoring_service.score_payload(
+        _request(10.0), model=make_model(PRESCREEN.probabilities), threshold=0.5
+    )
+
+    assert cascade_service.cascade_stats().prescreened == 0
+
+
+def test_build_cascade_keeps_held_out_decisions(make_model):
+    cascade, report = build_cascade(
+        _csv(400),
+        model=make_model(PRESCREEN.probabilities),
+        threshold=0.5,
+        chunk_size=100,
+    )
+
+    assert report.training_rows + report.validation_rows == 400
+    assert report.validation_decision_changes == 0
+    assert report.training_decision_changes == 0
+    assert cascade.band.low <= 0.5 <= cascade.band.high
+    assert report.validation_escalation_rate < 0.1
@@ -0,0 +1,144 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+from api.enums import MERCHANT_CATEGORY_CODES, MerchantCategory
+from api.migrations import m0002_compact_storage
+from api.models import Prediction, Transaction
+from api.repositories.encoding import (
+    merchant_category_code,
+    merchant_category_sql,
+    select_columns,
+)
+
+
+def test_category_codes_decode_by_array_subscript():
+    assert merchant_category_code(MerchantCategory.GROCERY) == 3
+    assert merchant_category_code("Clothing") == 5
+    assert merchant_category_sql("t.merchant_category") == (
+        "(ARRAY['Electronics', 'Travel', 'Grocery', 'Food', 'Clothing']::text[])"
+        "[t.merchant_category]"
+    )
+
+
+def test_select_columns_keep_api_shapes():
+    assert select_columns(("id", "merchant_category", "decision"), "x") == (
+        f"x.id, {merchant_category_sql('x.merchant_category')} AS merchant_category, "
+        "x.decision::int AS decision"
+    )
+
+
+def test_merchant_category_field_round_trips_codes():
+    field = Transaction._meta.fields_map["merchant_category"]
+
+    for category, code in MERCHANT_CATEGORY_CODES.items():
+        assert field.to_db_value(category, Transaction) == code
+        assert field.to_python_value(code) is category
+    assert field.to_db_value("Travel", Transaction) == 2
+    assert field.to_python_value(None) is None
+
+
+def test_decision_field_stores_booleans_and_reads_ints():
+    field = Prediction._meta.fields_map["decision"]
+
+    assert field.to_db_value(1, Prediction) is True
+    assert field.to_db_value(0, Prediction) is False
+    assert field.to_python_value(True) == 1
+    assert type(field.to_python_value(False)) is int
+
+
+class _SchemaConnection:
+    """Records statements against a database with the given column types."""
+
+    def __init__(self, types: dict[tuple[str, str], str], partitions: list) -> None:
+        self.types = types
+        self.partitions = partitions
+        self.statements: list[str] = []
+
+    async def fetch(self, query, *args):
+        if "information_schema.columns" in query:
+            return [
+                {"table_name": table, "column_name": column, "data_type": data_type}
+                for (table, column), data_type in self.types.items()
+            ]
+        return self.partitions
+
+    async def fetchval(self, query, name):
+        tables = {f'"{table}"' for table, _ in self.types}
+        return name if name in tables else None
+
+    async def execute(self, query, *args):
+        self.statements.append(query)
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+def _wide_types():
+    return {
+        ("transaction", "transaction_hour"): "integer",
+        ("transaction", "device_trust_score"): "integer",
+        ("transaction", "cardholder_age"): "integer",
+        ("transaction", "merchant_category"): "character varying",
+        ("prediction_rollup", "merchant_category"): "character varying",
+        ("prediction", "decision"): "integer",
+    }
+
+
+@pytest.mark.anyio
+async def test_compact_migration_narrows_columns_and_rebuilds_predictions():
+    partitions = [
+        {"name": name, "attached": attached, "rows_estimate": 0, "total_bytes": 0}
+        for name, attached in (
+            ("prediction_default", True),
+            ("prediction_p2024_01", True),
+            ("prediction_p2023_12", False),
+        )
+    ]
+    connection = _SchemaConnection(_wide_types(), partitions)
+
+    await m0002_compact_storage.upgrade(connection)
+
+    transaction_alter, rollup_alter, *rebuild = connection.statements
+    assert transaction_alter.startswith('ALTER TABLE "transaction" ')
+    assert transaction_alter.count("TYPE SMALLINT") == 4
+    assert "WHEN 'Clothing' THEN 5" in transaction_alter
+    assert rollup_alter.startswith('ALTER TABLE "prediction_rollup" ')
+    assert rebuild[:2] == [
+        'ALTER TABLE "prediction_default" RENAME TO "prediction_default_wide"',
+        'ALTER TABLE "prediction_p2024_01" RENAME TO "prediction_p2024_01_wide"',
+    ]
+    assert "decision BOOLEAN NOT NULL" in rebuild[2]
+    assert any('CREATE TABLE "prediction_p2024_01"' in sql for sql in rebuild)
+    assert not any("prediction_p2023_12" in sql for sql in rebuild)
+    assert "decision <> 0" in rebuild[-1]
+    assert "WHERE decision = true" in rebuild[-1]
+
+
+@pytest.mark.anyio
+async def test_compact_migration_is_a_no_op_on_compact_schema():
+    types = {
+        key: "smallint" for key in _wide_types() if key != ("prediction", "decision")
+    }
+    types["prediction", "decision"] = "boolean"
+    connection = _SchemaConnection(types, [])
+
+    await m0002_compact_storage.upgrade(connection)
+
+    assert connection.statements == []
+
+
+@pytest.mark.anyio
+async def test_compact_migration_skips_tables_that_do_not_exist():
+    types = {
+        key: data_type
+        for key, data_type in _wide_types().items()
+        if key[0] != "prediction_rollup"
+    }
+    connection = _SchemaConnection(types, [])
+
+    await m0002_compact_storage.upgrade(connection)
+
+    assert connection.statements[0].startswith('ALTER TABLE "transaction" ')
+    assert not any("prediction_rollup" in sql for sql in connection.statements)
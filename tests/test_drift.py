@@ -0,0 +1,252 @@
+import json
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from chainmock import mocker
+
+from api.domain.drift import (
+    AMOUNT_EDGES,
+    BinnedCounts,
+    DriftSketch,
+    drift_status,
+    grouped_psi,
+    psi,
+    quantile_groups,
+)
+from api.domain.fraud_scoring import FEATURE_COLUMNS
+from api.enums import MerchantCategory
+from api.schemas import ScoreRequest
+from api.services import drift as drift_service
+from api.services.drift import DriftMonitor, current_drift_report, drift_report
+
+
+def _frame(rows: int, *, seed: int = 3, amount_scale: float = 1.0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "amount": rng.lognormal(4, 1, rows) * amount_scale,
+            "transaction_hour": rng.integers(0, 24, rows),
+            "merchant_category": rng.choice(
+                [category.value for category in MerchantCategory], rows
+            ),
+            "foreign_transaction": False,
+            "location_mismatch": False,
+            "device_trust_score": rng.integers(0, 101, rows),
+            "velocity_last_24h": 1,
+            "cardholder_age": 30,
+        },
+        columns=pd.Index(FEATURE_COLUMNS),
+    )
+
+
+def _sketch(features_df: pd.DataFrame, seed: int = 3) -> DriftSketch:
+    sketch = DriftSketch()
+    probabilities = np.random.default_rng(seed).beta(1, 20, len(features_df))
+    sketch.observe_frame(features_df, probabilities)
+    return sketch
+
+
+def _monitor(tmp_path, name: str = "worker-1") -> DriftMonitor:
+    monitor = DriftMonitor(
+        tmp_path,
+        baseline_path=tmp_path / "baseline.csv",
+        interval_seconds=60,
+        max_age_seconds=300,
+    )
+    monitor.snapshot_path = tmp_path / f"{name}.json"
+    return monitor
+
+
+def _request(amount: float = 120.0) -> ScoreRequest:
+    return ScoreRequest(
+        transaction_id="tx_1",
+        amount=amount,
+        transaction_hour=14,
+        merchant_category=MerchantCategory.TRAVEL,
+        foreign_transaction=False,
+        location_mismatch=False,
+        device_trust_score=85,
+        velocity_last_24h=3,
+        cardholder_age=35,
+    )
+
+
+def test_binned_counts_observe_matches_observe_many():
+    values = np.array([0.001, 0.01, 5.0, 99.99, 1e7])
+    one_by_one = BinnedCounts(AMOUNT_EDGES)
+    batched = BinnedCounts(AMOUNT_EDGES)
+
+    for value in values:
+        one_by_one.observe(float(value))
+    batched.observe_many(values)
+
+    assert one_by_one.counts == batched.counts
+    assert batched.counts[0] == 1
+    assert batched.counts[-1] == 1
+
+
+def test_binned_counts_refuses_to_merge_different_edges():
+    with pytest.raises(ValueError, match="different edges"):
+        BinnedCounts((1.0, 2.0)).merge(BinnedCounts((1.0, 3.0)))
+
+
+def test_merged_sketches_equal_one_sketch_of_all_rows():
+    features_df = _frame(600)
+    probabilities = np.linspace(0, 1, 600)
+    whole = DriftSketch()
+    whole.observe_frame(features_df, probabilities)
+    merged = DriftSketch()
+    for part in (slice(0, 200), slice(200, 600)):
+        worker = DriftSketch()
+        worker.observe_frame(features_df.iloc[part], probabilities[part])
+        merged.merge(DriftSketch.from_dict(json.loads(json.dumps(worker.to_dict()))))
+
+    assert merged.to_dict() == whole.to_dict()
+
+
+def test_from_dict_rejects_other_layouts():
+    data = DriftSketch().to_dict() | {"layout": 99}
+
+    with pytest.raises(ValueError, match="layout"):
+        DriftSketch.from_dict(data)
+
+
+def test_quantile_groups_split_baseline_mass_evenly():
+    counts = [0, 10, 10, 10, 10, 10, 10, 10, 10, 10, 10, 0]
+
+    groups = quantile_groups(counts, groups=5)
+
+    assert [sum(counts[part]) for part in groups] == [20, 20, 20, 20, 20]
+    assert groups[0].start == 0
+    assert groups[-1].stop == len(counts)
+
+
+def test_psi_is_zero_for_same_distribution_and_none_without_data():
+    assert psi([10, 20, 30], [1, 2, 3]) == pytest.approx(0)
+    assert psi([10, 20, 30], [0, 0, 0]) is None
+
+
+def test_grouped_psi_flags_shifted_amounts():
+    baseline = _sketch(_frame(5_000))
+    same = _sketch(_frame(2_000, seed=4), seed=4)
+    shifted = _sketch(_frame(2_000, seed=4, amount_scale=5), seed=4)
+
+    assert drift_status(grouped_psi(baseline.amount, same.amount)) == "stable"
+    assert drift_status(grouped_psi(baseline.amount, shifted.amount)) == "significant"
+
+
+def test_drift_status_thresholds():
+    assert [drift_status(value) for value in (None, 0.05, 0.1, 0.3)] == [
+        "no_data",
+        "stable",
+        "moderate",
+        "significant",
+    ]
+
+
+def test_drift_report_covers_every_monitored_feature():
+    baseline = _sketch(_frame(5_000))
+
+    report = drift_report(_sketch(_frame(2_000, seed=4), seed=4), baseline, workers=4)
+
+    assert [item.feature for item in report.features] == [
+        "amount",
+        "device_trust_score",
+        "merchant_category",
+        "fraud_probability",
+    ]
+    assert all(item.status == "stable" for item in report.features)
+    assert (report.workers, report.baseline_rows, report.live_rows) == (4, 5_000, 2_000)
+
+
+def test_read_snapshots_merges_fresh_files_of_other_workers(tmp_path):
+    other = _monitor(tmp_path, "worker-2")
+    other.observe(_request(), 0.2)
+    other.write_snapshot()
+    stale = _monitor(tmp_path, "worker-3")
+    stale.observe(_request(), 0.2)
+    stale.write_snapshot()
+    os.utime(stale.snapshot_path, (0, 0))
+    (tmp_path / "broken.json").write_text("{", encoding="utf-8")
+    monitor = _monitor(tmp_path)
+    monitor.observe(_request(), 0.9)
+    monitor.write_snapshot()
+
+    merged, workers = monitor.read_snapshots()
+
+    assert workers == 1
+    assert merged.rows == 1
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_prescreened_scores_only_count_towards_feature_drift(tmp_path):
+    monitor = _monitor(tmp_path)
+
+    monitor.observe(_request(), 0.9)
+    monitor.observe(_request(), 0.01, prescreened=True)
+
+    assert monitor.sketch.rows == monitor.sketch.amount.total == 2
+    assert monitor.sketch.fraud_probability.total == 1
+
+
+def test_baseline_scores_only_rows_the_cascade_escalates(tmp_path):
+    features_df = _frame(4)
+    cascade = SimpleNamespace(
+        prescreen=SimpleNamespace(probabilities=lambda _df: np.array([0, 1, 2, 3])),
+        band=SimpleNamespace(escalated=lambda values: values >= 2),
+    )
+    mocker(drift_service).mock("read_feature_frame").return_value(features_df)
+    mocker(drift_service).mock("get_model").return_value(object())
+    mocker(drift_service).mock("predict_probabilities").return_value(
+        np.array([0.01, 0.02, 0.5, 0.6])
+    )
+    mocker(drift_service).mock("get_cascade").return_value(cascade)
+    csv_path = tmp_path / "baseline.csv"
+    csv_path.write_text("", encoding="utf-8")
+
+    baseline = drift_service.build_baseline(csv_path)
+
+    assert baseline.rows == baseline.amount.total == 4
+    assert baseline.fraud_probability.total == 2
+    escalated = DriftSketch()
+    escalated.fraud_probability.observe_many(np.array([0.5, 0.6]))
+    assert baseline.fraud_probability.counts == escalated.fraud_probability.counts
+
+
+@pytest.mark.anyio
+async def test_current_drift_report_merges_workers_without_database(tmp_path):
+    other = _monitor(tmp_path, "worker-2")
+    other.observe(_request(), 0.2)
+    other.write_snapshot()
+    monitor = _monitor(tmp_path)
+    monitor.observe(_request(), 0.9)
+    baseline = _sketch(_frame(1_000))
+    drift_service._monitor = monitor
+    drift_service._baseline = baseline
+    try:
+        report = await current_drift_report()
+    finally:
+        drift_service._monitor = None
+        drift_service._baseline = None
+
+    assert report.enabled is True
+    assert (report.workers, report.live_rows) == (2, 2)
+    assert report.baseline_rows == 1_000
+
+
+@pytest.mark.anyio
+async def test_current_drift_report_when_disabled():
+    report = await current_drift_report()
+
+    assert report.enabled is False
+    assert report.live_rows == 0
+    assert {item.status for item in report.features} == {"no_data"}
+
+
+def test_observe_score_is_a_noop_without_monitor():
+    drift_service.observe_score(_request(), 0.5)
+
+    assert drift_service.get_drift_monitor() is None
@@ -0,0 +1,128 @@
+import io
+
+import numpy as np
+import pytest
+
+from api.core.exceptions import InvalidCSVError
+from api.domain.evaluation import ScoreHistogram
+from api.services.evaluation import evaluate_labeled_csv
+
+CSV_HEADER = (
+    "transaction_id,amount,transaction_hour,merchant_category,foreign_transaction,"
+    "location_mismatch,device_trust_score,velocity_last_24h,cardholder_age,is_fraud\n"
+)
+
+
+def test_score_histogram_confusion_matches_brute_force():
+    rng = np.random.default_rng(7)
+    probabilities = rng.random(5_000)
+    labels = rng.random(5_000) < probabilities
+    histogram = ScoreHistogram(bins=100)
+    histogram.update(probabilities[:2_000], labels[:2_000])
+    histogram.update(probabilities[2_000:], labels[2_000:])
+
+    for counts in histogram.confusion_at([0.0, 0.25, 0.5, 0.9, 1.0]):
+        flagged = probabilities >= counts.threshold
+        assert counts.true_positives == int(np.sum(flagged & labels))
+        assert counts.false_positives == int(np.sum(flagged & ~labels))
+        assert counts.false_negatives == int(np.sum(~flagged & labels))
+        assert counts.true_negatives == int(np.sum(~flagged & ~labels))
+
+
+@pytest.mark.parametrize("threshold", [0.071, 0.141, 0.29])
+def test_score_histogram_flags_a_score_equal_to_the_threshold(threshold):
+    histogram = ScoreHistogram(bins=100_000)
+    histogram.update(np.array([threshold]), np.array([1]))
+
+    [counts] = histogram.confusion_at([threshold])
+
+    assert (counts.true_positives, counts.false_negatives) == (1, 0)
+
+
+def test_score_histogram_perfect_separation_metrics():
+    histogram = ScoreHistogram(bins=10)
+    histogram.update(np.array([0.05, 0.15, 0.85, 0.95]), np.array([0, 0, 1, 1]))
+
+    assert histogram.roc_auc() == pytest.approx(1.0)
+    assert histogram.average_precision() == pytest.approx(1.0)
+
+
+def test_score_histogram_cost_optimal_threshold_prefers_recall_when_fn_costly():
+    histogram = ScoreHistogram(bins=10)
+    histogram.update(
+        np.array([0.15, 0.35, 0.45, 0.65, 0.85]),
+        np.array([0, 1, 0, 1, 1]),
+    )
+
+    balanced = histogram.cost_optimal_threshold(fp_cost=1.0, fn_cost=1.0)
+    recall_heavy = histogram.cost_optimal_threshold(fp_cost=1.0, fn_cost=10.0)
+
+    assert balanced.cost == 1.0
+    assert recall_heavy.false_negatives == 0
+    assert recall_heavy.threshold <= 0.3
+
+
+def test_score_histogram_merge_rejects_different_bins():
+    with pytest.raises(ValueError):
+        ScoreHistogram(bins=10).merge(ScoreHistogram(bins=20))
+
+
+def _per_hundred(df):
+    return df["amount"].to_numpy() / 100
+
+
+def test_evaluate_labeled_csv_single_pass_report(make_model):
+    csv_content = (
+        CSV_HEADER
+        + "1,10,14,Electronics,0,0,85,3,35,0\n"
+        + "2,30,14,Travel,1,0,85,3,35,0\n"
+        + "3,70,14,Grocery,0,1,85,3,35,1\n"
+        + "4,90,14,Food,1,1,85,3,35,1\n"
+        + "5,0,14,Food,1,1,85,3,35,1\n"
+        + "6,50,14,Unknown,1,1,85,3,35,0\n"
+    )
+
+    report = evaluate_labeled_csv(
+        io.StringIO(csv_content),
+        model=make_model(_per_hundred),
+        threshold=0.5,
+        chunk_size=2,
+        thresholds=[0.2, 0.5, 0.8],
+    )
+
+    assert report.total_rows == 6
+    assert report.evaluated_rows == 4
+    assert report.skipped_invalid == 2
+    assert report.positives == 2
+    assert report.negatives == 2
+    assert report.roc_auc == pytest.approx(1.0)
+    assert report.current_threshold.true_positives == 2
+    assert report.current_threshold.false_positives == 0
+    assert [metrics.threshold for metrics in report.sweep] == [0.2, 0.5, 0.8]
+    assert report.sweep[0].false_positives == 1
+    assert report.sweep[2].recall == 0.5
+    assert report.cost_optimal_threshold.cost == 0
+
+
+def test_evaluate_labeled_csv_requires_label_column(make_model):
+    csv_content = (
+        "transaction_id,amount,transaction_hour,merchant_category,foreign_transaction,"
+        "location_mismatch,device_trust_score,velocity_last_24h,cardholder_age\n"
+        "1,10,14,Electronics,0,0,85,3,35\n"
+    )
+
+    with pytest.raises(InvalidCSVError) as exc_info:
+        evaluate_labeled_csv(
+            io.StringIO(csv_content), model=make_model(_per_hundred), threshold=0.5
+        )
+
+    assert exc_info.value.detail == "CSV missing required columns: is_fraud"
+
+
+def test_evaluate_labeled_csv_missing_header_raises(make_model):
+    with pytest.raises(InvalidCSVError) as exc_info:
+        evaluate_labeled_csv(
+            io.StringIO(""), model=make_model(_per_hundred), threshold=0.5
+        )
+
+    assert exc_info.value.detail == "CSV header is missing"
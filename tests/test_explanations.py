@@ -0,0 +1,239 @@
+from datetime import UTC, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from chainmock import mocker
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from api.core.exceptions import (
+    ExplanationUnavailableError,
+    PredictionNotFoundError,
+    TransactionNotFoundError,
+)
+from api.domain.explanations import linear_explainer
+from api.domain.fraud_scoring import FEATURE_COLUMNS
+from api.enums import MerchantCategory
+from api.repositories.explanations import ExplanationRow
+from api.services import explanations as explanation_service
+from api.services.explanations import (
+    explain_feature_rows,
+    explain_predictions,
+    explain_transaction,
+    get_explainer,
+)
+
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=UTC)
+NUMERIC = [column for column in FEATURE_COLUMNS if column != "merchant_category"]
+
+
+def _features_df(rows: int = 300) -> pd.DataFrame:
+    rng = np.random.default_rng(5)
+    return pd.DataFrame(
+        {
+            "amount": rng.uniform(1, 900, rows),
+            "transaction_hour": rng.integers(0, 24, rows),
+            "merchant_category": rng.choice(
+                [category.value for category in MerchantCategory], rows
+            ),
+            "foreign_transaction": rng.integers(0, 2, rows).astype(bool),
+            "location_mismatch": rng.integers(0, 2, rows).astype(bool),
+            "device_trust_score": rng.integers(0, 101, rows),
+            "velocity_last_24h": rng.integers(0, 10, rows),
+            "cardholder_age": rng.integers(18, 90, rows),
+        },
+        columns=pd.Index(FEATURE_COLUMNS),
+    )
+
+
+def _pipeline(features_df: pd.DataFrame) -> Pipeline:
+    labels = (
+        features_df["amount"] / 900 + features_df["foreign_transaction"] > 1
+    ).astype(int)
+    preprocessor = ColumnTransformer(
+        [
+            ("num", StandardScaler(), NUMERIC),
+            ("cat", OneHotEncoder(handle_unknown="ignore"), ["merchant_category"]),
+        ]
+    )
+    model = Pipeline(
+        [("preprocessor", preprocessor), ("classifier", LogisticRegression())]
+    )
+    return model.fit(features_df, labels)
+
+
+@pytest.fixture(autouse=True)
+def _reset_explainer():
+    explanation_service._explainer = None
+    explanation_service._explainer_error = None
+    yield
+    explanation_service._explainer = None
+    explanation_service._explainer_error = None
+
+
+@pytest.fixture
+def model_and_rows():
+    features_df = _features_df()
+    rows = features_df.head(3).to_dict("records")
+    for index, row in enumerate(rows, start=1):
+        row["id"] = index
+    return _pipeline(features_df), rows
+
+
+def _stored(prediction_id: int) -> ExplanationRow:
+    return ExplanationRow(
+        prediction_id=prediction_id,
+        model_version="v1",
+        method="linear",
+        base_value=-1.0,
+        contributions=[
+            {"feature": "amount", "value": 120.0, "contribution": 1.5},
+            {"feature": "merchant_category", "value": "Travel", "contribution": -0.5},
+        ],
+        created_at=NOW,
+    )
+
+
+def test_linear_explainer_adds_up_to_model_log_odds():
+    features_df = _features_df()
+    model = _pipeline(features_df)
+
+    explanations = linear_explainer(model).explain(features_df)
+
+    probabilities = model.predict_proba(features_df)[:, 1]
+    assert explanations.contributions.shape == (len(features_df), len(FEATURE_COLUMNS))
+    assert explanations.log_odds == pytest.approx(
+        np.log(probabilities / (1 - probabilities))
+    )
+
+
+def test_linear_explainer_rejects_other_models():
+    with pytest.raises(ValueError, match="two-step Pipeline"):
+        linear_explainer(LogisticRegression())
+
+
+def test_explain_feature_rows_ranks_contributions(model_and_rows):
+    model, rows = model_and_rows
+
+    explained = explain_feature_rows(linear_explainer(model), rows, model_version="v1")
+
+    assert [row["prediction_id"] for row in explained] == [1, 2, 3]
+    for row, source in zip(explained, rows, strict=True):
+        sizes = [abs(item["contribution"]) for item in row["contributions"]]
+        assert sizes == sorted(sizes, reverse=True)
+        assert {item["feature"] for item in row["contributions"]} == set(
+            FEATURE_COLUMNS
+        )
+        assert all(
+            item["value"] == source[item["feature"]] for item in row["contributions"]
+        )
+
+
+def test_get_explainer_raises_for_unsupported_model():
+    mocker(explanation_service).mock("get_model").return_value(
+        LogisticRegression()
+    ).called_once()
+
+    for _ in range(2):
+        with pytest.raises(ExplanationUnavailableError):
+            get_explainer()
+
+
+@pytest.mark.anyio
+async def test_explain_predictions_computes_and_stores_only_missing(model_and_rows):
+    model, rows = model_and_rows
+    mocker(explanation_service).mock("get_model").return_value(model)
+    mocker(explanation_service).mock("get_model_version").return_value("v1")
+    mocker(explanation_service.explanation_repo).mock(
+        "get_explanations", force_async=True
+    ).return_value({1: _stored(1)}).awaited_once_with("v1", [1, 2, 3])
+    mocker(explanation_service.explanation_repo).mock(
+        "get_prediction_features", force_async=True
+    ).return_value(rows[1:]).awaited_once_with([2, 3])
+    inserted = []
+
+    async def insert(new_rows):
+        inserted.extend(new_rows)
+        return len(new_rows)
+
+    mocker(explanation_service.explanation_repo).mock(
+        "bulk_insert_explanations"
+    ).side_effect(insert)
+
+    explained = await explain_predictions([1, 2, 3])
+
+    assert explained[1] == _stored(1)
+    assert [row["prediction_id"] for row in inserted] == [2, 3]
+    assert explained[2] is inserted[0]
+
+
+@pytest.mark.anyio
+async def test_explain_predictions_skips_storage_when_all_cached(model_and_rows):
+    model, _ = model_and_rows
+    mocker(explanation_service).mock("get_model").return_value(model)
+    mocker(explanation_service).mock("get_model_version").return_value("v1")
+    mocker(explanation_service.explanation_repo).mock(
+        "get_explanations", force_async=True
+    ).return_value({1: _stored(1)})
+    mocker(explanation_service.explanation_repo).mock(
+        "get_prediction_features"
+    ).not_called()
+    mocker(explanation_service.explanation_repo).mock(
+        "bulk_insert_explanations"
+    ).not_called()
+
+    assert await explain_predictions([1]) == {1: _stored(1)}
+
+
+@pytest.mark.anyio
+async def test_explain_transaction_explains_latest_prediction(
+    make_transaction, make_prediction
+):
+    mocker(explanation_service.transaction_repo).mock(
+        "get_transaction_by_external_id", force_async=True
+    ).return_value(make_transaction("tx_1"))
+    mocker(explanation_service.transaction_repo).mock(
+        "list_prediction_rows_for_transaction", force_async=True
+    ).return_value([make_prediction(id=7, prescreened=True), make_prediction(id=3)])
+    mocker(explanation_service).mock(
+        "explain_predictions", force_async=True
+    ).return_value({7: _stored(7)}).awaited_once_with([7])
+
+    explanation = await explain_transaction("tx_1")
+
+    assert explanation.prediction_id == 7
+    assert explanation.prescreened
+    assert explanation.log_odds == pytest.approx(0.0)
+    assert explanation.model_probability == pytest.approx(0.5)
+    assert [item.feature for item in explanation.contributions] == [
+        "amount",
+        "merchant_category",
+    ]
+
+
+@pytest.mark.anyio
+async def test_explain_transaction_not_found():
+    mocker(explanation_service.transaction_repo).mock(
+        "get_transaction_by_external_id", force_async=True
+    ).return_value(None)
+
+    with pytest.raises(TransactionNotFoundError):
+        await explain_transaction("missing")
+
+
+@pytest.mark.anyio
+async def test_explain_transaction_without_predictions(make_transaction):
+    mocker(explanation_service.transaction_repo).mock(
+        "get_transaction_by_external_id", force_async=True
+    ).return_value(make_transaction("tx_1"))
+    mocker(explanation_service.transaction_repo).mock(
+        "list_prediction_rows_for_transaction", force_async=True
+    ).return_value([])
+
+    with pytest.raises(PredictionNotFoundError) as exc_info:
+        await explain_transaction("tx_1")
+
+    assert exc_info.value.detail == "No prediction for transaction: tx_1"
@@ -0,0 +1,114 @@
+import io
+import json
+from datetime import UTC, datetime
+
+import pyarrow.parquet as pq
+import pytest
+
+from api.repositories.transactions import (
+    PREDICTION_EXPORT_COLUMNS,
+    TRANSACTION_EXPORT_COLUMNS,
+)
+from api.services.csv_import import read_csv_header
+from api.services.export import (
+    PREDICTION_EXPORT_SCHEMA,
+    TRANSACTION_EXPORT_SCHEMA,
+    encode_export,
+)
+
+SCORED_AT = datetime(2024, 1, 1, 12, tzinfo=UTC)
+
+
+async def _batches(batches):
+    for rows in batches:
+        yield rows
+
+
+def _prediction_batches(batch_count: int, batch_size: int = 2):
+    return [
+        [
+            (
+                index,
+                f"tx_{index}",
+                index / 10,
+                index % 2,
+                index == 0,
+                SCORED_AT,
+            )
+            for index in range(batch * batch_size, (batch + 1) * batch_size)
+        ]
+        for batch in range(batch_count)
+    ]
+
+
+async def _encode(batches, export_format, schema=PREDICTION_EXPORT_SCHEMA):
+    return [
+        chunk
+        async for chunk in encode_export(
+            _batches(batches), schema=schema, export_format=export_format
+        )
+    ]
+
+
+def test_export_schemas_match_repository_columns():
+    assert tuple(TRANSACTION_EXPORT_SCHEMA.names) == TRANSACTION_EXPORT_COLUMNS
+    assert tuple(PREDICTION_EXPORT_SCHEMA.names) == PREDICTION_EXPORT_COLUMNS
+
+
+@pytest.mark.anyio
+async def test_csv_export_writes_header_once_and_one_chunk_per_batch():
+    chunks = await _encode(_prediction_batches(3), "csv")
+
+    assert len(chunks) == 4
+    lines = b"".join(chunks).decode().splitlines()
+    assert lines[0] == (
+        '"id","transaction_id","fraud_probability","decision","prescreened","scored_at"'
+    )
+    assert len(lines) == 7
+    assert lines[2] == '1,"tx_1",0.1,1,false,2024-01-01 12:00:00.000000Z'
+
+
+@pytest.mark.anyio
+async def test_empty_csv_export_still_has_header():
+    chunks = await _encode([], "csv", TRANSACTION_EXPORT_SCHEMA)
+
+    header = read_csv_header(io.StringIO(b"".join(chunks).decode()))
+    assert tuple(header) == TRANSACTION_EXPORT_COLUMNS
+
+
+@pytest.mark.anyio
+async def test_ndjson_export_writes_one_object_per_line():
+    chunks = await _encode(_prediction_batches(2), "ndjson")
+
+    records = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert len(records) == 4
+    assert records[3] == {
+        "id": 3,
+        "transaction_id": "tx_3",
+        "fraud_probability": 0.3,
+        "decision": 1,
+        "prescreened": False,
+        "scored_at": "2024-01-01T12:00:00Z",
+    }
+
+
+@pytest.mark.anyio
+async def test_parquet_export_streams_one_row_group_per_batch():
+    chunks = await _encode(_prediction_batches(3), "parquet")
+
+    assert len(chunks) == 4
+    parquet_file = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert parquet_file.num_row_groups == 3
+    assert parquet_file.schema_arrow == PREDICTION_EXPORT_SCHEMA
+    table = parquet_file.read()
+    assert table.column("id").to_pylist() == list(range(6))
+    assert table.column("scored_at")[0].as_py() == SCORED_AT
+
+
+@pytest.mark.anyio
+async def test_empty_parquet_export_is_a_valid_file():
+    chunks = await _encode([], "parquet")
+
+    table = pq.read_table(io.BytesIO(b"".join(chunks)))
+    assert table.num_rows == 0
+    assert table.schema == PREDICTION_EXPORT_SCHEMA
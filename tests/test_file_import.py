@@ -0,0 +1,185 @@
+import gzip
+import io
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import zstandard
+from chainmock import mocker
+
+from api.core.exceptions import InvalidCSVError
+from api.services import csv_import
+from api.services.file_import import (
+    detect_import_format,
+    import_transactions_from_file,
+)
+
+CSV_CONTENT = (
+    "transaction_id,amount,transaction_hour,merchant_category,foreign_transaction,"
+    "location_mismatch,device_trust_score,velocity_last_24h,cardholder_age\n"
+    "tx_1,150.5,14,Electronics,0,0,85,3,35\n"
+    "tx_2,20.0,3,Travel,1,0,40,9,61\n"
+    "tx_1,99.0,14,Electronics,0,0,85,3,35\n"
+    "tx_3,20.0,3,Travel,1,0,40,9,16\n"
+)
+
+
+def _flagged(df: pd.DataFrame) -> np.ndarray:
+    return np.full(len(df), 0.9)
+
+
+def _parquet_bytes(table: pa.Table, row_group_size: int = 2) -> io.BytesIO:
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, row_group_size=row_group_size)
+    buffer.seek(0)
+    return buffer
+
+
+def _mock_pipeline(persisted: list[str], model: Any) -> None:
+    async def persist(rows, *, fraud_probabilities, decisions):
+        persisted.extend(row["transaction_id"] for row in rows)
+        return len(rows), 0
+
+    mocker(csv_import).mock("get_model").return_value(model)
+    mocker(csv_import).mock("current_threshold", force_async=True).return_value(0.5)
+    mocker(csv_import.transaction_repo).mock(
+        "bulk_get_by_external_ids", force_async=True
+    ).return_value({})
+    mocker(csv_import).mock("persist_scored_rows").side_effect(persist)
+
+
+@pytest.mark.parametrize(
+    ("filename", "expected"),
+    [
+        ("transactions.csv", "csv"),
+        ("EXPORT.CSV.GZ", "csv.gz"),
+        ("export.csv.zst", "csv.zst"),
+        ("part-0001.parquet", "parquet"),
+        ("transactions.gz", None),
+        ("transactions.txt", None),
+    ],
+)
+def test_detect_import_format(filename, expected):
+    assert detect_import_format(filename) == expected
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ("import_format", "compress"),
+    [
+        ("csv", lambda data: data),
+        ("csv.gz", gzip.compress),
+        ("csv.zst", zstandard.ZstdCompressor().compress),
+    ],
+)
+async def test_import_compressed_csv_keeps_accounting(
+    import_format, compress, make_model
+):
+    persisted: list[str] = []
+    _mock_pipeline(persisted, make_model(_flagged))
+    source = io.BytesIO(compress(CSV_CONTENT.encode()))
+
+    summary = await import_transactions_from_file(
+        source, import_format=import_format, block_size=2
+    )
+
+    assert persisted == ["tx_1", "tx_2"]
+    assert summary.total_rows == 4
+    assert summary.imported == 2
+    assert summary.skipped_duplicates == 1
+    assert summary.skipped_invalid == 1
+    assert [(error.line, error.transaction_id) for error in summary.errors] == [
+        (5, "tx_3")
+    ]
+    assert not source.closed
+
+
+@pytest.mark.anyio
+async def test_import_parquet_reads_typed_columns(make_model):
+    persisted: list[str] = []
+    _mock_pipeline(persisted, make_model(_flagged))
+    table = pa.table(
+        {
+            "transaction_id": pa.array([101, 102, 103, 101], pa.int64()),
+            "amount": [150.5, 20.0, 30.0, 99.0],
+            "transaction_hour": [14.0, 3.0, 14.5, 14.0],
+            "merchant_category": pa.array(
+                ["Electronics", "Travel", "Food", "Electronics"]
+            ).dictionary_encode(),
+            "foreign_transaction": [False, True, False, False],
+            "location_mismatch": [False, False, False, False],
+            "device_trust_score": [85, 40, 50, 85],
+            "velocity_last_24h": [3, 9, 1, 3],
+            "cardholder_age": [35, 61, 40, 35],
+            "is_fraud": [0, 1, 0, 0],
+        }
+    )
+
+    summary = await import_transactions_from_file(
+        _parquet_bytes(table), import_format="parquet"
+    )
+
+    assert persisted == ["101", "102"]
+    assert summary.total_rows == 4
+    assert summary.imported == 2
+    assert summary.skipped_duplicates == 1
+    assert summary.skipped_invalid == 1
+    assert summary.errors[0].line == 3
+    assert summary.errors[0].transaction_id == "103"
+    assert summary.errors[0].error == "Invalid row: invalid value for transaction_hour"
+
+
+@pytest.mark.anyio
+async def test_import_parquet_rejects_null_values(make_model):
+    persisted: list[str] = []
+    _mock_pipeline(persisted, make_model(_flagged))
+    frame = pd.DataFrame(
+        {
+            "transaction_id": ["tx_1", None],
+            "amount": [150.5, None],
+            "transaction_hour": [14, 3],
+            "merchant_category": ["Electronics", "Travel"],
+            "foreign_transaction": [False, None],
+            "location_mismatch": [False, False],
+            "device_trust_score": [85, 40],
+            "velocity_last_24h": [3, 9],
+            "cardholder_age": [35, 61],
+        }
+    )
+
+    summary = await import_transactions_from_file(
+        _parquet_bytes(pa.Table.from_pandas(frame)), import_format="parquet"
+    )
+
+    assert persisted == ["tx_1"]
+    assert summary.skipped_invalid == 1
+    assert summary.errors[0].transaction_id is None
+    assert summary.errors[0].error == (
+        "Invalid row: invalid value for transaction_id, amount, foreign_transaction"
+    )
+
+
+@pytest.mark.anyio
+async def test_import_parquet_missing_columns_raises():
+    table = pa.table({"transaction_id": ["tx_1"], "amount": [1.0]})
+
+    with pytest.raises(InvalidCSVError) as exc_info:
+        await import_transactions_from_file(
+            _parquet_bytes(table), import_format="parquet"
+        )
+
+    assert "Parquet file missing required columns:" in exc_info.value.detail
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("import_format", ["csv.gz", "csv.zst", "parquet"])
+async def test_import_corrupt_file_raises_invalid_csv(import_format):
+    with pytest.raises(InvalidCSVError) as exc_info:
+        await import_transactions_from_file(
+            io.BytesIO(b"definitely not compressed"), import_format=import_format
+        )
+
+    assert exc_info.value.detail.startswith(f"Could not read {import_format} file:")
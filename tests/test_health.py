@@ -0,0 +1,142 @@
+import asyncio
+import signal
+
+import pytest
+from chainmock import mocker
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.config import SettingsTest
+from api.main import create_application
+from api.routers import health
+from api.services import health as health_service
+from api.services.health import (
+    ReadinessProbe,
+    drain_on_shutdown_signal,
+    start_readiness_probe,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_probe():
+    health_service._probe = None
+    yield
+    health_service._probe = None
+
+
+@pytest.fixture
+def health_client():
+    app = FastAPI()
+    app.include_router(health.router)
+    return TestClient(app)
+
+
+def _database(*, available: bool = True):
+    client = mocker()
+    execute = client.mock("execute_query", force_async=True)
+    if available:
+        execute.return_value((1, [{"?column?": 1}]))
+    else:
+        execute.side_effect(OSError("connection refused"))
+    mocker("api.services.health.connections").mock("get").return_value(client)
+    return execute
+
+
+def test_healthz_answers_without_a_probe(health_client):
+    response = health_client.get("/healthz")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_readyz_is_not_ready_before_startup(health_client):
+    response = health_client.get("/readyz")
+
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
+
+
+def test_readyz_reports_model_and_database(health_client):
+    mocker(health_service).mock("model_bundle_loaded").return_value(True)
+    _database().called_once()
+    start_readiness_probe(cache_seconds=60, db_timeout_seconds=1)
+
+    first = health_client.get("/readyz")
+    second = health_client.get("/readyz")
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert first.json()["ready"]
+
+
+@pytest.mark.anyio
+async def test_unreachable_database_is_not_ready():
+    mocker(health_service).mock("model_bundle_loaded").return_value(True)
+    _database(available=False)
+    probe = ReadinessProbe(cache_seconds=0, db_timeout_seconds=1)
+
+    report = await probe.check()
+
+    assert (report.ready, report.model_loaded, report.database) == (False, True, False)
+
+
+@pytest.mark.anyio
+async def test_draining_flips_readiness_without_waiting_for_the_cache():
+    mocker(health_service).mock("model_bundle_loaded").return_value(True)
+    _database().called_once()
+    probe = ReadinessProbe(cache_seconds=60, db_timeout_seconds=1)
+    assert (await probe.check()).ready
+
+    probe.drain()
+    report = await probe.check()
+
+    assert (report.ready, report.draining) == (False, True)
+
+
+def test_drain_callbacks_run_once():
+    probe = ReadinessProbe(cache_seconds=60, db_timeout_seconds=1)
+    drained: list[bool] = []
+    probe.on_drain(lambda: drained.append(True))
+
+    probe.drain()
+    probe.drain()
+
+    assert drained == [True]
+
+
+@pytest.mark.anyio
+async def test_sigterm_drains_before_reaching_the_server():
+    probe = ReadinessProbe(cache_seconds=60, db_timeout_seconds=1)
+    received: list[int] = []
+    original = signal.signal(
+        signal.SIGTERM, lambda signum, _frame: received.append(signum)
+    )
+    try:
+        drain_on_shutdown_signal(probe, drain_seconds=0.05)
+        handler = signal.getsignal(signal.SIGTERM)
+        assert callable(handler)
+
+        handler(signal.SIGTERM, None)
+        await asyncio.sleep(0.01)
+        assert probe.draining
+        assert received == []
+        await asyncio.sleep(0.1)
+        assert received == [signal.SIGTERM]
+    finally:
+        signal.signal(signal.SIGTERM, original)
+
+
+def test_openapi_document_is_rendered_once():
+    app = create_application(SettingsTest())
+    client = TestClient(app)
+
+    first = client.get("/openapi.json")
+    body = app.state.openapi_body
+    second = client.get("/openapi.json")
+
+    assert first.status_code == 200
+    assert first.headers["content-type"] == "application/json"
+    assert "/transactions" in first.json()["paths"]
+    assert "/healthz" not in first.json()["paths"]
+    assert second.content == first.content == body
+    assert app.state.openapi_body is body
@@ -0,0 +1,174 @@
+import asyncio
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+import pytest
+from chainmock import mocker
+
+from api.core.exceptions import IdempotencyKeyInProgressError, IdempotencyKeyReusedError
+from api.schemas import ScoreRequest, ScoreResponse
+from api.services import idempotency as idempotency_service
+from api.services.idempotency import (
+    IdempotencyStore,
+    request_fingerprint,
+    score_idempotently,
+)
+
+
+def _store(**overrides) -> IdempotencyStore:
+    options: dict = {"cache_size": 2, "ttl_seconds": 60, "wait_seconds": 0}
+    options.update(overrides)
+    return IdempotencyStore(**options)
+
+
+def _response(transaction_id: str = "tx_1") -> ScoreResponse:
+    return ScoreResponse(
+        transaction_id=transaction_id,
+        fraud_probability=0.8,
+        decision=1,
+        threshold=0.5,
+        scored_at=datetime(2024, 1, 1, tzinfo=UTC),
+    )
+
+
+class _Scorer:
+    def __init__(self, error: Exception | None = None) -> None:
+        self.calls = 0
+        self.error = error
+
+    async def __call__(self) -> ScoreResponse:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        return _response()
+
+
+@pytest.fixture
+def keys():
+    """In-memory stand-in for the idempotency_key table."""
+    rows: dict[str, SimpleNamespace] = {}
+
+    def claim(key, request_hash, **_options):
+        if key in rows:
+            return False
+        rows[key] = SimpleNamespace(request_hash=request_hash, response=None)
+        return True
+
+    def save(key, response):
+        rows[key].response = response
+
+    def release(key):
+        if rows.get(key) is not None and rows[key].response is None:
+            del rows[key]
+
+    repo = mocker(idempotency_service.idempotency_repo)
+    repo.mock("claim_idempotency_key", force_async=True).side_effect(claim)
+    repo.mock("get_idempotency_key", force_async=True).side_effect(rows.get)
+    repo.mock("save_idempotent_response", force_async=True).side_effect(save)
+    repo.mock("release_idempotency_key", force_async=True).side_effect(release)
+    return rows
+
+
+@pytest.mark.anyio
+async def test_concurrent_duplicates_score_once(keys, make_score_request):
+    store = _store()
+    score = _Scorer()
+    payload = make_score_request()
+
+    results = await asyncio.gather(
+        *(store.run("key-1", payload, score) for _ in range(5))
+    )
+
+    assert score.calls == 1
+    assert [replayed for _, replayed in results] == [False] + [True] * 4
+    assert all(response == _response() for response, _ in results)
+    assert keys["key-1"].response == _response().model_dump(mode="json")
+    stats = store.stats()
+    assert (stats.scored, stats.coalesced, stats.in_flight) == (1, 4, 0)
+
+
+@pytest.mark.anyio
+async def test_retries_replay_from_memory_within_the_cache_size(
+    keys, make_score_request
+):
+    store = _store(cache_size=1)
+    score = _Scorer()
+
+    await store.run("key-1", make_score_request(), score)
+    response, replayed = await store.run("key-1", make_score_request(), score)
+
+    assert (response, replayed, score.calls) == (_response(), True, 1)
+    await store.run("key-2", make_score_request("tx_2"), _Scorer())
+    assert store.stats().cached == 1
+
+
+@pytest.mark.anyio
+async def test_key_reused_for_a_different_request_is_rejected(keys, make_score_request):
+    store = _store()
+    await store.run("key-1", make_score_request(), _Scorer())
+
+    with pytest.raises(IdempotencyKeyReusedError):
+        await store.run("key-1", make_score_request(amount=5.0), _Scorer())
+
+    assert store.stats().reused == 1
+
+
+@pytest.mark.anyio
+async def test_response_stored_by_another_worker_is_replayed(keys, make_score_request):
+    payload = make_score_request()
+    keys["key-1"] = SimpleNamespace(
+        request_hash=request_fingerprint(payload),
+        response=_response().model_dump(mode="json"),
+    )
+    score = _Scorer()
+
+    response, replayed = await _store().run("key-1", payload, score)
+
+    assert (response, replayed, score.calls) == (_response(), True, 0)
+
+
+@pytest.mark.anyio
+async def test_key_held_by_another_worker_gives_up_after_waiting(
+    keys, make_score_request
+):
+    payload = make_score_request()
+    keys["key-1"] = SimpleNamespace(
+        request_hash=request_fingerprint(payload), response=None
+    )
+    store = _store()
+
+    with pytest.raises(IdempotencyKeyInProgressError) as exc_info:
+        await store.run("key-1", payload, _Scorer())
+
+    assert exc_info.value.headers == {"Retry-After": "1"}
+    assert store.stats().in_progress == 1
+
+
+@pytest.mark.anyio
+async def test_failed_scoring_is_shared_and_releases_the_key(keys, make_score_request):
+    store = _store()
+    failing = _Scorer(RuntimeError("db down"))
+    payload = make_score_request()
+
+    results = await asyncio.gather(
+        store.run("key-1", payload, failing),
+        store.run("key-1", payload, failing),
+        return_exceptions=True,
+    )
+
+    assert failing.calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert "key-1" not in keys
+    _, replayed = await store.run("key-1", payload, _Scorer())
+    assert not replayed
+
+
+@pytest.mark.anyio
+async def test_without_a_store_every_request_is_scored(make_score_request):
+    payload: ScoreRequest = make_score_request()
+    mocker(idempotency_service).mock(
+        "create_or_score_transaction", force_async=True
+    ).called_once_with(payload).return_value(_response())
+
+    assert await score_idempotently("key-1", payload) == (_response(), False)
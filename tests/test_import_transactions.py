@@ -1,41 +1,77 @@
 import io
+import itertools
 from pathlib import Path
+from unittest.mock import ANY
 
 import numpy as np
+import pandas as pd
 import pytest
 from chainmock import mocker
 
 from api.core.exceptions import InvalidCSVError
+from api.enums import MerchantCategory
 from api.schemas import TransactionImportResponse
 from api.services import csv_import
-from api.services.csv_import import import_transactions_from_csv
+from api.services.csv_import import (
+    _build_score_request,
+    import_transactions_from_csv,
+    iter_csv_blocks,
+    parse_transaction_block,
+    persist_scored_rows,
+    read_csv_header,
+)
 from scripts import import_transactions as import_script
 from scripts.import_transactions import import_transactions_from_path
 
+HEADER = (
+    "transaction_id,amount,transaction_hour,merchant_category,foreign_transaction,"
+    "location_mismatch,device_trust_score,velocity_last_24h,cardholder_age\n"
+)
 
-class MockModel:
-    def predict_proba(self, df):
-        return np.array([[0.1, 0.9]])
+
+class _DummyTxContext:
+    async def __aenter__(self):
+        return "conn"
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+def _flagged(df: pd.DataFrame) -> np.ndarray:
+    return np.full(len(df), 0.9)
 
 
 @pytest.mark.anyio
-async def test_import_transactions_service_creates_records():
+async def test_import_transactions_service_creates_records(make_model):
     csv_content = (
         "transaction_id,amount,transaction_hour,merchant_category,foreign_transaction,"
         "location_mismatch,device_trust_score,velocity_last_24h,cardholder_age\n"
         "tx_1,150.5,14,Electronics,0,0,85,3,35\n"
     )
-    mocker(csv_import).mock("get_model").return_value(MockModel())
-    mocker(csv_import).mock("get_threshold").return_value(0.5)
-    mocker(csv_import.transaction_repo).mock(
-        "get_transaction_by_external_id", force_async=True
-    ).return_value(None)
+    mocker(csv_import).mock("get_model").return_value(make_model(_flagged))
+    mocker(csv_import).mock("current_threshold", force_async=True).return_value(0.5)
     mocker(csv_import.transaction_repo).mock(
-        "create_transaction", force_async=True
-    ).return_value(object()).awaited_once()
-    mocker(csv_import.transaction_repo).mock(
-        "create_prediction", force_async=True
-    ).awaited_once()
+        "bulk_get_by_external_ids", force_async=True
+    ).return_value({}).awaited_once_with(["tx_1"])
+    mocker(csv_import).mock("persist_scored_rows", force_async=True).return_value(
+        (1, 0)
+    ).awaited_once_with(
+        [
+            {
+                "transaction_id": "tx_1",
+                "amount": 150.5,
+                "transaction_hour": 14,
+                "merchant_category": MerchantCategory.ELECTRONICS,
+                "foreign_transaction": False,
+                "location_mismatch": False,
+                "device_trust_score": 85,
+                "velocity_last_24h": 3,
+                "cardholder_age": 35,
+            }
+        ],
+        fraud_probabilities=[0.9],
+        decisions=[1],
+    )
 
     summary = await import_transactions_from_csv(csv_stream=io.StringIO(csv_content))
     assert summary.imported == 1
@@ -56,7 +92,7 @@ async def test_import_script_reuses_app_service(tmp_path):
     mocker(import_script).mock("init_db", force_async=True).awaited_once()
     mocker(import_script).mock("close_db", force_async=True).awaited_once()
     mocker(import_script).mock(
-        "import_transactions_from_csv", force_async=True
+        "import_transactions_from_file", force_async=True
     ).return_value(
         TransactionImportResponse(
             total_rows=0,
@@ -90,14 +126,14 @@ async def test_import_transactions_missing_required_columns_raises():
 
 
 @pytest.mark.anyio
-async def test_import_transactions_invalid_row_increments_skipped_invalid():
+async def test_import_transactions_invalid_row_increments_skipped_invalid(make_model):
     csv_content = (
         "transaction_id,amount,transaction_hour,merchant_category,foreign_transaction,"
         "location_mismatch,device_trust_score,velocity_last_24h,cardholder_age\n"
         "tx_1,150.5,14,Electronics,not_bool,0,85,3,35\n"
     )
-    mocker(csv_import).mock("get_model").return_value(MockModel())
-    mocker(csv_import).mock("get_threshold").return_value(0.5)
+    mocker(csv_import).mock("get_model").return_value(make_model(_flagged))
+    mocker(csv_import).mock("current_threshold", force_async=True).return_value(0.5)
 
     summary = await import_transactions_from_csv(csv_stream=io.StringIO(csv_content))
 
@@ -108,23 +144,20 @@ async def test_import_transactions_invalid_row_increments_skipped_invalid():
 
 
 @pytest.mark.anyio
-async def test_import_transactions_duplicate_in_file_is_skipped():
+async def test_import_transactions_duplicate_in_file_is_skipped(make_model):
     csv_content = (
         "transaction_id,amount,transaction_hour,merchant_category,foreign_transaction,"
         "location_mismatch,device_trust_score,velocity_last_24h,cardholder_age\n"
         "tx_1,150.5,14,Electronics,0,0,85,3,35\n"
         "tx_1,160.5,14,Electronics,0,0,85,3,35\n"
     )
-    mocker(csv_import).mock("get_model").return_value(MockModel())
-    mocker(csv_import).mock("get_threshold").return_value(0.5)
-    mocker(csv_import.transaction_repo).mock(
-        "get_transaction_by_external_id", force_async=True
-    ).return_value(None)
-    mocker(csv_import.transaction_repo).mock(
-        "create_transaction", force_async=True
-    ).return_value(object()).awaited_once()
+    mocker(csv_import).mock("get_model").return_value(make_model(_flagged))
+    mocker(csv_import).mock("current_threshold", force_async=True).return_value(0.5)
     mocker(csv_import.transaction_repo).mock(
-        "create_prediction", force_async=True
+        "bulk_get_by_external_ids", force_async=True
+    ).return_value({}).awaited_once_with(["tx_1"])
+    mocker(csv_import).mock("persist_scored_rows", force_async=True).return_value(
+        (1, 0)
     ).awaited_once()
 
     summary = await import_transactions_from_csv(csv_stream=io.StringIO(csv_content))
@@ -134,23 +167,18 @@ async def test_import_transactions_duplicate_in_file_is_skipped():
 
 
 @pytest.mark.anyio
-async def test_import_transactions_duplicate_in_db_is_skipped():
+async def test_import_transactions_duplicate_in_db_is_skipped(make_model):
     csv_content = (
         "transaction_id,amount,transaction_hour,merchant_category,foreign_transaction,"
         "location_mismatch,device_trust_score,velocity_last_24h,cardholder_age\n"
         "tx_1,150.5,14,Electronics,0,0,85,3,35\n"
     )
-    mocker(csv_import).mock("get_model").return_value(MockModel())
-    mocker(csv_import).mock("get_threshold").return_value(0.5)
+    mocker(csv_import).mock("get_model").return_value(make_model(_flagged))
+    mocker(csv_import).mock("current_threshold", force_async=True).return_value(0.5)
     mocker(csv_import.transaction_repo).mock(
-        "get_transaction_by_external_id", force_async=True
-    ).return_value(object())
-    mocker(csv_import.transaction_repo).mock(
-        "create_transaction", force_async=True
-    ).not_awaited()
-    mocker(csv_import.transaction_repo).mock(
-        "create_prediction", force_async=True
-    ).not_awaited()
+        "bulk_get_by_external_ids", force_async=True
+    ).return_value({"tx_1": 1})
+    mocker(csv_import).mock("persist_scored_rows", force_async=True).not_awaited()
 
     summary = await import_transactions_from_csv(csv_stream=io.StringIO(csv_content))
 
@@ -159,21 +187,19 @@ async def test_import_transactions_duplicate_in_db_is_skipped():
 
 
 @pytest.mark.anyio
-async def test_import_transactions_scoring_failure_is_tracked():
+async def test_import_transactions_scoring_failure_is_tracked(make_model):
     csv_content = (
         "transaction_id,amount,transaction_hour,merchant_category,foreign_transaction,"
         "location_mismatch,device_trust_score,velocity_last_24h,cardholder_age\n"
         "tx_1,150.5,14,Electronics,0,0,85,3,35\n"
     )
-    mocker(csv_import).mock("get_model").return_value(MockModel())
-    mocker(csv_import).mock("get_threshold").return_value(0.5)
-    mocker(csv_import.transaction_repo).mock(
-        "get_transaction_by_external_id", force_async=True
-    ).return_value(None)
-    mocker(csv_import).mock("score_payload").side_effect(RuntimeError("model crash"))
+    mocker(csv_import).mock("get_model").return_value(make_model(_flagged))
+    mocker(csv_import).mock("current_threshold", force_async=True).return_value(0.5)
     mocker(csv_import.transaction_repo).mock(
-        "create_transaction", force_async=True
-    ).not_awaited()
+        "bulk_get_by_external_ids", force_async=True
+    ).return_value({})
+    mocker(csv_import).mock("score_frame").side_effect(RuntimeError("model crash"))
+    mocker(csv_import).mock("persist_scored_rows", force_async=True).not_awaited()
 
     summary = await import_transactions_from_csv(csv_stream=io.StringIO(csv_content))
 
@@ -181,3 +207,136 @@ async def test_import_transactions_scoring_failure_is_tracked():
     assert summary.skipped_scoring_errors == 1
     assert len(summary.errors) == 1
     assert summary.errors[0].error.startswith("Scoring failed:")
+
+
+@pytest.mark.anyio
+async def test_persist_scored_rows_keeps_first_occurrence_of_each_id():
+    rows = [
+        {"transaction_id": "tx_1", "amount": 10.0},
+        {"transaction_id": "tx_2", "amount": 20.0},
+        {"transaction_id": "tx_1", "amount": 30.0},
+        {"transaction_id": "tx_3", "amount": 40.0},
+    ]
+    mocker(csv_import).mock("in_transaction").return_value(_DummyTxContext())
+    mocker(csv_import.transaction_repo).mock(
+        "insert_missing_transactions", force_async=True
+    ).return_value({"tx_1": 11, "tx_3": 13}).awaited_once_with(
+        [rows[0], rows[1], rows[3]], connection="conn"
+    )
+    mocker(csv_import.transaction_repo).mock(
+        "bulk_insert_predictions", force_async=True
+    ).awaited_once_with(
+        transaction_ids=[11, 13],
+        fraud_probabilities=[0.1, 0.4],
+        decisions=[0, 1],
+        scored_at=ANY,
+        connection="conn",
+    )
+
+    imported, duplicates = await persist_scored_rows(
+        rows,
+        fraud_probabilities=[0.1, 0.2, 0.3, 0.4],
+        decisions=[0, 0, 1, 1],
+    )
+
+    assert imported == 2
+    assert duplicates == 2
+
+
+PARITY_ROWS = [
+    "tx_ok,150.5,14,Electronics,0,0,85,3,35",
+    "tx_spaces, 150.5 , 14 ,Travel, YES ,n,85,3,35",
+    "tx_underscore,1_000.5,1_4,Grocery,true,false,85,3,35",
+    "tx_inf,inf,14,Food,t,f,85,3,35",
+    "tx_nan,nan,14,Food,t,f,85,3,35",
+    "tx_zero_amount,0,14,Clothing,0,0,85,3,35",
+    "tx_float_hour,150.5,14.0,Electronics,0,0,85,3,35",
+    "tx_hour_high,150.5,24,Electronics,0,0,85,3,35",
+    "tx_young,150.5,14,Electronics,0,0,85,3,17",
+    "tx_old,150.5,14,Electronics,0,0,85,3,101",
+    "tx_trust,150.5,14,Electronics,0,0,-1,3,35",
+    "tx_category,150.5,14,electronics,0,0,85,3,35",
+    "tx_bool,150.5,14,Electronics,maybe,0,85,3,35",
+    "tx_empty,,14,Electronics,0,0,85,3,35",
+    "tx_huge,150.5,99999999999999999999,Electronics,0,0,85,3,35",
+    ",150.5,14,Electronics,0,0,85,3,35",
+]
+
+
+def test_parse_transaction_block_matches_row_by_row_validation():
+    csv_stream = io.StringIO(HEADER + "\n".join(PARITY_ROWS) + "\n")
+    fieldnames = read_csv_header(csv_stream)
+    (first_line, chunk), *_ = iter_csv_blocks(csv_stream, fieldnames)
+
+    block = parse_transaction_block(chunk, first_line=first_line)
+
+    expected_valid = []
+    expected_errors = []
+    for line_number, row in enumerate(chunk.to_dict("records"), start=2):
+        try:
+            payload = _build_score_request(row)
+        except (KeyError, ValueError) as exc:
+            expected_valid.append(False)
+            expected_errors.append(
+                (line_number, row["transaction_id"], f"Invalid row: {exc}")
+            )
+        else:
+            expected_valid.append(True)
+            assert block.transactions.iloc[sum(expected_valid) - 1].to_dict() == (
+                payload.model_dump()
+            )
+    assert block.valid.tolist() == expected_valid
+    assert [
+        (error.line, error.transaction_id, error.error) for error in block.errors
+    ] == expected_errors
+    assert block.line_numbers.tolist() == [
+        line for line, valid in zip(itertools.count(2), expected_valid) if valid
+    ]
+
+
+@pytest.mark.anyio
+async def test_import_transactions_reports_invalid_lines_across_blocks(make_model):
+    rows = [f"tx_{index},150.5,14,Electronics,0,0,85,3,35" for index in range(5)]
+    rows[3] = "tx_3,150.5,14,Electronics,0,0,85,3,15"
+    mocker(csv_import).mock("get_model").return_value(make_model(_flagged))
+    mocker(csv_import).mock("current_threshold", force_async=True).return_value(0.5)
+    mocker(csv_import.transaction_repo).mock(
+        "bulk_get_by_external_ids", force_async=True
+    ).return_value({}).await_count(3)
+    mocker(csv_import).mock("persist_scored_rows", force_async=True).return_value(
+        (1, 0)
+    )
+
+    summary = await import_transactions_from_csv(
+        csv_stream=io.StringIO(HEADER + "\n".join(rows) + "\n"), block_size=2
+    )
+
+    assert summary.total_rows == 5
+    assert summary.skipped_invalid == 1
+    assert [(error.line, error.transaction_id) for error in summary.errors] == [
+        (5, "tx_3")
+    ]
+
+
+@pytest.mark.anyio
+async def test_import_transactions_skips_rows_with_extra_fields(make_model):
+    rows = [f"tx_{index},150.5,14,Electronics,0,0,85,3,35" for index in range(4)]
+    rows[1] += ",extra"
+    rows[2] += ","
+    mocker(csv_import).mock("get_model").return_value(make_model(_flagged))
+    mocker(csv_import).mock("current_threshold", force_async=True).return_value(0.5)
+    mocker(csv_import.transaction_repo).mock(
+        "bulk_get_by_external_ids", force_async=True
+    ).return_value({}).awaited_once_with(["tx_0", "tx_2", "tx_3"])
+    mocker(csv_import).mock("persist_scored_rows", force_async=True).return_value(
+        (3, 0)
+    )
+
+    summary = await import_transactions_from_csv(
+        csv_stream=io.StringIO(HEADER + "\n".join(rows) + "\n")
+    )
+
+    assert (summary.total_rows, summary.imported, summary.skipped_invalid) == (4, 3, 1)
+    assert [
+        (error.line, error.transaction_id, error.error) for error in summary.errors
+    ] == [(3, "tx_1", "Invalid row: more fields than the 9 in the header")]
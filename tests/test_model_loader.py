@@ -11,6 +11,7 @@ def _reset_model_bundle():
     model_loader._bundle = None
     yield
     model_loader._bundle = None
+    model_loader._shadow_bundles = {}
 
 
 def test_get_model_bundle_raises_when_model_path_missing(monkeypatch):
@@ -53,3 +54,32 @@ def test_get_model_and_threshold(monkeypatch, tmp_path):
 
     assert model_loader.get_model() is model
     assert model_loader.get_threshold(default=0.7) == 0.7
+
+
+def test_get_model_version_prefers_bundle_version(monkeypatch, tmp_path):
+    model_path = Path(tmp_path) / "model.joblib"
+    model_path.write_text("stub", encoding="utf-8")
+    monkeypatch.setenv("MODEL_PATH", str(model_path))
+    mocker(model_loader.joblib).mock("load").side_effect(
+        [{"model": object()}, {"model": object(), "version": "2024-03"}]
+    )
+
+    digest = model_loader.get_model_version()
+    model_loader._bundle = None
+
+    assert len(digest) == 16
+    assert model_loader.get_model_version() == "2024-03"
+
+
+def test_load_shadow_bundles_names_bundles(tmp_path):
+    paths = [tmp_path / "challenger-v2.joblib", tmp_path / "other.joblib"]
+    for path in paths:
+        path.write_text("stub", encoding="utf-8")
+    mocker(model_loader.joblib).mock("load").side_effect(
+        [{"model": object()}, {"model": object(), "name": "gbm"}]
+    )
+
+    bundles = model_loader.load_shadow_bundles([str(path) for path in paths])
+
+    assert list(bundles) == ["challenger-v2", "gbm"]
+    assert model_loader.get_shadow_bundles() is bundles
@@ -0,0 +1,306 @@
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from chainmock import mocker
+
+from api.domain.partitions import (
+    add_months,
+    month_floor,
+    month_range,
+    partition_month,
+    partition_name,
+    retention_cutoff,
+)
+from api.enums import MerchantCategory
+from api.migrations import Migration, apply_migrations
+from api.repositories.partitions import ARCHIVE_COLUMNS, PartitionRow
+from api.repositories.transactions import PREDICTION_EXPORT_COLUMNS, TransactionFilters
+from api.services import partitions as partition_service
+from api.services.export import rows_to_record_batch
+from api.services.partitions import (
+    ARCHIVE_SCHEMA,
+    PredictionArchive,
+    archive_filter,
+    maintain_partitions,
+    with_archived_predictions,
+)
+
+NOW = datetime(2024, 6, 15, 12, tzinfo=UTC)
+JANUARY = datetime(2024, 1, 1, tzinfo=UTC)
+FEBRUARY = datetime(2024, 2, 1, tzinfo=UTC)
+
+
+async def _batches(batches):
+    for rows in batches:
+        yield rows
+
+
+def _archive_row(index: int, scored_at: datetime, category: str = "Travel"):
+    return (
+        index,
+        f"tx_{index}",
+        index / 10,
+        index % 2,
+        False,
+        scored_at,
+        category,
+        100.0 * index,
+        False,
+    )
+
+
+def _partition(name: str, *, attached: bool = True) -> PartitionRow:
+    return PartitionRow(name=name, attached=attached, rows_estimate=0, total_bytes=0)
+
+
+@pytest.fixture(autouse=True)
+def _reset_job():
+    partition_service._job = None
+    yield
+    partition_service._job = None
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return PredictionArchive(tmp_path / "archive")
+
+
+def _mock_maintenance_connection(connection):
+    @asynccontextmanager
+    async def maintenance_connection():
+        yield connection
+
+    mocker(partition_service.partition_repo).mock("maintenance_connection").side_effect(
+        maintenance_connection
+    )
+
+
+def test_month_helpers_work_in_utc_months():
+    assert month_floor(datetime(2024, 3, 31, 23, 30)) == datetime(
+        2024, 3, 1, tzinfo=UTC
+    )
+    assert add_months(datetime(2024, 11, 1, tzinfo=UTC), 3) == datetime(
+        2025, 2, 1, tzinfo=UTC
+    )
+    assert list(
+        month_range(datetime(2024, 1, 20, tzinfo=UTC), datetime(2024, 3, 1, tzinfo=UTC))
+    ) == [
+        JANUARY,
+        FEBRUARY,
+    ]
+    assert retention_cutoff(NOW, 3) == datetime(2024, 3, 1, tzinfo=UTC)
+
+
+def test_partition_names_round_trip_and_reject_other_tables():
+    assert partition_name(FEBRUARY) == "prediction_p2024_02"
+    assert partition_month("prediction_p2024_02") == FEBRUARY
+    assert partition_month("prediction_default") is None
+    assert partition_month("prediction_p2024_13") is None
+    assert partition_month("transaction_p2024_02") is None
+
+
+def test_archive_schema_matches_repository_columns():
+    assert tuple(ARCHIVE_SCHEMA.names) == ARCHIVE_COLUMNS
+
+
+def test_archive_filter_is_none_without_filters():
+    assert archive_filter(TransactionFilters()) is None
+
+
+@pytest.mark.anyio
+async def test_archive_round_trip_applies_export_filters(archive):
+    january = [
+        _archive_row(1, datetime(2024, 1, 5, tzinfo=UTC)),
+        _archive_row(2, datetime(2024, 1, 6, tzinfo=UTC), "Grocery"),
+    ]
+    february = [_archive_row(3, datetime(2024, 2, 5, tzinfo=UTC))]
+    written = await archive.write("prediction_p2024_01", _batches([january]))
+    await archive.write("prediction_p2024_02", _batches([february]))
+
+    everything = [rows async for rows in archive.stream(TransactionFilters())]
+    travel_in_january = [
+        rows
+        async for rows in archive.stream(
+            TransactionFilters(
+                merchant_category=MerchantCategory.TRAVEL,
+                end=datetime(2024, 2, 1),
+            )
+        )
+    ]
+
+    assert written.rows == 2
+    assert written.month == JANUARY
+    assert [row[0] for rows in everything for row in rows] == [1, 2, 3]
+    assert travel_in_january == [[january[0][:6]]]
+    assert not list(archive.directory.glob("*.partial"))
+
+
+@pytest.mark.anyio
+async def test_archive_skips_months_outside_the_time_range(archive):
+    await archive.write("prediction_p2024_01", _batches([[_archive_row(1, JANUARY)]]))
+    archive.path("prediction_p2024_01").write_bytes(b"not parquet")
+
+    rows = [rows async for rows in archive.stream(TransactionFilters(start=FEBRUARY))]
+
+    assert rows == []
+
+
+@pytest.mark.anyio
+async def test_with_archived_predictions_streams_archive_before_live(archive):
+    await archive.write("prediction_p2024_01", _batches([[_archive_row(1, JANUARY)]]))
+    partition_service._job = partition_service.PartitionMaintenanceJob(
+        archive, retention_months=3, months_ahead=3, interval_seconds=60
+    )
+    live = [[(9, "tx_9", 0.9, 1, False, NOW)]]
+
+    batches = [
+        rows
+        async for rows in with_archived_predictions(
+            TransactionFilters(), _batches(live)
+        )
+    ]
+
+    assert [row[0] for rows in batches for row in rows] == [1, 9]
+    assert {len(row) for rows in batches for row in rows} == {
+        len(PREDICTION_EXPORT_COLUMNS)
+    }
+
+
+@pytest.mark.anyio
+async def test_archive_written_before_prescreened_reads_it_as_false(archive):
+    row = _archive_row(1, JANUARY)
+    old_schema = pa.schema(
+        field for field in ARCHIVE_SCHEMA if field.name != "prescreened"
+    )
+    archive.directory.mkdir(parents=True)
+    pq.write_table(
+        pa.Table.from_batches([rows_to_record_batch([row[:4] + row[5:]], old_schema)]),
+        archive.path("prediction_p2024_01"),
+    )
+
+    rows = [rows async for rows in archive.stream(TransactionFilters(decision=1))]
+
+    assert rows == [[row[:6]]]
+
+
+@pytest.mark.anyio
+async def test_maintain_partitions_creates_ahead_and_archives_past_retention(
+    archive,
+):
+    connection = object()
+    _mock_maintenance_connection(connection)
+    repo = partition_service.partition_repo
+    mocker(repo).mock("list_partitions", force_async=True).return_value(
+        [
+            _partition("prediction_default"),
+            _partition("prediction_p2024_01"),
+            _partition("prediction_p2024_02", attached=False),
+            _partition("prediction_p2024_03"),
+            _partition("prediction_p2024_06"),
+            _partition("prediction_p2024_07"),
+        ]
+    )
+    created = []
+
+    async def create(_, name):
+        created.append(name)
+
+    mocker(repo).mock("create_month_partition").side_effect(create)
+    mocker(repo).mock("get_rollup_watermark", force_async=True).return_value(
+        datetime(2024, 2, 20, tzinfo=UTC)
+    )
+    mocker(repo).mock("detach_partition", force_async=True).awaited_once_with(
+        connection, "prediction_p2024_01"
+    )
+
+    def rows(_, name, *, batch_size):
+        month = partition_month(name)
+        assert month is not None
+        return _batches([[_archive_row(month.month, month)]])
+
+    mocker(repo).mock("stream_archive_rows").side_effect(rows)
+    dropped = []
+
+    async def drop(_, name):
+        dropped.append(name)
+
+    mocker(repo).mock("drop_partition_table").side_effect(drop)
+
+    report = await maintain_partitions(
+        archive, retention_months=2, months_ahead=2, now=NOW
+    )
+
+    assert report.locked
+    assert created == report.created == ["prediction_p2024_08"]
+    assert [item.name for item in report.archived] == [
+        "prediction_p2024_01",
+        "prediction_p2024_02",
+    ]
+    assert dropped == ["prediction_p2024_01", "prediction_p2024_02"]
+    # March is past retention but not yet rolled up into analytics.
+    assert report.waiting_for_rollup == ["prediction_p2024_03"]
+    assert [month for month, _ in archive.files()] == [JANUARY, FEBRUARY]
+
+
+@pytest.mark.anyio
+async def test_maintain_partitions_skips_when_another_worker_holds_the_lock(
+    archive,
+):
+    _mock_maintenance_connection(None)
+    mocker(partition_service.partition_repo).mock("list_partitions").not_called()
+
+    report = await maintain_partitions(archive, retention_months=1, now=NOW)
+
+    assert not report.locked
+    assert report.created == []
+
+
+class _MigrationConnection:
+    """Records statements; acts as a database whose base schema exists."""
+
+    def __init__(self, applied: list[str]) -> None:
+        self.applied = applied
+        self.statements: list[tuple[str, tuple]] = []
+
+    async def fetchval(self, query, *args):
+        return "transaction"
+
+    async def fetch(self, query, *args):
+        return [{"name": name} for name in self.applied]
+
+    async def execute(self, query, *args):
+        self.statements.append((query, args))
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+@pytest.mark.anyio
+async def test_apply_migrations_runs_only_pending_ones_in_order():
+    ran = []
+
+    def migration(name):
+        async def upgrade(connection):
+            ran.append(name)
+
+        return Migration(name, upgrade)
+
+    connection = _MigrationConnection(applied=["0001_first"])
+
+    applied = await apply_migrations(
+        connection,
+        (migration("0001_first"), migration("0002_second"), migration("0003_third")),
+    )
+
+    assert applied == ran == ["0002_second", "0003_third"]
+    recorded = [
+        args[0]
+        for query, args in connection.statements
+        if query.startswith("INSERT INTO schema_migration")
+    ]
+    assert recorded == ["0002_second", "0003_third"]
+    assert "pg_advisory_unlock" in connection.statements[-1][0]
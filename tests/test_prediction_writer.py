@@ -0,0 +1,116 @@
+import asyncio
+from datetime import UTC, datetime
+
+import pytest
+from chainmock import mocker
+
+from api.enums import MerchantCategory
+from api.services import prediction_writer
+from api.services import scoring as scoring_service
+from api.services.prediction_writer import PendingPrediction, PredictionWriteBehind
+
+
+def _pending(transaction_id: str = "tx_1") -> PendingPrediction:
+    return PendingPrediction(
+        fields={"transaction_id": transaction_id},
+        fraud_probability=0.9,
+        decision=1,
+        scored_at=datetime.now(UTC),
+    )
+
+
+@pytest.mark.anyio
+async def test_stop_flushes_queue_in_batches():
+    mocker(prediction_writer).mock("_persist", force_async=True).await_count(3)
+    writer = PredictionWriteBehind(max_size=10, flush_interval_ms=60_000, batch_size=2)
+    writer.start()
+    for index in range(5):
+        await writer.enqueue(_pending(f"tx_{index}"))
+
+    await writer.stop()
+
+    stats = writer.stats()
+    assert stats.enqueued == 5
+    assert stats.flushed == 5
+    assert stats.batches == 3
+    assert stats.queue_depth == 0
+
+
+@pytest.mark.anyio
+async def test_background_task_flushes_every_interval():
+    mocker(prediction_writer).mock("_persist", force_async=True).awaited_once()
+    writer = PredictionWriteBehind(max_size=10, flush_interval_ms=5, batch_size=10)
+    writer.start()
+
+    await writer.enqueue(_pending())
+    for _ in range(100):
+        if writer.stats().flushed:
+            break
+        await asyncio.sleep(0.005)
+
+    assert writer.stats().flushed == 1
+    await writer.stop()
+
+
+@pytest.mark.anyio
+async def test_full_queue_applies_backpressure():
+    mocker(prediction_writer).mock("_persist", force_async=True).awaited_once()
+    writer = PredictionWriteBehind(max_size=1, flush_interval_ms=60_000, batch_size=10)
+    await writer.enqueue(_pending("tx_1"))
+
+    blocked = asyncio.create_task(writer.enqueue(_pending("tx_2")))
+    await asyncio.sleep(0)
+    assert not blocked.done()
+
+    writer._queue.get_nowait()
+    await blocked
+    await writer.stop()
+
+    assert writer.stats().backpressure_waits == 1
+
+
+@pytest.mark.anyio
+async def test_failed_flush_is_retried_then_counted():
+    mocker(prediction_writer).mock("_persist", force_async=True).side_effect(
+        RuntimeError("db down")
+    ).awaited_twice()
+    writer = PredictionWriteBehind(
+        max_size=10, flush_interval_ms=1, batch_size=10, max_attempts=2
+    )
+    await writer.enqueue(_pending())
+
+    await writer.stop()
+
+    stats = writer.stats()
+    assert stats.failed == 1
+    assert stats.flushed == 0
+
+
+@pytest.mark.anyio
+async def test_create_or_score_enqueues_when_write_behind_enabled():
+    writer = PredictionWriteBehind(max_size=10, flush_interval_ms=60_000, batch_size=10)
+    mocker(scoring_service).mock("get_prediction_writer").return_value(writer)
+    mocker(scoring_service).mock("score_payload").return_value((0.77, 1, 0.5, True))
+    mocker(scoring_service.transaction_repo).mock(
+        "create_or_score_transaction_row", force_async=True
+    ).not_awaited()
+    payload = scoring_service.ScoreRequest(
+        transaction_id="tx_1",
+        amount=100.0,
+        transaction_hour=12,
+        merchant_category=MerchantCategory.ELECTRONICS,
+        foreign_transaction=False,
+        location_mismatch=False,
+        device_trust_score=80,
+        velocity_last_24h=5,
+        cardholder_age=30,
+    )
+
+    result = await scoring_service.create_or_score_transaction(payload)
+
+    assert result.decision == 1
+    assert writer.stats().queue_depth == 1
+    queued = writer._queue.get_nowait()
+    assert queued.fields["transaction_id"] == "tx_1"
+    assert queued.scored_at == result.scored_at
+    assert queued.prescreened
@@ -0,0 +1,67 @@
+import pytest
+from chainmock import mocker
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import database
+from api.core.primary_pin import PIN_COOKIE, PrimaryPinMiddleware
+from api.database import PRIMARY_CONNECTION, primary_pin, read_connection
+
+
+@pytest.fixture
+def replicas():
+    mocker("api.database.connections").mock("get").side_effect(lambda name: name)
+    database._replicas = iter(["replica_0", "replica_1", "replica_0"])
+    yield
+    database._replicas = None
+
+
+@pytest.fixture
+def pin_client():
+    app = FastAPI()
+
+    @app.get("/read")
+    async def read():
+        return {"connection": read_connection()}
+
+    @app.post("/write")
+    async def write():
+        return {"connection": read_connection()}
+
+    @app.post("/fail", status_code=409)
+    async def fail():
+        return {}
+
+    app.add_middleware(PrimaryPinMiddleware, pin_seconds=3)
+    return TestClient(app)
+
+
+def test_reads_use_the_primary_without_replicas():
+    mocker("api.database.connections").mock("get").side_effect(lambda name: name)
+
+    assert read_connection() == PRIMARY_CONNECTION
+
+
+def test_reads_rotate_over_replicas_unless_pinned(replicas):
+    assert read_connection() == "replica_0"
+    with primary_pin():
+        assert read_connection() == PRIMARY_CONNECTION
+    assert read_connection() == "replica_1"
+
+
+def test_writes_read_from_the_primary_and_pin_the_client(replicas, pin_client):
+    assert pin_client.get("/read").json() == {"connection": "replica_0"}
+
+    response = pin_client.post("/write")
+
+    assert response.json() == {"connection": PRIMARY_CONNECTION}
+    assert f"{PIN_COOKIE}=1; Max-Age=3" in response.headers["set-cookie"]
+    # The cookie sent back keeps the next read on the primary.
+    assert pin_client.get("/read").json() == {"connection": PRIMARY_CONNECTION}
+
+
+def test_failed_writes_do_not_pin_the_client(replicas, pin_client):
+    response = pin_client.post("/fail")
+
+    assert response.status_code == 409
+    assert "set-cookie" not in response.headers
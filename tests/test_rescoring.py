@@ -0,0 +1,145 @@
+import pytest
+from chainmock import mocker
+
+from api.routers import admin
+from api.schemas import RescoreRequest, RescoreResponse
+from api.services import rescoring
+from api.services.rescoring import (
+    REQUEST_MAX_ROWS,
+    REQUEST_MAX_SECONDS,
+    RateLimiter,
+    rescore_transactions,
+)
+
+
+def _row(row_id: int, amount: float) -> tuple:
+    return (row_id, amount, 12, "Electronics", False, False, 80, 5, 30)
+
+
+def _fetch_batches(*batches):
+    """Serve ``batches`` in turn to keyset fetches, recording what was asked."""
+    remaining = list(batches)
+    calls: list[tuple[int, int]] = []
+
+    async def fetch(*, after_id, limit):
+        calls.append((after_id, limit))
+        return remaining.pop(0) if remaining else []
+
+    mocker(rescoring.transaction_repo).mock(
+        "fetch_transaction_feature_batch", force_async=True
+    ).side_effect(fetch)
+    return calls
+
+
+@pytest.mark.anyio
+async def test_rescore_transactions_scores_each_batch_in_one_call(amount_model):
+    mocker(rescoring).mock("get_model").return_value(amount_model)
+    mocker(rescoring).mock("current_threshold", force_async=True).return_value(0.5)
+    fetches = _fetch_batches([_row(3, 100.0), _row(5, 900.0)], [_row(8, 600.0)])
+    mocker(rescoring.transaction_repo).mock(
+        "bulk_insert_predictions", force_async=True
+    ).any_await_with(
+        transaction_ids=[3, 5],
+        fraud_probabilities=[0.1, 0.9],
+        decisions=[0, 1],
+    ).any_await_with(
+        transaction_ids=[8],
+        fraud_probabilities=[0.6],
+        decisions=[1],
+    ).awaited_twice()
+    checkpoints = []
+
+    result = await rescore_transactions(
+        RescoreRequest(after_id=2, max_rows=10, batch_size=2),
+        checkpoint=checkpoints.append,
+    )
+
+    assert result.processed == 3
+    assert result.batches == 2
+    assert result.last_id == 8
+    assert result.done is True
+    assert checkpoints == [5, 8]
+    assert fetches == [(2, 2), (5, 2)]
+
+
+@pytest.mark.anyio
+async def test_rescore_transactions_reports_not_done_when_segment_is_full(amount_model):
+    mocker(rescoring).mock("get_model").return_value(amount_model)
+    mocker(rescoring).mock("current_threshold", force_async=True).return_value(0.5)
+    fetches = _fetch_batches([_row(1, 100.0), _row(2, 200.0)])
+    mocker(rescoring.transaction_repo).mock(
+        "bulk_insert_predictions", force_async=True
+    ).awaited_once()
+
+    result = await rescore_transactions(RescoreRequest(max_rows=2, batch_size=2))
+
+    assert result.done is False
+    assert result.last_id == 2
+    assert fetches == [(0, 2)]
+
+
+@pytest.mark.anyio
+async def test_rescore_transactions_without_rows_keeps_checkpoint(amount_model):
+    mocker(rescoring).mock("get_model").return_value(amount_model)
+    mocker(rescoring).mock("current_threshold", force_async=True).return_value(0.5)
+    _fetch_batches()
+    mocker(rescoring.transaction_repo).mock(
+        "bulk_insert_predictions", force_async=True
+    ).not_awaited()
+
+    result = await rescore_transactions(RescoreRequest(after_id=42))
+
+    assert result.processed == 0
+    assert result.last_id == 42
+    assert result.done is True
+
+
+@pytest.mark.anyio
+async def test_rate_limiter_sleeps_to_keep_rate():
+    mocker(rescoring.asyncio).mock("sleep", force_async=True).awaited_once()
+    limiter = RateLimiter(rows_per_second=10)
+
+    await limiter.throttle(5)
+
+
+@pytest.mark.anyio
+async def test_rescore_transactions_stops_after_the_time_budget(amount_model):
+    mocker(rescoring).mock("get_model").return_value(amount_model)
+    mocker(rescoring).mock("current_threshold", force_async=True).return_value(0.5)
+    fetches = _fetch_batches([_row(1, 100.0)], [_row(2, 200.0)])
+    mocker(rescoring.transaction_repo).mock(
+        "bulk_insert_predictions", force_async=True
+    ).awaited_once()
+
+    result = await rescore_transactions(
+        RescoreRequest(max_rows=None, batch_size=1), max_seconds=0
+    )
+
+    assert (result.processed, result.last_id, result.done) == (1, 1, False)
+    assert fetches == [(0, 1)]
+
+
+@pytest.mark.anyio
+async def test_throttling_only_sleeps_between_batches(amount_model):
+    mocker(rescoring).mock("get_model").return_value(amount_model)
+    mocker(rescoring).mock("current_threshold", force_async=True).return_value(0.5)
+    _fetch_batches([_row(1, 100.0)], [_row(2, 200.0)])
+    mocker(rescoring.transaction_repo).mock(
+        "bulk_insert_predictions", force_async=True
+    ).awaited_twice()
+    mocker(rescoring.RateLimiter).mock("throttle", force_async=True).awaited_twice()
+
+    result = await rescore_transactions(RescoreRequest(batch_size=1, rows_per_second=1))
+
+    # Two full batches, then an empty fetch ends the run without a sleep.
+    assert (result.processed, result.done) == (2, True)
+
+
+@pytest.mark.anyio
+async def test_admin_rescore_caps_each_call():
+    mocker(admin).mock("rescore_transactions", force_async=True).called_once_with(
+        RescoreRequest(after_id=7, max_rows=REQUEST_MAX_ROWS),
+        max_seconds=REQUEST_MAX_SECONDS,
+    ).return_value(RescoreResponse(processed=0, batches=0, last_id=7, done=True))
+
+    await admin.rescore(RescoreRequest(after_id=7, max_rows=None))
@@ -0,0 +1,99 @@
+import gzip
+import json
+
+import msgpack
+import pytest
+import zstandard
+from pydantic import BaseModel, TypeAdapter
+
+from api.core.responses import (
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    encode_response,
+    select_content_encoding,
+    select_media_type,
+)
+
+
+class Row(BaseModel):
+    id: int
+    label: str
+
+
+ROWS_ADAPTER = TypeAdapter(list[Row])
+
+
+def _rows(count: int) -> list[dict]:
+    return [{"id": index, "label": f"row-{index}"} for index in range(count)]
+
+
+@pytest.mark.parametrize(
+    ("accept", "expected"),
+    [
+        ("", JSON_MEDIA_TYPE),
+        ("*/*", JSON_MEDIA_TYPE),
+        ("application/json", JSON_MEDIA_TYPE),
+        ("application/msgpack", MSGPACK_MEDIA_TYPE),
+        ("application/x-msgpack, application/json;q=0.5", MSGPACK_MEDIA_TYPE),
+        ("application/msgpack;q=0.2, application/json", JSON_MEDIA_TYPE),
+    ],
+)
+def test_select_media_type(accept, expected):
+    assert select_media_type(accept) == expected
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "expected"),
+    [
+        ("", None),
+        ("identity", None),
+        ("gzip, deflate", "gzip"),
+        ("gzip, zstd", "zstd"),
+        ("zstd;q=0, gzip", "gzip"),
+        ("gzip;q=1, zstd;q=0.1", "gzip"),
+        ("gzip;q=0.5, zstd;q=0.5", "zstd"),
+        ("gzip;q=0.8, *;q=0.9", "zstd"),
+        ("*", "zstd"),
+    ],
+)
+def test_select_content_encoding(accept_encoding, expected):
+    assert select_content_encoding(accept_encoding) == expected
+
+
+def test_encode_response_defaults_to_uncompressed_json(make_request):
+    response = encode_response(make_request(), ROWS_ADAPTER, _rows(2))
+
+    assert response.media_type == JSON_MEDIA_TYPE
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept, Accept-Encoding"
+    assert json.loads(bytes(response.body)) == _rows(2)
+
+
+def test_encode_response_skips_compression_for_small_bodies(make_request):
+    response = encode_response(
+        make_request({"Accept-Encoding": "gzip"}), ROWS_ADAPTER, _rows(1)
+    )
+
+    assert "content-encoding" not in response.headers
+
+
+def test_encode_response_gzip(make_request):
+    response = encode_response(
+        make_request({"Accept-Encoding": "gzip"}), ROWS_ADAPTER, _rows(100)
+    )
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.body)) == _rows(100)
+
+
+def test_encode_response_msgpack_with_zstd(make_request):
+    response = encode_response(
+        make_request({"Accept": "application/msgpack", "Accept-Encoding": "zstd"}),
+        ROWS_ADAPTER,
+        _rows(100),
+    )
+
+    assert response.media_type == MSGPACK_MEDIA_TYPE
+    assert response.headers["content-encoding"] == "zstd"
+    body = zstandard.ZstdDecompressor().decompress(response.body)
+    assert msgpack.unpackb(body) == _rows(100)
@@ -0,0 +1,195 @@
+import asyncio
+import json
+from datetime import UTC, datetime
+
+import pytest
+from chainmock import mocker
+
+from api.enums import MerchantCategory
+from api.schemas import ScoreEvent
+from api.services.score_feed import (
+    MAX_NOTIFY_PAYLOAD_BYTES,
+    ScoreBroadcaster,
+    ScoreEventFilter,
+    ScoreFeedListener,
+    notify_payloads,
+    stream_score_events,
+)
+
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=UTC)
+
+
+def _event(
+    transaction_id: str = "tx_1",
+    *,
+    fraud_probability: float = 0.9,
+    decision: int = 1,
+    merchant_category: MerchantCategory = MerchantCategory.TRAVEL,
+) -> ScoreEvent:
+    return ScoreEvent(
+        transaction_id=transaction_id,
+        fraud_probability=fraud_probability,
+        decision=decision,
+        merchant_category=merchant_category,
+        amount=120.0,
+        scored_at=NOW,
+        source="create",
+    )
+
+
+def test_filter_matches_on_every_set_field():
+    filters = ScoreEventFilter(
+        decision=1, min_probability=0.8, merchant_category=MerchantCategory.TRAVEL
+    )
+
+    assert filters.matches(_event())
+    assert not filters.matches(_event(decision=0))
+    assert not filters.matches(_event(fraud_probability=0.5))
+    assert not filters.matches(_event(merchant_category=MerchantCategory.GROCERY))
+    assert ScoreEventFilter().matches(_event(decision=0))
+
+
+def test_deliver_fans_out_to_matching_subscribers_only():
+    broadcaster = ScoreBroadcaster(max_buffer=10)
+    everything = broadcaster.subscribe(ScoreEventFilter())
+    flagged = broadcaster.subscribe(ScoreEventFilter(decision=1))
+
+    broadcaster.deliver([_event("tx_1"), _event("tx_2", decision=0)])
+
+    assert everything.get_ready() == [_event("tx_1"), _event("tx_2", decision=0)]
+    assert flagged.get_ready() == [_event("tx_1")]
+    assert broadcaster.stats().delivered == 3
+
+
+def test_slow_subscriber_is_dropped_without_affecting_others():
+    broadcaster = ScoreBroadcaster(max_buffer=2)
+    slow = broadcaster.subscribe(ScoreEventFilter())
+    other = broadcaster.subscribe(ScoreEventFilter())
+
+    broadcaster.deliver([_event("tx_1"), _event("tx_2")])
+    other.get_ready()
+    broadcaster.deliver([_event("tx_3")])
+
+    assert slow.dropped
+    assert slow.get_ready()[-1] is None
+    assert other.get_ready() == [_event("tx_3")]
+    stats = broadcaster.stats()
+    assert stats.subscribers == 1
+    assert stats.dropped_subscribers == 1
+
+
+def test_notify_payloads_stay_under_the_postgres_limit():
+    events = [_event(f"tx_{index}") for index in range(200)]
+
+    payloads = notify_payloads(events)
+
+    assert len(payloads) > 1
+    assert all(len(payload) <= MAX_NOTIFY_PAYLOAD_BYTES for payload in payloads)
+    decoded = [item for payload in payloads for item in json.loads(payload)]
+    assert [item["transaction_id"] for item in decoded] == [
+        e.transaction_id for e in events
+    ]
+
+
+@pytest.mark.anyio
+async def test_publish_is_a_noop_without_subscribers_or_channel():
+    broadcaster = ScoreBroadcaster()
+    mocker("api.services.score_feed.connections").mock("get").not_called()
+
+    await broadcaster.publish([_event()])
+
+    assert broadcaster.stats().published == 0
+
+
+@pytest.mark.anyio
+async def test_publish_sends_notify_when_listening(make_connection):
+    broadcaster = ScoreBroadcaster()
+    broadcaster.notify_channel = "score_events"
+    subscription = broadcaster.subscribe(ScoreEventFilter())
+    connection = make_connection()
+    mocker("api.services.score_feed.connections").mock("get").return_value(connection)
+    broadcaster.start()
+
+    await broadcaster.publish([_event("tx_1")])
+    await broadcaster.publish([_event("tx_2")])
+    await broadcaster.stop()
+
+    assert all(query == "SELECT pg_notify($1, $2)" for query, _ in connection.queries)
+    assert all(values[0] == "score_events" for _, values in connection.queries)
+    sent = [
+        event["transaction_id"]
+        for _, values in connection.queries
+        for event in json.loads(values[1])
+    ]
+    assert sent == ["tx_1", "tx_2"]
+    # Delivery happens when the notification comes back through the listener.
+    assert subscription.get_ready() == []
+
+
+@pytest.mark.anyio
+async def test_publish_does_not_wait_for_notify(make_connection):
+    broadcaster = ScoreBroadcaster(notify_queue_size=1)
+    broadcaster.notify_channel = "score_events"
+    subscription = broadcaster.subscribe(ScoreEventFilter())
+    release = asyncio.Event()
+    connection = make_connection(release=release)
+    mocker("api.services.score_feed.connections").mock("get").return_value(connection)
+    broadcaster.start()
+
+    await broadcaster.publish([_event("tx_1")])
+    await asyncio.sleep(0)
+    await broadcaster.publish([_event("tx_2")])
+    await broadcaster.publish([_event("tx_3")])
+
+    assert subscription.get_ready() == [_event("tx_3")]
+    assert broadcaster.stats().notify_overflows == 1
+    release.set()
+    await broadcaster.stop()
+    assert len(connection.queries) == 2
+
+
+def test_listener_delivers_notifications_and_ignores_garbage():
+    broadcaster = ScoreBroadcaster()
+    subscription = broadcaster.subscribe(ScoreEventFilter())
+    listener = ScoreFeedListener(broadcaster, dsn="postgres://", channel="feed")
+
+    listener.on_notify(None, 1, "feed", "not json")
+    listener.on_notify(None, 1, "feed", notify_payloads([_event()])[0])
+
+    assert subscription.get_ready() == [_event()]
+
+
+@pytest.mark.anyio
+async def test_stream_batches_ready_events_and_ends_after_a_drop():
+    broadcaster = ScoreBroadcaster(max_buffer=2)
+    stream = stream_score_events(broadcaster, ScoreEventFilter())
+
+    assert await anext(stream) == b": connected\n\n"
+    broadcaster.deliver([_event("tx_1"), _event("tx_2"), _event("tx_3")])
+    chunk = await anext(stream)
+
+    assert chunk.count(b"event: score\n") == 2
+    assert chunk.endswith(b'data: {"reason":"subscriber buffer overflow"}\n\n')
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+    assert broadcaster.stats().subscribers == 0
+
+
+@pytest.mark.anyio
+async def test_closing_ends_open_and_later_streams():
+    broadcaster = ScoreBroadcaster(max_buffer=2)
+    stream = stream_score_events(broadcaster, ScoreEventFilter())
+    assert await anext(stream) == b": connected\n\n"
+    broadcaster.deliver([_event("tx_1")])
+
+    broadcaster.close_subscriptions()
+    chunk = await anext(stream)
+
+    assert chunk.count(b"event: score\n") == 1
+    assert chunk.endswith(b'data: {"reason":"server shutting down"}\n\n')
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+    late = stream_score_events(broadcaster, ScoreEventFilter())
+    assert await anext(late) == b": connected\n\n"
+    assert (await anext(late)).startswith(b"event: closed\n")
+    assert broadcaster.stats().subscribers == 0
@@ -1,12 +1,16 @@
+import asyncio
 from datetime import UTC, datetime
-from types import SimpleNamespace
 
 import numpy as np
 import pytest
 from chainmock import mocker
 
-from api.core.exceptions import TransactionNotFoundError
+from api.core.exceptions import (
+    TransactionNotFoundError,
+    TransactionUpdateConflictError,
+)
 from api.enums import MerchantCategory
+from api.models import Prediction, Transaction
 from api.services import scoring as scoring_service
 from api.services.scoring import (
     create_or_score_transaction,
@@ -15,14 +19,6 @@ from api.services.scoring import (
 )
 
 
-class _DummyTxContext:
-    async def __aenter__(self):
-        return "conn"
-
-    async def __aexit__(self, exc_type, exc, tb):
-        return False
-
-
 class _PredictProbaModel:
     def predict_proba(self, df):
         return np.array([[0.2, 0.8]])
@@ -50,19 +46,20 @@ def _score_request_payload():
 def test_score_payload_uses_predict_proba():
     payload = scoring_service.ScoreRequest(**_score_request_payload())
 
-    fraud_probability, decision, threshold = score_payload(
+    fraud_probability, decision, threshold, prescreened = score_payload(
         payload, model=_PredictProbaModel(), threshold=0.5
     )
 
     assert fraud_probability == 0.8
     assert decision == 1
     assert threshold == 0.5
+    assert not prescreened
 
 
 def test_score_payload_falls_back_to_predict():
     payload = scoring_service.ScoreRequest(**_score_request_payload())
 
-    fraud_probability, decision, threshold = score_payload(
+    fraud_probability, decision, threshold, _ = score_payload(
         payload, model=_PredictModel(), threshold=0.5
     )
 
@@ -72,17 +69,20 @@ def test_score_payload_falls_back_to_predict():
 
 
 @pytest.mark.anyio
-async def test_create_or_score_transaction_success(make_transaction):
+async def test_create_or_score_transaction_success():
     payload = scoring_service.ScoreRequest(**_score_request_payload())
-    prediction = SimpleNamespace(scored_at=datetime.now(UTC))
-    mocker(scoring_service).mock("in_transaction").return_value(_DummyTxContext())
-    mocker(scoring_service).mock("score_payload").return_value((0.77, 1, 0.5))
-    mocker(scoring_service.transaction_repo).mock(
-        "get_or_create_transaction", force_async=True
-    ).return_value((make_transaction("tx_1"), True)).awaited_once()
+    scored_at = datetime.now(UTC)
+    mocker(scoring_service).mock("score_payload").return_value((0.77, 1, 0.5, False))
     mocker(scoring_service.transaction_repo).mock(
-        "create_prediction", force_async=True
-    ).return_value(prediction).awaited_once()
+        "create_or_score_transaction_row", force_async=True
+    ).return_value(
+        {
+            "transaction_pk": 1,
+            "prediction_id": 10,
+            "scored_at": scored_at,
+            "created": True,
+        }
+    ).awaited_once()
 
     result = await create_or_score_transaction(payload)
 
@@ -90,27 +90,83 @@ async def test_create_or_score_transaction_success(make_transaction):
     assert result.fraud_probability == 0.77
     assert result.decision == 1
     assert result.threshold == 0.5
-    assert result.scored_at == prediction.scored_at
+    assert result.scored_at == scored_at
+
+
+@pytest.mark.anyio
+async def test_create_or_score_transaction_publishes_to_feed_shadow_and_drift():
+    payload = scoring_service.ScoreRequest(**_score_request_payload())
+    scored_at = datetime.now(UTC)
+    published = []
+    mocker(scoring_service).mock("score_payload").return_value((0.77, 1, 0.5, False))
+    mocker(scoring_service.transaction_repo).mock(
+        "create_or_score_transaction_row", force_async=True
+    ).return_value(
+        {
+            "transaction_pk": 1,
+            "prediction_id": 10,
+            "scored_at": scored_at,
+            "created": True,
+        }
+    )
+    mocker(scoring_service).mock("publish_scores", force_async=True).side_effect(
+        published.extend
+    )
+    mocker(scoring_service).mock("submit_shadow").called_once_with(
+        payload,
+        champion_probability=0.77,
+        champion_decision=1,
+        threshold=0.5,
+        scored_at=scored_at,
+    )
+    mocker(scoring_service).mock("observe_score").called_once_with(
+        payload, 0.77, prescreened=False
+    )
+
+    await create_or_score_transaction(payload)
+
+    [event] = published
+    assert event.transaction_id == "tx_1"
+    assert event.decision == 1
+    assert event.scored_at == scored_at
+    assert event.source == "create"
+
+
+@pytest.mark.anyio
+async def test_create_or_score_transaction_concurrent_duplicates(db):
+    payload = scoring_service.ScoreRequest(**_score_request_payload())
+    mocker(scoring_service).mock("score_payload").return_value((0.77, 1, 0.5, False))
+
+    results = await asyncio.gather(
+        *(create_or_score_transaction(payload) for _ in range(50))
+    )
+
+    assert all(result.transaction_id == "tx_1" for result in results)
+    assert await Transaction.filter(transaction_id="tx_1").count() == 1
+    assert await Prediction.filter(transaction__transaction_id="tx_1").count() == 50
 
 
 @pytest.mark.anyio
 async def test_update_and_rescore_transaction_success_with_partial_payload(
     make_transaction,
 ):
-    tx = make_transaction("tx_1")
-    prediction = SimpleNamespace(scored_at=datetime.now(UTC))
+    tx = make_transaction("tx_1", pk=7, version=3)
+    scored_at = datetime.now(UTC)
     payload = scoring_service.TransactionUpdate(amount=250.0)
-    mocker(scoring_service).mock("in_transaction").return_value(_DummyTxContext())
     mocker(scoring_service.transaction_repo).mock(
-        "get_transaction_for_update", force_async=True
+        "get_transaction", force_async=True
     ).return_value(tx).awaited_once()
-    mocker(scoring_service).mock("score_payload").return_value((0.61, 1, 0.5))
+    mocker(scoring_service).mock("score_payload").return_value((0.61, 1, 0.5, True))
     mocker(scoring_service.transaction_repo).mock(
-        "update_transaction_fields", force_async=True
-    ).awaited_once()
-    mocker(scoring_service.transaction_repo).mock(
-        "create_prediction", force_async=True
-    ).return_value(prediction).awaited_once()
+        "rescore_transaction_if_version", force_async=True
+    ).return_value(scored_at).awaited_once_with(
+        transaction_pk=7,
+        version=3,
+        fields={"amount": 250.0},
+        fraud_probability=0.61,
+        decision=1,
+        prescreened=True,
+    )
 
     result = await update_and_rescore_transaction("tx_1", payload)
 
@@ -118,15 +174,61 @@ async def test_update_and_rescore_transaction_success_with_partial_payload(
     assert result.fraud_probability == 0.61
     assert result.decision == 1
     assert result.threshold == 0.5
-    assert result.scored_at == prediction.scored_at
+    assert result.scored_at == scored_at
+
+
+@pytest.mark.anyio
+async def test_update_and_rescore_transaction_retries_after_a_concurrent_write(
+    make_transaction,
+):
+    stale = make_transaction("tx_1", pk=1, version=1)
+    fresh = make_transaction("tx_1", pk=1, version=2)
+    scored_at = datetime.now(UTC)
+    mocker(scoring_service.transaction_repo).mock(
+        "get_transaction", force_async=True
+    ).side_effect([stale, fresh])
+    mocker(scoring_service).mock("score_payload").return_value((0.2, 0, 0.5, False))
+    versions = []
+
+    async def rescore(*, version, **kwargs):
+        versions.append(version)
+        return None if version == 1 else scored_at
+
+    mocker(scoring_service.transaction_repo).mock(
+        "rescore_transaction_if_version"
+    ).side_effect(rescore)
+
+    result = await update_and_rescore_transaction(
+        "tx_1", scoring_service.TransactionUpdate(amount=10.0)
+    )
+
+    assert versions == [1, 2]
+    assert result.scored_at == scored_at
+
+
+@pytest.mark.anyio
+async def test_update_and_rescore_transaction_gives_up_after_max_attempts(
+    make_transaction,
+):
+    mocker(scoring_service.transaction_repo).mock(
+        "get_transaction", force_async=True
+    ).return_value(make_transaction("tx_1", pk=1))
+    mocker(scoring_service).mock("score_payload").return_value((0.2, 0, 0.5, False))
+    mocker(scoring_service.transaction_repo).mock(
+        "rescore_transaction_if_version", force_async=True
+    ).return_value(None).awaited_twice()
+
+    with pytest.raises(TransactionUpdateConflictError):
+        await update_and_rescore_transaction(
+            "tx_1", scoring_service.TransactionUpdate(amount=10.0), max_attempts=2
+        )
 
 
 @pytest.mark.anyio
 async def test_update_and_rescore_transaction_not_found_raises():
     payload = scoring_service.TransactionUpdate(amount=250.0)
-    mocker(scoring_service).mock("in_transaction").return_value(_DummyTxContext())
     mocker(scoring_service.transaction_repo).mock(
-        "get_transaction_for_update", force_async=True
+        "get_transaction", force_async=True
     ).return_value(None)
 
     with pytest.raises(TransactionNotFoundError):
@@ -0,0 +1,156 @@
+from datetime import UTC, datetime
+
+import pytest
+from chainmock import mocker
+
+from api.enums import MerchantCategory
+from api.schemas import ScoreRequest
+from api.services import shadow_scoring
+from api.services.shadow_scoring import (
+    ShadowItem,
+    ShadowScorer,
+    score_shadow_batch,
+    shadow_report,
+)
+
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=UTC)
+
+
+class BrokenModel:
+    def predict_proba(self, df):
+        msg = "model crash"
+        raise RuntimeError(msg)
+
+
+def _request(transaction_id: str = "tx_1", amount: float = 600.0) -> ScoreRequest:
+    return ScoreRequest(
+        transaction_id=transaction_id,
+        amount=amount,
+        transaction_hour=14,
+        merchant_category=MerchantCategory.ELECTRONICS,
+        foreign_transaction=False,
+        location_mismatch=False,
+        device_trust_score=85,
+        velocity_last_24h=3,
+        cardholder_age=35,
+    )
+
+
+def _item(transaction_id: str = "tx_1", amount: float = 600.0) -> ShadowItem:
+    request = _request(transaction_id, amount)
+    return ShadowItem(
+        transaction_id=transaction_id,
+        features=request.model_dump(exclude={"transaction_id"}),
+        champion_probability=0.4,
+        champion_decision=0,
+        threshold=0.5,
+        scored_at=NOW,
+    )
+
+
+def test_score_shadow_batch_scores_every_challenger_at_its_threshold(amount_model):
+    bundles = {
+        "strict": {"model": amount_model, "threshold": 0.7},
+        "default": {"model": amount_model},
+        "broken": {"model": BrokenModel()},
+    }
+
+    rows, failed = score_shadow_batch(bundles, [_item("tx_1"), _item("tx_2", 800.0)])
+
+    assert failed == ["broken"]
+    assert [
+        (row["model_name"], row["transaction_id"], row["decision"]) for row in rows
+    ] == [
+        ("strict", "tx_1", 0),
+        ("strict", "tx_2", 1),
+        ("default", "tx_1", 1),
+        ("default", "tx_2", 1),
+    ]
+    assert rows[0]["fraud_probability"] == pytest.approx(0.6)
+    assert rows[0]["champion_probability"] == 0.4
+
+
+@pytest.mark.anyio
+async def test_submit_drops_instead_of_waiting_when_full(amount_model):
+    scorer = ShadowScorer(
+        {"challenger": {"model": amount_model}},
+        max_size=1,
+        flush_interval_ms=60_000,
+        batch_size=10,
+    )
+
+    assert scorer.submit(_item("tx_1")) is True
+    assert scorer.submit(_item("tx_2")) is False
+
+    stats = scorer.stats()
+    assert (stats.enqueued, stats.dropped, stats.queue_depth) == (1, 1, 1)
+    scorer._executor.shutdown()
+
+
+@pytest.mark.anyio
+async def test_stop_scores_and_stores_queued_items_in_batches(amount_model):
+    stored = []
+
+    async def insert(rows):
+        stored.append(rows)
+        return len(rows)
+
+    mocker(shadow_scoring.shadow_repo).mock(
+        "bulk_insert_shadow_predictions"
+    ).side_effect(insert)
+    scorer = ShadowScorer(
+        {"challenger": {"model": amount_model}, "broken": {"model": BrokenModel()}},
+        max_size=10,
+        flush_interval_ms=60_000,
+        batch_size=2,
+    )
+    scorer.start()
+    for index in range(3):
+        scorer.submit(_item(f"tx_{index}"))
+
+    await scorer.stop()
+
+    assert [len(rows) for rows in stored] == [2, 1]
+    stats = scorer.stats()
+    assert (stats.scored, stats.failed, stats.batches) == (3, 3, 2)
+    assert stats.queue_depth == 0
+
+
+def test_submit_shadow_is_a_noop_without_challengers():
+    shadow_scoring.submit_shadow(
+        _request(),
+        champion_probability=0.4,
+        champion_decision=0,
+        threshold=0.5,
+        scored_at=NOW,
+    )
+
+    assert shadow_scoring.get_shadow_scorer() is None
+
+
+@pytest.mark.anyio
+async def test_shadow_report_derives_agreement_rate():
+    mocker(shadow_scoring.shadow_repo).mock(
+        "shadow_report", force_async=True
+    ).return_value(
+        [
+            {
+                "model_name": "challenger",
+                "prediction_count": 200,
+                "agreements": 190,
+                "both_flagged": 12,
+                "shadow_only_flagged": 6,
+                "champion_only_flagged": 4,
+                "mean_delta": 0.01,
+                "mean_abs_delta": 0.03,
+                "p95_abs_delta": 0.12,
+                "max_abs_delta": 0.4,
+                "correlation": 0.97,
+            }
+        ]
+    ).awaited_once_with(start=NOW, end=None)
+
+    [report] = await shadow_report(start=NOW)
+
+    assert report.agreement_rate == 0.95
+    assert report.shadow_only_flagged == 6
@@ -0,0 +1,170 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import pairwise
+from pathlib import Path
+
+import numpy as np
+import pytest
+from chainmock import mocker
+
+from api.core.exceptions import InvalidCSVError
+from api.services import csv_import, sharded_import
+from api.services.sharded_import import (
+    Shard,
+    import_csv_file_sharded,
+    plan_shards,
+    process_shard,
+)
+
+HEADER = (
+    "transaction_id,amount,transaction_hour,merchant_category,foreign_transaction,"
+    "location_mismatch,device_trust_score,velocity_last_24h,cardholder_age\n"
+)
+
+
+def _line(tx_id: str, amount: float = 100.0) -> str:
+    return f"{tx_id},{amount},14,Electronics,0,0,85,3,35\n"
+
+
+def _write_csv(tmp_path: Path, lines: list[str]) -> Path:
+    csv_path = tmp_path / "transactions.csv"
+    csv_path.write_text(HEADER + "".join(lines), encoding="utf-8")
+    return csv_path
+
+
+def test_plan_shards_aligns_ranges_to_line_starts(tmp_path):
+    csv_path = _write_csv(tmp_path, [_line(f"tx_{index}") for index in range(10)])
+    content = csv_path.read_bytes()
+
+    fieldnames, shards = plan_shards(csv_path, shard_bytes=50)
+
+    assert fieldnames == HEADER.strip().split(",")
+    assert len(shards) > 1
+    assert shards[0].start == len(HEADER)
+    assert shards[-1].end == len(content)
+    for previous, current in pairwise(shards):
+        assert previous.end == current.start
+        assert content[current.start - 1 : current.start] == b"\n"
+    body = b"".join(content[shard.start : shard.end] for shard in shards)
+    assert body == content[len(HEADER) :]
+
+
+def test_plan_shards_handles_missing_trailing_newline(tmp_path):
+    csv_path = tmp_path / "transactions.csv"
+    csv_path.write_text(HEADER + _line("tx_1") + _line("tx_2").rstrip("\n"))
+
+    _, shards = plan_shards(csv_path, shard_bytes=10)
+
+    assert [shard.end - shard.start for shard in shards] == [
+        len(_line("tx_1")),
+        len(_line("tx_2")) - 1,
+    ]
+
+
+def test_plan_shards_empty_file_raises(tmp_path):
+    csv_path = tmp_path / "empty.csv"
+    csv_path.write_bytes(b"")
+
+    with pytest.raises(InvalidCSVError) as exc_info:
+        plan_shards(csv_path)
+
+    assert exc_info.value.detail == "CSV header is missing"
+
+
+def test_process_shard_validates_and_scores_in_one_call(tmp_path, amount_model):
+    csv_path = _write_csv(
+        tmp_path,
+        [
+            _line("tx_1", 900.0),
+            "tx_2,150.5,14,Electronics,maybe,0,85,3,35\n",
+            _line("tx_3"),
+        ],
+    )
+    fieldnames, shards = plan_shards(csv_path)
+    mocker(sharded_import).mock("get_model").return_value(amount_model)
+
+    result = process_shard(str(csv_path), shards[0], fieldnames, 50, 0.5)
+
+    assert result.total_rows == 3
+    assert result.skipped_invalid == 1
+    assert result.transactions["transaction_id"].tolist() == ["tx_1", "tx_3"]
+    assert result.line_numbers.tolist() == [0, 2]
+    assert result.fraud_probabilities.tolist() == [0.9, 0.1]
+    assert result.decisions.tolist() == [1, 0]
+    assert (result.errors[0].line, result.errors[0].transaction_id) == (1, "tx_2")
+
+
+def test_process_shard_isolates_scoring_failures(tmp_path, amount_model):
+    csv_path = _write_csv(tmp_path, [_line("tx_1"), _line("tx_2")])
+    fieldnames, _ = plan_shards(csv_path)
+    shard = Shard(start=len(HEADER), end=csv_path.stat().st_size)
+    mocker(sharded_import).mock("get_model").return_value(amount_model)
+    mocker(csv_import).mock("score_frame").side_effect(
+        [
+            RuntimeError("batch"),
+            RuntimeError("model crash"),
+            (np.array([0.2]), np.array([0])),
+        ]
+    )
+
+    result = process_shard(str(csv_path), shard, fieldnames, 50, 0.5)
+
+    assert result.skipped_scoring_errors == 1
+    assert result.transactions["transaction_id"].tolist() == ["tx_2"]
+    assert result.fraud_probabilities.tolist() == [0.2]
+    assert [
+        (error.line, error.transaction_id, error.error) for error in result.errors
+    ] == [(0, "tx_1", "Scoring failed: model crash")]
+
+
+@pytest.mark.anyio
+async def test_import_csv_file_sharded_keeps_first_duplicate_across_shards(
+    tmp_path, amount_model
+):
+    csv_path = _write_csv(
+        tmp_path,
+        [
+            _line("tx_1", 100.0),
+            _line("tx_2", 200.0),
+            "tx_bad,oops,14,Electronics,0,0,85,3,35\n",
+            _line("tx_1", 300.0),
+            _line("tx_3", 400.0),
+        ],
+    )
+    mocker(sharded_import).mock("get_model").return_value(amount_model)
+    mocker(sharded_import).mock("current_threshold", force_async=True).return_value(0.5)
+    stored: dict[str, float] = {}
+
+    async def persist(rows, *, fraud_probabilities, decisions):
+        imported = 0
+        for row in rows:
+            if row["transaction_id"] not in stored:
+                stored[row["transaction_id"]] = row["amount"]
+                imported += 1
+        return imported, len(rows) - imported
+
+    mocker(sharded_import).mock("persist_scored_rows").side_effect(persist)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        summary, stats = await import_csv_file_sharded(
+            csv_path, workers=2, shard_bytes=1, executor=executor
+        )
+
+    assert stored == {"tx_1": 100.0, "tx_2": 200.0, "tx_3": 400.0}
+    assert summary.total_rows == 5
+    assert summary.imported == 3
+    assert summary.skipped_duplicates == 1
+    assert summary.skipped_invalid == 1
+    assert summary.errors[0].line == 4
+    assert summary.errors[0].transaction_id == "tx_bad"
+    assert stats.rows == 5
+
+
+@pytest.mark.anyio
+async def test_import_csv_file_sharded_missing_columns_raises(tmp_path):
+    csv_path = tmp_path / "transactions.csv"
+    csv_path.write_text("transaction_id,amount\ntx_1,10\n")
+
+    with pytest.raises(InvalidCSVError) as exc_info:
+        await import_csv_file_sharded(csv_path)
+
+    assert "CSV missing required columns:" in exc_info.value.detail
@@ -0,0 +1,191 @@
+from datetime import UTC, datetime
+
+import numpy as np
+import pytest
+from chainmock import mocker
+
+from api.core.exceptions import ThresholdVersionNotFoundError
+from api.domain.evaluation import flagged_at
+from api.models import ThresholdVersion
+from api.repositories import thresholds as threshold_repo
+from api.repositories.thresholds import (
+    probability_histogram,
+    redecide_prediction_batch,
+)
+from api.schemas import RedecideRequest
+from api.services import thresholds as threshold_service
+from api.services.thresholds import (
+    get_active_threshold,
+    redecide_predictions,
+    threshold_what_if,
+)
+
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=UTC)
+
+
+@pytest.fixture(autouse=True)
+def _reset_active_threshold():
+    threshold_service._active = None
+    yield
+    threshold_service._active = None
+
+
+def _version(version_id: int, threshold: float) -> ThresholdVersion:
+    return ThresholdVersion(id=version_id, threshold=threshold, created_at=NOW)
+
+
+def test_flagged_at_matches_direct_comparison():
+    probabilities = np.random.default_rng(7).random(5_000)
+    counts = np.bincount((probabilities * 1_000).astype(np.int64), minlength=1_000)
+    thresholds = [0.0, 0.25, 0.5, 0.731, 1.0]
+
+    assert flagged_at(counts, thresholds) == [
+        int((probabilities >= threshold).sum()) for threshold in thresholds
+    ]
+
+
+@pytest.mark.anyio
+async def test_active_threshold_is_cached_and_falls_back_to_the_model():
+    mocker(threshold_service).mock("get_threshold").return_value(0.5)
+    mocker(threshold_repo).mock(
+        "latest_threshold_version", force_async=True
+    ).return_value(None).awaited_once()
+
+    first = await get_active_threshold()
+    second = await get_active_threshold()
+
+    assert first == second
+    assert (first.threshold, first.version) == (0.5, None)
+
+
+@pytest.mark.anyio
+async def test_active_threshold_keeps_last_value_when_lookup_fails():
+    mocker(threshold_repo).mock(
+        "latest_threshold_version", force_async=True
+    ).side_effect([_version(3, 0.7), RuntimeError("database unavailable")])
+
+    assert (await get_active_threshold()).threshold == 0.7
+    threshold_service._active_loaded_at = 0.0
+    active = await get_active_threshold()
+
+    assert (active.threshold, active.version) == (0.7, 3)
+
+
+@pytest.mark.anyio
+async def test_redecide_batch_passes_the_rollup_watermark(
+    make_connection, make_transaction_context
+):
+    connection = make_connection(
+        [
+            [{"scored_at": NOW}],
+            [{"last_id": 40, "scanned": 20, "prescreened": 2, "changed": 3}],
+        ]
+    )
+    mocker(threshold_repo).mock("in_transaction").return_value(
+        make_transaction_context(connection)
+    )
+
+    batch = await redecide_prediction_batch(threshold=0.7, after_id=20, batch_size=20)
+
+    assert batch == {"last_id": 40, "scanned": 20, "prescreened": 2, "changed": 3}
+    assert "FOR SHARE" in connection.queries[0][0]
+    query, values = connection.queries[1]
+    assert "p.decision <> (p.fraud_probability >= $1)" in query
+    assert "AND NOT b.prescreened" in query
+    assert "ON CONFLICT (bucket_start, merchant_category, decision)" in query
+    assert values == [0.7, 20, 20, NOW]
+
+
+@pytest.mark.anyio
+async def test_redecide_predictions_walks_batches_until_a_short_one():
+    mocker(threshold_repo).mock("get_threshold_version", force_async=True).return_value(
+        _version(2, 0.8)
+    ).awaited_once_with(2)
+    mocker(threshold_repo).mock(
+        "redecide_prediction_batch", force_async=True
+    ).side_effect(
+        [
+            {"last_id": 10, "scanned": 5, "prescreened": 1, "changed": 1},
+            {"last_id": 13, "scanned": 3, "prescreened": 0, "changed": 2},
+        ]
+    ).any_await_with(threshold=0.8, after_id=10, batch_size=5).awaited_twice()
+
+    result = await redecide_predictions(
+        RedecideRequest(threshold_version=2, batch_size=5, max_rows=None)
+    )
+
+    assert (result.threshold, result.threshold_version) == (0.8, 2)
+    assert (result.scanned, result.changed, result.batches) == (8, 3, 2)
+    assert result.prescreened == 1
+    assert result.last_id == 13
+    assert result.done is True
+
+
+@pytest.mark.anyio
+async def test_redecide_predictions_stops_at_max_rows():
+    mocker(threshold_repo).mock(
+        "latest_threshold_version", force_async=True
+    ).return_value(_version(1, 0.6))
+    mocker(threshold_repo).mock(
+        "redecide_prediction_batch", force_async=True
+    ).return_value(
+        {"last_id": 4, "scanned": 4, "prescreened": 0, "changed": 0}
+    ).awaited_once_with(threshold=0.6, after_id=0, batch_size=4)
+
+    result = await redecide_predictions(RedecideRequest(batch_size=10, max_rows=4))
+
+    assert result.last_id == 4
+    assert result.done is False
+
+
+@pytest.mark.anyio
+async def test_redecide_predictions_rejects_unknown_version():
+    mocker(threshold_repo).mock("get_threshold_version", force_async=True).return_value(
+        None
+    )
+
+    with pytest.raises(ThresholdVersionNotFoundError):
+        await redecide_predictions(RedecideRequest(threshold_version=9))
+
+
+@pytest.mark.anyio
+async def test_probability_histogram_filters_by_scored_at(make_connection):
+    connection = make_connection(
+        [[{"bucket": 9_000, "predictions": 4, "flagged": 4, "prescreened": 1}]]
+    )
+    mocker("api.repositories.thresholds.connections").mock("get").return_value(
+        connection
+    )
+
+    rows = await probability_histogram(bins=10_000, start=NOW)
+
+    assert rows == [{"bucket": 9_000, "predictions": 4, "flagged": 4, "prescreened": 1}]
+    query, values = connection.queries[0]
+    assert "count(*) FILTER (WHERE NOT prescreened) AS predictions" in query
+    assert "floor(fraud_probability * $1::float8 + 1e-9)" in query
+    assert "WHERE scored_at >= $2 GROUP BY 1" in query
+    assert values == [10_000, NOW]
+
+
+@pytest.mark.anyio
+async def test_threshold_what_if_reports_change_per_candidate():
+    mocker(threshold_repo).mock("probability_histogram", force_async=True).return_value(
+        [
+            {"bucket": 2_000, "predictions": 6, "flagged": 0, "prescreened": 5},
+            {"bucket": 6_000, "predictions": 3, "flagged": 3, "prescreened": 0},
+            {"bucket": 9_500, "predictions": 1, "flagged": 1, "prescreened": 2},
+        ]
+    )
+    mocker(threshold_repo).mock(
+        "latest_threshold_version", force_async=True
+    ).return_value(_version(1, 0.5))
+
+    report = await threshold_what_if([0.5, 0.9])
+
+    assert (report.prediction_count, report.flagged_count) == (10, 4)
+    assert report.prescreened_count == 7
+    assert report.active_threshold == 0.5
+    assert [
+        (candidate.flagged_count, candidate.flag_rate, candidate.change)
+        for candidate in report.candidates
+    ] == [(4, 0.4, 0), (1, 0.1, -3)]
@@ -1,38 +1,73 @@
 import io
+import json
 from datetime import UTC, datetime
 
+import msgpack
 import pytest
 from chainmock import mocker
-from fastapi import UploadFile
+from fastapi import Response, UploadFile
 
 from api.core.exceptions import (
     CreateOrScoreFailedError,
+    IdempotencyKeyReusedError,
+    InvalidTimeRangeError,
     InvalidUploadError,
     TransactionNotFoundError,
+    TransactionUpdateConflictError,
     UpdateOrRescoreFailedError,
 )
 from api.enums import MerchantCategory
+from api.repositories.transactions import PREDICTION_EXPORT_COLUMNS, TransactionFilters
 from api.routers import transactions as transactions_router
 from api.routers.transactions import (
     create_transaction,
     get_transaction,
+    list_scores,
     list_transactions,
     update_transaction,
 )
-from api.schemas import ScoreRequest, ScoreResponse, TransactionUpdate
+from api.schemas import (
+    ScoreRequest,
+    ScoreResponse,
+    TransactionImportResponse,
+    TransactionUpdate,
+)
 
 
 @pytest.mark.anyio
-async def test_list_transactions(make_transaction):
+async def test_list_transactions(make_transaction, make_request):
     mocker(transactions_router.transaction_repo).mock(
         "list_transactions", force_async=True
     ).return_value([make_transaction("tx1"), make_transaction("tx2")])
 
-    response = await list_transactions(limit=10, offset=0)
+    response = await list_transactions(
+        make_request(), filters=TransactionFilters(), limit=10, offset=0
+    )
+
+    data = json.loads(bytes(response.body))
+    assert response.media_type == "application/json"
+    assert len(data) == 2
+    assert data[0]["transaction_id"] == "tx1"
+    assert data[1]["transaction_id"] == "tx2"
+
+
+@pytest.mark.anyio
+async def test_list_scores_negotiates_msgpack(make_request, make_prediction):
+    mocker(transactions_router.transaction_repo).mock(
+        "list_scores", force_async=True
+    ).return_value([make_prediction(transaction_id="tx1")])
+
+    response = await list_scores(
+        make_request({"Accept": "application/msgpack"}),
+        filters=TransactionFilters(),
+        limit=10,
+        offset=0,
+    )
 
-    assert len(response) == 2
-    assert response[0].transaction_id == "tx1"
-    assert response[1].transaction_id == "tx2"
+    data = msgpack.unpackb(response.body)
+    assert response.media_type == "application/msgpack"
+    assert data[0]["transaction_id"] == "tx1"
+    assert data[0]["decision"] == 1
 
 
 @pytest.mark.anyio
@@ -87,7 +122,7 @@ async def test_create_transaction_success():
         "create_or_score_transaction", force_async=True
     ).return_value(expected)
 
-    response = await create_transaction(payload)
+    response = await create_transaction(payload, Response())
 
     assert response == expected
 
@@ -110,12 +145,47 @@ async def test_create_transaction_failure():
     ).side_effect(RuntimeError("boom"))
 
     with pytest.raises(CreateOrScoreFailedError) as exc_info:
-        await create_transaction(payload)
+        await create_transaction(payload, Response())
 
     exc = exc_info.value
     assert exc.detail == "Create-and-score failed for transaction: tx_456"
 
 
+@pytest.mark.anyio
+async def test_create_transaction_marks_replayed_responses(make_score_request):
+    payload = make_score_request("tx_789")
+    expected = ScoreResponse(
+        transaction_id="tx_789",
+        fraud_probability=0.2,
+        decision=0,
+        threshold=0.5,
+        scored_at=datetime(2023, 1, 1, tzinfo=UTC),
+    )
+    mocker(transactions_router).mock(
+        "score_idempotently", force_async=True
+    ).called_once_with("key-1", payload).return_value((expected, True))
+    response = Response()
+
+    scored = await create_transaction(payload, response, idempotency_key="key-1")
+
+    assert scored == expected
+    assert response.headers["Idempotent-Replayed"] == "true"
+
+
+@pytest.mark.anyio
+async def test_create_transaction_idempotency_errors_pass_through(
+    make_score_request,
+):
+    mocker(transactions_router).mock(
+        "score_idempotently", force_async=True
+    ).side_effect(IdempotencyKeyReusedError("key-1"))
+
+    with pytest.raises(IdempotencyKeyReusedError):
+        await create_transaction(
+            make_score_request("tx_789"), Response(), idempotency_key="key-1"
+        )
+
+
 @pytest.mark.anyio
 async def test_update_transaction_success():
     payload = TransactionUpdate(
@@ -167,6 +237,18 @@ async def test_update_transaction_not_found():
     assert exc.detail == "Transaction not found: tx_missing"
 
 
+@pytest.mark.anyio
+async def test_update_transaction_conflict_passes_through():
+    mocker(transactions_router).mock(
+        "update_and_rescore_transaction", force_async=True
+    ).side_effect(TransactionUpdateConflictError("tx_hot"))
+
+    with pytest.raises(TransactionUpdateConflictError) as exc_info:
+        await update_transaction("tx_hot", TransactionUpdate(amount=1.0))
+
+    assert exc_info.value.status_code == 409
+
+
 @pytest.mark.anyio
 async def test_update_transaction_failure():
     payload = TransactionUpdate(
@@ -192,7 +274,7 @@ async def test_update_transaction_failure():
 
 def test_import_transactions_endpoint_success(client):
     mocker(transactions_router).mock(
-        "import_transactions_from_csv", force_async=True
+        "import_transactions_from_file", force_async=True
     ).return_value(
         {
             "total_rows": 1,
@@ -227,7 +309,27 @@ def test_import_transactions_endpoint_rejects_non_csv(client):
     )
 
     assert response.status_code == 400
-    assert response.json()["detail"] == "Only .csv files are supported"
+    assert response.json()["detail"] == (
+        "Only .csv, .csv.gz, .csv.zst and .parquet files are supported"
+    )
+
+
+@pytest.mark.anyio
+async def test_import_transactions_endpoint_passes_detected_format():
+    file = UploadFile(filename="export.CSV.ZST", file=io.BytesIO(b""))
+    summary = TransactionImportResponse(
+        total_rows=0,
+        imported=0,
+        skipped_duplicates=0,
+        skipped_invalid=0,
+        skipped_scoring_errors=0,
+        errors=[],
+    )
+    mocker(transactions_router).mock(
+        "import_transactions_from_file", force_async=True
+    ).return_value(summary).awaited_once_with(file.file, import_format="csv.zst")
+
+    assert await transactions_router.import_transactions(file) == summary
 
 
 @pytest.mark.anyio
@@ -242,7 +344,7 @@ async def test_import_transactions_endpoint_requires_filename():
 
 def test_import_transactions_endpoint_handles_unexpected_error(client):
     mocker(transactions_router).mock(
-        "import_transactions_from_csv", force_async=True
+        "import_transactions_from_file", force_async=True
     ).side_effect(RuntimeError("boom"))
     csv_content = (
         "transaction_id,amount,transaction_hour,merchant_category,foreign_transaction,"
@@ -257,3 +359,54 @@ def test_import_transactions_endpoint_handles_unexpected_error(client):
 
     assert response.status_code == 500
     assert response.json()["detail"] == "CSV import failed for file: transactions.csv"
+
+
+@pytest.mark.anyio
+async def test_list_scores_passes_filters_to_repository(make_request, make_prediction):
+    filters = transactions_router.transaction_filters(
+        merchant_category=MerchantCategory.ELECTRONICS, decision=1
+    )
+    mocker(transactions_router.transaction_repo).mock(
+        "list_scores", force_async=True
+    ).return_value([make_prediction(transaction_id="tx1")]).awaited_once_with(
+        limit=50, offset=0, filters=filters
+    )
+
+    response = await list_scores(make_request(), filters=filters, limit=50, offset=0)
+
+    assert json.loads(bytes(response.body))[0]["transaction_id"] == "tx1"
+
+
+def test_transaction_filters_reject_empty_time_range():
+    moment = datetime(2024, 1, 1, tzinfo=UTC)
+
+    with pytest.raises(InvalidTimeRangeError):
+        transactions_router.transaction_filters(start=moment, end=moment)
+
+
+@pytest.mark.anyio
+async def test_export_scores_streams_filtered_rows(make_prediction):
+    scored_at = datetime(2024, 1, 1, tzinfo=UTC)
+    filters = TransactionFilters(decision=1, start=scored_at)
+    prediction = make_prediction(transaction_id="tx1", scored_at=scored_at)
+
+    async def rows():
+        yield [tuple(prediction[column] for column in PREDICTION_EXPORT_COLUMNS)]
+
+    mocker(transactions_router.transaction_repo).mock(
+        "stream_predictions_for_export"
+    ).return_value(rows()).called_once_with(filters)
+
+    response = await transactions_router.export_scores(
+        filters=filters, export_format="ndjson"
+    )
+
+    body = b""
+    async for chunk in response.body_iterator:
+        assert isinstance(chunk, bytes)
+        body += chunk
+    assert response.media_type == "application/x-ndjson"
+    assert response.headers["content-disposition"] == (
+        'attachment; filename="scores.ndjson"'
+    )
+    assert json.loads(body)["transaction_id"] == "tx1"